@@ -1,6 +1,6 @@
 # app/__init__.py
 
-from flask import Flask
+from flask import Flask, jsonify
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from config import Config # Import application configuration
@@ -8,8 +8,11 @@ from app.models import User, UserRole # Import models used by create-admin comma
 from werkzeug.security import generate_password_hash # For hashing admin password
 from app.extensions import db, migrate # Import initialized extensions
 import click # For Flask CLI commands
+import logging
 import os # Potentially needed for env vars, though Config handles it
 
+logger = logging.getLogger(__name__)
+
 # Initialize JWTManager globally but configure within create_app
 jwt = JWTManager()
 
@@ -21,6 +24,14 @@ def create_app(config_class=Config):
     # Load configuration from Config object
     app.config.from_object(config_class)
 
+    # Leveled JSON logging through a non-blocking queue (level, format and sampling from config)
+    from app.utils.logging_setup import configure_logging
+    configure_logging(app)
+
+    # Per-endpoint latency/status/DB metrics and GET /metrics (summed across gunicorn workers)
+    from app.services import metrics
+    metrics.init_app(app)
+
     # Enable Cross-Origin Resource Sharing (CORS)
     # Configure origins properly for production deployments
     CORS(app) # Allow all origins for development, restrict in production
@@ -33,6 +44,46 @@ def create_app(config_class=Config):
     # It will now use the JWT_SECRET_KEY from the app config
     jwt.init_app(app)
 
+    # Revoked token check on every JWT, served from memory (revocations reloaded incrementally)
+    from app.services import token_blocklist
+    token_blocklist.init_app(app, jwt)
+
+    # Bind the answer autosave write-behind buffer (flusher thread starts on first autosave)
+    from app.services import draft_buffer
+    draft_buffer.init_app(app)
+
+    # Optional write-behind submission queue (no-op unless SUBMISSION_QUEUE_ENABLED)
+    from app.services import submission_queue
+    submission_queue.init_app(app)
+
+    # Admin dashboard counters (cache lifetime from config)
+    from app.services import stats
+    stats.init_app(app)
+
+    # Process pool for hashing/checking passwords (started on first use; hash method and queue bound from config)
+    from app.services import passwords
+    passwords.init_app(app)
+
+    # Background exam/user deletion jobs (worker thread starts when a job is scheduled)
+    from app.services import deletion_jobs
+    deletion_jobs.init_app(app)
+
+    # Per-exam item analysis cache (size from config)
+    from app.services import item_analysis
+    item_analysis.init_app(app)
+
+    # Batch re-ranking of exams whose scores changed (thread starts when the first exam is queued)
+    from app.services import rankings
+    rankings.init_app(app)
+
+    # Per-teacher dashboard cache (lifetime from config)
+    from app.services import teacher_dashboard
+    teacher_dashboard.init_app(app)
+
+    # Role/verification cache used by the auth decorators (lifetime from config)
+    from app.services import user_cache
+    user_cache.init_app(app)
+
     # --- Register Blueprints ---
     # Import blueprint objects
     from app.routes.auth import bp as auth_bp
@@ -45,7 +96,7 @@ def create_app(config_class=Config):
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(teacher_bp, url_prefix='/teacher')
     app.register_blueprint(student_bp, url_prefix='/student')
-    print("Blueprints registered.")
+    logger.info("Blueprints registered.")
 
     # --- Simple Health Check Route ---
     @app.route('/')
@@ -88,7 +139,188 @@ def create_app(config_class=Config):
              db.session.rollback()
              click.echo(f"Error creating admin user: {e}", err=True)
 
-    print("Flask app creation completed.")
+    # --- CLI Command to Drain the Submission Queue ---
+    @app.cli.command('drain-submissions')
+    def drain_submissions():
+        """Writes queued submissions to the database (e.g. to recover after a crash)."""
+        if not submission_queue.is_enabled():
+            click.echo("Submission queue is disabled (SUBMISSION_QUEUE_ENABLED is not set).", err=True)
+            return
+        applied = submission_queue.drain_with_lock()
+        if applied is None:
+            click.echo("A running worker is currently draining the queue; nothing to do.", err=True)
+            return
+        click.echo(f"Drained {applied} queued submissions into the database.")
+
+    # --- CLI Command to Rebuild Materialized Exam Scores ---
+    @app.cli.command('rebuild-scores')
+    def rebuild_scores():
+        """Recomputes the exam_scores table from responses and evaluations."""
+        from app.services.scores import rebuild_all_scores
+        from app.services.rankings import refresh_stale_rankings
+        try:
+            row_count = rebuild_all_scores()
+            db.session.commit()
+            click.echo(f"Rebuilt exam scores: {row_count} student/exam rows.")
+            # The rebuilt rows have no ranks yet, so every exam is picked up
+            click.echo(f"Re-ranked {refresh_stale_rankings()} exams.")
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"Error rebuilding exam scores: {e}", err=True)
+
+    @app.cli.command('check-exam-totals')
+    @click.option('--fix', is_flag=True, help='Overwrite inconsistent totals with the values computed from questions.')
+    def check_exam_totals(fix):
+        """Checks exams.question_count/total_marks against the questions table."""
+        from app.services.exam_totals import find_inconsistent_exam_totals, fix_exam_totals
+        mismatches = find_inconsistent_exam_totals()
+        if not mismatches:
+            click.echo("All exam totals are consistent.")
+            return
+        for exam_id, stored_count, actual_count, stored_marks, actual_marks in mismatches:
+            click.echo(
+                f"Exam {exam_id}: question_count {stored_count} (actual {actual_count}), "
+                f"total_marks {stored_marks} (actual {actual_marks})"
+            )
+        if not fix:
+            click.echo(f"{len(mismatches)} exams have inconsistent totals. Re-run with --fix to repair them.")
+            return
+        try:
+            fix_exam_totals(mismatches)
+            db.session.commit()
+            click.echo(f"Fixed totals of {len(mismatches)} exams.")
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"Error fixing exam totals: {e}", err=True)
+
+    @app.cli.command('check-query-plans')
+    @click.option('--verbose', is_flag=True, help='Print the full plan of every query.')
+    def check_query_plans_command(verbose):
+        """Verifies with EXPLAIN that the hot endpoint queries use indexes. Exits with status 1 on a full scan."""
+        from app.services.query_plans import check_query_plans
+        failures = 0
+        for name, plan_lines, full_scans in check_query_plans():
+            if full_scans:
+                failures += 1
+                click.echo(f"FULL SCAN  {name}: {', '.join(full_scans)}")
+            else:
+                click.echo(f"ok         {name}")
+            if verbose or full_scans:
+                for line in plan_lines:
+                    click.echo(f"             {line}")
+        if failures:
+            click.echo(f"{failures} queries fall back to full table scans.", err=True)
+            raise SystemExit(1)
+
+    @app.cli.command('reconcile-stats')
+    def reconcile_stats():
+        """Recomputes the admin dashboard counters (stat_counters) from scratch."""
+        from app.services.stats import reconcile_counters
+        try:
+            drift = reconcile_counters()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"Error reconciling dashboard counters: {e}", err=True)
+            return
+        if not drift:
+            click.echo("All dashboard counters are accurate.")
+        for name, stored, actual in drift:
+            click.echo(f"{name}: {stored} -> {actual}")
+
+    @app.cli.command('bench-admin-listings')
+    @click.option('--pages', default=20, show_default=True, help='Number of pages to walk.')
+    @click.option('--per-page', default=20, show_default=True, help='Rows per page.')
+    def bench_admin_listings(pages, per_page):
+        """Compares per-page latency and memory of the old and current admin response listing queries."""
+        from app.services.listing_benchmark import run_listing_benchmark
+        results = run_listing_benchmark(pages, per_page)
+        click.echo(f"{'variant':<12}{'pages':>7}{'rows':>8}{'avg ms':>10}{'max ms':>10}{'avg KiB':>11}{'max KiB':>11}")
+        for variant, stats in results.items():
+            click.echo(
+                f"{variant:<12}{stats['pages']:>7}{stats['rows']:>8}{stats['avg_ms']:>10.1f}{stats['max_ms']:>10.1f}"
+                f"{stats['avg_peak_kib']:>11.1f}{stats['max_peak_kib']:>11.1f}"
+            )
+
+    @app.cli.command('bench-logins')
+    @click.option('--logins', default=200, show_default=True, help='Number of password checks to time.')
+    def bench_logins(logins):
+        """Measures password checks (logins) per second with the current hash method, serially and through the pool."""
+        from app.services.passwords import run_login_benchmark, current_method, pool_size
+        click.echo(f"Method {current_method()}, {pool_size()} pool workers, {logins} logins")
+        results = run_login_benchmark(logins)
+        click.echo(f"{'variant':<10}{'seconds':>10}{'logins/s':>12}{'per core':>12}")
+        for variant, stats in results.items():
+            click.echo(f"{variant:<10}{stats['seconds']:>10.2f}{stats['per_second']:>12.1f}{stats['per_core']:>12.1f}")
+
+    @app.cli.command('import-users')
+    @click.argument('csv_path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--role', default='Student', show_default=True, help='Role for rows without a role column value.')
+    @click.option('--verified', is_flag=True, help='Mark the imported users as verified.')
+    @click.option('--chunk-size', type=int, default=None, help='Rows per insert/commit (default: USER_IMPORT_CHUNK_SIZE).')
+    def import_users_command(csv_path, role, verified, chunk_size):
+        """Imports users from a CSV file with name, email, password and optional role columns."""
+        from app.services.user_import import import_users, parse_role
+        try:
+            default_role = parse_role(role)
+        except ValueError as e:
+            click.echo(f"Error: {e}", err=True)
+            return
+        try:
+            with open(csv_path, newline='', encoding='utf-8-sig') as csv_file:
+                report = import_users(
+                    csv_file, default_role, verified, chunk_size or app.config['USER_IMPORT_CHUNK_SIZE']
+                )
+        except (ValueError, UnicodeDecodeError) as e:
+            click.echo(f"Error: {e}", err=True)
+            return
+        for error in report["errors"]:
+            click.echo(f"Line {error['line']} ({error['email']}): {error['msg']}", err=True)
+        if report["error_count"] > len(report["errors"]):
+            click.echo(f"... and {report['error_count'] - len(report['errors'])} more errors.", err=True)
+        click.echo(f"Imported {report['created']} of {report['rows']} rows ({report['error_count']} rejected).")
+
+    @app.cli.command('run-deletion-jobs')
+    @click.option('--retry', is_flag=True, help='Also rerun failed and interrupted jobs.')
+    def run_deletion_jobs(retry):
+        """Runs queued exam/user deletion jobs in the foreground until none are left."""
+        ran = deletion_jobs.run_pending_jobs(retry=retry)
+        click.echo(f"Ran {ran} deletion jobs.")
+
+    @app.cli.command('refresh-rankings')
+    @click.option('--all', 'refresh_all', is_flag=True, help='Recompute every exam, not only those whose scores changed.')
+    def refresh_rankings(refresh_all):
+        """Recomputes cohort ranks, percentiles and score distributions of exams with changed scores."""
+        from app.services.rankings import refresh_stale_rankings
+        click.echo(f"Re-ranked {refresh_stale_rankings(force=refresh_all)} exams.")
+
+    @app.cli.command('purge-revoked-tokens')
+    def purge_revoked_tokens():
+        """Deletes token revocations whose tokens have expired anyway."""
+        from app.services.token_blocklist import purge_expired
+        deleted = purge_expired()
+        db.session.commit()
+        click.echo(f"Purged {deleted} expired token revocations.")
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index():
+        """Creates the full-text search index (and its sync triggers) if missing and re-indexes everything."""
+        from app.services.search import get_backend
+        try:
+            backend = get_backend()
+            backend.install()
+            counts = backend.rebuild()
+            db.session.commit()
+        except NotImplementedError as e:
+            click.echo(f"Error: {e}", err=True)
+            return
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"Error rebuilding search index: {e}", err=True)
+            return
+        click.echo(f"Rebuilt {backend.name} index: " + ", ".join(f"{count} {kind} documents" for kind, count in counts.items()))
+
+    logger.info("Flask app creation completed.")
     return app
 
 # No changes were needed in this file for the UTC refactoring.
\ No newline at end of file
@@ -1,7 +1,8 @@
 # app/models.py
 
 from app.extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from app.services.passwords import hash_password # Current PASSWORD_HASH_METHOD
 from datetime import datetime, timezone
 import enum
 
@@ -19,13 +20,25 @@ class User(db.Model):
     role = db.Column(db.Enum(UserRole), nullable=False, default=UserRole.STUDENT)
     is_verified = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Set when the account is scheduled for deletion; hidden everywhere until the deletion job removes it
+    is_deleted = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
+
+    # Admin dashboard counts and pending-verification lists filter on role and verification;
+    # the teacher/student directories page by role ordered by case-insensitive name, email or
+    # registration time, and prefix-search on lower(name)/lower(email)
+    __table_args__ = (
+        db.Index('ix_users_role_is_verified', 'role', 'is_verified'),
+        db.Index('ix_users_role_lower_name_id', role, db.func.lower(name), id),
+        db.Index('ix_users_role_lower_email_id', role, db.func.lower(email), id),
+        db.Index('ix_users_role_created_at_id', role, created_at, id),
+    )
 
     # Relationships - No cascade needed *from* User deletion typically
     created_exams = db.relationship('Exam', backref='creator', lazy='dynamic', foreign_keys='Exam.created_by')
     responses = db.relationship('StudentResponse', backref='student', lazy='dynamic')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -43,6 +56,18 @@ class Exam(db.Model):
     # Define the ForeignKey to User here
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Denormalized aggregates of the exam's questions, kept in step by app/services/exam_totals.py
+    # in the same transaction as every question insert/update/delete
+    question_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    total_marks = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    # Set when the exam is scheduled for deletion; hidden everywhere until the deletion job removes it
+    is_deleted = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
+
+    # Teacher listings filter by creator and order by schedule; student listings order by schedule
+    __table_args__ = (
+        db.Index('ix_exams_created_by_scheduled_time', 'created_by', 'scheduled_time'),
+        db.Index('ix_exams_scheduled_time', 'scheduled_time'),
+    )
 
     # ORM Relationships: Define cascades primarily for session management if needed,
     # but DB cascades will handle the deletion persistence.
@@ -72,6 +97,10 @@ class Question(db.Model):
     marks = db.Column(db.Integer, nullable=False)
     word_limit = db.Column(db.Integer, nullable=True)
 
+    __table_args__ = (
+        db.Index('ix_questions_exam_id', 'exam_id'),
+    )
+
     # Cascade needed here too for deleting Responses when a Question is deleted
     responses = db.relationship('StudentResponse', backref='question', lazy='dynamic',
                                 cascade="all, delete-orphan")
@@ -91,12 +120,95 @@ class StudentResponse(db.Model):
     response_text = db.Column(db.Text, nullable=True)
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        # Student dashboards/results and the "already submitted" check
+        db.Index('ix_student_responses_student_id_exam_id', 'student_id', 'exam_id'),
+        # Teacher result details and score refreshes (filter by exam, ordered by student and question)
+        db.Index('ix_student_responses_exam_id_student_id_question_id', 'exam_id', 'student_id', 'question_id'),
+        # Question deletes and per-question listings
+        db.Index('ix_student_responses_question_id', 'question_id'),
+        # Admin response listing (newest first)
+        db.Index('ix_student_responses_submitted_at_id', 'submitted_at', 'id'),
+    )
+
     # The 'evaluation' attribute is added via backref from Evaluation model.
     # Cascade for this one-to-one is best handled on the Evaluation FK below.
 
     def __repr__(self):
          return f'<StudentResponse {self.id} by Student {self.student_id} for Exam {self.exam_id}>'
 
+class ExamScore(db.Model):
+    __tablename__ = 'exam_scores'
+    # Materialized per-student, per-exam totals, maintained incrementally by app/services/scores.py
+    # whenever a submission lands or an evaluation is saved. "flask rebuild-scores" recomputes it.
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    exam_id = db.Column(db.Integer, db.ForeignKey('exams.id', ondelete='CASCADE'), nullable=False)
+    marks_awarded = db.Column(db.Float, default=0.0, nullable=False) # Sum over evaluated responses
+    marks_possible = db.Column(db.Integer, default=0, nullable=False) # Sum of max marks of answered questions
+    evaluated_count = db.Column(db.Integer, default=0, nullable=False)
+    pending_count = db.Column(db.Integer, default=0, nullable=False)
+    submitted_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Position in the exam's cohort, written in batch by app/services/rankings.py (null until ranked)
+    rank = db.Column(db.Integer, nullable=True) # 1 = best; ties share a rank
+    percentile = db.Column(db.Float, nullable=True) # Share of the cohort scoring lower (ties count half), 0-100
+
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'exam_id', name='uq_exam_scores_student_exam'),
+        db.Index('ix_exam_scores_exam_id_student_id', 'exam_id', 'student_id'),
+    )
+
+    def __repr__(self):
+        return f'<ExamScore Student {self.student_id} Exam {self.exam_id}: {self.marks_awarded}/{self.marks_possible}>'
+
+class ExamStats(db.Model):
+    __tablename__ = 'exam_stats'
+    # Score distribution of an exam's cohort, recomputed together with the ranks in exam_scores
+    id = db.Column(db.Integer, primary_key=True)
+    exam_id = db.Column(db.Integer, db.ForeignKey('exams.id', ondelete='CASCADE'), nullable=False, unique=True)
+    students = db.Column(db.Integer, nullable=False)
+    fully_evaluated = db.Column(db.Integer, nullable=False)
+    mean_marks = db.Column(db.Float, nullable=True)
+    median_marks = db.Column(db.Float, nullable=True)
+    std_dev = db.Column(db.Float, nullable=True)
+    highest_marks = db.Column(db.Float, nullable=True)
+    lowest_marks = db.Column(db.Float, nullable=True)
+    histogram = db.Column(db.JSON, nullable=False) # Student counts per 10% band of the exam's total marks
+    scores_version = db.Column(db.String(100), nullable=False) # scores.score_versions() value the stats were computed from
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<ExamStats Exam {self.exam_id}: {self.students} students>'
+
+class ExamDraft(db.Model):
+    __tablename__ = 'exam_drafts'
+    id = db.Column(db.Integer, primary_key=True)
+    # Drafts are scratch data: drop them together with the student, exam or question
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    exam_id = db.Column(db.Integer, db.ForeignKey('exams.id', ondelete='CASCADE'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id', ondelete='CASCADE'), nullable=False)
+    response_text = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # One row per (student, exam, question); autosave flushes upsert against this key
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'exam_id', 'question_id', name='uq_exam_drafts_student_exam_question'),
+    )
+
+    def __repr__(self):
+        return f'<ExamDraft Student {self.student_id} Exam {self.exam_id} Question {self.question_id}>'
+
+class StatCounter(db.Model):
+    __tablename__ = 'stat_counters'
+    # Running totals for the admin dashboard, updated by app/services/stats.py in the same
+    # transaction as the writes they count. "flask reconcile-stats" recomputes them from scratch.
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<StatCounter {self.name}={self.value}>'
+
 class Evaluation(db.Model):
     __tablename__ = 'evaluations'
     id = db.Column(db.Integer, primary_key=True)
@@ -107,6 +219,11 @@ class Evaluation(db.Model):
     feedback = db.Column(db.Text, nullable=True)
     evaluated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    # Admin results listing (newest first)
+    __table_args__ = (
+        db.Index('ix_evaluations_evaluated_at_id', 'evaluated_at', 'id'),
+    )
+
     # Relationship remains largely the same, backref creates 'evaluation' attribute.
     # ORM cascade 'delete-orphan' on the *owning* side (response) can be useful
     # if you ever remove an evaluation from a response object in the session.
@@ -114,4 +231,43 @@ class Evaluation(db.Model):
                                                                      cascade="all, delete-orphan"))
 
     def __repr__(self):
-        return f'<Evaluation for Response {self.response_id}>'
\ No newline at end of file
+        return f'<Evaluation for Response {self.response_id}>'
+
+class DeletionJob(db.Model):
+    __tablename__ = 'deletion_jobs'
+    # Background removal of a soft-deleted exam or user and all rows that depend on it, in small
+    # chunked transactions (app/services/deletion_jobs.py). No FKs: the target disappears during the job.
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(20), nullable=False) # 'exam' or 'user'
+    entity_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False) # pending, running, completed, failed
+    requested_by = db.Column(db.Integer, nullable=True)
+    rows_total = db.Column(db.Integer, nullable=True) # Counted when the job starts
+    rows_deleted = db.Column(db.Integer, default=0, nullable=False)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True) # Claim and every chunk; a stale one means the runner died
+
+    __table_args__ = (
+        db.Index('ix_deletion_jobs_status_id', 'status', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<DeletionJob {self.id} {self.entity_type} {self.entity_id} ({self.status})>'
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+    # JWT revocations, loaded incrementally (by id) into the in-memory blocklist of
+    # app/services/token_blocklist.py. A row either revokes one token (jti), or, with jti NULL,
+    # every token of user_id issued before revoked_at. No FK: rows outlive deleted users until they expire.
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), nullable=True, unique=True)
+    token_type = db.Column(db.String(10), nullable=False) # 'access', 'refresh' or 'all'
+    user_id = db.Column(db.Integer, nullable=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True) # Row can be purged after this
+
+    def __repr__(self):
+        return f'<RevokedToken {self.id} {self.token_type} {self.jti or self.user_id}>'
@@ -1,14 +1,31 @@
 # app/routes/admin.py
 
-from flask import Blueprint, request, jsonify
+import logging
+from flask import Blueprint, request, jsonify, current_app
 from app.extensions import db
-from app.models import User, UserRole, Exam, StudentResponse, Evaluation, Question # Import necessary models
-from app.utils.decorators import admin_required, verified_required # Import custom decorators
-from app.utils.helpers import get_current_user_id, format_datetime # Import helper functions
+from app.models import User, UserRole, Exam, StudentResponse, Evaluation, Question, ExamDraft, ExamScore, DeletionJob # Import necessary models
+from app.utils.decorators import verified_admin_required # Role + verification check with one cached user lookup
+from app.utils.helpers import get_current_user_id, format_datetime, decode_cursor # Import helper functions
+from app.utils.helpers import fetch_keyset_page, approximate_total, pagination_payload # Keyset pagination
 from flask_jwt_extended import jwt_required # For protecting routes
+from sqlalchemy import func, case, update, and_, or_
 from sqlalchemy.orm import joinedload # For efficient loading of related objects
 from datetime import datetime # Standard datetime library (mainly for type hints or potential parsing)
 from app.services.ai_evaluation import evaluate_response_with_gemini # Import AI evaluation service
+from app.services.scores import record_evaluation # Keeps the materialized exam_scores in step
+from app.services import stats # Dashboard counters
+from app.services.grading import save_manual_evaluations, MAX_BATCH_SIZE
+from app.services.user_import import import_users, parse_role # CSV user import
+from app.services import deletion_jobs # Background user deletion
+from app.services.search import parse_search_args, search_page # Full-text search
+from app.services import user_cache # Auth decorator cache, invalidated on bulk verify/delete
+from app.services import token_blocklist # Token revocation
+import csv
+import io
+import time
+from app.utils.logging_setup import SAMPLED # Marks high-volume debug records for sampling
+
+logger = logging.getLogger(__name__)
 
 # Removed pendulum import as it's no longer needed
 
@@ -18,37 +35,28 @@ bp = Blueprint('admin', __name__)
 
 @bp.route('/dashboard', methods=['GET'])
 @jwt_required()
-@admin_required
-@verified_required
+@verified_admin_required
 def dashboard():
     """Provides summary statistics for the admin dashboard."""
-    print(f"\n*** Admin Dashboard Endpoint Reached ***")
+    logger.debug('Admin Dashboard Endpoint Reached', extra=SAMPLED)
     admin_id = get_current_user_id() # For logging/context if needed
     if not admin_id:
         # This case should ideally be caught by jwt_required/decorators, but good practice
         return jsonify({"msg": "Unauthorized: Could not identify admin user."}), 401
 
     try:
-        # Count verified teachers and students
-        teacher_count = User.query.filter_by(role=UserRole.TEACHER, is_verified=True).count()
-        student_count = User.query.filter_by(role=UserRole.STUDENT, is_verified=True).count()
-
-        # Count users (non-admins) awaiting verification
-        pending_users_count = User.query.filter(
-            User.is_verified == False,
-            User.role != UserRole.ADMIN
-        ).count()
-
-        # Count total exams
-        exam_count = Exam.query.count()
-
-        # Count total and evaluated responses
-        total_responses_count = StudentResponse.query.count()
-        evaluated_responses_count = Evaluation.query.count()
+        # Incremental counters (stat_counters), cached for a few seconds
+        counters = stats.get_counters()
+        teacher_count = counters[stats.VERIFIED_TEACHERS]
+        student_count = counters[stats.VERIFIED_STUDENTS]
+        pending_users_count = counters[stats.PENDING_USERS]
+        exam_count = counters[stats.EXAMS]
+        total_responses_count = counters[stats.RESPONSES]
+        evaluated_responses_count = counters[stats.EVALUATIONS]
         # Calculate pending evaluations (ensure non-negative)
         pending_evaluations_count = max(0, total_responses_count - evaluated_responses_count)
 
-        print(f"--- Admin {admin_id} dashboard data retrieved ---")
+        logger.info('Admin %s dashboard data retrieved', admin_id)
         return jsonify({
             "message": "Admin Dashboard Data",
             "active_teachers": teacher_count,
@@ -60,21 +68,21 @@ def dashboard():
             "responses_pending_evaluation": pending_evaluations_count
         }), 200
     except Exception as e:
-        print(f"!!! Error generating admin dashboard data for admin {admin_id}: {e}")
+        logger.exception('Error generating admin dashboard data for admin %s: %s', admin_id, e)
         return jsonify({"msg": "An error occurred while retrieving dashboard statistics."}), 500
 
 @bp.route('/users/pending', methods=['GET'])
 @jwt_required()
-@admin_required
-@verified_required
+@verified_admin_required
 def get_pending_users():
     """Retrieves a list of users awaiting verification."""
-    print(f"\n*** Get Pending Users Endpoint Reached ***")
+    logger.debug('Get Pending Users Endpoint Reached', extra=SAMPLED)
     try:
         # Query for non-verified users who are not Admins, order by registration time
         pending_users = User.query.filter(
             User.is_verified == False,
-            User.role != UserRole.ADMIN
+            User.role != UserRole.ADMIN,
+            User.is_deleted == False
         ).order_by(User.created_at.asc()).all()
 
         # Format user data for the response
@@ -87,26 +95,25 @@ def get_pending_users():
             "registered_at_utc": format_datetime(u.created_at)
         } for u in pending_users]
 
-        print(f"--- Found {len(users_data)} pending users ---")
+        logger.info('Found %s pending users', len(users_data))
         return jsonify(users_data), 200
     except Exception as e:
-        print(f"!!! Error fetching pending users: {e}")
+        logger.exception('Error fetching pending users: %s', e)
         return jsonify({"msg": "Error fetching pending users."}), 500
 
 @bp.route('/users/verify/<int:user_id>', methods=['POST'])
 @jwt_required()
-@admin_required
-@verified_required
+@verified_admin_required
 def verify_user(user_id):
     """Verifies a specific user account."""
-    print(f"\n*** Verify User Endpoint Reached for User ID: {user_id} ***")
+    logger.debug('Verify User Endpoint Reached for User ID: %s', user_id, extra=SAMPLED)
     admin_id = get_current_user_id()
 
     # Find the user to verify
     user = User.query.get(user_id)
 
     # --- Validation Checks ---
-    if not user:
+    if not user or user.is_deleted:
         return jsonify({"msg": "User not found"}), 404
     if user.role == UserRole.ADMIN:
         # Prevent admins from verifying other admins via this endpoint
@@ -118,75 +125,141 @@ def verify_user(user_id):
     try:
         # Set verification flag and commit
         user.is_verified = True
+        stats.bump_user(user.role, False, -1)
+        stats.bump_user(user.role, True, 1)
         db.session.commit()
-        print(f"--- User {user.email} (ID: {user_id}) verified successfully by admin {admin_id} ---")
+        logger.info('User %s (ID: %s) verified successfully by admin %s', user.email, user_id, admin_id)
         return jsonify({"msg": f"User '{user.email}' verified successfully"}), 200
     except Exception as e:
         db.session.rollback() # Rollback changes on error
-        print(f"!!! Error verifying user {user_id} by admin {admin_id}: {e}")
+        logger.exception('Error verifying user %s by admin %s: %s', user_id, admin_id, e)
         return jsonify({"msg": "Failed to verify user due to a server error."}), 500
 
 @bp.route('/teachers', methods=['GET'])
 @jwt_required()
-@admin_required
-@verified_required
+@verified_admin_required
 def get_all_teachers():
-    """Retrieves a list of all registered teachers."""
-    print(f"\n*** Get All Teachers Endpoint Reached ***")
+    """Retrieves a page of the teacher directory (or every teacher with legacy=true)."""
+    logger.debug('Get All Teachers Endpoint Reached', extra=SAMPLED)
+    return _user_directory(UserRole.TEACHER, "teachers")
+
+@bp.route('/students', methods=['GET'])
+@jwt_required()
+@verified_admin_required
+def get_all_students():
+    """Retrieves a page of the student directory (or every student with legacy=true)."""
+    logger.debug('Get All Students Endpoint Reached', extra=SAMPLED)
+    return _user_directory(UserRole.STUDENT, "students")
+
+# --- User directories ---
+# Keyset-paginated, searchable listings of teachers/students. Sorting uses the
+# (role, lower(name|email), id) and (role, created_at, id) indexes; the search is a
+# case-insensitive prefix match on name or email, expressed as a range on the same
+# lower() expressions so it can use those indexes too (LIKE cannot use an expression index).
+
+DIRECTORY_SORTS = ('name', 'email', 'created_at')
+
+def _prefix_range(expression, prefix):
+    """expression starts with prefix, as a range condition (expression >= prefix AND < next prefix)."""
+    upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(expression >= prefix, expression < upper_bound)
+
+def _user_directory(role, label):
+    """
+    Shared implementation of /teachers and /students for the given role.
+    Query params: q (name/email prefix), sort (name, email, created_at), order (asc, desc),
+    verified (true, false), per_page, cursor, with_total, page (legacy), legacy (plain array).
+    """
+    if request.args.get('legacy', 'false').lower() in ('1', 'true', 'yes'):
+        return _legacy_user_directory(role, label)
+
+    sort = request.args.get('sort', 'name')
+    if sort not in DIRECTORY_SORTS:
+        return jsonify({"msg": f"sort must be one of: {', '.join(DIRECTORY_SORTS)}."}), 400
+    order = request.args.get('order', 'desc' if sort == 'created_at' else 'asc')
+    if order not in ('asc', 'desc'):
+        return jsonify({"msg": "order must be 'asc' or 'desc'."}), 400
+    verified = request.args.get('verified')
+    if verified is not None and verified.lower() not in ('true', 'false'):
+        return jsonify({"msg": "verified must be 'true' or 'false'."}), 400
+    search = (request.args.get('q') or '').strip().lower()
     try:
-        # Query for all users with the Teacher role, order by name
-        teachers = User.query.filter_by(role=UserRole.TEACHER).order_by(User.name.asc()).all()
+        args = _parse_listing_args()
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
-        # Format data for response
-        teachers_data = [{
-            "id": u.id,
-            "name": u.name,
-            "email": u.email,
-            "is_verified": u.is_verified,
-            # Format the naive UTC datetime
-            "created_at_utc": format_datetime(u.created_at)
-        } for u in teachers]
+    sort_column = {
+        'name': func.lower(User.name),
+        'email': func.lower(User.email),
+        'created_at': User.created_at
+    }[sort]
+    try:
+        filters = [User.role == role, User.is_deleted == False]
+        if verified is not None:
+            filters.append(User.is_verified == (verified.lower() == 'true'))
+        if search:
+            filters.append(or_(
+                _prefix_range(func.lower(User.name), search),
+                _prefix_range(func.lower(User.email), search)
+            ))
+        # Compact projection: only the columns the directory shows
+        query = db.session.query(
+            User.id, User.name, User.email, User.is_verified, User.created_at,
+            sort_column.label("sort_value"), User.id.label("sort_id")
+        ).filter(*filters)
+        rows, next_cursor = fetch_keyset_page(query, sort_column, User.id, args, descending=(order == 'desc'))
+
+        total = None
+        if args["with_total"] or args["page"]:
+            total = approximate_total(
+                (label, verified, search),
+                db.session.query(func.count(User.id)).filter(*filters)
+            )
+
+        users_data = [{
+            "id": row.id,
+            "name": row.name,
+            "email": row.email,
+            "is_verified": row.is_verified,
+            "created_at_utc": format_datetime(row.created_at)
+        } for row in rows]
 
-        print(f"--- Found {len(teachers_data)} teachers ---")
-        return jsonify(teachers_data), 200
+        logger.info("Returning %s %s (search '%s', sort %s %s)", len(users_data), label, search, sort, order)
+        return jsonify({label: users_data, **pagination_payload(args, next_cursor, total)}), 200
     except Exception as e:
-        print(f"!!! Error fetching teachers: {e}")
-        return jsonify({"msg": "Error fetching teacher list."}), 500
+        logger.exception('Error fetching %s: %s', label, e)
+        return jsonify({"msg": f"Error fetching {label[:-1]} list."}), 500
 
-@bp.route('/students', methods=['GET'])
-@jwt_required()
-@admin_required
-@verified_required
-def get_all_students():
-    """Retrieves a list of all registered students."""
-    print(f"\n*** Get All Students Endpoint Reached ***")
+def _legacy_user_directory(role, label):
+    """The original response shape: a plain array of every user with the role, ordered by name."""
     try:
-        # Query for all users with the Student role, order by name
-        students = User.query.filter_by(role=UserRole.STUDENT).order_by(User.name.asc()).all()
+        users = db.session.query(
+            User.id, User.name, User.email, User.is_verified, User.created_at
+        ).filter(
+            User.role == role, User.is_deleted == False
+        ).order_by(User.name.asc()).all()
 
-        # Format data for response
-        students_data = [{
+        users_data = [{
             "id": u.id,
             "name": u.name,
             "email": u.email,
             "is_verified": u.is_verified,
             # Format the naive UTC datetime
             "created_at_utc": format_datetime(u.created_at)
-        } for u in students]
+        } for u in users]
 
-        print(f"--- Found {len(students_data)} students ---")
-        return jsonify(students_data), 200
+        logger.info('Found %s %s', len(users_data), label)
+        return jsonify(users_data), 200
     except Exception as e:
-        print(f"!!! Error fetching students: {e}")
-        return jsonify({"msg": "Error fetching student list."}), 500
+        logger.exception('Error fetching %s: %s', label, e)
+        return jsonify({"msg": f"Error fetching {label[:-1]} list."}), 500
 
 @bp.route('/users/<int:user_id>', methods=['DELETE'])
 @jwt_required()
-@admin_required
-@verified_required
+@verified_admin_required
 def delete_user(user_id):
     """Deletes a specific user (non-admin)."""
-    print(f"\n*** Delete User Endpoint Reached for User ID: {user_id} ***")
+    logger.debug('Delete User Endpoint Reached for User ID: %s', user_id, extra=SAMPLED)
     current_admin_id = get_current_user_id()
 
     # --- Validation Checks ---
@@ -198,7 +271,7 @@ def delete_user(user_id):
 
     user_to_delete = User.query.get(user_id)
 
-    if not user_to_delete:
+    if not user_to_delete or user_to_delete.is_deleted:
        return jsonify({"msg": "User not found"}), 404
     if user_to_delete.role == UserRole.ADMIN:
        # Restrict deletion of other admins
@@ -206,204 +279,546 @@ def delete_user(user_id):
     # --- End Validation ---
 
     try:
-        email_deleted = user_to_delete.email # Store email for logging before deletion
-        # Delete the user and commit
-        db.session.delete(user_to_delete)
+        email_deleted = user_to_delete.email # Store email for logging
+        # The account is hidden now; its exams, responses etc. are removed by a background job
+        job = deletion_jobs.schedule_user_deletion(user_to_delete, current_admin_id)
         db.session.commit()
-        print(f"--- User {email_deleted} (ID: {user_id}) deleted successfully by admin {current_admin_id} ---")
-        return jsonify({"msg": f"User '{email_deleted}' deleted successfully"}), 200
+        deletion_jobs.wake()
+        logger.info('User %s (ID: %s) scheduled for deletion by admin %s (job %s)', email_deleted, user_id, current_admin_id, job.id)
+        return jsonify({
+            "msg": f"User '{email_deleted}' deleted successfully",
+            "deletion_job": deletion_jobs.job_to_dict(job)
+        }), 202
     except Exception as e:
         db.session.rollback() # Rollback on error
-        print(f"!!! Error deleting user {user_id} by admin {current_admin_id}: {e}")
-        # Consider implications: deleting a user might require cascading deletes or nullifying foreign keys
-        # depending on relationships (e.g., exams created, responses submitted).
-        # Current setup might raise IntegrityError if related records exist and constraints are enforced.
-        return jsonify({"msg": "Failed to delete user due to a server error or constraint violation."}), 500
+        logger.exception('Error deleting user %s by admin %s: %s', user_id, current_admin_id, e)
+        return jsonify({"msg": "Failed to delete user due to a server error."}), 500
 
-@bp.route('/results/all', methods=['GET'])
+@bp.route('/users/<int:user_id>/revoke-tokens', methods=['POST'])
 @jwt_required()
-@admin_required
-@verified_required
-def get_all_results():
-    """Retrieves all evaluated results, possibly paginated."""
-    print(f"\n*** Get All Results Endpoint Reached ***")
+@verified_admin_required
+def revoke_user_tokens(user_id):
+    """Signs a user out everywhere: every access and refresh token issued to them so far stops working."""
+    current_admin_id = get_current_user_id()
+    user = User.query.get(user_id)
+    if not user or user.is_deleted:
+        return jsonify({"msg": "User not found"}), 404
+
     try:
-        # Pagination parameters from query string
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        token_blocklist.revoke_all_for_user(user.id)
+        db.session.commit()
+        logger.info('All tokens of user %s revoked by admin %s', user.id, current_admin_id)
+        return jsonify({"msg": f"All sessions of '{user.email}' have been revoked."}), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Error revoking tokens of user %s by admin %s: %s', user_id, current_admin_id, e)
+        return jsonify({"msg": "Failed to revoke tokens due to a server error."}), 500
 
-        # Base query for Evaluations, joining related tables for details
-        evaluations_query = Evaluation.query.join(
-            StudentResponse, Evaluation.response_id == StudentResponse.id
-        ).join(
-            User, StudentResponse.student_id == User.id
-        ).join(
-            Exam, StudentResponse.exam_id == Exam.id
-        ).join(
-            Question, StudentResponse.question_id == Question.id
-        ).add_columns(
-            Evaluation.id.label("evaluation_id"),
-            User.name.label("student_name"),
-            User.email.label("student_email"),
-            Exam.title.label("exam_title"),
-            Question.question_text,
-            StudentResponse.response_text, # Include student's response text
-            Evaluation.marks_awarded,
-            Question.marks.label("marks_possible"), # Include max marks for context
-            Evaluation.evaluated_by,
-            Evaluation.feedback,
-            Evaluation.evaluated_at
-        ).order_by(Evaluation.evaluated_at.desc()) # Order by most recent evaluation
-
-        # Paginate the query results
-        paginated_evaluations = evaluations_query.paginate(page=page, per_page=per_page, error_out=False)
-        evaluations = paginated_evaluations.items
-
-        # Format results for JSON response
-        results_data = [{
-            "evaluation_id": ev.evaluation_id,
-            "student_name": ev.student_name,
-            "student_email": ev.student_email,
-            "exam_title": ev.exam_title,
-            "question_text": ev.question_text[:100] + ("..." if len(ev.question_text or "") > 100 else ""), # Truncate long text
-            "student_response": ev.response_text[:150] + ("..." if len(ev.response_text or "") > 150 else ""), # Truncate response
-            "marks_awarded": ev.marks_awarded,
-            "marks_possible": ev.marks_possible,
-            "feedback": ev.feedback,
-            "evaluated_by": ev.evaluated_by,
-            # Format the naive UTC datetime
-            "evaluated_at_utc": format_datetime(ev.evaluated_at)
-        } for ev in evaluations]
+# --- Bulk user administration ---
+# Batch verify/delete take a JSON list of user ids and apply all changes in one transaction.
+# Ids that cannot be processed are skipped and reported instead of failing the whole batch.
+
+MAX_USER_BATCH_SIZE = 1000
+
+def _parse_user_ids(data):
+    """Returns (de-duplicated list of ids, error message) from {"user_ids": [...]}."""
+    user_ids = data.get('user_ids') if isinstance(data, dict) else None
+    if not isinstance(user_ids, list) or not user_ids:
+        return None, "Missing 'user_ids' list in request."
+    if len(user_ids) > MAX_USER_BATCH_SIZE:
+        return None, f"At most {MAX_USER_BATCH_SIZE} users can be processed per request."
+    if any(not isinstance(uid, int) or isinstance(uid, bool) for uid in user_ids):
+        return None, "'user_ids' must contain integers only."
+    return list(dict.fromkeys(user_ids)), None
+
+@bp.route('/users/verify', methods=['POST'])
+@jwt_required()
+@verified_admin_required
+def verify_users():
+    """Verifies many user accounts at once."""
+    logger.debug('Bulk Verify Users Endpoint Reached', extra=SAMPLED)
+    admin_id = get_current_user_id()
+    user_ids, error = _parse_user_ids(request.get_json(silent=True))
+    if error:
+        return jsonify({"msg": error}), 400
+
+    try:
+        users = {
+            row.id: row for row in db.session.query(User.id, User.role, User.is_verified)
+            .filter(User.id.in_(user_ids), User.is_deleted == False)
+        }
+        skipped = []
+        ids_by_role = {}
+        for uid in user_ids:
+            user = users.get(uid)
+            if user is None:
+                skipped.append({"user_id": uid, "msg": "User not found"})
+            elif user.role == UserRole.ADMIN:
+                skipped.append({"user_id": uid, "msg": "Cannot verify Admin role using this method"})
+            elif user.is_verified:
+                skipped.append({"user_id": uid, "msg": "User is already verified"})
+            else:
+                ids_by_role.setdefault(user.role, []).append(uid)
+
+        verified_count = 0
+        for role, ids in ids_by_role.items():
+            # rowcount guards the counters against a concurrent verify of the same user
+            result = db.session.execute(
+                update(User).where(User.id.in_(ids), User.is_verified == False).values(is_verified=True)
+            )
+            stats.bump_user(role, False, -result.rowcount)
+            stats.bump_user(role, True, result.rowcount)
+            verified_count += result.rowcount
+            user_cache.note_users_changed(ids) # Core update: no mapper events
+        db.session.commit()
+        logger.info('%s users verified in bulk by admin %s (%s skipped)', verified_count, admin_id, len(skipped))
+        return jsonify({
+            "msg": f"{verified_count} users verified successfully.",
+            "verified": [uid for ids in ids_by_role.values() for uid in ids],
+            "skipped": skipped
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Error verifying users in bulk by admin %s: %s', admin_id, e)
+        return jsonify({"msg": "Failed to verify users due to a server error."}), 500
 
-        print(f"--- Retrieved page {page} of all results ({len(results_data)} items) ---")
-        # Return paginated results structure
+@bp.route('/users/delete', methods=['POST'])
+@jwt_required()
+@verified_admin_required
+def delete_users():
+    """
+    Deletes many non-admin users at once. Users without exams or responses are deleted right away;
+    the others are hidden and handed to background deletion jobs.
+    """
+    logger.debug('Bulk Delete Users Endpoint Reached', extra=SAMPLED)
+    current_admin_id = get_current_user_id()
+    if not current_admin_id:
+        return jsonify({"msg": "Could not identify requesting admin user."}), 401
+    user_ids, error = _parse_user_ids(request.get_json(silent=True))
+    if error:
+        return jsonify({"msg": error}), 400
+
+    try:
+        users = {user.id: user for user in User.query.filter(User.id.in_(user_ids), User.is_deleted == False)}
+        with_exams = {uid for (uid,) in db.session.query(Exam.created_by).filter(Exam.created_by.in_(user_ids)).distinct()}
+        with_responses = {
+            uid for (uid,) in db.session.query(StudentResponse.student_id)
+            .filter(StudentResponse.student_id.in_(user_ids)).distinct()
+        }
+
+        skipped = []
+        to_delete = []
+        jobs = []
+        for uid in user_ids:
+            user = users.get(uid)
+            if user is None:
+                skipped.append({"user_id": uid, "msg": "User not found"})
+            elif uid == current_admin_id:
+                skipped.append({"user_id": uid, "msg": "Admin cannot delete their own account via this endpoint"})
+            elif user.role == UserRole.ADMIN:
+                skipped.append({"user_id": uid, "msg": "Deleting other Admin users is restricted"})
+            elif uid in with_exams or uid in with_responses:
+                jobs.append(deletion_jobs.schedule_user_deletion(user, current_admin_id))
+            else:
+                to_delete.append(uid)
+
+        if to_delete:
+            # Users without history: bulk deletes bypass ORM cascades, so clear dependent scratch rows explicitly
+            ExamDraft.query.filter(ExamDraft.student_id.in_(to_delete)).delete(synchronize_session=False)
+            ExamScore.query.filter(ExamScore.student_id.in_(to_delete)).delete(synchronize_session=False)
+            for uid in to_delete:
+                stats.bump_user(users[uid].role, users[uid].is_verified, -1)
+            User.query.filter(User.id.in_(to_delete)).delete(synchronize_session=False)
+            user_cache.note_users_changed(to_delete) # Core delete: no mapper events
+            for uid in to_delete:
+                token_blocklist.revoke_all_for_user(uid) # For other processes' user caches
+        db.session.commit()
+        if jobs:
+            deletion_jobs.wake()
+        logger.info('%s users deleted and %s scheduled for deletion in bulk by admin %s (%s skipped)', len(to_delete), len(jobs), current_admin_id, len(skipped))
         return jsonify({
-            "results": results_data,
-            "total_results": paginated_evaluations.total,
-            "total_pages": paginated_evaluations.pages,
-            "current_page": page,
-            "per_page": per_page
+            "msg": f"{len(to_delete) + len(jobs)} users deleted successfully.",
+            "deleted": to_delete,
+            "scheduled": [{"user_id": job.entity_id, "job_id": job.id} for job in jobs], # Removed in the background
+            "skipped": skipped
         }), 200
     except Exception as e:
-        print(f"!!! Error fetching all results: {e}")
+        db.session.rollback()
+        logger.exception('Error deleting users in bulk by admin %s: %s', current_admin_id, e)
+        return jsonify({"msg": "Failed to delete users due to a server error."}), 500
+
+@bp.route('/users/import', methods=['POST'])
+@jwt_required()
+@verified_admin_required
+def import_users_csv():
+    """
+    Creates users from an uploaded CSV file (multipart field 'file') with name, email, password
+    and optional role columns. Form fields: role (default for rows without one), verified.
+    """
+    logger.debug('Import Users Endpoint Reached', extra=SAMPLED)
+    admin_id = get_current_user_id()
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({"msg": "Missing CSV file (multipart field 'file')."}), 400
+    try:
+        default_role = parse_role(request.form.get('role'))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    verified = request.form.get('verified', 'false').lower() in ('1', 'true', 'yes')
+
+    try:
+        # Decode the upload as it is read instead of loading it into memory
+        text_stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        report = import_users(text_stream, default_role, verified, current_app.config['USER_IMPORT_CHUNK_SIZE'])
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        # Chunks before the failing line are already committed
+        logger.warning('Invalid user import file from admin %s: %s', admin_id, e)
+        return jsonify({"msg": f"Invalid CSV file: {e}"}), 400
+    except Exception as e:
+        logger.exception('Error importing users by admin %s: %s', admin_id, e)
+        return jsonify({"msg": "Failed to import users due to a server error."}), 500
+
+    logger.info('Admin %s imported %s of %s users', admin_id, report['created'], report['rows'])
+    return jsonify(dict(report, msg=f"Imported {report['created']} of {report['rows']} users.")), 200
+
+# --- Deletion jobs ---
+
+@bp.route('/deletion-jobs', methods=['GET'])
+@jwt_required()
+@verified_admin_required
+def get_deletion_jobs():
+    """Lists the most recent exam/user deletion jobs, optionally filtered by status."""
+    status = request.args.get('status')
+    if status and status not in (deletion_jobs.PENDING, deletion_jobs.RUNNING, deletion_jobs.COMPLETED, deletion_jobs.FAILED):
+        return jsonify({"msg": "status must be one of: pending, running, completed, failed."}), 400
+    limit = min(request.args.get('limit', 50, type=int) or 50, MAX_PER_PAGE)
+    try:
+        query = DeletionJob.query
+        if status:
+            query = query.filter(DeletionJob.status == status)
+        jobs = query.order_by(DeletionJob.id.desc()).limit(limit).all()
+        return jsonify([deletion_jobs.job_to_dict(job) for job in jobs]), 200
+    except Exception as e:
+        logger.exception('Error fetching deletion jobs: %s', e)
+        return jsonify({"msg": "Error fetching deletion jobs."}), 500
+
+@bp.route('/deletion-jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+@verified_admin_required
+def get_deletion_job(job_id):
+    """Reports the progress of one deletion job."""
+    job = DeletionJob.query.get(job_id)
+    if not job:
+        return jsonify({"msg": "Deletion job not found"}), 404
+    return jsonify(deletion_jobs.job_to_dict(job)), 200
+
+# --- Admin listings (keyset pagination) ---
+# The listings below page with an opaque cursor over their (timestamp or name, id) sort key instead of
+# OFFSET + COUNT(*): each page is one index range scan, however deep the admin pages.
+# `page` is still accepted for older clients (OFFSET, without an exact count).
+
+MAX_PER_PAGE = 100
+
+def _parse_listing_args():
+    """
+    Reads the pagination and filter query parameters shared by the admin listings.
+    Returns a dict; raises ValueError with a client-facing message on invalid input.
+    """
+    per_page = request.args.get('per_page', 20, type=int)
+    if per_page < 1:
+        raise ValueError("per_page must be a positive integer.")
+    args = {
+        "per_page": min(per_page, MAX_PER_PAGE),
+        "cursor": None,
+        "page": request.args.get('page', type=int),
+        "exam_id": request.args.get('exam_id', type=int),
+        "student_id": request.args.get('student_id', type=int),
+        "with_total": request.args.get('with_total', 'false').lower() in ('1', 'true', 'yes')
+    }
+    cursor = request.args.get('cursor')
+    if cursor:
+        args["cursor"] = decode_cursor(cursor) # Raises ValueError if tampered with
+    if args["page"] is not None and args["page"] < 1:
+        raise ValueError("page must be a positive integer.")
+    return args
+
+# Listing previews: long text columns are cut in SQL, so a page never pulls whole answers
+# out of the database. The full text is served by GET /admin/responses/<id>.
+QUESTION_PREVIEW_LENGTH = 100
+RESPONSE_PREVIEW_LENGTH = 150
+FEEDBACK_PREVIEW_LENGTH = 150
+
+def _preview_column(column, length, label):
+    """Selects the first `length` + 1 characters of a text column (the extra one shows whether it was cut)."""
+    return func.substr(column, 1, length + 1).label(label)
+
+def _preview(text, length):
+    """Finishes a _preview_column value: trims it to `length` and marks cut text with '...'."""
+    if text is None:
+        return None
+    return text[:length] + ("..." if len(text) > length else "")
+
+def _results_listing_query(args):
+    """Projection query (and its count query) behind /results/all, with the request's filters applied."""
+    query = db.session.query(
+        Evaluation.id.label("evaluation_id"),
+        User.name.label("student_name"),
+        User.email.label("student_email"),
+        Exam.title.label("exam_title"),
+        _preview_column(Question.question_text, QUESTION_PREVIEW_LENGTH, "question_text"),
+        _preview_column(StudentResponse.response_text, RESPONSE_PREVIEW_LENGTH, "response_text"),
+        Evaluation.marks_awarded,
+        Question.marks.label("marks_possible"), # Include max marks for context
+        Evaluation.evaluated_by,
+        _preview_column(Evaluation.feedback, FEEDBACK_PREVIEW_LENGTH, "feedback"),
+        Evaluation.evaluated_at.label("sort_value"),
+        Evaluation.id.label("sort_id")
+    ).select_from(Evaluation).join(
+        StudentResponse, Evaluation.response_id == StudentResponse.id
+    ).join(
+        User, StudentResponse.student_id == User.id
+    ).join(
+        Exam, StudentResponse.exam_id == Exam.id
+    ).join(
+        Question, StudentResponse.question_id == Question.id
+    ).filter(
+        Exam.is_deleted == False, User.is_deleted == False # Hidden while their deletion job runs
+    )
+    count_query = db.session.query(func.count(Evaluation.id)).join(
+        StudentResponse, Evaluation.response_id == StudentResponse.id
+    )
+    if args["exam_id"]:
+        query = query.filter(StudentResponse.exam_id == args["exam_id"])
+        count_query = count_query.filter(StudentResponse.exam_id == args["exam_id"])
+    if args["student_id"]:
+        query = query.filter(StudentResponse.student_id == args["student_id"])
+        count_query = count_query.filter(StudentResponse.student_id == args["student_id"])
+    return query, count_query
+
+def _format_result_row(row):
+    return {
+        "evaluation_id": row.evaluation_id,
+        "student_name": row.student_name,
+        "student_email": row.student_email,
+        "exam_title": row.exam_title,
+        "question_text": _preview(row.question_text, QUESTION_PREVIEW_LENGTH),
+        "student_response": _preview(row.response_text or "", RESPONSE_PREVIEW_LENGTH),
+        "marks_awarded": row.marks_awarded,
+        "marks_possible": row.marks_possible,
+        "feedback": _preview(row.feedback, FEEDBACK_PREVIEW_LENGTH),
+        "evaluated_by": row.evaluated_by,
+        # Format the naive UTC datetime
+        "evaluated_at_utc": format_datetime(row.sort_value)
+    }
+
+def _responses_listing_query(args, status):
+    """Projection query (and its count query) behind /response/all, with the request's filters applied."""
+    query = db.session.query(
+        StudentResponse.id.label("response_id"),
+        StudentResponse.exam_id,
+        StudentResponse.question_id,
+        User.name.label("student_name"),
+        User.email.label("student_email"),
+        Exam.title.label("exam_title"),
+        Question.question_type,
+        Question.marks.label("marks_possible"),
+        _preview_column(Question.question_text, QUESTION_PREVIEW_LENGTH, "question_text"),
+        _preview_column(StudentResponse.response_text, RESPONSE_PREVIEW_LENGTH, "response_text"),
+        Evaluation.id.label("evaluation_id"),
+        Evaluation.marks_awarded,
+        Evaluation.evaluated_by,
+        Evaluation.evaluated_at,
+        _preview_column(Evaluation.feedback, FEEDBACK_PREVIEW_LENGTH, "feedback"),
+        StudentResponse.submitted_at.label("sort_value"),
+        StudentResponse.id.label("sort_id")
+    ).select_from(StudentResponse).join(
+        User, StudentResponse.student_id == User.id
+    ).join(
+        Exam, StudentResponse.exam_id == Exam.id
+    ).join(
+        Question, StudentResponse.question_id == Question.id
+    ).outerjoin(
+        Evaluation, Evaluation.response_id == StudentResponse.id # None while pending
+    ).filter(
+        Exam.is_deleted == False, User.is_deleted == False # Hidden while their deletion job runs
+    )
+    count_query = db.session.query(func.count(StudentResponse.id))
+
+    filters = []
+    if args["exam_id"]:
+        filters.append(StudentResponse.exam_id == args["exam_id"])
+    if args["student_id"]:
+        filters.append(StudentResponse.student_id == args["student_id"])
+    if filters:
+        query = query.filter(*filters)
+        count_query = count_query.filter(*filters)
+    if status:
+        # Pending = no evaluation row (looked up through the unique evaluations.response_id index)
+        query = query.filter(Evaluation.id.isnot(None) if status == 'evaluated' else Evaluation.id.is_(None))
+        has_evaluation = db.session.query(Evaluation.id).filter(
+            Evaluation.response_id == StudentResponse.id
+        ).exists()
+        count_query = count_query.filter(has_evaluation if status == 'evaluated' else ~has_evaluation)
+    return query, count_query
+
+def _format_response_row(row):
+    return {
+        "response_id": row.response_id,
+        "student_name": row.student_name,
+        "student_email": row.student_email,
+        "exam_id": row.exam_id,
+        "exam_title": row.exam_title,
+        "question_id": row.question_id,
+        "question_text": _preview(row.question_text, QUESTION_PREVIEW_LENGTH),
+        "question_type": row.question_type.name, # Use .name for enum string value
+        "response_text": _preview(row.response_text or "", RESPONSE_PREVIEW_LENGTH),
+        "submitted_at_utc": format_datetime(row.sort_value),
+        "marks_possible": row.marks_possible,
+        "evaluation_status": "Evaluated" if row.evaluation_id is not None else "Pending Evaluation",
+        # Evaluation fields are null while pending
+        "evaluation_id": row.evaluation_id,
+        "marks_awarded": row.marks_awarded,
+        "feedback": _preview(row.feedback, FEEDBACK_PREVIEW_LENGTH),
+        "evaluated_by": row.evaluated_by,
+        "evaluated_at_utc": format_datetime(row.evaluated_at)
+    }
+
+@bp.route('/results/all', methods=['GET'])
+@jwt_required()
+@verified_admin_required
+def get_all_results():
+    """
+    Retrieves evaluated results, newest evaluation first, one page at a time.
+    Query params: per_page, cursor (from next_cursor), exam_id, student_id,
+    with_total (approximate total count), page (legacy).
+    """
+    logger.debug('Get All Results Endpoint Reached', extra=SAMPLED)
+    try:
+        args = _parse_listing_args()
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    try:
+        evaluations_query, count_query = _results_listing_query(args)
+        evaluations, next_cursor = fetch_keyset_page(evaluations_query, Evaluation.evaluated_at, Evaluation.id, args)
+
+        total = None
+        if args["with_total"] or args["page"]:
+            total = approximate_total(('results', args["exam_id"], args["student_id"]), count_query)
+
+        results_data = [_format_result_row(ev) for ev in evaluations]
+
+        logger.info('Retrieved %s results (more: %s)', len(results_data), next_cursor is not None)
+        payload = {"results": results_data, **pagination_payload(args, next_cursor, total)}
+        if total is not None:
+            payload["total_results"] = total
+        return jsonify(payload), 200
+    except Exception as e:
+        logger.exception('Error fetching all results: %s', e)
         return jsonify({"msg": "Error fetching results list."}), 500
 
 @bp.route('/response/all', methods=['GET'])
 @jwt_required()
-@admin_required
-@verified_required
+@verified_admin_required
 def get_all_student_responses():
     """
-    Retrieves all submitted student responses across all exams, paginated.
+    Retrieves submitted student responses across all exams, newest first, one page at a time.
     Includes both evaluated and pending responses.
+    Query params: per_page, cursor (from next_cursor), exam_id, student_id,
+    status ('pending' or 'evaluated'), with_total (approximate total count), page (legacy).
     """
-    print(f"\n*** Get All Student Responses Endpoint Reached ***")
+    logger.debug('Get All Student Responses Endpoint Reached', extra=SAMPLED)
     admin_id = get_current_user_id() # For logging context
 
     try:
-        # Pagination parameters from query string
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-
-        # Base query starting from StudentResponse
-        # Use options for eager loading to avoid N+1 query issues
-        responses_query = StudentResponse.query.options(
-            joinedload(StudentResponse.student),     # Load related User (student)
-            joinedload(StudentResponse.exam),        # Load related Exam
-            joinedload(StudentResponse.question),    # Load related Question
-            joinedload(StudentResponse.evaluation)   # Load related Evaluation (will be None if no eval exists)
+        args = _parse_listing_args()
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    status = (request.args.get('status') or '').lower() or None
+    if status not in (None, 'pending', 'evaluated'):
+        return jsonify({"msg": "status must be 'pending' or 'evaluated'."}), 400
+
+    try:
+        responses_query, count_query = _responses_listing_query(args, status)
+        rows, next_cursor = fetch_keyset_page(responses_query, StudentResponse.submitted_at, StudentResponse.id, args)
+
+        total = None
+        if args["with_total"] or args["page"]:
+            total = approximate_total(('responses', args["exam_id"], args["student_id"], status), count_query)
+
+        responses_data = [_format_response_row(row) for row in rows]
+
+        logger.info('Admin %s retrieved %s responses (more: %s)', admin_id, len(responses_data), next_cursor is not None)
+
+        payload = {"responses": responses_data, **pagination_payload(args, next_cursor, total)}
+        if total is not None:
+            payload["total_responses"] = total
+        return jsonify(payload), 200
+
+    except Exception as e:
+        logger.exception('Error fetching all student responses for admin %s: %s', admin_id, e)
+        # import traceback; traceback.print_exc() # Uncomment for detailed debugging
+        return jsonify({"msg": "An error occurred while fetching student responses."}), 500
+
+@bp.route('/responses/<int:response_id>', methods=['GET'])
+@jwt_required()
+@verified_admin_required
+def get_response_details(response_id):
+    """Retrieves one student response with the full question, answer and evaluation text."""
+    logger.debug('Get Response Details Endpoint for Response ID: %s', response_id, extra=SAMPLED)
+    try:
+        row = db.session.query(
+            StudentResponse, User.name, User.email, Exam.title, Question, Evaluation
         ).join(
-            User, StudentResponse.student_id == User.id # Explicit join often helps with filtering/ordering
+            User, StudentResponse.student_id == User.id
         ).join(
             Exam, StudentResponse.exam_id == Exam.id
         ).join(
             Question, StudentResponse.question_id == Question.id
-        ).order_by(
-            StudentResponse.submitted_at.desc() # Order by most recent submission first
-        )
+        ).outerjoin(
+            Evaluation, Evaluation.response_id == StudentResponse.id
+        ).filter(StudentResponse.id == response_id).first()
+        if not row:
+            return jsonify({"msg": "Student response not found"}), 404
 
-        # Paginate the query results
-        paginated_responses = responses_query.paginate(page=page, per_page=per_page, error_out=False)
-        responses = paginated_responses.items
-
-        # Format data for JSON response
-        responses_data = []
-        for resp in responses:
-            # Access related objects loaded via joinedload
-            student = resp.student
-            exam = resp.exam
-            question = resp.question
-            evaluation = resp.evaluation # Access the optional evaluation
-
-            # Basic check for data integrity (should be rare with joins/loads)
-            if not all([student, exam, question]):
-                print(f"!!! Warning: Skipping response ID {resp.id} due to missing related data (student/exam/question).")
-                continue
-
-            # Determine evaluation status and details
-            eval_status = "Evaluated" if evaluation else "Pending Evaluation"
-            eval_details = {}
-            if evaluation:
-                eval_details = {
-                    "evaluation_id": evaluation.id,
-                    "marks_awarded": evaluation.marks_awarded,
-                    "feedback": evaluation.feedback,
-                    "evaluated_by": evaluation.evaluated_by,
-                    "evaluated_at_utc": format_datetime(evaluation.evaluated_at)
-                }
-            else:
-                # Provide nulls for evaluation fields if not evaluated
-                 eval_details = {
-                    "evaluation_id": None,
-                    "marks_awarded": None,
-                    "feedback": None,
-                    "evaluated_by": None,
-                    "evaluated_at_utc": None
-                 }
-
-            # Truncate potentially long text fields for summary view
-            q_text_short = question.question_text[:100] + ("..." if len(question.question_text or "") > 100 else "")
-            resp_text_short = resp.response_text[:150] + ("..." if len(resp.response_text or "") > 150 else "")
-
-            responses_data.append({
-                "response_id": resp.id,
-                "student_name": student.name,
-                "student_email": student.email,
-                "exam_id": exam.id,
-                "exam_title": exam.title,
-                "question_id": question.id,
-                "question_text": q_text_short,
-                "question_type": question.question_type.name, # Use .name for enum string value
-                "response_text": resp_text_short,
-                "submitted_at_utc": format_datetime(resp.submitted_at),
-                "marks_possible": question.marks,
-                "evaluation_status": eval_status,
-                **eval_details # Unpack evaluation details (will contain nulls if pending)
-            })
-
-        print(f"--- Admin {admin_id} retrieved page {page} of all responses ({len(responses_data)} items) ---")
-
-        # Return the paginated results structure
+        response, student_name, student_email, exam_title, question, evaluation = row
+        is_ai_evaluation = bool(evaluation and evaluation.evaluated_by.startswith("AI"))
         return jsonify({
-            "responses": responses_data,
-            "total_responses": paginated_responses.total, # Total count matching query
-            "total_pages": paginated_responses.pages,     # Total pages available
-            "current_page": page,
-            "per_page": per_page
+            "response_id": response.id,
+            "student_id": response.student_id,
+            "student_name": student_name,
+            "student_email": student_email,
+            "exam_id": response.exam_id,
+            "exam_title": exam_title,
+            "question_id": question.id,
+            "question_text": question.question_text,
+            "question_type": question.question_type.value,
+            "options": question.options,
+            "correct_answer": question.correct_answer,
+            "word_limit": question.word_limit,
+            "marks": question.marks, # Max marks for the question
+            "response_text": response.response_text,
+            "submitted_at_utc": format_datetime(response.submitted_at),
+            "evaluation_status": "Evaluated" if evaluation else "Pending Evaluation",
+            "evaluation_id": evaluation.id if evaluation else None,
+            "final_marks": evaluation.marks_awarded if evaluation else None,
+            "feedback": evaluation.feedback if evaluation else None,
+            "evaluated_by": evaluation.evaluated_by if evaluation else None,
+            "evaluation_date": format_datetime(evaluation.evaluated_at) if evaluation else None,
+            # Feedback split by origin, as shown on the admin evaluation screen
+            "ai_evaluation": evaluation.feedback if is_ai_evaluation else None,
+            "manual_evaluation": evaluation.feedback if evaluation and not is_ai_evaluation else None
         }), 200
-
     except Exception as e:
-        print(f"!!! Error fetching all student responses for admin {admin_id}: {e}")
-        # import traceback; traceback.print_exc() # Uncomment for detailed debugging
-        return jsonify({"msg": "An error occurred while fetching student responses."}), 500
+        logger.exception('Error fetching details of response %s: %s', response_id, e)
+        return jsonify({"msg": "An error occurred while fetching the response."}), 500
 
 @bp.route('/evaluate/response/<int:response_id>', methods=['POST'])
 @jwt_required()
-@admin_required
-@verified_required
+@verified_admin_required
 def trigger_ai_evaluation(response_id):
     """Triggers AI evaluation for a specific student response."""
-    print(f"\n*** Trigger AI Evaluation Endpoint for Response ID: {response_id} ***")
+    logger.debug('Trigger AI Evaluation Endpoint for Response ID: %s', response_id, extra=SAMPLED)
     # # Import the AI evaluation service function locally to avoid circular imports if service uses models
     # try:
     # except ImportError:
@@ -424,19 +839,19 @@ def trigger_ai_evaluation(response_id):
         return jsonify({"msg": "Student response not found"}), 404
     if response.evaluation:
         # Prevent re-evaluation via this endpoint if already evaluated
-        print(f"--- Attempt to re-evaluate response {response_id} blocked (already evaluated by {response.evaluation.evaluated_by}). Admin: {admin_id} ---")
+        logger.info('Attempt to re-evaluate response %s blocked (already evaluated by %s). Admin: %s', response_id, response.evaluation.evaluated_by, admin_id)
         return jsonify({"msg": f"This response (ID: {response_id}) has already been evaluated."}), 400
 
     question = response.question
     if not question:
         # Data integrity issue if response exists but question doesn't
-        print(f"!!! CRITICAL ERROR: Question not found for existing response ID: {response_id}")
+        logger.error('Question not found for existing response ID: %s', response_id)
         return jsonify({"msg": f"Data Error: Could not find question associated with response ID: {response_id}"}), 500
     # --- End Validation ---
 
     # Handle empty responses directly without calling AI
     if not response.response_text or not response.response_text.strip():
-        print(f"--- Evaluating response {response_id} as 0 marks (empty response text). Admin: {admin_id} ---")
+        logger.info('Evaluating response %s as 0 marks (empty response text). Admin: %s', response_id, admin_id)
         try:
             # Create evaluation record for empty response
             evaluation = Evaluation(
@@ -447,6 +862,7 @@ def trigger_ai_evaluation(response_id):
                 evaluated_at=datetime.now()
             )
             db.session.add(evaluation)
+            record_evaluation(response, 0.0)
             db.session.commit()
             return jsonify({
                 "msg": "AI evaluation skipped: Student response was empty. Marked as 0.",
@@ -456,12 +872,12 @@ def trigger_ai_evaluation(response_id):
             }), 200
         except Exception as e:
             db.session.rollback()
-            print(f"!!! Error saving 0-mark evaluation for empty response {response_id}: {e}")
+            logger.exception('Error saving 0-mark evaluation for empty response %s: %s', response_id, e)
             return jsonify({"msg": "Failed to process empty response due to server error."}), 500
 
     # Proceed with AI evaluation for non-empty responses
     try:
-        print(f"--- Admin {admin_id} triggering AI evaluation service for response {response_id} ---")
+        logger.info('Admin %s triggering AI evaluation service for response %s', admin_id, response_id)
         marks, feedback = evaluate_response_with_gemini(
             question_text=question.question_text,
             student_answer=response.response_text,
@@ -472,7 +888,7 @@ def trigger_ai_evaluation(response_id):
 
         # Check if AI evaluation was successful
         if marks is not None and feedback is not None:
-            print(f"--- AI Service returned marks: {marks}, feedback snippet: '{feedback[:60]}...' for response {response_id} ---")
+            logger.info("AI Service returned marks: %s, feedback snippet: '%s...' for response %s", marks, feedback[:60], response_id)
             # Create and save the Evaluation record
             evaluation = Evaluation(
                 response_id=response_id,
@@ -482,8 +898,9 @@ def trigger_ai_evaluation(response_id):
                 # evaluated_at default is handled by model
             )
             db.session.add(evaluation)
+            record_evaluation(response, float(marks))
             db.session.commit()
-            print(f"--- Successfully evaluated and saved response {response_id}. Evaluation ID: {evaluation.id} ---")
+            logger.info('Successfully evaluated and saved response %s. Evaluation ID: %s', response_id, evaluation.id)
             return jsonify({
                 "msg": "AI evaluation successful",
                 "evaluation_id": evaluation.id,
@@ -493,12 +910,249 @@ def trigger_ai_evaluation(response_id):
         else:
             # AI service failed (returned None or partial data)
             error_detail = feedback or "Unknown evaluation service error or model issue."
-            print(f"!!! AI evaluation service failed for response {response_id}. Details: {error_detail}")
+            logger.warning('AI evaluation service failed for response %s. Details: %s', response_id, error_detail)
             return jsonify({"msg": "AI evaluation service failed. Check server logs.", "details": error_detail}), 500 # Internal Server Error or Service Unavailable (503) might be appropriate
 
     except Exception as e:
         # Catch any other unexpected errors during the AI call or DB save
         db.session.rollback()
-        print(f"!!! Exception during AI evaluation trigger endpoint for response {response_id}: {e}")
+        logger.exception('Exception during AI evaluation trigger endpoint for response %s: %s', response_id, e)
         # import traceback; traceback.print_exc() # For detailed debugging
-        return jsonify({"msg": f"An internal server error occurred during the AI evaluation process: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"msg": f"An internal server error occurred during the AI evaluation process: {str(e)}"}), 500
+@bp.route('/exams/progress', methods=['GET'])
+@jwt_required()
+@verified_admin_required
+def get_exams_evaluation_progress():
+    """
+    Grading progress of every exam: responses, evaluated/pending counts, evaluations by origin
+    (AI, manual, system) and average marks. One grouped LEFT JOIN, however many exams exist.
+    """
+    logger.debug('Get Exams Evaluation Progress Endpoint Reached', extra=SAMPLED)
+    try:
+        is_ai = Evaluation.evaluated_by.like('AI%')
+        is_system = Evaluation.evaluated_by.like('System%') # Automatic 0 marks for empty answers
+        rows = db.session.query(
+            Exam.id,
+            Exam.title,
+            Exam.scheduled_time,
+            Exam.question_count,
+            func.count(func.distinct(StudentResponse.student_id)).label("students_submitted"),
+            func.count(StudentResponse.id).label("total_responses"),
+            func.count(Evaluation.id).label("evaluated"),
+            func.sum(case((is_ai, 1), else_=0)).label("ai_evaluated"),
+            func.sum(case((is_system, 1), else_=0)).label("system_evaluated"),
+            func.avg(Evaluation.marks_awarded).label("average_marks"),
+            func.sum(Evaluation.marks_awarded).label("marks_awarded"),
+            func.sum(case((Evaluation.id.isnot(None), Question.marks), else_=0)).label("marks_possible")
+        ).outerjoin(
+            StudentResponse, StudentResponse.exam_id == Exam.id
+        ).outerjoin(
+            Question, StudentResponse.question_id == Question.id
+        ).outerjoin(
+            Evaluation, Evaluation.response_id == StudentResponse.id
+        ).filter(
+            Exam.is_deleted == False
+        ).group_by(
+            Exam.id, Exam.title, Exam.scheduled_time, Exam.question_count
+        ).order_by(Exam.scheduled_time.desc()).all()
+
+        progress_data = []
+        for row in rows:
+            ai_evaluated = int(row.ai_evaluated or 0)
+            system_evaluated = int(row.system_evaluated or 0)
+            progress_data.append({
+                "exam_id": row.id,
+                "exam_title": row.title,
+                "scheduled_time_utc": format_datetime(row.scheduled_time),
+                "question_count": row.question_count,
+                "students_submitted": row.students_submitted,
+                "total_responses": row.total_responses,
+                "evaluated": row.evaluated,
+                "pending": row.total_responses - row.evaluated,
+                "ai_evaluated": ai_evaluated,
+                "manual_evaluated": row.evaluated - ai_evaluated - system_evaluated,
+                "system_evaluated": system_evaluated,
+                # Per evaluated response; null until something is evaluated
+                "average_marks": round(row.average_marks, 2) if row.average_marks is not None else None,
+                "average_percentage": round(row.marks_awarded / row.marks_possible * 100, 1) if row.marks_possible else None,
+                "percent_complete": round(row.evaluated / row.total_responses * 100, 1) if row.total_responses else None
+            })
+
+        logger.info('Retrieved evaluation progress for %s exams', len(progress_data))
+        return jsonify(progress_data), 200
+    except Exception as e:
+        logger.exception('Error fetching exam evaluation progress: %s', e)
+        return jsonify({"msg": "Error fetching exam evaluation progress."}), 500
+
+# --- Manual Grading ---
+
+@bp.route('/questions/<int:question_id>/responses', methods=['GET'])
+@jwt_required()
+@verified_admin_required
+def get_question_responses(question_id):
+    """
+    Question-wise grading: the responses to one question, in submission order, one page at a time,
+    with only the fields a grader needs.
+    Query params: per_page, cursor (from next_cursor), status ('pending' or 'evaluated').
+    """
+    logger.debug('Get Responses for Question ID: %s', question_id, extra=SAMPLED)
+    try:
+        args = _parse_listing_args()
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    status = (request.args.get('status') or '').lower() or None
+    if status not in (None, 'pending', 'evaluated'):
+        return jsonify({"msg": "status must be 'pending' or 'evaluated'."}), 400
+
+    question = db.session.get(Question, question_id)
+    if not question:
+        return jsonify({"msg": "Question not found"}), 404
+
+    try:
+        query = db.session.query(
+            StudentResponse.id.label("response_id"),
+            StudentResponse.student_id,
+            User.name.label("student_name"),
+            StudentResponse.response_text,
+            Evaluation.id.label("evaluation_id"),
+            Evaluation.marks_awarded,
+            Evaluation.feedback,
+            Evaluation.evaluated_by,
+            StudentResponse.submitted_at.label("sort_value"),
+            StudentResponse.id.label("sort_id")
+        ).select_from(StudentResponse).join(
+            User, StudentResponse.student_id == User.id
+        ).outerjoin(
+            Evaluation, Evaluation.response_id == StudentResponse.id
+        ).filter(StudentResponse.question_id == question_id)
+        if status:
+            query = query.filter(Evaluation.id.isnot(None) if status == 'evaluated' else Evaluation.id.is_(None))
+
+        rows, next_cursor = fetch_keyset_page(
+            query, StudentResponse.submitted_at, StudentResponse.id, args, descending=False
+        )
+
+        logger.info('Retrieved %s responses for question %s', len(rows), question_id)
+        return jsonify({
+            "question": {
+                "id": question.id,
+                "exam_id": question.exam_id,
+                "question_text": question.question_text,
+                "question_type": question.question_type.value,
+                "options": question.options,
+                "correct_answer": question.correct_answer,
+                "marks": question.marks,
+                "word_limit": question.word_limit
+            },
+            "responses": [{
+                "response_id": row.response_id,
+                "student_id": row.student_id,
+                "student_name": row.student_name,
+                "response_text": row.response_text,
+                "submitted_at_utc": format_datetime(row.sort_value),
+                "evaluation_id": row.evaluation_id, # null while pending (same for the fields below)
+                "marks_awarded": row.marks_awarded,
+                "feedback": row.feedback,
+                "evaluated_by": row.evaluated_by
+            } for row in rows],
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+            "per_page": args["per_page"]
+        }), 200
+    except Exception as e:
+        logger.exception('Error fetching responses for question %s: %s', question_id, e)
+        return jsonify({"msg": "Error fetching responses for the question."}), 500
+
+@bp.route('/evaluate/bulk', methods=['POST'])
+@jwt_required()
+@verified_admin_required
+def submit_bulk_evaluations():
+    """
+    Saves manual marks for many responses in one transaction (new evaluations are created,
+    existing ones overwritten). The whole batch is rejected if any entry is invalid.
+    Body: {"question_id": optional int, "evaluations": [{"response_id", "marks", "feedback"}, ...]}
+    """
+    logger.debug('Bulk Manual Evaluation Endpoint Reached', extra=SAMPLED)
+    admin_id = get_current_user_id()
+    if not admin_id: return jsonify({"msg": "Could not identify requesting admin user."}), 401
+
+    data = request.get_json()
+    if not data or not isinstance(data.get('evaluations'), list) or not data['evaluations']:
+        return jsonify({"msg": "Missing or empty 'evaluations' list"}), 400
+    if len(data['evaluations']) > MAX_BATCH_SIZE:
+        return jsonify({"msg": f"At most {MAX_BATCH_SIZE} evaluations can be submitted per request."}), 400
+    question_id = data.get('question_id')
+    if question_id is not None and not isinstance(question_id, int):
+        return jsonify({"msg": "question_id must be an integer."}), 400
+
+    try:
+        counts, errors = save_manual_evaluations(
+            data['evaluations'], f"Manual (Admin: {admin_id})", question_id=question_id
+        )
+        if errors:
+            db.session.rollback()
+            return jsonify({"msg": "No evaluations were saved: some entries are invalid.", "errors": errors}), 400
+        db.session.commit()
+        logger.info('Admin %s saved %s new and %s updated manual evaluations', admin_id, counts['created'], counts['updated'])
+        return jsonify({"msg": "Evaluations saved successfully.", **counts}), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Error saving bulk evaluations by admin %s: %s', admin_id, e)
+        return jsonify({"msg": "Failed to save evaluations due to a server error."}), 500
+
+@bp.route('/evaluate/submit', methods=['POST'])
+@jwt_required()
+@verified_admin_required
+def submit_manual_evaluation():
+    """Saves manual marks for one response. Body: {"response_id", "marks", "evaluation" (feedback text)}."""
+    logger.debug('Manual Evaluation Endpoint Reached', extra=SAMPLED)
+    admin_id = get_current_user_id()
+    if not admin_id: return jsonify({"msg": "Could not identify requesting admin user."}), 401
+
+    data = request.get_json()
+    if not data or 'response_id' not in data or 'marks' not in data:
+        return jsonify({"msg": "Missing required fields: response_id, marks"}), 400
+
+    try:
+        entry = {"response_id": data['response_id'], "marks": data['marks'], "feedback": data.get('evaluation')}
+        counts, errors = save_manual_evaluations([entry], f"Manual (Admin: {admin_id})")
+        if errors:
+            db.session.rollback()
+            status_code = 404 if errors[0]["msg"] == "Student response not found." else 400
+            return jsonify({"msg": errors[0]["msg"]}), status_code
+        db.session.commit()
+        logger.info('Admin %s manually evaluated response %s', admin_id, data['response_id'])
+        return jsonify({"msg": "Evaluation saved successfully.", "response_id": data['response_id'], "marks_awarded": float(data['marks'])}), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Error saving manual evaluation by admin %s: %s', admin_id, e)
+        return jsonify({"msg": "Failed to save evaluation due to a server error."}), 500
+
+# --- Full-text search ---
+
+@bp.route('/search', methods=['GET'])
+@jwt_required()
+@verified_admin_required
+def search():
+    """
+    Full-text search over student responses, question texts and evaluation feedback, best match first.
+    Query params: q, type (response, question, feedback), exam_id, page, per_page.
+    """
+    logger.debug('Admin Search Endpoint Reached', extra=SAMPLED)
+    try:
+        params = parse_search_args(request.args)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    try:
+        started = time.perf_counter()
+        payload = search_page(params)
+        payload["took_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info("Search '%s' returned %s results in %s ms", params['q'], len(payload['results']), payload['took_ms'])
+        return jsonify(payload), 200
+    except NotImplementedError as e:
+        logger.error('Search unavailable: %s', e)
+        return jsonify({"msg": "Full-text search is not available for this database."}), 501
+    except Exception as e:
+        logger.exception("Error running search '%s': %s", params['q'], e)
+        return jsonify({"msg": "Error running search."}), 500
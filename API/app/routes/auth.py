@@ -1,16 +1,42 @@
 # app/routes/auth.py
 
+import logging
 from flask import Blueprint, request, jsonify
 from app.extensions import db
 from app.models import User, UserRole # Import necessary models
-from werkzeug.security import check_password_hash # For checking passwords
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt # JWT functions
+from app.services import passwords # Hashing/checking in the bounded process pool
+from app.services import token_blocklist # Token revocation (logout, refresh rotation)
+from app.services import user_cache # Cached (role, is_verified) per user id
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt # JWT functions
+from sqlalchemy.exc import IntegrityError
 # Import the updated helper for formatting naive UTC datetimes
 from app.utils.helpers import format_datetime
+from app.services import stats # Dashboard counters
 from datetime import datetime # Although not directly used for NOW, good practice to have if needed
 
+logger = logging.getLogger(__name__)
+
 bp = Blueprint('auth', __name__)
 
+def _issue_tokens(user_id, role_name):
+    """Creates a short-lived access token and a refresh token, both carrying the user_info claim."""
+    user_claims = {
+        'id': user_id, # Include user ID
+        'role': role_name # Include user role string
+        # Add other non-sensitive info if needed (e.g., 'name': user.name)
+    }
+    # The identity can be the user ID (as string or int)
+    return {
+        "access_token": create_access_token(
+            identity=str(user_id), # Standard practice to use user ID as identity
+            additional_claims={'user_info': user_claims} # Embed custom data
+        ),
+        "refresh_token": create_refresh_token(
+            identity=str(user_id),
+            additional_claims={'user_info': user_claims}
+        )
+    }
+
 @bp.route('/register', methods=['POST'])
 def register():
     """Handles new user registration."""
@@ -49,13 +75,18 @@ def register():
 
     # Create new User instance
     new_user = User(name=name, email=email, role=role, is_verified=is_verified)
-    new_user.set_password(password) # Hashes the password before saving
+    try:
+        new_user.password_hash = passwords.hash_password_pooled(password) # Hashes the password before saving
+    except passwords.PasswordPoolBusy:
+        logger.warning('Registration of %s rejected: password hashing pool is full', email)
+        return jsonify({"msg": "The server is busy. Please try again in a moment."}), 503, {"Retry-After": "2"}
 
     try:
         # Add user to session and commit to database
         db.session.add(new_user)
+        stats.bump_user(role, is_verified, 1)
         db.session.commit()
-        print(f"--- User registered successfully: {email}, Role: {role.name}, Verified: {is_verified} ---")
+        logger.info('User registered successfully: %s, Role: %s, Verified: %s', email, role.name, is_verified)
 
         # Format the created_at timestamp (which is naive UTC from DB) using the helper
         created_at_iso = format_datetime(new_user.created_at)
@@ -75,7 +106,7 @@ def register():
     except Exception as e:
         # Rollback database changes in case of error
         db.session.rollback()
-        print(f"!!! Error during user registration for {email}: {e}")
+        logger.exception('Error during user registration for %s: %s', email, e)
         # Log the detailed error e for debugging
         return jsonify({"msg": "Failed to register user due to a server error."}), 500
 
@@ -95,32 +126,40 @@ def login():
     # Find user by email
     user = User.query.filter_by(email=email).first()
 
-    # Check if user exists and password is correct
-    if user and user.check_password(password):
+    # Check if user exists (and is not being deleted) and password is correct
+    # (the pbkdf2 check runs in the password pool so a login burst does not block this worker)
+    try:
+        password_ok = bool(user) and not user.is_deleted and passwords.verify_password(user.password_hash, password)
+    except passwords.PasswordPoolBusy:
+        logger.warning('Login for %s rejected: password hashing pool is full', email)
+        return jsonify({"msg": "The server is busy. Please try again in a moment."}), 503, {"Retry-After": "2"}
+
+    if password_ok:
         # Check if the user account is verified (unless they are Admin)
         if not user.is_verified and user.role != UserRole.ADMIN:
-            print(f"--- Login attempt failed for unverified user: {email} ---")
+            logger.info('Login attempt failed for unverified user: %s', email)
             return jsonify({"msg": "Account requires verification by an administrator. Please contact support."}), 403 # Forbidden
 
-        # Create custom claims to include in the JWT payload
-        user_claims = {
-            'id': user.id, # Include user ID
-            'role': user.role.name # Include user role string
-            # Add other non-sensitive info if needed (e.g., 'name': user.name)
-        }
-
-        # Create the JWT access token including the custom claims
-        # The identity can be the user ID (as string or int)
-        access_token = create_access_token(
-            identity=str(user.id), # Standard practice to use user ID as identity
-            additional_claims={'user_info': user_claims} # Embed custom data
-        )
-        print(f"--- Login successful for user ID {user.id} ({user.email}). Token created. ---")
-        # Return the access token to the client
-        return jsonify(access_token=access_token), 200
+        # Upgrade the stored hash if it was made with older hash parameters (best effort)
+        if passwords.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = passwords.hash_password_pooled(password)
+                db.session.commit()
+                logger.info('Password hash of user %s upgraded to %s', user.id, passwords.current_method())
+            except passwords.PasswordPoolBusy:
+                pass # Retried on a later login
+            except Exception as e:
+                db.session.rollback()
+                logger.exception('Could not rehash password of user %s: %s', user.id, e)
+
+        # Create the JWT access and refresh tokens including the custom claims
+        tokens = _issue_tokens(user.id, user.role.name)
+        logger.info('Login successful for user ID %s (%s). Tokens created.', user.id, user.email)
+        # Return the tokens to the client
+        return jsonify(tokens), 200
 
     # If user not found or password incorrect
-    print(f"--- Login attempt failed for email: {email} (Invalid credentials) ---")
+    logger.info('Login attempt failed for email: %s (Invalid credentials)', email)
     return jsonify({"msg": "Invalid email or password"}), 401 # Unauthorized
 
 @bp.route('/me', methods=['GET'])
@@ -133,7 +172,7 @@ def get_me():
 
     # Validate that our custom claims structure is present
     if not user_info or 'id' not in user_info or 'role' not in user_info:
-        print(f"!!! '/me' endpoint: Missing or incomplete 'user_info' claim in JWT: {jwt_payload}")
+        logger.warning("'/me' endpoint: Missing or incomplete 'user_info' claim in JWT: %s", jwt_payload)
         # This indicates an issue with token creation or a malformed token
         return jsonify({"msg": "Invalid token structure: Missing user information."}), 401
 
@@ -142,15 +181,15 @@ def get_me():
     try:
         user = User.query.get(int(user_info['id'])) # Convert ID from claim if necessary
     except ValueError:
-        print(f"!!! '/me' endpoint: Invalid user ID format in token: {user_info['id']}")
+        logger.error("'/me' endpoint: Invalid user ID format in token: %s", user_info['id'])
         return jsonify({"msg": "Invalid user identifier in token."}), 401
     except Exception as e:
-        print(f"!!! '/me' endpoint: DB Error fetching user {user_info['id']}: {e}")
+        logger.exception("'/me' endpoint: DB Error fetching user %s: %s", user_info['id'], e)
         return jsonify({"msg": "Error retrieving user data."}), 500
 
-    if not user:
-        # User existed when token was created, but is now deleted from DB
-        print(f"!!! '/me' endpoint: User ID {user_info.get('id')} from token not found in DB.")
+    if not user or user.is_deleted:
+        # User existed when token was created, but is now deleted (or scheduled for deletion)
+        logger.warning("'/me' endpoint: User ID %s from token not found in DB.", user_info.get('id'))
         return jsonify({"msg": "User associated with this token no longer exists."}), 404 # Not Found
 
     # Format the created_at timestamp (naive UTC) using the helper
@@ -166,13 +205,59 @@ def get_me():
         "created_at_utc": created_at_iso # Formatted naive UTC timestamp
     }), 200
 
+@bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True) # Requires a valid, unrevoked refresh token
+def refresh():
+    """
+    Exchanges a refresh token for a new access token and a new refresh token.
+    The presented refresh token is revoked (rotation), so it can be used only once.
+    """
+    jwt_payload = get_jwt()
+    try:
+        user = user_cache.get_auth_user(int(get_jwt_identity()))
+    except (TypeError, ValueError):
+        return jsonify({"msg": "Invalid user identifier in token."}), 401
+    if not user:
+        logger.warning('Refresh rejected: user %s not found or deleted.', get_jwt_identity())
+        return jsonify({"msg": "User associated with this token no longer exists."}), 401
+    if not user.is_verified and user.role != UserRole.ADMIN:
+        return jsonify({"msg": "Account requires verification by an administrator. Please contact support."}), 403
+
+    try:
+        token_blocklist.revoke_token(jwt_payload)
+        db.session.commit()
+    except IntegrityError:
+        # Another request (possibly in another process) rotated this refresh token first
+        db.session.rollback()
+        logger.error('Refresh token %s of user %s reused.', jwt_payload['jti'], user.id)
+        return jsonify({"msg": "Token has been revoked"}), 401
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Error rotating refresh token of user %s: %s', user.id, e)
+        return jsonify({"msg": "Failed to refresh token due to a server error."}), 500
+
+    logger.info('Tokens refreshed for user ID %s.', user.id)
+    return jsonify(_issue_tokens(user.id, user.role.name)), 200
+
 @bp.route('/logout', methods=['POST'])
-@jwt_required() # Requires a valid token to "logout" (client just discards token)
+@jwt_required() # Requires a valid token to log out
 def logout():
-    """Handles logout request (server-side does nothing for stateless JWT)."""
-    # For stateless JWTs, logout is primarily handled client-side by deleting the token.
-    # Server-side blocklisting could be implemented here if needed using Flask-JWT-Extended features.
-    user_id = get_jwt_identity() # Get the identity from the token being "logged out"
-    print(f"--- User {user_id} initiated logout request. Client should discard token. ---")
-    # A simple success message is sufficient.
-    return jsonify({"msg": "Logout successful. Please discard your token."}), 200
\ No newline at end of file
+    """
+    Revokes the access token used for this request and, if sent as {"refresh_token": "..."},
+    the refresh token, so neither can be used again.
+    """
+    user_id = get_jwt_identity() # Get the identity from the token being logged out
+    data = request.get_json(silent=True) or {}
+    try:
+        token_blocklist.revoke_token(get_jwt())
+        if data.get('refresh_token'):
+            token_blocklist.revoke_encoded_token(data['refresh_token'], user_id=int(user_id))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback() # Already revoked
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Error revoking tokens of user %s at logout: %s', user_id, e)
+        return jsonify({"msg": "Failed to log out due to a server error."}), 500
+    logger.info('User %s logged out. Tokens revoked.', user_id)
+    return jsonify({"msg": "Logout successful."}), 200
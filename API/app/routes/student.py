@@ -1,25 +1,55 @@
 # app/routes/student.py
 
+import logging
 from flask import Blueprint, request, jsonify
 from app.extensions import db
-from app.models import Exam, Question, StudentResponse, Evaluation, QuestionType, UserRole
-from app.utils.decorators import student_required, verified_required
+from app.models import Exam, Question, StudentResponse, Evaluation, QuestionType, UserRole, ExamScore, ExamStats
+from app.services import draft_buffer, submission_queue
+from app.services.submissions import record_submission
+from app.services.rankings import HISTOGRAM_BUCKETS, trend_summary # Precomputed cohort ranks
+from app.utils.decorators import verified_student_required # Role + verification check with one cached user lookup
 from flask_jwt_extended import jwt_required
 # Make sure helpers uses standard datetime and formats naive UTC correctly
 from app.utils.helpers import get_current_user_id, format_datetime
 # Use standard Python datetime and timedelta
 from datetime import datetime, timedelta, timezone
-from sqlalchemy.orm import joinedload
+from cachetools import TTLCache
+import threading
+
+logger = logging.getLogger(__name__)
+
 # Removed pendulum import
 
 bp = Blueprint('student', __name__)
 
 # No specific timezone definitions needed here when using naive UTC consistently
 
+# Short-lived cache of (submission deadline, valid question IDs) per exam for the autosave hot path,
+# so a burst of draft saves does not re-read the exam and its questions on every request.
+_autosave_context_cache = TTLCache(maxsize=1024, ttl=30)
+_autosave_context_lock = threading.Lock()
+
+def _get_autosave_context(exam_id):
+    """Returns (start_naive_utc, submission_deadline_naive_utc, frozenset of question IDs) for an exam, or None if not found/invalid."""
+    with _autosave_context_lock:
+        cached = _autosave_context_cache.get(exam_id)
+    if cached is not None:
+        return cached
+
+    exam = Exam.query.get(exam_id)
+    if not exam or exam.is_deleted or not isinstance(exam.scheduled_time, datetime) or not isinstance(exam.duration, int) or exam.duration <= 0:
+        return None
+    # Same deadline rule (including grace period) as submit_exam
+    deadline = exam.scheduled_time + timedelta(minutes=exam.duration) + timedelta(seconds=30)
+    question_ids = frozenset(q_id for (q_id,) in db.session.query(Question.id).filter_by(exam_id=exam_id))
+    context = (exam.scheduled_time, deadline, question_ids)
+    with _autosave_context_lock:
+        _autosave_context_cache[exam_id] = context
+    return context
+
 @bp.route('/dashboard', methods=['GET'])
 @jwt_required()
-@student_required
-@verified_required
+@verified_student_required
 def dashboard():
     """Provides dashboard information for the logged-in student."""
     student_id = get_current_user_id()
@@ -38,7 +68,8 @@ def dashboard():
         # Find upcoming exams (scheduled time > now)
         # Comparison works correctly between naive UTC datetimes
         upcoming_exams = Exam.query.filter(
-            Exam.scheduled_time > now_naive_utc
+            Exam.scheduled_time > now_naive_utc,
+            Exam.is_deleted == False
         ).order_by(Exam.scheduled_time.asc()).limit(5).all()
 
         # Format upcoming exams data
@@ -50,20 +81,19 @@ def dashboard():
             "scheduled_time_utc": format_datetime(e.scheduled_time)
         } for e in upcoming_exams]
 
-        print(f"--- Student {student_id} dashboard generated. Completed: {completed_count} ---")
+        logger.info('Student %s dashboard generated. Completed: %s', student_id, completed_count)
         return jsonify({
             "message": "Student Dashboard",
             "completed_exams_count": completed_count,
             "upcoming_exams": upcoming_data # List of upcoming exams
         }), 200
     except Exception as e:
-        print(f"!!! Error fetching student dashboard for student {student_id}: {e}")
+        logger.exception('Error fetching student dashboard for student %s: %s', student_id, e)
         return jsonify({"msg": "Error fetching dashboard data."}), 500
 
 @bp.route('/exams/available', methods=['GET'])
 @jwt_required()
-@student_required
-@verified_required
+@verified_student_required
 def get_available_exams():
     """Lists exams available for the student to take (upcoming or active)."""
     student_id = get_current_user_id()
@@ -79,11 +109,11 @@ def get_available_exams():
             resp.exam_id for resp in
             db.session.query(StudentResponse.exam_id).filter_by(student_id=student_id)
         }
-        print(f"--- Student {student_id} has submitted exams: {submitted_exam_ids} ---")
+        logger.info('Student %s has submitted exams: %s', student_id, submitted_exam_ids)
 
         # Get all potential exams
         # TODO: Optimization - Could filter exams by schedule time relevance here if needed
-        potential_exams = Exam.query.order_by(Exam.scheduled_time.asc()).all()
+        potential_exams = Exam.query.filter_by(is_deleted=False).order_by(Exam.scheduled_time.asc()).all()
         available_exams_data = []
 
         for exam in potential_exams:
@@ -94,17 +124,17 @@ def get_available_exams():
             # Get naive UTC start time from DB
             start_time_naive_utc = exam.scheduled_time
             if not start_time_naive_utc or not isinstance(start_time_naive_utc, datetime):
-                print(f"!!! WARNING: Skipping exam {exam.id} due to invalid scheduled_time: {start_time_naive_utc}")
+                logger.warning('Skipping exam %s due to invalid scheduled_time: %s', exam.id, start_time_naive_utc)
                 continue
             if not isinstance(exam.duration, int) or exam.duration <= 0:
-                print(f"!!! WARNING: Skipping exam {exam.id} due to invalid duration: {exam.duration}")
+                logger.warning('Skipping exam %s due to invalid duration: %s', exam.id, exam.duration)
                 continue
 
             # Calculate naive UTC end time
             try:
                 end_time_naive_utc = start_time_naive_utc + timedelta(minutes=exam.duration)
             except TypeError:
-                print(f"!!! WARNING: Skipping exam {exam.id} due to error calculating end time (start={start_time_naive_utc}, duration={exam.duration})")
+                logger.warning('Skipping exam %s due to error calculating end time (start=%s, duration=%s)', exam.id, start_time_naive_utc, exam.duration)
                 continue
 
             # Determine exam status based on naive UTC comparison
@@ -123,20 +153,21 @@ def get_available_exams():
                     # Format naive UTC time using helper
                     "scheduled_time_utc": format_datetime(start_time_naive_utc),
                     "duration_minutes": exam.duration,
+                    "question_count": exam.question_count,
+                    "total_marks": exam.total_marks,
                     "status": status
                 })
 
-        print(f"--- Found {len(available_exams_data)} available exams for student {student_id} ---")
+        logger.info('Found %s available exams for student %s', len(available_exams_data), student_id)
         return jsonify(available_exams_data), 200
 
     except Exception as e:
-        print(f"!!! ERROR in get_available_exams for student {student_id}: {type(e).__name__} - {e}")
+        logger.exception('ERROR in get_available_exams for student %s: %s - %s', student_id, type(e).__name__, e)
         return jsonify({"msg": "Error fetching available exams."}), 500
 
 @bp.route('/exams/<int:exam_id>/take', methods=['GET'])
 @jwt_required()
-@student_required
-@verified_required
+@verified_student_required
 def get_exam_questions_for_student(exam_id):
     """Allows a student to start an active exam and retrieves its questions.
        If the exam is not active, returns a 403 error with the scheduled time.
@@ -148,7 +179,7 @@ def get_exam_questions_for_student(exam_id):
     try:
         # Fetch the exam
         exam = Exam.query.get(exam_id)
-        if not exam:
+        if not exam or exam.is_deleted:
             return jsonify({"msg": "Exam not found."}), 404
 
         # Check if student has already submitted for this exam
@@ -156,24 +187,24 @@ def get_exam_questions_for_student(exam_id):
             student_id=student_id, exam_id=exam_id
         ).first()
         if existing_submission:
-            print(f"--- Student {student_id} attempted to retake exam {exam_id} ---")
+            logger.info('Student %s attempted to retake exam %s', student_id, exam_id)
             return jsonify({"msg": "You have already submitted responses for this exam."}), 403
 
         # --- Naive UTC Time Validation Logic ---
         start_time_naive_utc = exam.scheduled_time
         if not start_time_naive_utc or not isinstance(start_time_naive_utc, datetime):
-            print(f"!!! ERROR: Exam {exam_id} has invalid scheduled_time in DB: {start_time_naive_utc}")
+            logger.error('Exam %s has invalid scheduled_time in DB: %s', exam_id, start_time_naive_utc)
             return jsonify({"msg": "Exam schedule is invalid or missing."}), 500
 
         if not isinstance(exam.duration, int) or exam.duration <= 0:
-            print(f"!!! ERROR: Exam {exam_id} has invalid duration: {exam.duration}")
+            logger.error('Exam %s has invalid duration: %s', exam_id, exam.duration)
             return jsonify({"msg": "Invalid exam duration."}), 500
 
         # Calculate end time in naive UTC
         try:
              end_time_naive_utc = start_time_naive_utc + timedelta(minutes=exam.duration)
         except TypeError:
-             print(f"!!! ERROR: Could not calculate end time for exam {exam_id} (start={start_time_naive_utc}, duration={exam.duration})")
+             logger.error('Could not calculate end time for exam %s (start=%s, duration=%s)', exam_id, start_time_naive_utc, exam.duration)
              return jsonify({"msg": "Error processing exam duration."}), 500
 
         # Get current time in naive UTC
@@ -184,7 +215,7 @@ def get_exam_questions_for_student(exam_id):
         # Check if the exam is currently active (using naive UTC times)
         if not (start_time_naive_utc <= now_naive_utc < end_time_naive_utc):
             status = "Upcoming" if now_naive_utc < start_time_naive_utc else "Expired"
-            print(f"--- Exam {exam_id} access denied for student {student_id}. Status: {status}. Now (UTC): {now_naive_utc}, Start (UTC): {start_time_naive_utc}, End (UTC): {end_time_naive_utc} ---")
+            logger.info('Exam %s access denied for student %s. Status: %s. Now (UTC): %s, Start (UTC): %s, End (UTC): %s', exam_id, student_id, status, now_naive_utc, start_time_naive_utc, end_time_naive_utc)
 
             # --- MODIFIED RESPONSE for non-active exams ---
             # Format the scheduled time for the response message
@@ -214,7 +245,7 @@ def get_exam_questions_for_student(exam_id):
         # Calculate remaining time in seconds using naive UTC times
         time_remaining_seconds = max(0, int((end_time_naive_utc - now_naive_utc).total_seconds()))
 
-        print(f"--- Student {student_id} starting exam {exam_id}. Time remaining: {time_remaining_seconds}s ---")
+        logger.info('Student %s starting exam %s. Time remaining: %ss', student_id, exam_id, time_remaining_seconds)
 
         # (Code to return successful response remains the same)
         return jsonify({
@@ -227,17 +258,105 @@ def get_exam_questions_for_student(exam_id):
         }), 200
 
     except Exception as e:
-        print(f"!!! EXCEPTION in get_exam_questions_for_student (Exam ID: {exam_id}, Student ID: {student_id}): {type(e).__name__}: {str(e)}")
+        logger.exception('EXCEPTION in get_exam_questions_for_student (Exam ID: %s, Student ID: %s): %s: %s', exam_id, student_id, type(e).__name__, str(e))
         # import traceback; traceback.print_exc() # For detailed debugging
         return jsonify({"msg": "An unexpected error occurred while fetching the exam questions."}), 500
 
 
+@bp.route('/exams/<int:exam_id>/draft', methods=['PUT'])
+@jwt_required()
+@verified_student_required
+def save_exam_draft(exam_id):
+    """
+    Autosaves partial answers for an exam in progress.
+    Accepts answer deltas in the submit format ({"answers": [{"question_id": X, "response_text": "..."}]}).
+    Answers are buffered in memory and written to the drafts table in batches by a background flusher.
+    """
+    student_id = get_current_user_id()
+    if not student_id:
+        return jsonify({"msg": "Invalid authentication token"}), 401
+
+    data = request.get_json(silent=True)
+    answers_data = data.get('answers') if isinstance(data, dict) else None
+    if not isinstance(answers_data, list):
+        return jsonify({"msg": "Invalid draft format. Expected {'answers': [ ... ]}"}), 400
+
+    try:
+        context = _get_autosave_context(exam_id)
+        if context is None:
+            return jsonify({"msg": "Exam not found."}), 404
+        start_time_naive_utc, submission_deadline_naive_utc, valid_question_ids = context
+
+        now_naive_utc = datetime.utcnow()
+        if now_naive_utc < start_time_naive_utc:
+            return jsonify({"msg": "Exam has not started yet. Draft not saved."}), 403
+        if now_naive_utc > submission_deadline_naive_utc:
+            return jsonify({"msg": "Submission deadline has passed. Draft not saved."}), 403
+
+        # Same check as submit_exam: saves after submitting would only be discarded later
+        existing_submission = db.session.query(StudentResponse.id).filter_by(
+            student_id=student_id, exam_id=exam_id
+        ).first()
+        if existing_submission or submission_queue.is_pending(student_id, exam_id):
+            return jsonify({"msg": "You have already submitted responses for this exam."}), 403
+
+        # Keep only well-formed answers for questions of this exam; later entries win
+        answers = {}
+        for answer in answers_data:
+            if not isinstance(answer, dict): continue
+            q_id = answer.get('question_id')
+            response_text = answer.get('response_text')
+            if not isinstance(q_id, int) or q_id not in valid_question_ids:
+                continue
+            if response_text is not None and not isinstance(response_text, str):
+                continue
+            answers[q_id] = response_text
+
+        if answers:
+            draft_buffer.buffer_answers(student_id, exam_id, answers)
+        return jsonify({"msg": "Draft saved.", "saved_answers": len(answers)}), 202
+
+    except Exception as e:
+        logger.exception('EXCEPTION during save_exam_draft (Exam ID: %s, Student ID: %s): %s: %s', exam_id, student_id, type(e).__name__, str(e))
+        return jsonify({"msg": "Failed to save draft due to a server error."}), 500
+
+@bp.route('/exams/<int:exam_id>/draft', methods=['GET'])
+@jwt_required()
+@verified_student_required
+def get_exam_draft(exam_id):
+    """Returns the student's autosaved answers for an exam (e.g. to restore after a browser crash)."""
+    student_id = get_current_user_id()
+    if not student_id:
+        return jsonify({"msg": "Invalid authentication token"}), 401
+
+    try:
+        exam = Exam.query.get(exam_id)
+        if not exam or exam.is_deleted:
+            return jsonify({"msg": "Exam not found."}), 404
+
+        # Stored answers plus saves not yet flushed by any worker
+        drafts = draft_buffer.load_draft(student_id, exam_id)
+
+        answers_data = [{
+            "question_id": q_id,
+            "response_text": response_text,
+            "saved_at_utc": format_datetime(saved_at)
+        } for q_id, (response_text, saved_at) in sorted(drafts.items())]
+
+        return jsonify({"exam_id": exam_id, "answers": answers_data}), 200
+    except Exception as e:
+        logger.exception('EXCEPTION during get_exam_draft (Exam ID: %s, Student ID: %s): %s: %s', exam_id, student_id, type(e).__name__, str(e))
+        return jsonify({"msg": "Failed to load draft due to a server error."}), 500
+
 @bp.route('/exams/<int:exam_id>/submit', methods=['POST'])
 @jwt_required()
-@student_required
-@verified_required
+@verified_student_required
 def submit_exam(exam_id):
-    """Handles the submission of answers for an exam."""
+    """
+    Handles the submission of answers for an exam.
+    With "use_draft": true, autosaved answers fill in any question the payload does not answer,
+    so an exam can be finalized from the stored draft alone.
+    """
     student_id = get_current_user_id()
     if not student_id:
         return jsonify({"msg": "Invalid authentication token"}), 401
@@ -250,24 +369,24 @@ def submit_exam(exam_id):
 
     try:
         exam = Exam.query.get(exam_id)
-        if not exam:
+        if not exam or exam.is_deleted:
             return jsonify({"msg": "Exam not found."}), 404
 
         # Check for existing submission
         existing_submission = StudentResponse.query.filter_by(
             student_id=student_id, exam_id=exam_id
         ).first()
-        if existing_submission:
+        if existing_submission or submission_queue.is_pending(student_id, exam_id):
             return jsonify({"msg": "You have already submitted responses for this exam."}), 403
 
         # --- Naive UTC Time Validation Logic for Submission Deadline ---
         start_time_naive_utc = exam.scheduled_time
         if not start_time_naive_utc or not isinstance(start_time_naive_utc, datetime):
-            print(f"!!! ERROR: Cannot submit exam {exam_id}, invalid schedule time in DB: {start_time_naive_utc}")
+            logger.error('Cannot submit exam %s, invalid schedule time in DB: %s', exam_id, start_time_naive_utc)
             return jsonify({"msg": "Exam schedule is invalid or missing."}), 500
 
         if not isinstance(exam.duration, int) or exam.duration <= 0:
-            print(f"!!! ERROR: Exam {exam_id} has invalid duration during submission: {exam.duration}")
+            logger.error('Exam %s has invalid duration during submission: %s', exam_id, exam.duration)
             return jsonify({"msg": "Invalid exam duration."}), 500
 
         # Calculate end time and deadline in naive UTC
@@ -276,24 +395,25 @@ def submit_exam(exam_id):
             grace_period_seconds = 30 # Define a grace period (e.g., 30 seconds)
             submission_deadline_naive_utc = end_time_naive_utc + timedelta(seconds=grace_period_seconds)
         except TypeError:
-             print(f"!!! ERROR: Could not calculate deadline for exam {exam_id}")
+             logger.error('Could not calculate deadline for exam %s', exam_id)
              return jsonify({"msg": "Error processing exam deadline."}), 500
 
         # Compare current naive UTC time with the naive UTC deadline
         if now_naive_utc > submission_deadline_naive_utc:
             deadline_str = format_datetime(submission_deadline_naive_utc) # Format for message
-            print(f"--- Submission rejected for exam {exam_id} by student {student_id}. Deadline passed. Now (UTC): {now_naive_utc}, Deadline (UTC): {submission_deadline_naive_utc} ---")
+            logger.info('Submission rejected for exam %s by student %s. Deadline passed. Now (UTC): %s, Deadline (UTC): %s', exam_id, student_id, now_naive_utc, submission_deadline_naive_utc)
             return jsonify({"msg": f"Submission deadline ({deadline_str} UTC) has passed."}), 403
         # --- End Naive UTC Time Validation ---
 
-        answers_data = data.get('answers')
+        use_draft = bool(data.get('use_draft'))
+        answers_data = data.get('answers', [] if use_draft else None)
         if not isinstance(answers_data, list):
             return jsonify({"msg": "Invalid submission format. Expected {'answers': [ ... ]}"}), 400
 
         # Get valid question IDs for this exam
         valid_question_ids = {q.id for q in Question.query.filter_by(exam_id=exam_id).with_entities(Question.id)}
         submitted_question_ids = set() # Track submitted Qs to prevent duplicates
-        responses_to_add = []
+        answers_to_save = [] # Validated (question_id, response_text) pairs
 
         # Process submitted answers
         for answer in answers_data:
@@ -304,198 +424,279 @@ def submit_exam(exam_id):
 
             # Validate question ID
             if not isinstance(q_id, int):
-                print(f"--- Skipping answer due to invalid question_id type: {q_id} ---")
+                logger.info('Skipping answer due to invalid question_id type: %s', q_id)
                 continue
             if q_id not in valid_question_ids:
-                print(f"--- Skipping answer for invalid question_id: {q_id} (not in exam {exam_id}) ---")
+                logger.info('Skipping answer for invalid question_id: %s (not in exam %s)', q_id, exam_id)
                 continue
             if q_id in submitted_question_ids:
-                print(f"--- Skipping duplicate answer for question_id: {q_id} in exam {exam_id} ---")
+                logger.info('Skipping duplicate answer for question_id: %s in exam %s', q_id, exam_id)
                 continue
 
-            # Create the response object - submitted_at will use the default datetime.utcnow()
-            new_response = StudentResponse(
-                student_id=student_id,
-                exam_id=exam_id,
-                question_id=q_id,
-                response_text=response_text,
-                submitted_at=now_naive_utc # Explicitly set submission time to current UTC
-            )
-            responses_to_add.append(new_response)
+            answers_to_save.append((q_id, response_text))
             submitted_question_ids.add(q_id) # Mark question as processed
 
-        if not responses_to_add:
-            print(f"--- Submission attempt for exam {exam_id} by student {student_id} had no valid answers. ---")
+        # Fill in unanswered questions from the autosaved draft (including saves no worker has flushed yet)
+        if use_draft:
+            draft_answers = draft_buffer.load_draft(student_id, exam_id)
+            for q_id, (response_text, _) in sorted(draft_answers.items()):
+                if q_id not in valid_question_ids or q_id in submitted_question_ids:
+                    continue
+                answers_to_save.append((q_id, response_text))
+                submitted_question_ids.add(q_id)
+
+        if not answers_to_save:
+            logger.info('Submission attempt for exam %s by student %s had no valid answers.', exam_id, student_id)
             return jsonify({"msg": "No valid answers found in the submission."}), 400
 
-        # Add all valid responses to the session and commit
-        db.session.add_all(responses_to_add)
+        if submission_queue.is_enabled():
+            # Queue mode: durably log the submission and acknowledge; the drainer writes it to the DB
+            if not submission_queue.enqueue(student_id, exam_id, answers_to_save, now_naive_utc):
+                # A concurrent submit (possibly on another worker) was queued first
+                return jsonify({"msg": "You have already submitted responses for this exam."}), 403
+            draft_buffer.discard_buffered_answers(student_id, exam_id)
+            logger.info('Exam %s submission by student %s queued. %s responses.', exam_id, student_id, len(answers_to_save))
+            return jsonify({"msg": "Exam submitted successfully. Your answers are being recorded."}), 202
+
+        # Save all valid responses (and drop the now-final draft) in one transaction
+        record_submission(student_id, exam_id, answers_to_save, now_naive_utc)
         db.session.commit()
-        print(f"--- Exam {exam_id} submitted successfully by student {student_id}. {len(responses_to_add)} responses saved. ---")
+        draft_buffer.discard_buffered_answers(student_id, exam_id) # Later flushes elsewhere drop theirs (submitted exam)
+        logger.info('Exam %s submitted successfully by student %s. %s responses saved.', exam_id, student_id, len(answers_to_save))
         return jsonify({"msg": "Exam submitted successfully."}), 200
 
     except Exception as e:
         db.session.rollback()
-        print(f"!!! EXCEPTION during submit_exam (Exam ID: {exam_id}, Student ID: {student_id}): {type(e).__name__}: {str(e)}")
+        logger.exception('EXCEPTION during submit_exam (Exam ID: %s, Student ID: %s): %s: %s', exam_id, student_id, type(e).__name__, str(e))
         # import traceback; traceback.print_exc() # For detailed trace
         return jsonify({"msg": "Failed to submit exam due to a server error."}), 500
 
 @bp.route('/exams/submitted', methods=['GET'])
 @jwt_required()
-@student_required
-@verified_required
+@verified_student_required
 def get_submitted_exams():
     """Lists exams the student has already submitted."""
     student_id = get_current_user_id()
     if not student_id: return jsonify({"msg": "Invalid authentication token"}), 401
 
     try:
-        # Find all responses submitted by the student
-        submissions = db.session.query(StudentResponse).filter(
-            StudentResponse.student_id == student_id
-        ).options(
-            joinedload(StudentResponse.exam) # Load the related exam info
-        ).order_by(
-            StudentResponse.submitted_at.desc() # Order by most recent submission
-        ).all()
-
-        # Use a dictionary to group by exam_id and get the latest submission time per exam
-        submitted_exams_info = {}
-        for sub in submissions:
-            if sub.exam and sub.exam_id not in submitted_exams_info:
-                submitted_exams_info[sub.exam_id] = {
-                    "id": sub.exam.id,
-                    "title": sub.exam.title,
-                    # Format naive UTC scheduled time
-                    "scheduled_time_utc": format_datetime(sub.exam.scheduled_time),
-                    # Format naive UTC submission time
-                    "submitted_at_utc": format_datetime(sub.submitted_at),
-                    "status": "Submitted"
-                }
-
-        submitted_data = list(submitted_exams_info.values())
-        # Optionally re-sort if needed, e.g., by scheduled_time desc
-        submitted_data.sort(key=lambda x: x.get("scheduled_time_utc") or "", reverse=True)
-
-        print(f"--- Found {len(submitted_data)} submitted exams for student {student_id} ---")
+        # One exam_scores row per submitted exam; select just the columns the list shows
+        submissions = db.session.query(
+            Exam.id, Exam.title, Exam.scheduled_time, ExamScore.submitted_at
+        ).join(
+            ExamScore, ExamScore.exam_id == Exam.id
+        ).filter(
+            ExamScore.student_id == student_id,
+            Exam.is_deleted == False
+        ).order_by(Exam.scheduled_time.desc()).all()
+
+        submitted_data = [{
+            "id": sub.id,
+            "title": sub.title,
+            # Format naive UTC scheduled time
+            "scheduled_time_utc": format_datetime(sub.scheduled_time),
+            # Format naive UTC submission time
+            "submitted_at_utc": format_datetime(sub.submitted_at),
+            "status": "Submitted"
+        } for sub in submissions]
+
+        logger.info('Found %s submitted exams for student %s', len(submitted_data), student_id)
         return jsonify(submitted_data), 200
     except Exception as e:
-        print(f"!!! Error fetching submitted exams for student {student_id}: {e}")
+        logger.exception('Error fetching submitted exams for student %s: %s', student_id, e)
         return jsonify({"msg": "Error fetching submitted exams list."}), 500
 
 @bp.route('/results/my', methods=['GET'])
 @jwt_required()
-@student_required
-@verified_required
+@verified_student_required
 def get_my_results():
-    """Retrieves the results for all exams submitted by the student."""
+    """
+    Retrieves the results for all exams submitted by the student.
+    Totals, rank and percentile come from the materialized exam_scores table and the cohort
+    distribution from exam_stats (both precomputed). Per-question details are
+    only loaded when requested with ?include=questions, or for one exam from
+    GET /results/my/<exam_id>/questions.
+    """
     student_id = get_current_user_id()
     if not student_id:
         return jsonify({"msg": "Invalid authentication token"}), 401
+    include_questions = request.args.get('include') == 'questions'
 
     try:
-        # Fetch all student responses, joining related data including optional evaluation
-        responses = db.session.query(StudentResponse).filter(
-            StudentResponse.student_id == student_id
-        ).options(
-            # Load question and the exam it belongs to
-            joinedload(StudentResponse.question).joinedload(Question.exam),
-            # Load the evaluation if it exists
-            joinedload(StudentResponse.evaluation)
-        ).order_by(
-            # Order by exam schedule descending, then by question ID
-            Exam.scheduled_time.desc(),
-            StudentResponse.question_id.asc()
-        ).join(Question).join(Exam).all() # Explicit joins needed for ordering by Exam field
-
-        results_by_exam = {}
-        for resp in responses:
-            question = resp.question
-            if not question:
-                 print(f"!!! WARNING: Skipping response ID {resp.id} for student {student_id} due to missing question link.")
-                 continue
-            exam = question.exam
-            if not exam:
-                 print(f"!!! WARNING: Skipping response ID {resp.id} for student {student_id} due to missing exam link (via question {question.id}).")
-                 continue
-
-            evaluation = resp.evaluation # Will be None if no evaluation exists
-
-            exam_id = exam.id
-            if exam_id not in results_by_exam:
-                # Initialize structure for this exam
-                results_by_exam[exam_id] = {
-                    "exam_id": exam_id,
-                    "exam_title": exam.title,
-                    # Format naive UTC scheduled time
-                    "exam_scheduled_time_utc": format_datetime(exam.scheduled_time),
-                    "total_marks_awarded": 0.0,
-                    "total_marks_possible": 0,
-                    "overall_status": "Pending Evaluation", # Default status
-                    "questions": [],
-                    "_pending_count": 0 # Internal counter for unevaluated questions
-                }
-
-            # Process details for this specific question/response
-            marks_possible = question.marks if question.marks is not None else 0
-            marks_awarded = None
-            feedback = "Not evaluated yet"
-            evaluated_at_utc_iso = None
-            evaluated_by = None
-            question_status = "Pending Evaluation"
-
-            if evaluation:
-                # If an evaluation exists, extract its details
-                marks_awarded = evaluation.marks_awarded # Assume float if exists
-                feedback = evaluation.feedback if evaluation.feedback else "Evaluation submitted, no feedback provided."
-                evaluated_at_utc_iso = format_datetime(evaluation.evaluated_at) # Format naive UTC
-                evaluated_by = evaluation.evaluated_by
-                question_status = "Evaluated"
-            else:
-                 # Increment pending counter if no evaluation exists for this response
-                 results_by_exam[exam_id]['_pending_count'] += 1
+        # One row per submitted exam with precomputed totals, newest exam first
+        score_rows = db.session.query(ExamScore, Exam, ExamStats).join(
+            Exam, ExamScore.exam_id == Exam.id
+        ).outerjoin(
+            ExamStats, ExamStats.exam_id == ExamScore.exam_id
+        ).filter(
+            ExamScore.student_id == student_id,
+            Exam.is_deleted == False
+        ).order_by(Exam.scheduled_time.desc()).all()
+
+        questions_by_exam = _get_my_question_details(student_id) if include_questions else {}
 
-            # Format naive UTC submission time
-            submitted_at_utc_iso = format_datetime(resp.submitted_at)
-
-            # Add question details to the exam's list
-            results_by_exam[exam_id]['questions'].append({
-                "question_id": question.id,
-                "question_text": question.question_text,
-                "question_type": question.question_type.value,
-                "your_response": resp.response_text,
-                "submitted_at_utc": submitted_at_utc_iso,
-                "marks_awarded": marks_awarded,
-                "marks_possible": marks_possible,
-                "feedback": feedback,
-                "evaluated_at_utc": evaluated_at_utc_iso,
-                "evaluated_by": evaluated_by,
-                "status": question_status
-            })
-
-            # Update exam totals
-            results_by_exam[exam_id]['total_marks_possible'] += marks_possible
-            if marks_awarded is not None:
-                try:
-                    results_by_exam[exam_id]['total_marks_awarded'] += float(marks_awarded)
-                except (ValueError, TypeError):
-                     print(f"!!! WARNING: Could not convert marks_awarded '{marks_awarded}' to float for response ID {resp.id}. Skipping addition.")
-
-        # Post-process to set final exam status and remove internal counter
         final_results = []
-        for exam_id, data in results_by_exam.items():
-            if data['_pending_count'] == 0:
-                 data['overall_status'] = "Results Declared" # All questions evaluated
-            # Keep "Pending Evaluation" if count > 0, or add "Partially Evaluated" if needed
-            # else: data['overall_status'] = f"Pending Evaluation ({data['_pending_count']} questions)"
-
-            del data['_pending_count'] # Remove internal counter from final output
-            final_results.append(data)
-
-        print(f"--- Generated results for {len(final_results)} exams for student {student_id} ---")
+        for score, exam, exam_stats in score_rows:
+            exam_result = {
+                "exam_id": exam.id,
+                "exam_title": exam.title,
+                # Format naive UTC scheduled time
+                "exam_scheduled_time_utc": format_datetime(exam.scheduled_time),
+                "total_marks_awarded": score.marks_awarded,
+                # Whole exam, like the trend and the teacher view: unanswered questions count as 0
+                "total_marks_possible": exam.total_marks,
+                "evaluated_count": score.evaluated_count,
+                "pending_count": score.pending_count,
+                # All questions evaluated -> results declared
+                "overall_status": "Results Declared" if score.pending_count == 0 else "Pending Evaluation",
+                # Position in the cohort (null until the exam has been ranked)
+                "rank": score.rank,
+                "percentile": score.percentile,
+                "cohort": _format_cohort(exam_stats)
+            }
+            if include_questions:
+                exam_result["questions"] = questions_by_exam.get(exam.id, [])
+            final_results.append(exam_result)
+
+        logger.info('Generated results for %s exams for student %s', len(final_results), student_id)
         return jsonify(final_results), 200
 
     except Exception as e:
-        print(f"!!! EXCEPTION in get_my_results (Student ID: {student_id}): {type(e).__name__}: {str(e)}")
+        logger.exception('EXCEPTION in get_my_results (Student ID: %s): %s: %s', student_id, type(e).__name__, str(e))
         # import traceback; traceback.print_exc() # For detailed trace
-        return jsonify({"msg": "An unexpected error occurred while fetching your results."}), 500
\ No newline at end of file
+        return jsonify({"msg": "An unexpected error occurred while fetching your results."}), 500
+
+@bp.route('/results/my/<int:exam_id>/questions', methods=['GET'])
+@jwt_required()
+@verified_student_required
+def get_my_result_questions(exam_id):
+    """Per-question results of one submitted exam (loaded when the student expands that exam)."""
+    student_id = get_current_user_id()
+    if not student_id:
+        return jsonify({"msg": "Invalid authentication token"}), 401
+
+    try:
+        submitted = db.session.query(ExamScore.id).join(Exam, ExamScore.exam_id == Exam.id).filter(
+            ExamScore.student_id == student_id, ExamScore.exam_id == exam_id, Exam.is_deleted == False
+        ).first()
+        if not submitted:
+            return jsonify({"msg": "No submitted results found for this exam."}), 404
+
+        questions = _get_my_question_details(student_id, exam_id).get(exam_id, [])
+        return jsonify({"exam_id": exam_id, "questions": questions}), 200
+
+    except Exception as e:
+        logger.exception('EXCEPTION in get_my_result_questions (Exam ID: %s, Student ID: %s): %s: %s', exam_id, student_id, type(e).__name__, str(e))
+        return jsonify({"msg": "An unexpected error occurred while fetching your results."}), 500
+
+def _format_cohort(exam_stats):
+    """Score distribution of an exam's cohort from its ExamStats row (None if not computed yet)."""
+    if exam_stats is None:
+        return None
+    return {
+        "students": exam_stats.students,
+        "ranked_students": exam_stats.fully_evaluated, # Students with all answers evaluated; the rest are not ranked yet
+        "average_marks": exam_stats.mean_marks,
+        "median_marks": exam_stats.median_marks,
+        "highest_marks": exam_stats.highest_marks,
+        "histogram": exam_stats.histogram, # Students per band of the exam's total marks
+        "band_percent": 100 // HISTOGRAM_BUCKETS,
+        # Ranks can still move while some students' answers are unevaluated
+        "provisional": exam_stats.fully_evaluated < exam_stats.students,
+        "computed_at_utc": format_datetime(exam_stats.computed_at)
+    }
+
+@bp.route('/results/trend', methods=['GET'])
+@jwt_required()
+@verified_student_required
+def get_my_results_trend():
+    """
+    The student's performance across exams, oldest first: percentage of the exam's total marks
+    (the same total as /results/my),
+    rank and percentile per exam, plus the overall trend. One indexed query on exam_scores.
+    """
+    student_id = get_current_user_id()
+    if not student_id:
+        return jsonify({"msg": "Invalid authentication token"}), 401
+
+    try:
+        rows = db.session.query(
+            Exam.id, Exam.title, Exam.scheduled_time, Exam.total_marks,
+            ExamScore.marks_awarded, ExamScore.pending_count, ExamScore.rank, ExamScore.percentile,
+            ExamStats.fully_evaluated.label("ranked_students")
+        ).join(
+            ExamScore, ExamScore.exam_id == Exam.id
+        ).outerjoin(
+            ExamStats, ExamStats.exam_id == Exam.id
+        ).filter(
+            ExamScore.student_id == student_id,
+            Exam.is_deleted == False
+        ).order_by(Exam.scheduled_time.asc()).all()
+
+        exams = [{
+            "exam_id": row.id,
+            "exam_title": row.title,
+            "exam_scheduled_time_utc": format_datetime(row.scheduled_time),
+            "total_marks_awarded": row.marks_awarded,
+            "total_marks_possible": row.total_marks,
+            "percentage": round(row.marks_awarded / row.total_marks * 100, 2) if row.total_marks else None,
+            "rank": row.rank,
+            "cohort_size": row.ranked_students,
+            "percentile": row.percentile,
+            "results_declared": row.pending_count == 0
+        } for row in rows]
+
+        # The trend only uses exams whose results are final
+        declared = [exam for exam in exams if exam["results_declared"]]
+        return jsonify({
+            "exams": exams,
+            "summary": trend_summary(
+                [exam["percentage"] for exam in declared], [exam["percentile"] for exam in declared]
+            )
+        }), 200
+
+    except Exception as e:
+        logger.exception('EXCEPTION in get_my_results_trend (Student ID: %s): %s: %s', student_id, type(e).__name__, str(e))
+        return jsonify({"msg": "An unexpected error occurred while fetching your performance trend."}), 500
+
+def _get_my_question_details(student_id, exam_id=None):
+    """Loads the student's responses (of one exam, if given) with question and evaluation as plain rows, grouped by exam ID."""
+    rows = db.session.query(
+        StudentResponse.exam_id,
+        StudentResponse.response_text,
+        StudentResponse.submitted_at,
+        Question.id.label("question_id"),
+        Question.question_text,
+        Question.question_type,
+        Question.marks,
+        Evaluation.marks_awarded,
+        Evaluation.feedback,
+        Evaluation.evaluated_at,
+        Evaluation.evaluated_by
+    ).join(
+        Question, StudentResponse.question_id == Question.id
+    ).outerjoin(
+        Evaluation, Evaluation.response_id == StudentResponse.id
+    ).filter(
+        StudentResponse.student_id == student_id
+    ).order_by(StudentResponse.question_id.asc())
+    if exam_id is not None:
+        rows = rows.filter(StudentResponse.exam_id == exam_id)
+
+    questions_by_exam = {}
+    for row in rows:
+        evaluated = row.marks_awarded is not None
+        questions_by_exam.setdefault(row.exam_id, []).append({
+            "question_id": row.question_id,
+            "question_text": row.question_text,
+            "question_type": row.question_type.value,
+            "your_response": row.response_text,
+            "submitted_at_utc": format_datetime(row.submitted_at),
+            "marks_awarded": row.marks_awarded,
+            "marks_possible": row.marks if row.marks is not None else 0,
+            "feedback": (row.feedback or "Evaluation submitted, no feedback provided.") if evaluated else "Not evaluated yet",
+            "evaluated_at_utc": format_datetime(row.evaluated_at),
+            "evaluated_by": row.evaluated_by,
+            "status": "Evaluated" if evaluated else "Pending Evaluation"
+        })
+    return questions_by_exam
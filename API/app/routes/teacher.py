@@ -1,15 +1,35 @@
 # app/routes/teacher.py
 
-from flask import Blueprint, request, jsonify
+import logging
+import csv
+import io
+import json
+from types import SimpleNamespace
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from sqlalchemy import func, case
 from app.extensions import db
-from app.models import Exam, Question, QuestionType, StudentResponse, Evaluation, UserRole, User # Import User for student details
-from app.utils.decorators import teacher_required, verified_required # Import custom decorators
+from app.models import Exam, Question, QuestionType, StudentResponse, Evaluation, UserRole, User, ExamScore, ExamDraft, DeletionJob # Import User for student details
+from app.utils.decorators import verified_teacher_required # Role + verification check with one cached user lookup
 from flask_jwt_extended import jwt_required # For protecting routes
 # Import helper functions (format_datetime now handles naive UTC)
-from app.utils.helpers import get_current_user_id, format_datetime
+from app.utils.helpers import get_current_user_id, format_datetime, decode_cursor
 # Use standard Python datetime and timedelta
 from datetime import datetime, timedelta, timezone
-from sqlalchemy.orm import joinedload # For efficient loading
+from app.services.scores import refresh_exam_scores # Keeps the materialized exam_scores in step
+from app.services.exam_totals import adjust_exam_totals # Keeps Exam.question_count/total_marks in step
+from app.services.questions import ( # Shared question validation, bulk insert and cloning
+    MAX_QUESTION_BATCH, validate_question, validate_question_batch, parse_questions_csv, insert_questions, clone_exam
+)
+from app.services import stats # Dashboard counters
+from app.services import deletion_jobs # Background exam deletion
+from app.services.search import parse_search_args, search_page # Full-text search
+from app.services.results_export import EXPORT_FORMATS, export_rows, csv_chunks, xlsx_chunks # Spreadsheet export
+from app.services.item_analysis import get_item_analysis # Per-question statistics
+from app.services import teacher_dashboard # Cached per-teacher dashboard figures
+from app.utils.helpers import fetch_keyset_page, pagination_payload # Keyset pagination shared with the admin listings
+
+logger = logging.getLogger(__name__)
+
 # Removed pendulum import
 
 bp = Blueprint('teacher', __name__)
@@ -19,34 +39,29 @@ bp = Blueprint('teacher', __name__)
 # --- Dashboard ---
 @bp.route('/dashboard', methods=['GET'])
 @jwt_required()
-@teacher_required
-@verified_required
+@verified_teacher_required
 def dashboard():
-    """Provides basic dashboard info for the logged-in teacher."""
+    """
+    Dashboard for the logged-in teacher: exam counts by status, recent submissions, pending
+    evaluations and per-exam figures, from one grouped query (cached per teacher).
+    """
     teacher_id = get_current_user_id()
     if not teacher_id:
         return jsonify({"msg": "Invalid authentication token"}), 401 # Should be caught by decorators
 
     try:
-        # Count exams created by this teacher
-        exam_count = Exam.query.filter_by(created_by=teacher_id).count()
-        # Potentially add more stats: total questions, recent evaluations, etc.
-        print(f"--- Teacher {teacher_id} dashboard requested. Exam count: {exam_count} ---")
-        return jsonify({
-            "message": "Teacher Dashboard",
-            "my_exams_count": exam_count
-            # Add more relevant stats here
-        }), 200
+        data = teacher_dashboard.get_dashboard(teacher_id)
+        logger.info('Teacher %s dashboard requested. Exam count: %s (cached: %s)', teacher_id, data['my_exams_count'], data['cached'])
+        return jsonify(data), 200
     except Exception as e:
-        print(f"!!! Error generating teacher dashboard for teacher {teacher_id}: {e}")
+        logger.exception('Error generating teacher dashboard for teacher %s: %s', teacher_id, e)
         return jsonify({"msg": "Error fetching dashboard data."}), 500
 
 # --- Exam Management ---
 
 @bp.route('/exams', methods=['POST'])
 @jwt_required()
-@teacher_required
-@verified_required
+@verified_teacher_required
 def create_exam():
     """Creates a new exam."""
     data = request.get_json()
@@ -79,7 +94,7 @@ def create_exam():
 
         # Validate that scheduled time is in the future (optional, but good practice)
         if scheduled_time_naive_utc <= datetime.utcnow():
-             print(f"--- Warning: Exam created with schedule time in the past: {scheduled_time_naive_utc} UTC ---")
+             logger.warning('Exam created with schedule time in the past: %s UTC', scheduled_time_naive_utc)
              # Decide if this should be an error:
              # return jsonify({"msg": "Scheduled time must be in the future"}), 400
 
@@ -99,8 +114,9 @@ def create_exam():
     )
     try:
         db.session.add(new_exam)
+        stats.bump(exams=1)
         db.session.commit()
-        print(f"--- Exam '{title}' (ID: {new_exam.id}) created by teacher {teacher_id} ---")
+        logger.info("Exam '%s' (ID: %s) created by teacher %s", title, new_exam.id, teacher_id)
         return jsonify({
             "msg": "Exam created successfully",
             "exam": {
@@ -110,18 +126,19 @@ def create_exam():
                 # Format naive UTC for response
                 "scheduled_time_utc": format_datetime(new_exam.scheduled_time),
                 "duration_minutes": new_exam.duration,
-                "created_at_utc": format_datetime(new_exam.created_at)
+                "created_at_utc": format_datetime(new_exam.created_at),
+                "question_count": new_exam.question_count,
+                "total_marks": new_exam.total_marks
             }
         }), 201
     except Exception as e:
         db.session.rollback()
-        print(f"!!! Error creating exam '{title}' for teacher {teacher_id}: {e}")
+        logger.exception("Error creating exam '%s' for teacher %s: %s", title, teacher_id, e)
         return jsonify({"msg": "Failed to create exam due to a server error."}), 500
 
 @bp.route('/exams', methods=['GET'])
 @jwt_required()
-@teacher_required
-@verified_required
+@verified_teacher_required
 def get_my_exams():
     """Retrieves all exams created by the logged-in teacher."""
     teacher_id = get_current_user_id()
@@ -129,7 +146,7 @@ def get_my_exams():
 
     try:
         # Fetch exams created by this teacher, order by schedule time descending
-        exams = Exam.query.filter_by(created_by=teacher_id).order_by(Exam.scheduled_time.desc()).all()
+        exams = Exam.query.filter_by(created_by=teacher_id, is_deleted=False).order_by(Exam.scheduled_time.desc()).all()
 
         # Format data for response
         exams_data = [{
@@ -139,19 +156,20 @@ def get_my_exams():
             # Format naive UTC times
             "scheduled_time_utc": format_datetime(e.scheduled_time),
             "duration_minutes": e.duration,
-            "created_at_utc": format_datetime(e.created_at)
+            "created_at_utc": format_datetime(e.created_at),
+            "question_count": e.question_count,
+            "total_marks": e.total_marks
         } for e in exams]
 
-        print(f"--- Retrieved {len(exams_data)} exams for teacher {teacher_id} ---")
+        logger.info('Retrieved %s exams for teacher %s', len(exams_data), teacher_id)
         return jsonify(exams_data), 200
     except Exception as e:
-        print(f"!!! Error fetching exams for teacher {teacher_id}: {e}")
+        logger.exception('Error fetching exams for teacher %s: %s', teacher_id, e)
         return jsonify({"msg": "Error fetching exams list."}), 500
 
 @bp.route('/exams/<int:exam_id>', methods=['GET'])
 @jwt_required()
-@teacher_required
-@verified_required
+@verified_teacher_required
 def get_exam_details(exam_id):
     """Retrieves details for a specific exam created by the teacher."""
     teacher_id = get_current_user_id()
@@ -159,7 +177,7 @@ def get_exam_details(exam_id):
 
     try:
         # Fetch the specific exam, ensuring it belongs to the teacher
-        exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id).first()
+        exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id, is_deleted=False).first()
         if not exam:
             return jsonify({"msg": "Exam not found or access denied"}), 404
 
@@ -171,19 +189,19 @@ def get_exam_details(exam_id):
             # Format naive UTC times
             "scheduled_time_utc": format_datetime(exam.scheduled_time),
             "duration_minutes": exam.duration,
-            "created_at_utc": format_datetime(exam.created_at)
-            # Consider adding question count: "question_count": exam.questions.count()
+            "created_at_utc": format_datetime(exam.created_at),
+            "question_count": exam.question_count,
+            "total_marks": exam.total_marks
         }
-        print(f"--- Retrieved details for exam {exam_id} by teacher {teacher_id} ---")
+        logger.info('Retrieved details for exam %s by teacher %s', exam_id, teacher_id)
         return jsonify(exam_data), 200
     except Exception as e:
-        print(f"!!! Error fetching details for exam {exam_id} by teacher {teacher_id}: {e}")
+        logger.exception('Error fetching details for exam %s by teacher %s: %s', exam_id, teacher_id, e)
         return jsonify({"msg": "Error fetching exam details."}), 500
 
 @bp.route('/exams/<int:exam_id>', methods=['PUT'])
 @jwt_required()
-@teacher_required
-@verified_required
+@verified_teacher_required
 def update_exam(exam_id):
     """Updates details of an existing exam."""
     teacher_id = get_current_user_id()
@@ -192,7 +210,7 @@ def update_exam(exam_id):
     if not data: return jsonify({"msg": "Missing JSON data"}), 400
 
     # Fetch the exam, ensuring ownership
-    exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id).first()
+    exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id, is_deleted=False).first()
     if not exam:
         return jsonify({"msg": "Exam not found or access denied"}), 404
 
@@ -234,7 +252,7 @@ def update_exam(exam_id):
 
     try:
         db.session.commit()
-        print(f"--- Exam {exam_id} updated by teacher {teacher_id}. Fields: {', '.join(updated_fields)} ---")
+        logger.info('Exam %s updated by teacher %s. Fields: %s', exam_id, teacher_id, ', '.join(updated_fields))
         # Return the updated exam data
         return jsonify({
             "msg": "Exam updated successfully",
@@ -244,130 +262,88 @@ def update_exam(exam_id):
                 "description": exam.description,
                 "scheduled_time_utc": format_datetime(exam.scheduled_time),
                 "duration_minutes": exam.duration,
-                "created_at_utc": format_datetime(exam.created_at)
+                "created_at_utc": format_datetime(exam.created_at),
+                "question_count": exam.question_count,
+                "total_marks": exam.total_marks
             }
         }), 200
     except Exception as e:
         db.session.rollback()
-        print(f"!!! Error updating exam {exam_id} by teacher {teacher_id}: {e}")
+        logger.exception('Error updating exam %s by teacher %s: %s', exam_id, teacher_id, e)
         return jsonify({"msg": "Exam update failed due to a server error."}), 500
 
 @bp.route('/exams/<int:exam_id>', methods=['DELETE'])
 @jwt_required()
-@teacher_required
-@verified_required
+@verified_teacher_required
 def delete_exam(exam_id):
-    """Deletes an exam and its associated questions/responses."""
+    """Hides an exam immediately and queues the removal of its questions/responses as a background job."""
     teacher_id = get_current_user_id()
     if not teacher_id: return jsonify({"msg": "Invalid authentication token"}), 401
 
     # Fetch the exam, ensuring ownership
-    exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id).first()
+    exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id, is_deleted=False).first()
     if not exam:
         return jsonify({"msg": "Exam not found or access denied"}), 404
 
     try:
         exam_title = exam.title
-        # Simply deleting the exam object from the session
-        db.session.delete(exam)
-        # On commit, the database will handle cascading deletes due to ON DELETE CASCADE constraints
+        # Large exams take a while to remove; the job deletes the rows in small chunks
+        job = deletion_jobs.schedule_exam_deletion(exam, teacher_id)
         db.session.commit()
-        print(f"--- Exam '{exam_title}' (ID: {exam_id}) and related data deleted successfully by teacher {teacher_id} ---")
-        return jsonify({"msg": f"Exam '{exam_title}' deleted successfully"}), 200
+        deletion_jobs.wake()
+        logger.info("Exam '%s' (ID: %s) scheduled for deletion by teacher %s (job %s)", exam_title, exam_id, teacher_id, job.id)
+        return jsonify({
+            "msg": f"Exam '{exam_title}' deleted successfully",
+            "deletion_job": deletion_jobs.job_to_dict(job)
+        }), 202
     except Exception as e:
         db.session.rollback()
-        print(f"!!! Error deleting exam {exam_id} by teacher {teacher_id}: {e}")
-        # If cascade fails at DB level, it might raise an IntegrityError caught here
+        logger.exception('Error deleting exam %s by teacher %s: %s', exam_id, teacher_id, e)
         return jsonify({"msg": "Exam deletion failed. Check server logs."}), 500
 
+@bp.route('/deletion-jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+@verified_teacher_required
+def get_deletion_job(job_id):
+    """Reports the progress of an exam deletion requested by the current teacher."""
+    teacher_id = get_current_user_id()
+    if not teacher_id: return jsonify({"msg": "Invalid authentication token"}), 401
+    job = DeletionJob.query.filter_by(id=job_id, requested_by=teacher_id).first()
+    if not job:
+        return jsonify({"msg": "Deletion job not found or access denied"}), 404
+    return jsonify(deletion_jobs.job_to_dict(job)), 200
+
 # --- Question Management ---
 
 @bp.route('/exams/<int:exam_id>/questions', methods=['POST'])
 @jwt_required()
-@teacher_required
-@verified_required
+@verified_teacher_required
 def add_question(exam_id):
     """Adds a new question to a specific exam."""
     teacher_id = get_current_user_id()
     if not teacher_id: return jsonify({"msg": "Invalid authentication token."}), 401
 
     # Verify exam exists and belongs to the teacher
-    exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id).first()
+    exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id, is_deleted=False).first()
     if not exam: return jsonify({"msg": "Exam not found or access denied"}), 404
 
     data = request.get_json()
     if not data: return jsonify({"msg": "Missing JSON data"}), 400
 
-    # Extract question details from request
-    q_text = data.get('question_text')
-    q_type_str = data.get('question_type') # e.g., "MCQ", "Short Answer"
-    marks = data.get('marks')
-    options = data.get('options') # Expected for MCQ: {"key1": "text1", "key2": "text2"}
-    correct_answer = data.get('correct_answer') # Expected for MCQ: "key1"
-    word_limit = data.get('word_limit') # Expected for Short/Long
-
-    # Basic validation
-    if not q_text or not q_type_str or marks is None:
-        return jsonify({"msg": "Missing required fields: question_text, question_type, marks"}), 400
-
-    # Validate question type
+    # Same validation rules as the bulk endpoint
     try:
-        # Convert string type to enum
-        q_type_enum = QuestionType(q_type_str)
-    except ValueError:
-        valid_types = [qt.value for qt in QuestionType]
-        return jsonify({"msg": f"Invalid question type '{q_type_str}'. Must be one of: {', '.join(valid_types)}"}), 400
-
-    # Validate marks
-    try:
-        marks_int = int(marks)
-        if marks_int <= 0: raise ValueError("Marks must be positive")
-    except (ValueError, TypeError):
-        return jsonify({"msg": f"Invalid marks value: '{marks}'. Must be a positive integer."}), 400
-
-    # Type-specific validation
-    validated_options = None
-    validated_correct_answer = None
-    validated_word_limit = None
-
-    if q_type_enum == QuestionType.MCQ:
-        if not options or not isinstance(options, dict) or not options:
-            return jsonify({"msg": "MCQ requires a non-empty 'options' dictionary (key-value pairs)."}), 400
-        if not correct_answer or not isinstance(correct_answer, str):
-            return jsonify({"msg": "MCQ requires a 'correct_answer' string (the key of the correct option)."}), 400
-        if correct_answer not in options:
-            return jsonify({"msg": f"MCQ 'correct_answer' ('{correct_answer}') must be one of the keys provided in 'options'."}), 400
-        validated_options = options
-        validated_correct_answer = correct_answer
-    elif q_type_enum in [QuestionType.SHORT_ANSWER, QuestionType.LONG_ANSWER]:
-        if word_limit is not None:
-            try:
-                word_limit_val = int(word_limit)
-                if word_limit_val <= 0:
-                    raise ValueError("Word limit must be positive if provided.")
-                validated_word_limit = word_limit_val
-            except (ValueError, TypeError):
-                return jsonify({"msg": "Invalid word_limit. Must be a positive integer or null/absent."}), 400
-        # else: validated_word_limit remains None
-    else:
-        # Should not happen if enum validation works
-        return jsonify({"msg": "Unhandled question type during validation."}), 500
+        fields = validate_question(data)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
     # Create new Question instance
-    new_question = Question(
-        exam_id=exam_id,
-        question_text=q_text,
-        question_type=q_type_enum,
-        marks=marks_int,
-        options=validated_options,
-        correct_answer=validated_correct_answer,
-        word_limit=validated_word_limit
-    )
+    new_question = Question(exam_id=exam_id, **fields)
 
     try:
         db.session.add(new_question)
+        adjust_exam_totals(exam_id, 1, fields["marks"])
         db.session.commit()
-        print(f"--- Question {new_question.id} added to exam {exam_id} by teacher {teacher_id} ---")
+        logger.info('Question %s added to exam %s by teacher %s', new_question.id, exam_id, teacher_id)
         # Return the created question details
         return jsonify({
             "msg": "Question added successfully",
@@ -383,20 +359,129 @@ def add_question(exam_id):
         }), 201
     except Exception as e:
         db.session.rollback()
-        print(f"!!! Error saving question to exam {exam_id} for teacher {teacher_id}: {e}")
+        logger.exception('Error saving question to exam %s for teacher %s: %s', exam_id, teacher_id, e)
         return jsonify({"msg": "Failed to add question due to a server error."}), 500
 
+@bp.route('/exams/<int:exam_id>/questions/bulk', methods=['POST'])
+@jwt_required()
+@verified_teacher_required
+def add_questions_bulk(exam_id):
+    """
+    Adds many questions to an exam in one transaction: a JSON array (or {"questions": [...]}),
+    or a CSV file uploaded as multipart field 'file'. Every question is validated like
+    add_question first; if any is invalid, nothing is added.
+    """
+    teacher_id = get_current_user_id()
+    if not teacher_id: return jsonify({"msg": "Invalid authentication token."}), 401
+
+    exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id, is_deleted=False).first()
+    if not exam: return jsonify({"msg": "Exam not found or access denied"}), 404
+
+    upload = request.files.get('file')
+    try:
+        if upload is not None:
+            text_stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+            entries = parse_questions_csv(text_stream) # refs are CSV line numbers
+            ref_name = "line"
+        else:
+            data = request.get_json(silent=True)
+            questions = data.get('questions') if isinstance(data, dict) else data
+            if not isinstance(questions, list) or not questions:
+                return jsonify({"msg": "Send a JSON array of questions (or {\"questions\": [...]}) or a CSV file in 'file'."}), 400
+            if len(questions) > MAX_QUESTION_BATCH:
+                return jsonify({"msg": f"At most {MAX_QUESTION_BATCH} questions can be added per request."}), 400
+            entries = list(enumerate(questions)) # refs are array indexes
+            ref_name = "index"
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({"msg": f"Could not read questions: {e}"}), 400
+    if not entries:
+        return jsonify({"msg": "No questions found in the upload."}), 400
+
+    rows, errors = validate_question_batch(entries)
+    if errors:
+        return jsonify({
+            "msg": f"{len(errors)} of {len(entries)} questions are invalid; nothing was added.",
+            "errors": [{ref_name: error["ref"], "msg": error["msg"]} for error in errors]
+        }), 400
+
+    try:
+        insert_questions(exam_id, rows)
+        db.session.commit()
+        logger.info('%s questions added in bulk to exam %s by teacher %s', len(rows), exam_id, teacher_id)
+        return jsonify({
+            "msg": f"{len(rows)} questions added successfully",
+            "added": len(rows),
+            "question_count": exam.question_count, # Reloaded after commit, includes the new questions
+            "total_marks": exam.total_marks
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Error bulk-adding questions to exam %s for teacher %s: %s', exam_id, teacher_id, e)
+        return jsonify({"msg": "Failed to add questions due to a server error."}), 500
+
+@bp.route('/exams/<int:exam_id>/clone', methods=['POST'])
+@jwt_required()
+@verified_teacher_required
+def clone_exam_route(exam_id):
+    """
+    Copies one of the teacher's exams with all its questions (server-side, in one transaction).
+    Optional JSON: title (default "<title> (Copy)"), description, scheduled_time_utc, duration_minutes.
+    """
+    teacher_id = get_current_user_id()
+    if not teacher_id: return jsonify({"msg": "Invalid authentication token"}), 401
+    data = request.get_json(silent=True) or {}
+
+    source = Exam.query.filter_by(id=exam_id, created_by=teacher_id, is_deleted=False).first()
+    if not source: return jsonify({"msg": "Exam not found or access denied"}), 404
+
+    title = data.get('title') or f"{source.title} (Copy)"[:150]
+    description = data.get('description', source.description)
+    try:
+        scheduled_time = source.scheduled_time
+        if data.get('scheduled_time_utc'):
+            scheduled_time_str = data['scheduled_time_utc']
+            if scheduled_time_str.endswith('Z'):
+                scheduled_time_str = scheduled_time_str[:-1] # Remove trailing Z for naive parsing
+            scheduled_time = datetime.fromisoformat(scheduled_time_str)
+        duration = int(data.get('duration_minutes') or source.duration)
+        if duration <= 0:
+            raise ValueError("Duration must be a positive integer")
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({"msg": f"Invalid format for scheduled_time_utc or duration_minutes: {e}. Expected ISO 8601 UTC (e.g., YYYY-MM-DDTHH:MM:SS) and positive integer minutes."}), 400
+
+    try:
+        new_exam = clone_exam(source, teacher_id, title, scheduled_time, duration, description)
+        db.session.commit()
+        logger.info('Exam %s cloned as %s (%s questions) by teacher %s', exam_id, new_exam.id, new_exam.question_count, teacher_id)
+        return jsonify({
+            "msg": "Exam cloned successfully",
+            "exam": {
+                "id": new_exam.id,
+                "title": new_exam.title,
+                "description": new_exam.description,
+                "scheduled_time_utc": format_datetime(new_exam.scheduled_time),
+                "duration_minutes": new_exam.duration,
+                "created_at_utc": format_datetime(new_exam.created_at),
+                "question_count": new_exam.question_count,
+                "total_marks": new_exam.total_marks,
+                "cloned_from": source.id
+            }
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Error cloning exam %s for teacher %s: %s', exam_id, teacher_id, e)
+        return jsonify({"msg": "Failed to clone exam due to a server error."}), 500
+
 @bp.route('/exams/<int:exam_id>/questions', methods=['GET'])
 @jwt_required()
-@teacher_required
-@verified_required
+@verified_teacher_required
 def get_exam_questions(exam_id):
     """Retrieves all questions for a specific exam owned by the teacher."""
     teacher_id = get_current_user_id()
     if not teacher_id: return jsonify({"msg": "Invalid authentication token"}), 401
 
     # Verify exam exists and belongs to the teacher
-    exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id).first()
+    exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id, is_deleted=False).first()
     if not exam: return jsonify({"msg": "Exam not found or access denied"}), 404
 
     try:
@@ -414,16 +499,15 @@ def get_exam_questions(exam_id):
             "word_limit": q.word_limit
         } for q in questions]
 
-        print(f"--- Retrieved {len(questions_data)} questions for exam {exam_id} for teacher {teacher_id} ---")
+        logger.info('Retrieved %s questions for exam %s for teacher %s', len(questions_data), exam_id, teacher_id)
         return jsonify(questions_data), 200
     except Exception as e:
-        print(f"!!! Error fetching questions for exam {exam_id} by teacher {teacher_id}: {e}")
+        logger.exception('Error fetching questions for exam %s by teacher %s: %s', exam_id, teacher_id, e)
         return jsonify({"msg": "Error fetching questions."}), 500
 
 @bp.route('/exams/<int:exam_id>/questions/<int:question_id>', methods=['GET'])
 @jwt_required()
-@teacher_required
-@verified_required
+@verified_teacher_required
 def get_single_question(exam_id, question_id):
     """Retrieves details of a single question within an exam owned by the teacher."""
     teacher_id = get_current_user_id()
@@ -434,7 +518,8 @@ def get_single_question(exam_id, question_id):
         question = db.session.query(Question).join(Exam).filter(
             Question.id == question_id,
             Question.exam_id == exam_id,
-            Exam.created_by == teacher_id # Correct comparison operator
+            Exam.created_by == teacher_id, # Correct comparison operator
+            Exam.is_deleted == False
         ).first()
 
         if not question:
@@ -450,17 +535,16 @@ def get_single_question(exam_id, question_id):
             "correct_answer": question.correct_answer,
             "word_limit": question.word_limit
         }
-        print(f"--- Retrieved question {question_id} for exam {exam_id} by teacher {teacher_id} ---")
+        logger.info('Retrieved question %s for exam %s by teacher %s', question_id, exam_id, teacher_id)
         return jsonify(question_data), 200
 
     except Exception as e:
-        print(f"!!! Error fetching single question {question_id} (Exam {exam_id}) by teacher {teacher_id}: {e}")
+        logger.exception('Error fetching single question %s (Exam %s) by teacher %s: %s', question_id, exam_id, teacher_id, e)
         return jsonify({"msg": "Error fetching question details."}), 500
 
 @bp.route('/exams/<int:exam_id>/questions/<int:question_id>', methods=['PUT'])
 @jwt_required()
-@teacher_required
-@verified_required
+@verified_teacher_required
 def update_question(exam_id, question_id):
     """Updates an existing question."""
     teacher_id = get_current_user_id()
@@ -473,13 +557,15 @@ def update_question(exam_id, question_id):
     question = db.session.query(Question).join(Exam).filter(
         Question.id == question_id,
         Question.exam_id == exam_id,
-        Exam.created_by == teacher_id
+        Exam.created_by == teacher_id,
+        Exam.is_deleted == False
     ).first()
 
     if not question: return jsonify({"msg": "Question not found or access denied"}), 404
 
     updated_fields = []
     original_q_type = question.question_type # Store original type for logic checks
+    original_marks = question.marks # For adjusting the exam's total marks
 
     # --- Update Logic ---
     # Update text
@@ -578,8 +664,12 @@ def update_question(exam_id, question_id):
         return jsonify({"msg": "No changes detected or no valid fields provided for update."}), 400
 
     try:
+        if 'marks' in updated_fields:
+            adjust_exam_totals(exam_id, 0, question.marks - original_marks)
+            # Students' possible totals include this question's marks
+            refresh_exam_scores(exam_id)
         db.session.commit()
-        print(f"--- Question {question_id} (Exam {exam_id}) updated by teacher {teacher_id}. Fields: {', '.join(updated_fields)} ---")
+        logger.info('Question %s (Exam %s) updated by teacher %s. Fields: %s', question_id, exam_id, teacher_id, ', '.join(updated_fields))
         # Return updated question details
         return jsonify({
             "msg": "Question updated successfully",
@@ -595,13 +685,12 @@ def update_question(exam_id, question_id):
         }), 200
     except Exception as e:
         db.session.rollback()
-        print(f"!!! Error updating question {question_id} (Exam {exam_id}) by teacher {teacher_id}: {e}")
+        logger.exception('Error updating question %s (Exam %s) by teacher %s: %s', question_id, exam_id, teacher_id, e)
         return jsonify({"msg": "Failed to update question due to a server error."}), 500
 
 @bp.route('/exams/<int:exam_id>/questions/<int:question_id>', methods=['DELETE'])
 @jwt_required()
-@teacher_required
-@verified_required
+@verified_teacher_required
 def delete_question(exam_id, question_id):
     """Deletes a specific question from an exam."""
     teacher_id = get_current_user_id()
@@ -611,7 +700,8 @@ def delete_question(exam_id, question_id):
     question = db.session.query(Question).join(Exam).filter(
         Question.id == question_id,
         Question.exam_id == exam_id,
-        Exam.created_by == teacher_id
+        Exam.created_by == teacher_id,
+        Exam.is_deleted == False
     ).first()
 
     if not question: return jsonify({"msg": "Question not found or access denied"}), 404
@@ -620,133 +710,356 @@ def delete_question(exam_id, question_id):
     # Current model setup cascades Question deletion to StudentResponses.
     # Check if Evaluations should also be deleted or handled.
     try:
+        adjust_exam_totals(exam_id, -1, -question.marks)
+        stats.bump_removed_responses(StudentResponse.question_id == question_id)
         db.session.delete(question)
+        # The question's responses (and their evaluations) go with it; recompute affected totals
+        refresh_exam_scores(exam_id)
         db.session.commit()
-        print(f"--- Question {question_id} deleted from exam {exam_id} by teacher {teacher_id} ---")
+        logger.info('Question %s deleted from exam %s by teacher %s', question_id, exam_id, teacher_id)
         return jsonify({"msg": "Question deleted successfully"}), 200
     except Exception as e:
         db.session.rollback()
-        print(f"!!! Error deleting question {question_id} (Exam {exam_id}) by teacher {teacher_id}: {e}")
+        logger.exception('Error deleting question %s (Exam %s) by teacher %s: %s', question_id, exam_id, teacher_id, e)
         return jsonify({"msg": "Question deletion failed. Check related responses/evaluations or server logs."}), 500
 
 # --- Result Viewing ---
 
+RESULTS_MODES = ('summary', 'detail')
+RESULTS_MAX_PER_PAGE = 100
+RESULTS_STREAM_BATCH_SIZE = 500 # Rows fetched per round trip while streaming detail results
+
 @bp.route('/exams/results/<int:exam_id>', methods=['GET'])
 @jwt_required()
-@teacher_required
-@verified_required
+@verified_teacher_required
 def get_exam_results(exam_id):
-    """Retrieves aggregated and detailed results for a specific exam owned by the teacher."""
+    """
+    Retrieves per-student results for a specific exam owned by the teacher.
+    Totals come from the materialized exam_scores table.
+    Without `mode` every student is returned in one list (per-response details only with ?include=details,
+    or for one student from GET /exams/results/<exam_id>/students/<student_id>).
+    ?mode=summary returns one page of students (keyset cursor) plus cohort aggregates computed in SQL;
+    ?mode=detail streams every student with their responses as NDJSON, one student per line.
+    """
     teacher_id = get_current_user_id()
     if not teacher_id: return jsonify({"msg": "Invalid authentication token"}), 401
+    mode = request.args.get('mode')
+    if mode is not None and mode not in RESULTS_MODES:
+        return jsonify({"msg": f"mode must be one of: {', '.join(RESULTS_MODES)}."}), 400
+    include_details = request.args.get('include') == 'details'
 
     try:
-        # Fetch the exam with its questions, ensuring ownership
-        exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id).options(
-            joinedload(Exam.questions) # Eager load questions for total marks calculation
-        ).first()
+        # Verify exam ownership
+        exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id, is_deleted=False).first()
         if not exam: return jsonify({"msg": "Exam not found or access denied"}), 404
 
-        # Fetch all responses for this exam, joining related student, question, and evaluation data
-        responses = StudentResponse.query.filter_by(exam_id=exam_id).options(
-            joinedload(StudentResponse.student),    # Load student details
-            joinedload(StudentResponse.question),   # Load question details
-            joinedload(StudentResponse.evaluation)  # Load evaluation (if exists)
-        ).join(Question).order_by( # Join needed for ordering by student name/id if desired
-            StudentResponse.student_id, Question.id # Order by student, then question order
-        ).all()
-
-        # Process results, grouping by student
-        results_by_student = {}
-        # Calculate total possible marks accurately from loaded questions
-        total_possible_marks_exam = sum(q.marks for q in exam.questions if q.marks)
-
-        for resp in responses:
-            student = resp.student
-            question = resp.question
-            evaluation = resp.evaluation # Will be None if not evaluated
-
-            # Skip if data integrity issue (shouldn't happen with FKs)
-            if not student or not question:
-                print(f"!!! WARNING: Skipping response {resp.id} due to missing student/question link.")
-                continue
-
-            student_id = student.id
-            if student_id not in results_by_student:
-                # Initialize structure for this student
-                results_by_student[student_id] = {
-                    "student_id": student_id,
-                    "student_name": student.name,
-                    "student_email": student.email, # Add email for easier identification
-                    "total_marks_awarded": 0.0,
-                    "total_marks_possible": total_possible_marks_exam,
-                    "submission_status": "Submitted", # Initial status
-                    "_pending_eval_count": 0, # Counter for unevaluated responses
-                    "details": [] # List to hold response/evaluation details
-                }
-
-            # Extract evaluation details safely
-            marks_awarded = None
-            feedback = "Not Evaluated Yet"
-            evaluated_at_utc = None
-            evaluated_by = None
-            eval_status = "Pending Evaluation"
-
-            if evaluation:
-                marks_awarded = evaluation.marks_awarded
-                feedback = evaluation.feedback if evaluation.feedback else "Evaluation submitted, no feedback provided."
-                evaluated_at_utc = format_datetime(evaluation.evaluated_at) # Format naive UTC
-                evaluated_by = evaluation.evaluated_by
-                eval_status = "Evaluated"
-            else:
-                results_by_student[student_id]['_pending_eval_count'] += 1
-
-            # Format submission time (naive UTC)
-            submitted_at_utc = format_datetime(resp.submitted_at)
-
-            # Add detailed info for this response
-            results_by_student[student_id]['details'].append({
-                "response_id": resp.id,
-                "question_id": question.id,
-                "question_text": question.question_text,
-                "question_type": question.question_type.value,
-                "response_text": resp.response_text,
-                "submitted_at_utc": submitted_at_utc,
-                "marks_possible": question.marks,
-                "marks_awarded": marks_awarded,
-                "feedback": feedback,
-                "evaluated_at_utc": evaluated_at_utc,
-                "evaluated_by": evaluated_by,
-                "evaluation_status": eval_status
-            })
-
-            # Accumulate awarded marks for the student
-            if marks_awarded is not None:
-                try:
-                    results_by_student[student_id]['total_marks_awarded'] += float(marks_awarded)
-                except (ValueError, TypeError):
-                    print(f"!!! WARNING: Could not add marks_awarded '{marks_awarded}' for response {resp.id}")
-
-
-        # Post-process to finalize overall status and remove counter
-        final_results = []
-        for student_id, data in results_by_student.items():
-            if data['_pending_eval_count'] == 0:
-                 data['submission_status'] = "Fully Evaluated"
-            else:
-                 total_q = len(data['details'])
-                 evaluated_q = total_q - data['_pending_eval_count']
-                 data['submission_status'] = f"Partially Evaluated ({evaluated_q}/{total_q})"
+        if mode == 'summary':
+            return _get_results_summary(exam)
+        if mode == 'detail':
+            return _stream_results_detail(exam)
+
+        # Total possible marks for the whole exam (every question, answered or not)
+        total_possible_marks_exam = exam.total_marks
 
-            del data['_pending_eval_count'] # Remove internal counter
-            final_results.append(data)
+        # One row per student who submitted, with their precomputed totals
+        score_rows = db.session.query(ExamScore, User.name, User.email).join(
+            User, ExamScore.student_id == User.id
+        ).filter(
+            ExamScore.exam_id == exam_id
+        ).order_by(ExamScore.student_id).all()
 
-        print(f"--- Generated results for {len(final_results)} students for exam {exam_id} (Teacher: {teacher_id}) ---")
-        return jsonify(list(final_results)), 200 # Return list of student results
+        details_by_student = _get_response_details(exam_id) if include_details else {}
+
+        final_results = []
+        for score, student_name, student_email in score_rows:
+            student_result = _format_student_result(score, student_name, student_email, total_possible_marks_exam)
+            if include_details:
+                student_result["details"] = details_by_student.get(score.student_id, [])
+            final_results.append(student_result)
+
+        logger.info('Generated results for %s students for exam %s (Teacher: %s)', len(final_results), exam_id, teacher_id)
+        return jsonify(final_results), 200 # Return list of student results
 
     except Exception as e:
-        # Handle specific errors like 404 if needed
-        # if isinstance(e, NotFound): return jsonify({"msg": "Exam not found or access denied"}), 404
-        print(f"!!! Error fetching results for exam {exam_id} by teacher {teacher_id}: {e}")
+        logger.exception('Error fetching results for exam %s by teacher %s: %s', exam_id, teacher_id, e)
         # import traceback; traceback.print_exc() # For debug
-        return jsonify({"msg": "Error fetching exam results."}), 500
\ No newline at end of file
+        return jsonify({"msg": "Error fetching exam results."}), 500
+
+@bp.route('/exams/results/<int:exam_id>/students/<int:student_id>', methods=['GET'])
+@jwt_required()
+@verified_teacher_required
+def get_student_exam_result_details(exam_id, student_id):
+    """Per-response details of one student's submission (loaded when the teacher expands that student)."""
+    teacher_id = get_current_user_id()
+    if not teacher_id: return jsonify({"msg": "Invalid authentication token"}), 401
+
+    try:
+        exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id, is_deleted=False).first()
+        if not exam: return jsonify({"msg": "Exam not found or access denied"}), 404
+
+        details = [_format_response_detail(row) for row in _response_details_query(exam_id, student_id)]
+        if not details:
+            return jsonify({"msg": "No submission found for this student."}), 404
+        return jsonify({"exam_id": exam_id, "student_id": student_id, "details": details}), 200
+
+    except Exception as e:
+        logger.exception('Error fetching result details of student %s for exam %s by teacher %s: %s', student_id, exam_id, teacher_id, e)
+        return jsonify({"msg": "Error fetching exam results."}), 500
+
+def _format_student_result(score, student_name, student_email, total_possible_marks_exam):
+    """One student's result entry; `score` is an ExamScore or a row with the same columns."""
+    total_q = score.evaluated_count + score.pending_count
+    if score.pending_count == 0:
+        submission_status = "Fully Evaluated"
+    else:
+        submission_status = f"Partially Evaluated ({score.evaluated_count}/{total_q})"
+    return {
+        "student_id": score.student_id,
+        "student_name": student_name,
+        "student_email": student_email, # Add email for easier identification
+        "total_marks_awarded": score.marks_awarded,
+        "total_marks_possible": total_possible_marks_exam,
+        "evaluated_count": score.evaluated_count,
+        "pending_count": score.pending_count,
+        "submitted_at_utc": format_datetime(score.submitted_at),
+        "submission_status": submission_status
+    }
+
+def _get_results_summary(exam):
+    """
+    Page of per-student totals (ordered by student ID, ?cursor and ?per_page) plus cohort
+    aggregates. Both are computed in SQL from exam_scores; no response rows are loaded.
+    ?page is still accepted for old clients (OFFSET paging).
+    """
+    per_page = request.args.get('per_page', 50, type=int)
+    page = request.args.get('page', type=int)
+    if per_page < 1 or (page is not None and page < 1):
+        return jsonify({"msg": "page and per_page must be positive integers."}), 400
+    args = {"per_page": min(per_page, RESULTS_MAX_PER_PAGE), "cursor": None, "page": page}
+    if request.args.get('cursor'):
+        try:
+            args["cursor"] = decode_cursor(request.args['cursor'])
+        except ValueError as e:
+            return jsonify({"msg": str(e)}), 400
+
+    aggregates = db.session.query(
+        func.count(ExamScore.id).label("students"),
+        func.sum(case((ExamScore.pending_count == 0, 1), else_=0)).label("fully_evaluated"),
+        func.avg(ExamScore.marks_awarded).label("average"),
+        func.min(ExamScore.marks_awarded).label("lowest"),
+        func.max(ExamScore.marks_awarded).label("highest")
+    ).filter(ExamScore.exam_id == exam.id).one()
+
+    query = db.session.query(
+        ExamScore.student_id, ExamScore.marks_awarded, ExamScore.evaluated_count,
+        ExamScore.pending_count, ExamScore.submitted_at, User.name, User.email,
+        ExamScore.student_id.label("sort_value"), ExamScore.id.label("sort_id")
+    ).join(
+        User, ExamScore.student_id == User.id
+    ).filter(
+        ExamScore.exam_id == exam.id
+    )
+    # (student_id, id) order is served by ix_exam_scores_exam_id_student_id (the id is the rowid)
+    rows, next_cursor = fetch_keyset_page(query, ExamScore.student_id, ExamScore.id, args, descending=False)
+
+    return jsonify({
+        "exam_id": exam.id,
+        "exam_title": exam.title,
+        "total_marks_possible": exam.total_marks,
+        "summary": {
+            "students": aggregates.students,
+            "fully_evaluated": aggregates.fully_evaluated or 0,
+            "average_marks": round(aggregates.average, 2) if aggregates.average is not None else None,
+            "lowest_marks": aggregates.lowest,
+            "highest_marks": aggregates.highest
+        },
+        "results": [
+            _format_student_result(row, row.name, row.email, exam.total_marks) for row in rows
+        ],
+        **pagination_payload(args, next_cursor, aggregates.students)
+    }), 200
+
+def _stream_results_detail(exam):
+    """
+    Streams every student's result with their responses as NDJSON, one JSON object per line.
+    Rows arrive RESULTS_STREAM_BATCH_SIZE at a time in (student, question) order, so only one
+    batch and the current student's section are held in memory, however large the cohort.
+    """
+    exam_id, total_marks = exam.id, exam.total_marks
+    rows = _response_details_query(exam_id).add_columns(
+        ExamScore.marks_awarded.label("total_marks_awarded"),
+        ExamScore.evaluated_count, ExamScore.pending_count,
+        ExamScore.submitted_at.label("score_submitted_at"),
+        User.name.label("student_name"), User.email.label("student_email")
+    ).join(
+        ExamScore, (ExamScore.exam_id == StudentResponse.exam_id) & (ExamScore.student_id == StudentResponse.student_id)
+    ).join(
+        User, StudentResponse.student_id == User.id
+    ).execution_options(yield_per=RESULTS_STREAM_BATCH_SIZE)
+
+    def _score(row):
+        return SimpleNamespace(
+            student_id=row.student_id, marks_awarded=row.total_marks_awarded, evaluated_count=row.evaluated_count,
+            pending_count=row.pending_count, submitted_at=row.score_submitted_at
+        )
+
+    def generate():
+        current = None
+        students = 0
+        try:
+            for row in rows:
+                if current is None or current["student_id"] != row.student_id:
+                    if current is not None:
+                        yield json.dumps(current) + "\n"
+                        students += 1
+                    current = _format_student_result(_score(row), row.student_name, row.student_email, total_marks)
+                    current["details"] = []
+                current["details"].append(_format_response_detail(row))
+            if current is not None:
+                yield json.dumps(current) + "\n"
+                students += 1
+            logger.info('Streamed detailed results for %s students for exam %s', students, exam_id)
+        except Exception as e:
+            # Headers are already sent: report the failure in-band so the client knows the output is incomplete
+            logger.exception('Error streaming results for exam %s: %s', exam_id, e)
+            yield json.dumps({"msg": "Error streaming exam results; output is incomplete."}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def _response_details_query(exam_id, student_id=None):
+    """Every response of an exam (of one student, if given) with its question and evaluation as plain rows, ordered by student then question."""
+    query = db.session.query(
+        StudentResponse.id,
+        StudentResponse.student_id,
+        StudentResponse.response_text,
+        StudentResponse.submitted_at,
+        Question.id.label("question_id"),
+        Question.question_text,
+        Question.question_type,
+        Question.marks,
+        Evaluation.marks_awarded,
+        Evaluation.feedback,
+        Evaluation.evaluated_at,
+        Evaluation.evaluated_by
+    ).join(
+        Question, StudentResponse.question_id == Question.id
+    ).outerjoin(
+        Evaluation, Evaluation.response_id == StudentResponse.id
+    ).filter(
+        StudentResponse.exam_id == exam_id
+    ).order_by(
+        StudentResponse.student_id, Question.id # Order by student, then question order
+    )
+    if student_id is not None:
+        query = query.filter(StudentResponse.student_id == student_id)
+    return query
+
+def _format_response_detail(row):
+    evaluated = row.marks_awarded is not None
+    return {
+        "response_id": row.id,
+        "question_id": row.question_id,
+        "question_text": row.question_text,
+        "question_type": row.question_type.value,
+        "response_text": row.response_text,
+        "submitted_at_utc": format_datetime(row.submitted_at),
+        "marks_possible": row.marks,
+        "marks_awarded": row.marks_awarded,
+        "feedback": (row.feedback or "Evaluation submitted, no feedback provided.") if evaluated else "Not Evaluated Yet",
+        "evaluated_at_utc": format_datetime(row.evaluated_at),
+        "evaluated_by": row.evaluated_by,
+        "evaluation_status": "Evaluated" if evaluated else "Pending Evaluation"
+    }
+
+def _get_response_details(exam_id):
+    """Loads every response of an exam with its question and evaluation as plain rows, grouped by student ID."""
+    details_by_student = {}
+    for row in _response_details_query(exam_id):
+        details_by_student.setdefault(row.student_id, []).append(_format_response_detail(row))
+    return details_by_student
+
+@bp.route('/exams/<int:exam_id>/results/export', methods=['GET'])
+@jwt_required()
+@verified_teacher_required
+def export_exam_results(exam_id):
+    """
+    Downloads the exam's results as a spreadsheet (?format=csv, the default, or xlsx):
+    one row per student with per-question marks, total and percentage. The file is streamed.
+    """
+    teacher_id = get_current_user_id()
+    if not teacher_id: return jsonify({"msg": "Invalid authentication token"}), 401
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"msg": f"format must be one of: {', '.join(EXPORT_FORMATS)}."}), 400
+
+    try:
+        exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id, is_deleted=False).first()
+        if not exam: return jsonify({"msg": "Exam not found or access denied"}), 404
+    except Exception as e:
+        logger.exception('Error preparing results export for exam %s by teacher %s: %s', exam_id, teacher_id, e)
+        return jsonify({"msg": "Error exporting exam results."}), 500
+
+    def generate():
+        try:
+            rows = export_rows(exam)
+            yield from (csv_chunks(rows) if export_format == 'csv' else xlsx_chunks(rows))
+            logger.info('Exported results of exam %s as %s (Teacher: %s)', exam_id, export_format, teacher_id)
+        except Exception as e:
+            # Headers are already sent; the download ends early and the client sees a truncated file
+            logger.exception('Error streaming results export for exam %s: %s', exam_id, e)
+            raise
+
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="exam_{exam_id}_results.{export_format}"'}
+    )
+
+@bp.route('/exams/<int:exam_id>/analytics', methods=['GET'])
+@jwt_required()
+@verified_teacher_required
+def get_exam_analytics(exam_id):
+    """
+    Item analysis of an exam: difficulty, discrimination and MCQ distractor statistics per
+    question, plus Cronbach's alpha. Cached until a submission, evaluation or question changes.
+    """
+    teacher_id = get_current_user_id()
+    if not teacher_id: return jsonify({"msg": "Invalid authentication token"}), 401
+
+    try:
+        exam = Exam.query.filter_by(id=exam_id, created_by=teacher_id, is_deleted=False).first()
+        if not exam: return jsonify({"msg": "Exam not found or access denied"}), 404
+
+        analysis = get_item_analysis(exam)
+        logger.info('Item analysis for exam %s (%s) for teacher %s', exam_id, 'cached' if analysis['cached'] else 'computed', teacher_id)
+        return jsonify(analysis), 200
+    except Exception as e:
+        logger.exception('Error computing item analysis for exam %s by teacher %s: %s', exam_id, teacher_id, e)
+        return jsonify({"msg": "Error computing exam analytics."}), 500
+
+# --- Full-text search ---
+
+@bp.route('/search', methods=['GET'])
+@jwt_required()
+@verified_teacher_required
+def search():
+    """
+    Full-text search over responses, questions and feedback in the teacher's own exams.
+    Query params: q, type (response, question, feedback), exam_id, page, per_page.
+    """
+    teacher_id = get_current_user_id()
+    if not teacher_id: return jsonify({"msg": "Invalid authentication token"}), 401
+    try:
+        params = parse_search_args(request.args)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    try:
+        return jsonify(search_page(params, owner_id=teacher_id)), 200
+    except NotImplementedError as e:
+        logger.error('Search unavailable: %s', e)
+        return jsonify({"msg": "Full-text search is not available for this database."}), 501
+    except Exception as e:
+        logger.exception("Error running search '%s' for teacher %s: %s", params['q'], teacher_id, e)
+        return jsonify({"msg": "Error running search."}), 500
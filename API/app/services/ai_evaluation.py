@@ -1,10 +1,15 @@
 # app/services/ai_evaluation.py
 
+import logging
 import google.generativeai as genai
 import os
 import json
+import time
 from tenacity import retry, stop_after_attempt, wait_random_exponential, RetryError
 from config import Config # Use Config for API Key
+from app.services.metrics import observe_gemini_call # Per-call latency histogram
+
+logger = logging.getLogger(__name__)
 
 # Configure Gemini Client using the API key from Config
 try:
@@ -13,14 +18,14 @@ try:
     if not api_key:
         raise ValueError("GEMINI_API_KEY is not set in the environment or .env file.")
     genai.configure(api_key=api_key)
-    print("Gemini API configured successfully.")
+    logger.debug("Gemini API configured successfully.")
 except ValueError as ve:
-    print(f"FATAL CONFIGURATION ERROR: {ve}")
+    logger.error('FATAL CONFIGURATION ERROR: %s', ve)
     # Depending on desired behavior, you might exit or raise a more specific exception
     # For now, we'll print the error and let model initialization fail later if API key is missing
     pass
 except Exception as e:
-    print(f"FATAL: Unexpected error configuring Gemini API: {e}")
+    logger.error('FATAL: Unexpected error configuring Gemini API: %s', e)
     # Handle other potential configuration errors
     pass
 
@@ -50,21 +55,21 @@ model = None # Initialize model as None
 try:
     # Check if API key was successfully loaded before attempting initialization
     if Config.GEMINI_API_KEY:
-        print(f"--- Initializing Gemini Model: {MODEL_NAME} ---") # Added print statement
+        logger.info('Initializing Gemini Model: %s', MODEL_NAME)
         model = genai.GenerativeModel(
             model_name=MODEL_NAME,
             generation_config=generation_config,
             safety_settings=safety_settings
         )
-        print(f"Gemini model '{MODEL_NAME}' initialized successfully.")
+        logger.debug("Gemini model '%s' initialized successfully.", MODEL_NAME)
     else:
         # This condition is met if the API key was missing during configuration
-        print(f"ERROR: Cannot initialize Gemini model '{MODEL_NAME}' because GEMINI_API_KEY is missing.")
+        logger.error("Cannot initialize Gemini model '%s' because GEMINI_API_KEY is missing.", MODEL_NAME)
 
 except Exception as e:
     # Catch errors during model initialization (e.g., invalid model name, API issues)
     # ***** MORE SPECIFIC ERROR LOGGING *****
-    print(f"ERROR: Failed to initialize Gemini model '{MODEL_NAME}'. Check if the model name is valid and the API key is correct. Error: {e}")
+    logger.error("Failed to initialize Gemini model '%s'. Check if the model name is valid and the API key is correct. Error: %s", MODEL_NAME, e)
     # model remains None
 
 # Retry decorator for robustness against transient API issues
@@ -74,8 +79,9 @@ def generate_gemini_response_with_retry(prompt):
     if not model:
         # Fail fast if the model couldn't be initialized
         raise RuntimeError("Gemini model is not available or not initialized.")
+    started = time.perf_counter()
     try:
-        print("--- Attempting to generate content with Gemini ---")
+        logger.info("Attempting to generate content with Gemini")
         response = model.generate_content(prompt)
         # Check for blocked responses or empty content
         if not response.parts:
@@ -83,13 +89,13 @@ def generate_gemini_response_with_retry(prompt):
              block_reason = getattr(feedback, 'block_reason', None) if feedback else None
              if block_reason:
                  # ***** CLEARER BLOCK REASON LOGGING *****
-                 print(f"!!! Gemini response blocked by safety settings. Reason: {block_reason}")
+                 logger.warning('Gemini response blocked by safety settings. Reason: %s', block_reason)
                  raise ValueError(f"Gemini response blocked due to safety settings: {block_reason}")
              else:
                  # Check if candidate data exists but is empty (less common)
                  candidates = getattr(response, 'candidates', [])
                  if not candidates or not getattr(candidates[0], 'content', None):
-                    print("!!! Gemini response appears empty or incomplete (no parts/content).")
+                    logger.warning("Gemini response appears empty or incomplete (no parts/content).")
                     raise ValueError("Gemini response was empty or incomplete (no parts/content).")
                  else:
                      # Handle cases where parts is empty but candidates might have info (unlikely with default settings)
@@ -98,16 +104,19 @@ def generate_gemini_response_with_retry(prompt):
 
         # Extract text content
         response_text = response.text
-        print("--- Successfully received response text from Gemini ---")
+        logger.info("Successfully received response text from Gemini")
+        observe_gemini_call('ok', time.perf_counter() - started)
         return response_text
 
     except ValueError as ve:
         # Re-raise ValueErrors related to blocking or empty responses
-        print(f"!!! Gemini Value Error: {ve}")
+        observe_gemini_call('rejected', time.perf_counter() - started)
+        logger.error('Gemini Value Error: %s', ve)
         raise
     except Exception as e:
         # Catch other API call errors (network, authentication, etc.)
-        print(f"!!! Gemini API call attempt failed: {e}")
+        observe_gemini_call('error', time.perf_counter() - started)
+        logger.exception('Gemini API call attempt failed: %s', e)
         # Consider logging the prompt here for debugging, carefully handling sensitive data
         # print(f"Failed prompt snippet: {prompt[:200]}...")
         raise # Re-raise to trigger tenacity retry or fail after retries
@@ -139,20 +148,20 @@ def parse_evaluation_response(text_response, max_marks):
              validated_marks = float(marks)
              if not (0 <= validated_marks <= max_marks):
                 # ***** CLEARER RANGE ERROR *****
-                print(f"!!! Parsed marks '{validated_marks}' are outside the valid range [0, {max_marks}]")
+                logger.warning("Parsed marks '%s' are outside the valid range [0, %s]", validated_marks, max_marks)
                 raise ValueError(f"Parsed marks '{validated_marks}' are outside the valid range [0, {max_marks}]")
-             print(f"Successfully parsed JSON response. Marks: {validated_marks}")
+             logger.debug('Successfully parsed JSON response. Marks: %s', validated_marks)
              return validated_marks, feedback.strip()
         else:
              missing_or_invalid = []
              if not isinstance(marks, (int, float)): missing_or_invalid.append("'marks_awarded' (number)")
              if not isinstance(feedback, str) or not feedback.strip(): missing_or_invalid.append("'feedback' (non-empty string)")
              # ***** CLEARER TYPE ERROR *****
-             print(f"!!! Parsed JSON has missing or invalid types for: {', '.join(missing_or_invalid)}. JSON: {data}")
+             logger.warning('Parsed JSON has missing or invalid types for: %s. JSON: %s', ', '.join(missing_or_invalid), data)
              raise ValueError(f"Parsed JSON has missing or invalid types for: {', '.join(missing_or_invalid)}")
 
     except json.JSONDecodeError:
-        print("--- Gemini response was not valid JSON. Attempting structured text parsing... ---")
+        logger.info("Gemini response was not valid JSON. Attempting structured text parsing...")
         # Attempt 2: Parse structured text fallback (Marks: ..., Feedback: ...)
         marks = None
         feedback_lines = []
@@ -173,12 +182,12 @@ def parse_evaluation_response(text_response, max_marks):
                     # Validate marks range immediately
                     if not (0 <= marks <= max_marks):
                         # ***** CLEARER RANGE ERROR (Fallback) *****
-                        print(f"!!! Parsed marks '{marks}' from structured text are outside valid range [0, {max_marks}]")
+                        logger.error("Parsed marks '%s' from structured text are outside valid range [0, %s]", marks, max_marks)
                         raise ValueError(f"Parsed marks '{marks}' from structured text are outside valid range [0, {max_marks}]")
                     marks_found = True
-                    print(f"Found marks line, parsed marks: {marks}")
+                    logger.debug('Found marks line, parsed marks: %s', marks)
                 except ValueError as e:
-                    print(f"Warning: Could not parse marks value from line: '{line_stripped}'. Error: {e}")
+                    logger.warning("Could not parse marks value from line: '%s'. Error: %s", line_stripped, e)
                     # Reset marks if parsing failed, continue searching
                     marks = None
                     marks_found = False
@@ -186,7 +195,7 @@ def parse_evaluation_response(text_response, max_marks):
                 # Start collecting feedback from this line onwards
                 feedback_lines.append(line_stripped[len(feedback_line_prefix):].strip())
                 in_feedback_section = True
-                print("Found feedback start line.")
+                logger.debug("Found feedback start line.")
             elif in_feedback_section:
                 # Append subsequent non-empty lines to feedback
                 feedback_lines.append(line_stripped)
@@ -196,26 +205,26 @@ def parse_evaluation_response(text_response, max_marks):
 
         if not marks_found:
              # ***** CLEARER FALLBACK ERROR *****
-             print(f"!!! Could not find/parse valid '{marks_line_prefix}' line in range [0, {max_marks}] in fallback.")
+             logger.error("Could not find/parse valid '%s' line in range [0, %s] in fallback.", marks_line_prefix, max_marks)
              raise ValueError(f"Could not find or parse a valid '{marks_line_prefix}' line within range [0, {max_marks}].")
         if not final_feedback:
              # ***** CLEARER FALLBACK ERROR *****
-             print(f"!!! Could not find/parse '{feedback_line_prefix}' content in fallback.")
+             logger.error("Could not find/parse '%s' content in fallback.", feedback_line_prefix)
              raise ValueError(f"Could not find or parse '{feedback_line_prefix}' content.")
 
-        print(f"Successfully parsed structured text response. Marks: {marks}")
+        logger.debug('Successfully parsed structured text response. Marks: %s', marks)
         return marks, final_feedback # Already validated marks range
 
     except ValueError as ve:
          # Re-raise ValueErrors from parsing or validation
          error_msg = f"Failed to parse Gemini response: {ve}. Raw response snippet:\n---\n{text_response[:300]}...\n---"
-         print(f"!!! {error_msg}") # Print detailed message before raising
+         logger.error('%s', error_msg) # Log the detailed message before raising
          raise ValueError(error_msg) # Keep original error type
 
     except Exception as e:
         # Catch any other unexpected errors during parsing
         error_msg = f"Unexpected error parsing Gemini response: {e}. Raw response snippet:\n---\n{text_response[:300]}...\n---"
-        print(f"!!! {error_msg}") # Print detailed message before raising
+        logger.exception('%s', error_msg) # Log the detailed message before raising
         raise ValueError(error_msg) # Wrap as ValueError
 
 
@@ -229,7 +238,7 @@ def evaluate_response_with_gemini(question_text, student_answer, word_limit, max
     """
     if not model:
          # Added check here as well for safety
-         print("!!! AI EVALUATION SKIPPED: Gemini model not initialized. Check logs for initialization errors. !!!")
+         logger.warning("AI EVALUATION SKIPPED: Gemini model not initialized. Check logs for initialization errors.")
          return None, "AI Evaluation Service Error: Model not available."
 
     # Ensure max_marks is a number for prompt generation
@@ -237,7 +246,7 @@ def evaluate_response_with_gemini(question_text, student_answer, word_limit, max
         max_marks_float = float(max_marks)
     except (ValueError, TypeError):
          # ***** CLEARER MARKS ERROR *****
-         print(f"!!! Invalid max_marks value '{max_marks}' provided for evaluation.")
+         logger.warning("Invalid max_marks value '%s' provided for evaluation.", max_marks)
          return None, f"Invalid max_marks value '{max_marks}' provided for evaluation."
 
     # --- Construct the Prompt ---
@@ -253,7 +262,7 @@ def evaluate_response_with_gemini(question_text, student_answer, word_limit, max
             if wl > 0:
                prompt_parts.append(f"Suggested Word Limit: Approximately {wl} words.")
         except (ValueError, TypeError):
-            print(f"Warning: Invalid word_limit '{word_limit}' ignored during prompt construction.")
+            logger.warning("Invalid word_limit '%s' ignored during prompt construction.", word_limit)
 
     # Include student answer safely
     prompt_parts.append(f"Student's Answer:\n```\n{student_answer if student_answer else '(No answer provided)'}\n```") # Use code fence
@@ -285,38 +294,36 @@ def evaluate_response_with_gemini(question_text, student_answer, word_limit, max
 
     # --- Call Gemini API and Process Response ---
     try:
-        print(f"--- Sending Prompt to Gemini for evaluation (Max Marks: {max_marks_float}) ---")
+        logger.info('Sending Prompt to Gemini for evaluation (Max Marks: %s)', max_marks_float)
         # print(f"Prompt Snippet:\n{prompt[:500]}...\n---") # Uncomment for debugging
 
         raw_response = generate_gemini_response_with_retry(prompt)
 
-        print(f"--- Received Raw Response from Gemini ---\n{raw_response[:500]}{'...' if len(raw_response) > 500 else ''}\n--- End Raw Response ---")
+        logger.debug('Received Raw Response from Gemini ---\n%s%s\n--- End Raw Response', raw_response[:500], '...' if len(raw_response) > 500 else '')
 
         # Parse the response using the dedicated function
         marks, feedback = parse_evaluation_response(raw_response, max_marks_float)
-        print(f"--- Evaluation successful. Marks: {marks}, Feedback: {feedback[:100]}... ---")
+        logger.info('Evaluation successful. Marks: %s, Feedback: %s...', marks, feedback[:100])
         return marks, feedback
 
     except RetryError as e:
         # Error after multiple retries
         error_msg = f"AI Evaluation Failed: API call unsuccessful after multiple retries. Last error: {e}"
-        print(f"!!! {error_msg}")
+        logger.error('%s', error_msg)
         return None, error_msg
     except ValueError as ve:
         # Error during response parsing or validation (includes safety blocks)
         error_msg = f"AI Evaluation Failed: Error processing AI response. Details: {ve}"
         # Logging is handled within parse_evaluation_response or generate_gemini_response_with_retry
-        print(f"!!! AI Evaluation Value Error: {ve}") # Ensure it's logged here too
+        logger.error('AI Evaluation Value Error: %s', ve) # Ensure it's logged here too
         return None, error_msg # Pass the detailed error message back
     except RuntimeError as rterr:
         # Handle case where model wasn't initialized
          error_msg = f"AI Evaluation Failed: {rterr}"
-         print(f"!!! {error_msg}")
+         logger.error('%s', error_msg)
          return None, error_msg
     except Exception as e:
         # Catch any other unexpected errors during the process
         error_msg = f"AI Evaluation Failed: An unexpected error occurred. Error: {type(e).__name__}: {e}"
-        print(f"!!! {error_msg}")
-        # Optionally log full traceback for unexpected errors
-        import traceback; traceback.print_exc()
+        logger.exception('%s', error_msg) # Includes the traceback
         return None, error_msg
\ No newline at end of file
@@ -0,0 +1,307 @@
+# app/services/deletion_jobs.py
+
+import logging
+import atexit
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import or_, select, update
+from app.extensions import db
+from app.models import (
+    DeletionJob, User, Exam, Question, StudentResponse, Evaluation, ExamDraft, ExamScore, ExamStats
+)
+from app.services import rankings, stats, token_blocklist, user_cache
+from app.utils.helpers import format_datetime
+
+logger = logging.getLogger(__name__)
+
+# Background deletion of exams and users with large histories.
+# Deleting an exam used to load and delete every question, response and evaluation in one
+# transaction, holding the write lock for as long as that took. Now the request only flags the
+# entity as deleted (is_deleted: every query hides it from then on) and records a DeletionJob.
+# A worker thread then removes the dependent rows children-first in chunks of
+# DELETION_CHUNK_SIZE rows, one short transaction per chunk, and finally the entity itself.
+# Every chunk is idempotent, so an interrupted or failed job can simply be run again
+# ("flask run-deletion-jobs --retry").
+# Each gunicorn worker starts its job worker from the post_worker_init hook (gunicorn.conf.py;
+# on the first request with "flask run", never in CLI commands) and it polls for jobs every
+# DELETION_JOB_POLL_SECONDS, so jobs queued by other processes (or left over from before a
+# restart) are picked up without a wake(). A running job records a heartbeat with every chunk;
+# one whose heartbeat is older than DELETION_JOB_STALE_SECONDS lost its process (crash, kill)
+# and is put back in the queue.
+
+EXAM = 'exam'
+USER = 'user'
+
+PENDING = 'pending'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+_app = None
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_stopped = threading.Event()
+_worker = None
+
+
+def init_app(app):
+    """Binds the job runner to the application; the worker thread is started by start_worker."""
+    global _app
+    _app = app
+    atexit.register(shutdown)
+    if app.config.get('DELETION_JOBS_IN_BACKGROUND', True):
+        # Not here: CLI commands such as "flask db upgrade" must not start deleting.
+        # Fallback for servers without the gunicorn hook (e.g. "flask run"); cheap once the worker runs
+        app.before_request(start_worker)
+
+
+def schedule_exam_deletion(exam, requested_by):
+    """Hides the exam and queues its removal. Caller commits, then calls wake()."""
+    if not exam.is_deleted:
+        exam.is_deleted = True
+        stats.bump(exams=-1)
+    return _add_job(EXAM, exam.id, requested_by)
+
+
+def schedule_user_deletion(user, requested_by):
+    """Hides the user (and the exams they created) and queues their removal. Caller commits, then calls wake()."""
+    if not user.is_deleted:
+        user.is_deleted = True
+        stats.bump_user(user.role, user.is_verified, -1)
+        hidden_exams = db.session.execute(
+            update(Exam).where(Exam.created_by == user.id, Exam.is_deleted == False).values(is_deleted=True)
+        ).rowcount
+        stats.bump(exams=-hidden_exams)
+        # Every process rejects the user's tokens within one blocklist sync, even while its
+        # user cache still holds the account (the cache itself is only invalidated locally)
+        token_blocklist.revoke_all_for_user(user.id)
+        # Drop the student from the rankings of the exams they took
+        rankings.mark_cohort_changed(
+            exam_id for (exam_id,) in db.session.query(ExamScore.exam_id).filter(ExamScore.student_id == user.id)
+        )
+    return _add_job(USER, user.id, requested_by)
+
+
+def _add_job(entity_type, entity_id, requested_by):
+    job = DeletionJob(entity_type=entity_type, entity_id=entity_id, status=PENDING, requested_by=requested_by)
+    db.session.add(job)
+    db.session.flush() # Assigns job.id for the response
+    return job
+
+
+def job_to_dict(job):
+    """Progress payload for the job status endpoints."""
+    percent = None
+    if job.status == COMPLETED:
+        percent = 100.0
+    elif job.rows_total:
+        percent = round(min(job.rows_deleted / job.rows_total, 1.0) * 100, 1)
+    return {
+        "job_id": job.id,
+        "entity_type": job.entity_type,
+        "entity_id": job.entity_id,
+        "status": job.status,
+        "rows_total": job.rows_total,
+        "rows_deleted": job.rows_deleted,
+        "percent_complete": percent,
+        "error": job.error,
+        "requested_by": job.requested_by,
+        "created_at_utc": format_datetime(job.created_at),
+        "started_at_utc": format_datetime(job.started_at),
+        "finished_at_utc": format_datetime(job.finished_at)
+    }
+
+
+def _steps(entity_type, entity_id):
+    """
+    Returns the ordered (model, id query, counter name) deletion steps for an entity.
+    Children come first so no step leaves rows pointing at a deleted parent.
+    """
+    if entity_type == EXAM:
+        in_exams = lambda column: column == entity_id
+    else:
+        # A user's own exams go with them
+        in_exams = lambda column: column.in_(select(Exam.id).where(Exam.created_by == entity_id))
+
+    steps = [
+        (Evaluation, db.session.query(Evaluation.id).join(
+            StudentResponse, Evaluation.response_id == StudentResponse.id
+        ).filter(in_exams(StudentResponse.exam_id)), stats.EVALUATIONS),
+        (StudentResponse, db.session.query(StudentResponse.id).filter(in_exams(StudentResponse.exam_id)), stats.RESPONSES),
+        (ExamDraft, db.session.query(ExamDraft.id).filter(in_exams(ExamDraft.exam_id)), None),
+        (ExamScore, db.session.query(ExamScore.id).filter(in_exams(ExamScore.exam_id)), None),
+        (ExamStats, db.session.query(ExamStats.id).filter(in_exams(ExamStats.exam_id)), None),
+        (Question, db.session.query(Question.id).filter(in_exams(Question.exam_id)), None),
+        (Exam, db.session.query(Exam.id).filter(in_exams(Exam.id)), None)
+    ]
+    if entity_type == USER:
+        # Then everything the user submitted as a student in other teachers' exams
+        steps += [
+            (Evaluation, db.session.query(Evaluation.id).join(
+                StudentResponse, Evaluation.response_id == StudentResponse.id
+            ).filter(StudentResponse.student_id == entity_id), stats.EVALUATIONS),
+            (StudentResponse, db.session.query(StudentResponse.id).filter(StudentResponse.student_id == entity_id), stats.RESPONSES),
+            (ExamDraft, db.session.query(ExamDraft.id).filter(ExamDraft.student_id == entity_id), None),
+            (ExamScore, db.session.query(ExamScore.id).filter(ExamScore.student_id == entity_id), None),
+            (User, db.session.query(User.id).filter(User.id == entity_id), None)
+        ]
+    return steps
+
+
+def run_job(job_id, chunk_size=None, pause=None):
+    """
+    Claims and runs one job to completion. Must run inside an application context.
+    Returns False if the job is not claimable (already claimed by another worker or finished).
+    """
+    config = _app.config if _app else {}
+    chunk_size = chunk_size or config.get('DELETION_CHUNK_SIZE', 1000)
+    pause = config.get('DELETION_CHUNK_PAUSE_SECONDS', 0.05) if pause is None else pause
+
+    # Claim atomically so two processes never run the same job
+    claimed = db.session.execute(
+        update(DeletionJob).where(DeletionJob.id == job_id, DeletionJob.status == PENDING)
+        .values(status=RUNNING, started_at=datetime.utcnow(), heartbeat_at=datetime.utcnow(), error=None)
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        return False
+
+    job = db.session.get(DeletionJob, job_id)
+    logger.info('Deletion job %s: removing %s %s', job.id, job.entity_type, job.entity_id)
+    try:
+        steps = _steps(job.entity_type, job.entity_id)
+        rows_total = sum(query.count() for _, query, _ in steps)
+        job.rows_total = job.rows_deleted + rows_total
+        db.session.commit()
+
+        for model, id_query, counter in steps:
+            while True:
+                ids = [row_id for (row_id,) in id_query.limit(chunk_size)]
+                if not ids:
+                    break
+                deleted = model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+                if model is User:
+                    user_cache.note_users_changed(ids) # Core delete: no mapper events
+                if counter:
+                    stats.bump(**{counter: -deleted})
+                db.session.execute(
+                    update(DeletionJob).where(DeletionJob.id == job_id)
+                    .values(rows_deleted=DeletionJob.rows_deleted + deleted, heartbeat_at=datetime.utcnow())
+                )
+                db.session.commit() # One short transaction per chunk
+                if _stopped.is_set():
+                    # Shutting down: requeue so the next run resumes from here
+                    db.session.execute(update(DeletionJob).where(DeletionJob.id == job_id).values(status=PENDING))
+                    db.session.commit()
+                    logger.info('Deletion job %s paused for shutdown', job_id)
+                    return True
+                if pause:
+                    time.sleep(pause) # Lets queued writers take the lock between chunks
+
+        db.session.execute(
+            update(DeletionJob).where(DeletionJob.id == job_id).values(status=COMPLETED, finished_at=datetime.utcnow())
+        )
+        db.session.commit()
+        logger.info('Deletion job %s completed', job_id)
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Deletion job %s failed: %s', job_id, e)
+        db.session.execute(
+            update(DeletionJob).where(DeletionJob.id == job_id)
+            .values(status=FAILED, error=str(e)[:1000], finished_at=datetime.utcnow())
+        )
+        db.session.commit()
+    return True
+
+
+def run_pending_jobs(retry=False):
+    """
+    Runs queued jobs oldest first until none are left, after requeueing jobs whose runner died.
+    With retry, failed and all interrupted (stuck in 'running') jobs are requeued first.
+    Returns the number of jobs run.
+    """
+    if retry:
+        db.session.execute(
+            update(DeletionJob).where(DeletionJob.status.in_([RUNNING, FAILED])).values(status=PENDING)
+        )
+        db.session.commit()
+    else:
+        requeue_stale_jobs()
+    ran = 0
+    while not _stopped.is_set():
+        job_id = db.session.query(DeletionJob.id).filter(
+            DeletionJob.status == PENDING
+        ).order_by(DeletionJob.id.asc()).limit(1).scalar()
+        if job_id is None:
+            return ran
+        if run_job(job_id):
+            ran += 1
+    return ran
+
+
+def requeue_stale_jobs():
+    """Puts running jobs without a heartbeat for DELETION_JOB_STALE_SECONDS back in the queue. Returns their number."""
+    stale_seconds = (_app.config if _app else {}).get('DELETION_JOB_STALE_SECONDS', 300)
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    requeued = db.session.execute(
+        update(DeletionJob).where(
+            DeletionJob.status == RUNNING,
+            or_(DeletionJob.heartbeat_at == None, DeletionJob.heartbeat_at < cutoff)
+        ).values(status=PENDING)
+    ).rowcount
+    db.session.commit()
+    if requeued:
+        logger.warning('Deletion jobs: requeued %s interrupted jobs', requeued)
+    return requeued
+
+
+def wake():
+    """Signals the worker thread (starting it if needed) that a job is waiting. Call after committing."""
+    if _app is None or not _app.config.get('DELETION_JOBS_IN_BACKGROUND', True):
+        return
+    _ensure_worker()
+    _wakeup.set()
+
+
+def start_worker():
+    """
+    Starts this process's worker thread, unless jobs run only through the CLI or it is already running.
+    Called from gunicorn's post_worker_init hook and, as a fallback, before each request.
+    """
+    if _app is None or not _app.config.get('DELETION_JOBS_IN_BACKGROUND', True):
+        return
+    if _worker is None or not _worker.is_alive():
+        _ensure_worker()
+
+
+def shutdown():
+    """Stops the worker thread; the job it was running resumes from its last chunk on the next run."""
+    _stopped.set()
+    _wakeup.set()
+    if _worker and _worker.is_alive():
+        _worker.join(timeout=5)
+
+
+def _ensure_worker():
+    """Starts the worker lazily so each (forked) worker process gets its own."""
+    global _worker
+    with _lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _worker = threading.Thread(target=_run_worker, name='deletion-jobs', daemon=True)
+        _worker.start()
+
+
+def _run_worker():
+    interval = _app.config.get('DELETION_JOB_POLL_SECONDS', 30)
+    while not _stopped.is_set():
+        _wakeup.clear()
+        with _app.app_context():
+            try:
+                run_pending_jobs()
+            except Exception as e:
+                logger.exception('Deletion jobs: worker error, will retry: %s', e)
+            finally:
+                db.session.remove()
+        _wakeup.wait(interval)
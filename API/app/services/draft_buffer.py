@@ -0,0 +1,350 @@
+# app/services/draft_buffer.py
+
+import logging
+import atexit
+import json
+import os
+import threading
+from datetime import datetime
+from sqlalchemy import and_, exists, tuple_
+from app.extensions import db
+from app.models import ExamDraft, ExamScore
+from app.utils.helpers import upsert_statement
+
+try:
+    import fcntl
+except ImportError: # Non-POSIX: spools of exited workers are still read, but not adopted
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Write-behind buffer for exam answer autosaves.
+# Autosave requests only touch this in-memory dict; a background thread flushes it
+# to the exam_drafts table in coalesced batches. Keys are (student_id, exam_id, question_id),
+# so repeated saves of the same answer between flushes collapse into one row (last write wins).
+#
+# The buffer is per worker process, so before a save is acknowledged it is also appended to
+# the worker's spool file (<DRAFT_SPOOL_DIR>/<pid>.spool, one JSON line per answer, no fsync).
+# load_draft reads every worker's spool and then the table, so GET draft and submit see
+# unflushed saves whichever worker answers them. After a flush commits, the worker drops the
+# flushed lines from its spool. A worker holds a flock on its spool while it runs; the spool
+# of a worker that exited is written to the table and removed by the next flusher that finds it.
+# Flushes never overwrite a newer stored save, and drop the drafts of exams already submitted
+# (a submit may commit while another worker still buffers autosaves for that exam).
+
+SPOOL_SUFFIX = '.spool'
+
+_lock = threading.Lock()
+_pending = {} # (student_id, exam_id, question_id) -> (response_text, saved_at)
+_wakeup = threading.Event()
+_stopped = threading.Event()
+_flusher = None
+_app = None
+_spool_dir = None
+_spool_fd = None # This process's spool, opened (and locked) on first save
+_spool_pid = None
+
+
+def init_app(app):
+    """Binds the buffer to the application; the flusher thread starts on first use."""
+    global _app, _spool_dir
+    _app = app
+    _spool_dir = app.config.get('DRAFT_SPOOL_DIR') or os.path.join(app.instance_path, 'draft_spool')
+    os.makedirs(_spool_dir, exist_ok=True)
+    atexit.register(shutdown)
+
+
+def buffer_answers(student_id, exam_id, answers):
+    """
+    Buffers autosaved answers for later flushing. Returns once they are in this worker's spool.
+    Args:
+        answers (dict): question_id -> response_text.
+    """
+    saved_at = datetime.utcnow()
+    lines = ''.join(
+        _spool_line(student_id, exam_id, question_id, response_text, saved_at)
+        for question_id, response_text in answers.items()
+    )
+    with _lock:
+        os.write(_own_spool(), lines.encode('utf-8'))
+        for question_id, response_text in answers.items():
+            _pending[(student_id, exam_id, question_id)] = (response_text, saved_at)
+    _ensure_flusher()
+
+
+def load_draft(student_id, exam_id):
+    """
+    Returns the student's draft for an exam as {question_id: (response_text, saved_at)}:
+    stored rows merged with unflushed saves of every worker, the newest save of each question winning.
+    """
+    # Spools first: lines leave a spool only after their flush committed, so anything missed
+    # there is already in the table by the time it is read
+    draft = _read_spools(student_id, exam_id)
+    stored = db.session.query(ExamDraft.question_id, ExamDraft.response_text, ExamDraft.updated_at).filter_by(
+        student_id=student_id, exam_id=exam_id
+    )
+    _merge_newer(draft, {question_id: (response_text, updated_at) for question_id, response_text, updated_at in stored})
+    return draft
+
+
+def discard_buffered_answers(student_id, exam_id):
+    """Drops this worker's unflushed answers for one student's exam (e.g. once it has been submitted)."""
+    with _lock:
+        for key in [key for key in _pending if key[0] == student_id and key[1] == exam_id]:
+            del _pending[key]
+
+
+def flush():
+    """
+    Writes all buffered answers to the exam_drafts table.
+    Must run inside an application context. Returns the number of rows written.
+    """
+    with _lock:
+        if not _pending:
+            return 0
+        batch = dict(_pending)
+        _pending.clear()
+        spool_position = os.lseek(_spool_fd, 0, os.SEEK_END) if _spool_fd is not None else 0
+
+    try:
+        _write_rows(batch)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        # Requeue the batch so the next flush retries it, without clobbering newer saves
+        with _lock:
+            _restore(batch)
+        raise
+
+    with _lock:
+        _compact_own_spool(spool_position)
+    return len(batch)
+
+
+def shutdown():
+    """Stops the flusher thread and writes out whatever is still buffered."""
+    _stopped.set()
+    _wakeup.set()
+    if _flusher and _flusher.is_alive():
+        _flusher.join(timeout=5)
+    if _app is not None:
+        with _app.app_context():
+            try:
+                flush()
+            except Exception as e:
+                logger.exception('Draft buffer: final flush failed: %s', e)
+                return
+    with _lock:
+        if _spool_fd is not None and _spool_pid == os.getpid() and os.fstat(_spool_fd).st_size == 0:
+            os.unlink(os.path.join(_spool_dir, f"{_spool_pid}{SPOOL_SUFFIX}")) # Nothing left to adopt
+
+
+def _write_rows(entries):
+    """Upserts {(student_id, exam_id, question_id): (response_text, saved_at)} into the session's transaction."""
+    rows = [{
+        "student_id": student_id,
+        "exam_id": exam_id,
+        "question_id": question_id,
+        "response_text": response_text,
+        "updated_at": saved_at
+    } for (student_id, exam_id, question_id), (response_text, saved_at) in entries.items()]
+
+    batch_size = _app.config['DRAFT_FLUSH_BATCH_SIZE'] if _app else 500
+    stmt = upsert_statement(
+        ExamDraft,
+        index_elements=['student_id', 'exam_id', 'question_id'],
+        update_columns=['response_text', 'updated_at'],
+        newer_column='updated_at' # Another worker may already have stored a later save
+    )
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(stmt, rows[start:start + batch_size])
+
+    # Drafts of exams submitted meanwhile are final history, not drafts
+    pairs = sorted({(student_id, exam_id) for student_id, exam_id, _ in entries})
+    for start in range(0, len(pairs), batch_size):
+        db.session.execute(
+            ExamDraft.__table__.delete().where(
+                tuple_(ExamDraft.student_id, ExamDraft.exam_id).in_(pairs[start:start + batch_size]),
+                exists().where(and_(ExamScore.student_id == ExamDraft.student_id, ExamScore.exam_id == ExamDraft.exam_id))
+            )
+        )
+
+
+def _restore(entries):
+    """Merges entries back into the buffer unless a newer save exists. Caller holds _lock."""
+    for key, (response_text, saved_at) in entries.items():
+        current = _pending.get(key)
+        if current is None or current[1] < saved_at:
+            _pending[key] = (response_text, saved_at)
+
+
+def _merge_newer(target, entries):
+    for key, (response_text, saved_at) in entries.items():
+        current = target.get(key)
+        if current is None or current[1] < saved_at:
+            target[key] = (response_text, saved_at)
+
+
+def _spool_line(student_id, exam_id, question_id, response_text, saved_at):
+    return json.dumps([student_id, exam_id, question_id, response_text, saved_at.isoformat()], separators=(',', ':')) + "\n"
+
+
+def _parse_spool(data, prefix=None):
+    """Yields ((student_id, exam_id, question_id), (response_text, saved_at)) for the complete lines in data."""
+    for line in data.split(b"\n")[:-1]: # The last piece is empty or a line still being written
+        if prefix is not None and not line.startswith(prefix):
+            continue
+        try:
+            student_id, exam_id, question_id, response_text, saved_at = json.loads(line)
+            yield (student_id, exam_id, question_id), (response_text, datetime.fromisoformat(saved_at))
+        except ValueError:
+            continue
+
+
+def _read_spools(student_id, exam_id):
+    """Unflushed saves of one student's exam in every worker's spool."""
+    prefix = f"[{student_id},{exam_id},".encode('ascii')
+    found = {}
+    for filename in _spool_filenames():
+        try:
+            with open(os.path.join(_spool_dir, filename), 'rb') as spool:
+                data = spool.read()
+        except FileNotFoundError:
+            continue # Flushed and removed meanwhile
+        _merge_newer(found, {key[2]: value for key, value in _parse_spool(data, prefix)})
+    return found
+
+
+def _spool_filenames():
+    try:
+        return [name for name in os.listdir(_spool_dir) if name.endswith(SPOOL_SUFFIX)]
+    except FileNotFoundError:
+        return []
+
+
+def _open_locked(path, blocking):
+    """Opens and flocks the spool at path; None if another live process holds it (or it was replaced)."""
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o640)
+        if fcntl is None:
+            return fd
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        try:
+            if os.stat(path).st_ino == os.fstat(fd).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        os.close(fd) # Locked a file that was replaced or removed meanwhile
+        if not blocking:
+            return None
+
+
+def _own_spool():
+    """This process's spool fd, opened on first use (after a fork the child opens its own). Caller holds _lock."""
+    global _spool_fd, _spool_pid
+    if _spool_fd is None or _spool_pid != os.getpid():
+        _spool_pid = os.getpid()
+        _spool_fd = _open_locked(os.path.join(_spool_dir, f"{_spool_pid}{SPOOL_SUFFIX}"), blocking=True)
+        # A spool left by an earlier process with the same pid is taken over: its saves get flushed with ours
+        data = _read_all(_spool_fd)
+        if data:
+            _restore(dict(_parse_spool(data)))
+    return _spool_fd
+
+
+def _read_all(fd):
+    chunks = []
+    offset = 0
+    while True:
+        chunk = os.pread(fd, 1 << 20, offset)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+        offset += len(chunk)
+
+
+def _compact_own_spool(flushed_position):
+    """Drops the first flushed_position bytes (now in the table) from this process's spool. Caller holds _lock."""
+    global _spool_fd
+    if _spool_fd is None or _spool_pid != os.getpid():
+        return
+    path = os.path.join(_spool_dir, f"{_spool_pid}{SPOOL_SUFFIX}")
+    tail = _read_all(_spool_fd)[flushed_position:]
+    if not tail:
+        os.ftruncate(_spool_fd, 0)
+        return
+    # Keep the saves made since the flush started; the new file is locked before it replaces the old one
+    new_path = path + '.tmp'
+    new_fd = os.open(new_path, os.O_RDWR | os.O_APPEND | os.O_CREAT | os.O_TRUNC, 0o640)
+    if fcntl is not None:
+        fcntl.flock(new_fd, fcntl.LOCK_EX)
+    os.write(new_fd, tail)
+    os.replace(new_path, path)
+    os.close(_spool_fd)
+    _spool_fd = new_fd
+
+
+def _adopt_orphaned_spools():
+    """Writes the spools of workers that exited to the table and removes them."""
+    if fcntl is None:
+        return 0
+    adopted = 0
+    own_name = f"{os.getpid()}{SPOOL_SUFFIX}"
+    for filename in _spool_filenames():
+        if filename == own_name:
+            continue
+        path = os.path.join(_spool_dir, filename)
+        fd = _open_locked(path, blocking=False)
+        if fd is None:
+            continue # Its worker is still running
+        try:
+            entries = dict(_parse_spool(_read_all(fd)))
+            if entries:
+                _write_rows(entries)
+                db.session.commit()
+            os.unlink(path)
+            adopted += len(entries)
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            os.close(fd)
+    return adopted
+
+
+def _ensure_flusher():
+    """Starts the background flusher lazily so each (forked) worker process gets its own."""
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=_run_flusher, name='draft-flusher', daemon=True)
+        _flusher.start()
+
+
+def _run_flusher():
+    interval = _app.config['DRAFT_FLUSH_INTERVAL_SECONDS']
+    while not _stopped.is_set():
+        with _app.app_context():
+            try:
+                adopted = _adopt_orphaned_spools()
+                if adopted:
+                    logger.info('Draft buffer: stored %s autosaved answers left by an exited worker', adopted)
+            except Exception as e:
+                logger.exception('Draft buffer: adopting an orphaned spool failed, will retry: %s', e)
+        _wakeup.wait(interval)
+        if _stopped.is_set():
+            break
+        with _app.app_context():
+            try:
+                written = flush()
+                if written:
+                    logger.info('Draft buffer: flushed %s autosaved answers', written)
+            except Exception as e:
+                logger.exception('Draft buffer: flush failed, will retry: %s', e)
@@ -0,0 +1,59 @@
+# app/services/exam_totals.py
+
+from sqlalchemy import func, update
+from app.extensions import db
+from app.models import Exam, Question
+from app.services.teacher_dashboard import note_exams_changed
+
+# Maintenance of the denormalized Exam.question_count and Exam.total_marks columns.
+# Question writes call adjust_exam_totals inside their own transaction; listing endpoints
+# can then show exam totals without touching the questions table.
+
+
+def adjust_exam_totals(exam_id, question_delta, marks_delta):
+    """Applies a change in question count and total marks to an exam. Caller commits."""
+    db.session.execute(
+        update(Exam)
+        .where(Exam.id == exam_id)
+        .values(
+            question_count=Exam.question_count + question_delta,
+            total_marks=Exam.total_marks + marks_delta
+        )
+    )
+    note_exams_changed([exam_id])
+
+
+def find_inconsistent_exam_totals():
+    """
+    Compares the stored totals of every exam with its questions.
+    Returns a list of (exam_id, stored_count, actual_count, stored_marks, actual_marks) mismatches.
+    """
+    actual = db.session.query(
+        Question.exam_id,
+        func.count(Question.id).label("question_count"),
+        func.coalesce(func.sum(Question.marks), 0).label("total_marks")
+    ).group_by(Question.exam_id).subquery()
+
+    rows = db.session.query(
+        Exam.id,
+        Exam.question_count,
+        func.coalesce(actual.c.question_count, 0),
+        Exam.total_marks,
+        func.coalesce(actual.c.total_marks, 0)
+    ).outerjoin(actual, actual.c.exam_id == Exam.id).all()
+
+    return [
+        (exam_id, stored_count, actual_count, stored_marks, actual_marks)
+        for exam_id, stored_count, actual_count, stored_marks, actual_marks in rows
+        if stored_count != actual_count or stored_marks != actual_marks
+    ]
+
+
+def fix_exam_totals(mismatches):
+    """Overwrites the stored totals of the given mismatches with the actual values. Caller commits."""
+    for exam_id, _, actual_count, _, actual_marks in mismatches:
+        db.session.execute(
+            update(Exam)
+            .where(Exam.id == exam_id)
+            .values(question_count=actual_count, total_marks=actual_marks)
+        )
@@ -0,0 +1,102 @@
+# app/services/grading.py
+
+from datetime import datetime
+from app.extensions import db
+from app.models import StudentResponse, Question, Evaluation
+from app.services.scores import apply_score_deltas
+from app.utils.helpers import upsert_statement
+
+# Manual grading: saves admin-entered marks for many responses at once.
+# Used by the single-response manual evaluation endpoint and by question-wise bulk grading.
+# A batch is validated as a whole first; if any entry is invalid nothing is written.
+
+MAX_BATCH_SIZE = 500
+
+
+def save_manual_evaluations(entries, evaluated_by, question_id=None):
+    """
+    Validates and upserts manual evaluations, updating exam_scores in the same transaction. Caller commits.
+    Args:
+        entries (list): Dicts with response_id, marks and optional feedback.
+        evaluated_by (str): Stored in Evaluation.evaluated_by.
+        question_id (int): If given, every response must answer this question.
+    Returns:
+        tuple: ({"created": n, "updated": m}, errors). errors is a list of
+        {"index", "response_id", "msg"} dicts; when it is non-empty nothing was written.
+    """
+    errors = []
+    parsed = [] # (index, response_id, marks, feedback)
+    seen_ids = set()
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            errors.append({"index": index, "response_id": None, "msg": "Each evaluation must be an object."})
+            continue
+        response_id, marks, feedback = entry.get('response_id'), entry.get('marks'), entry.get('feedback')
+        if not isinstance(response_id, int) or isinstance(response_id, bool):
+            errors.append({"index": index, "response_id": response_id, "msg": "response_id must be an integer."})
+        elif response_id in seen_ids:
+            errors.append({"index": index, "response_id": response_id, "msg": "Duplicate response_id in this request."})
+        elif not isinstance(marks, (int, float)) or isinstance(marks, bool):
+            errors.append({"index": index, "response_id": response_id, "msg": "marks must be a number."})
+        elif feedback is not None and not isinstance(feedback, str):
+            errors.append({"index": index, "response_id": response_id, "msg": "feedback must be a string."})
+        else:
+            seen_ids.add(response_id)
+            parsed.append((index, response_id, float(marks), feedback))
+
+    # One query for the responses' owners and max marks, one for their current evaluations
+    response_info = {
+        row.id: row for row in db.session.query(
+            StudentResponse.id, StudentResponse.student_id, StudentResponse.exam_id,
+            StudentResponse.question_id, Question.marks
+        ).join(
+            Question, StudentResponse.question_id == Question.id
+        ).filter(StudentResponse.id.in_(seen_ids))
+    }
+    previous_marks = dict(
+        db.session.query(Evaluation.response_id, Evaluation.marks_awarded).filter(Evaluation.response_id.in_(seen_ids))
+    )
+
+    for index, response_id, marks, _ in parsed:
+        info = response_info.get(response_id)
+        if info is None:
+            errors.append({"index": index, "response_id": response_id, "msg": "Student response not found."})
+        elif question_id is not None and info.question_id != question_id:
+            errors.append({"index": index, "response_id": response_id, "msg": f"Response does not answer question {question_id}."})
+        elif not 0 <= marks <= info.marks:
+            errors.append({"index": index, "response_id": response_id, "msg": f"marks must be between 0 and {info.marks}."})
+    if errors:
+        errors.sort(key=lambda error: error["index"])
+        return None, errors
+
+    now = datetime.utcnow()
+    rows = [{
+        "response_id": response_id,
+        "evaluated_by": evaluated_by,
+        "marks_awarded": marks,
+        "feedback": feedback,
+        "evaluated_at": now
+    } for _, response_id, marks, feedback in parsed]
+    db.session.execute(
+        upsert_statement(
+            Evaluation,
+            index_elements=['response_id'],
+            update_columns=['evaluated_by', 'marks_awarded', 'feedback', 'evaluated_at']
+        ),
+        rows
+    )
+
+    # Aggregate score changes per student/exam so each exam_scores row is updated once
+    deltas = {}
+    for _, response_id, marks, _ in parsed:
+        info = response_info[response_id]
+        previous = previous_marks.get(response_id)
+        marks_delta, newly_evaluated = deltas.get((info.student_id, info.exam_id), (0.0, 0))
+        deltas[(info.student_id, info.exam_id)] = (
+            marks_delta + marks - (previous or 0.0),
+            newly_evaluated + (1 if previous is None else 0)
+        )
+    apply_score_deltas(deltas)
+
+    updated = sum(1 for _, response_id, _, _ in parsed if response_id in previous_marks)
+    return {"created": len(parsed) - updated, "updated": updated}, []
@@ -0,0 +1,222 @@
+# app/services/item_analysis.py
+
+import threading
+from datetime import datetime
+import numpy as np
+from cachetools import LRUCache
+from app.extensions import db
+from app.models import Question, QuestionType, StudentResponse, Evaluation, ExamScore
+from app.services.scores import score_versions
+from app.utils.helpers import format_datetime
+
+# Classical item analysis of an exam: difficulty, discrimination and distractor statistics per
+# question, and Cronbach's alpha for the whole exam.
+# The student x question marks matrix is read with two queries and every statistic is computed
+# on it with NumPy array operations. Results are cached per exam together with a version key
+# (question definitions plus an aggregate over exam_scores, which changes on every submission
+# and evaluation), so a cached result is reused only while nothing it depends on has changed,
+# whichever process made the change.
+
+UPPER_LOWER_FRACTION = 0.27 # Kelley's upper/lower groups for the discrimination index
+
+_cache = LRUCache(maxsize=64)
+_cache_lock = threading.Lock()
+
+
+def init_app(app):
+    """Sizes the per-exam result cache from ITEM_ANALYSIS_CACHE_SIZE."""
+    global _cache
+    _cache = LRUCache(maxsize=app.config['ITEM_ANALYSIS_CACHE_SIZE'])
+
+
+def get_item_analysis(exam):
+    """Returns the item analysis dict for `exam`, from the cache when still current."""
+    questions = db.session.query(
+        Question.id, Question.question_type, Question.marks, Question.options, Question.correct_answer
+    ).filter(Question.exam_id == exam.id).order_by(Question.id).all()
+    version = (repr([tuple(question) for question in questions]), score_versions([exam.id]).get(exam.id))
+
+    with _cache_lock:
+        cached = _cache.get(exam.id)
+    if cached is not None and cached[0] == version:
+        return dict(cached[1], cached=True)
+
+    analysis = _analyze(exam, questions)
+    with _cache_lock:
+        _cache[exam.id] = (version, analysis)
+    return dict(analysis, cached=False)
+
+
+def _analyze(exam, questions):
+    question_ids = np.array([question.id for question in questions], dtype=np.int64)
+    max_marks = np.array([question.marks for question in questions], dtype=float)
+    student_ids = np.array(sorted(
+        student_id for (student_id,) in db.session.query(ExamScore.student_id).filter(ExamScore.exam_id == exam.id)
+    ), dtype=np.int64)
+    n_students, n_questions = len(student_ids), len(questions)
+
+    # marks[s, q]: awarded marks; 0 if the student left the question unanswered, NaN while not evaluated
+    marks = np.zeros((n_students, n_questions))
+    answered = np.zeros((n_students, n_questions), dtype=bool)
+    rows = db.session.query(
+        StudentResponse.student_id, StudentResponse.question_id, Evaluation.marks_awarded
+    ).outerjoin(
+        Evaluation, Evaluation.response_id == StudentResponse.id
+    ).filter(StudentResponse.exam_id == exam.id).all()
+    if rows and n_students and n_questions:
+        data = np.array([(row[0], row[1], np.nan if row[2] is None else row[2]) for row in rows], dtype=float)
+        s_index = np.searchsorted(student_ids, data[:, 0].astype(np.int64))
+        q_index = np.searchsorted(question_ids, data[:, 1].astype(np.int64))
+        known = (s_index < n_students) & (q_index < n_questions)
+        known[known] &= (student_ids[s_index[known]] == data[known, 0]) & (question_ids[q_index[known]] == data[known, 1])
+        s_index, q_index = s_index[known], q_index[known]
+        marks[s_index, q_index] = data[known, 2]
+        answered[s_index, q_index] = True
+
+    evaluated = ~np.isnan(marks)
+    # Correlations, alpha and upper/lower groups use only fully evaluated students
+    complete = marks[evaluated.all(axis=1)]
+    n_complete = len(complete)
+    totals = complete.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        evaluated_counts = evaluated.sum(axis=0)
+        mean_marks = np.where(evaluated_counts > 0, np.nansum(marks, axis=0) / np.maximum(evaluated_counts, 1), np.nan)
+        difficulty = mean_marks / max_marks # Proportion of the available marks earned (higher = easier)
+
+        # Corrected item-total (item-rest) correlation; for 0/1 items this is the point-biserial
+        rest = totals[:, None] - complete
+        item_rest_r = np.full(n_questions, np.nan)
+        if n_complete >= 3:
+            item_centered = complete - complete.mean(axis=0)
+            rest_centered = rest - rest.mean(axis=0)
+            item_rest_r = (item_centered * rest_centered).sum(axis=0) / np.sqrt(
+                (item_centered ** 2).sum(axis=0) * (rest_centered ** 2).sum(axis=0)
+            )
+
+        # Upper-lower discrimination index: difference in mean proportion of marks between the groups
+        group_size = max(1, int(round(n_complete * UPPER_LOWER_FRACTION))) if n_complete >= 2 else 0
+        order = np.argsort(totals, kind='stable')
+        lower, upper = order[:group_size], order[n_complete - group_size:]
+        if group_size:
+            discrimination = (complete[upper].mean(axis=0) - complete[lower].mean(axis=0)) / max_marks
+        else:
+            discrimination = np.full(n_questions, np.nan)
+
+        # Cronbach's alpha, overall and with each item removed
+        alpha, alpha_if_deleted = None, np.full(n_questions, np.nan)
+        if n_complete >= 2 and n_questions >= 2:
+            item_variances = complete.var(axis=0, ddof=1)
+            total_variance = totals.var(ddof=1)
+            if total_variance > 0:
+                alpha = n_questions / (n_questions - 1) * (1 - item_variances.sum() / total_variance)
+            if n_questions >= 3:
+                rest_variances = rest.var(axis=0, ddof=1)
+                alpha_if_deleted = np.where(
+                    rest_variances > 0,
+                    (n_questions - 1) / (n_questions - 2) * (1 - (item_variances.sum() - item_variances) / rest_variances),
+                    np.nan
+                )
+
+    complete_ids = student_ids[evaluated.all(axis=1)]
+    distractors = _distractor_analysis(exam.id, questions, student_ids, complete_ids[upper], complete_ids[lower])
+
+    question_stats = []
+    for index, question in enumerate(questions):
+        question_stats.append({
+            "question_id": question.id,
+            "position": index + 1,
+            "question_type": question.question_type.value,
+            "max_marks": question.marks,
+            "responses": int(answered[:, index].sum()),
+            "evaluated": int(evaluated_counts[index]),
+            "mean_marks": _number(mean_marks[index]),
+            "difficulty": _number(difficulty[index]),
+            "discrimination_index": _number(discrimination[index]),
+            "item_rest_correlation": _number(item_rest_r[index]),
+            "alpha_if_deleted": _number(alpha_if_deleted[index]),
+            "distractors": distractors.get(question.id)
+        })
+
+    return {
+        "exam_id": exam.id,
+        "exam_title": exam.title,
+        "students": n_students,
+        "students_fully_evaluated": n_complete,
+        "question_count": n_questions,
+        "cronbach_alpha": _number(alpha),
+        "total_score": {
+            "mean": _number(totals.mean()) if n_complete else None,
+            "std_dev": _number(totals.std(ddof=1)) if n_complete >= 2 else None,
+            "min": _number(totals.min()) if n_complete else None,
+            "max": _number(totals.max()) if n_complete else None
+        },
+        "questions": question_stats,
+        "computed_at_utc": format_datetime(datetime.utcnow())
+    }
+
+
+def _distractor_analysis(exam_id, questions, student_ids, upper_ids, lower_ids):
+    """
+    For each MCQ: how often each option was chosen, overall and in the upper/lower groups.
+    A good distractor attracts more of the lower group than of the upper group.
+    """
+    mcqs = [question for question in questions if question.question_type == QuestionType.MCQ and question.options]
+    if not mcqs or not len(student_ids):
+        return {}
+    choices = db.session.query(
+        StudentResponse.student_id, StudentResponse.question_id, StudentResponse.response_text
+    ).filter(
+        StudentResponse.exam_id == exam_id,
+        StudentResponse.question_id.in_([question.id for question in mcqs])
+    ).all()
+
+    # One pass over the answers: chosen option index per (question, student);
+    # len(options) stands for any other text
+    option_keys = {question.id: list(question.options.keys()) for question in mcqs}
+    option_index = {question.id: {key: index for index, key in enumerate(keys)} for question, keys in zip(mcqs, option_keys.values())}
+    answer_question = np.array([row[1] for row in choices], dtype=np.int64)
+    answer_student = np.searchsorted(student_ids, np.array([row[0] for row in choices], dtype=np.int64))
+    answer_option = np.array([
+        option_index[question_id].get((text or '').strip(), len(option_index[question_id]))
+        for _, question_id, text in choices
+    ], dtype=np.int64)
+    valid = answer_student < len(student_ids)
+    valid[valid] &= student_ids[answer_student[valid]] == np.array([row[0] for row in choices], dtype=np.int64)[valid]
+
+    in_upper = np.isin(student_ids, upper_ids)
+    in_lower = np.isin(student_ids, lower_ids)
+    n_all, n_upper, n_lower = len(student_ids), int(in_upper.sum()), int(in_lower.sum())
+    results = {}
+    for question in mcqs:
+        keys = option_keys[question.id]
+        n_options = len(keys) + 1
+        mask = valid & (answer_question == question.id)
+        chosen, students = answer_option[mask], answer_student[mask]
+        counts = np.bincount(chosen, minlength=n_options)
+        upper_counts = np.bincount(chosen[in_upper[students]], minlength=n_options)
+        lower_counts = np.bincount(chosen[in_lower[students]], minlength=n_options)
+
+        entries = []
+        for index, key in enumerate(keys + [None]):
+            if key is None and not counts[index]:
+                continue # Only list "other" answers when there are any
+            entries.append({
+                "option": key,
+                "text": question.options[key] if key is not None else "(other answer)",
+                "is_correct": key is not None and key == question.correct_answer,
+                "count": int(counts[index]),
+                "proportion": _number(counts[index] / n_all),
+                "upper_proportion": _number(upper_counts[index] / n_upper) if n_upper else None,
+                "lower_proportion": _number(lower_counts[index] / n_lower) if n_lower else None
+            })
+        results[question.id] = entries
+    return results
+
+
+def _number(value, digits=4):
+    """Rounds a NumPy/Python number for JSON; NaN, infinities and None become None."""
+    if value is None:
+        return None
+    value = float(value)
+    return round(value, digits) if np.isfinite(value) else None
@@ -0,0 +1,98 @@
+# app/services/listing_benchmark.py
+
+import time
+import tracemalloc
+from sqlalchemy.orm import joinedload
+from app.extensions import db
+from app.models import User, Exam, Question, StudentResponse
+
+# Benchmark for the admin response listing ("flask bench-admin-listings").
+# Compares, page by page, the previous implementation (ORM entities with joinedload of
+# student/exam/question/evaluation, text truncated in Python) with the current projection
+# query (SQL-truncated columns as lightweight rows). Both walk the same keyset pages so only
+# the loading strategy differs. Run it against a database holding realistic data.
+
+
+def run_listing_benchmark(pages, per_page):
+    """
+    Returns {"legacy": stats, "projection": stats}, where stats is a dict with
+    pages, rows, avg_ms, max_ms, avg_peak_kib and max_peak_kib.
+    """
+    from app.routes.admin import _responses_listing_query, _format_response_row
+    from app.utils.helpers import fetch_keyset_page
+
+    args = {"per_page": per_page, "cursor": None, "page": None, "exam_id": None, "student_id": None}
+
+    def legacy_page(cursor):
+        query = StudentResponse.query.options(
+            joinedload(StudentResponse.student),
+            joinedload(StudentResponse.exam),
+            joinedload(StudentResponse.question),
+            joinedload(StudentResponse.evaluation)
+        ).join(
+            User, StudentResponse.student_id == User.id
+        ).join(
+            Exam, StudentResponse.exam_id == Exam.id
+        ).join(
+            Question, StudentResponse.question_id == Question.id
+        ).add_columns(
+            StudentResponse.submitted_at.label("sort_value"),
+            StudentResponse.id.label("sort_id")
+        )
+        rows, next_cursor = fetch_keyset_page(
+            query, StudentResponse.submitted_at, StudentResponse.id, dict(args, cursor=cursor)
+        )
+        data = []
+        for row in rows:
+            resp = row.StudentResponse
+            evaluation = resp.evaluation
+            data.append({
+                "response_id": resp.id,
+                "student_name": resp.student.name,
+                "exam_title": resp.exam.title,
+                "question_text": resp.question.question_text[:100],
+                "response_text": (resp.response_text or "")[:150],
+                "feedback": evaluation.feedback if evaluation else None
+            })
+        return data, next_cursor
+
+    def projection_page(cursor):
+        query, _ = _responses_listing_query(args, None)
+        rows, next_cursor = fetch_keyset_page(
+            query, StudentResponse.submitted_at, StudentResponse.id, dict(args, cursor=cursor)
+        )
+        return [_format_response_row(row) for row in rows], next_cursor
+
+    return {
+        "legacy": _measure(legacy_page, pages),
+        "projection": _measure(projection_page, pages)
+    }
+
+
+def _measure(fetch_page, pages):
+    """Fetches up to `pages` pages, timing each and tracing its peak Python memory."""
+    timings, peaks, rows = [], [], 0
+    cursor = None
+    for _ in range(pages):
+        db.session.remove() # Fresh session (empty identity map), as in a new request
+        tracemalloc.start()
+        started = time.perf_counter()
+        data, cursor = fetch_page(cursor)
+        timings.append((time.perf_counter() - started) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+        rows += len(data)
+        if cursor is None:
+            break
+    db.session.remove()
+
+    if not timings:
+        return {"pages": 0, "rows": 0, "avg_ms": 0.0, "max_ms": 0.0, "avg_peak_kib": 0.0, "max_peak_kib": 0.0}
+    return {
+        "pages": len(timings),
+        "rows": rows,
+        "avg_ms": sum(timings) / len(timings),
+        "max_ms": max(timings),
+        "avg_peak_kib": sum(peaks) / len(peaks),
+        "max_peak_kib": max(peaks)
+    }
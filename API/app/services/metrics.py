@@ -0,0 +1,133 @@
+# app/services/metrics.py
+
+import hmac
+import logging
+import os
+import threading
+import time
+from flask import Response, g, jsonify, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Request metrics in Prometheus text format, served on GET /metrics.
+# before/after/teardown request hooks record, per endpoint (URL rule, so the label set stays
+# small): latency, responses by status, requests in flight, and the number and total time of
+# the SQL statements the request ran (engine cursor events, counted per thread while a request
+# is active; background threads are not counted). ai_evaluation.py reports each Gemini call.
+# Under gunicorn every worker has its own counters. With PROMETHEUS_MULTIPROC_DIR set (done by
+# gunicorn.conf.py) prometheus_client keeps them in per-process files there, and /metrics sums
+# the files of all workers, so a scrape sees the whole server whichever worker answers it.
+# The endpoint exposes traffic and error rates, so it only exists when METRICS_TOKEN is set and
+# every scrape must present that token.
+# Latency of streamed responses covers the time until streaming starts.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+DB_QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+GEMINI_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60)
+
+REQUESTS = Counter('http_requests', 'HTTP responses by endpoint and status.', ['method', 'endpoint', 'status'])
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request handling time.', ['method', 'endpoint'], buckets=LATENCY_BUCKETS)
+IN_FLIGHT = Gauge('http_requests_in_progress', 'Requests being handled.', multiprocess_mode='livesum')
+DB_QUERIES = Histogram('http_request_db_queries', 'SQL statements run per request.', ['endpoint'], buckets=DB_QUERY_BUCKETS)
+DB_TIME = Histogram('http_request_db_seconds', 'Time spent in SQL statements per request.', ['endpoint'], buckets=DB_TIME_BUCKETS)
+GEMINI_LATENCY = Histogram('gemini_request_duration_seconds', 'Gemini generate_content calls by outcome (ok, rejected, error).', ['outcome'], buckets=GEMINI_BUCKETS)
+
+UNMATCHED_ENDPOINT = '<unmatched>' # 404s and other requests matching no URL rule
+
+_request_db = threading.local() # .stats = [statement count, seconds] while a request is active on the thread
+_token = None
+
+
+def init_app(app):
+    """Installs the request hooks and GET /metrics (unless METRICS_ENABLED is off or no METRICS_TOKEN is set)."""
+    global _token
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    _token = app.config.get('METRICS_TOKEN')
+    if not _token:
+        logger.info('Metrics disabled: set METRICS_TOKEN to serve GET /metrics')
+        return
+    app.before_request(_start_request)
+    app.after_request(_record_response)
+    app.teardown_request(_finish_request)
+    app.add_url_rule('/metrics', 'metrics', _metrics_view, methods=['GET'])
+
+
+def _endpoint_label():
+    return request.url_rule.rule if request.url_rule is not None else UNMATCHED_ENDPOINT
+
+
+def _start_request():
+    if request.endpoint == 'metrics':
+        return # Scrapes are not measured
+    g._metrics_started = time.perf_counter()
+    _request_db.stats = [0, 0.0]
+    IN_FLIGHT.inc()
+
+
+def _record_response(response):
+    started = g.pop('_metrics_started', None)
+    if started is None:
+        return response
+    endpoint = _endpoint_label()
+    REQUEST_LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - started)
+    REQUESTS.labels(request.method, endpoint, str(response.status_code)).inc()
+    stats = getattr(_request_db, 'stats', None)
+    if stats is not None:
+        DB_QUERIES.labels(endpoint).observe(stats[0])
+        DB_TIME.labels(endpoint).observe(stats[1])
+    return response
+
+
+def _finish_request(exc):
+    # Runs for every request that went through _start_request, even when a handler raised
+    if getattr(_request_db, 'stats', None) is None:
+        return
+    _request_db.stats = None
+    IN_FLIGHT.dec()
+    started = g.pop('_metrics_started', None)
+    if started is not None:
+        # Still set: no after_request ran, i.e. the request failed without producing a response
+        endpoint = _endpoint_label()
+        REQUEST_LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - started)
+        REQUESTS.labels(request.method, endpoint, '500').inc()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's execution context: it lives exactly as long as the statement,
+    # unlike conn.info, which stays with the pooled connection
+    if getattr(_request_db, 'stats', None) is not None and context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is None:
+        return
+    stats = getattr(_request_db, 'stats', None)
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - started
+
+
+def observe_gemini_call(outcome, seconds):
+    """Records one Gemini API call: outcome is 'ok', 'rejected' (blocked/empty) or 'error'."""
+    GEMINI_LATENCY.labels(outcome).observe(seconds)
+
+
+def _metrics_view():
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f"Bearer {_token}".encode()):
+        return jsonify({"msg": "Invalid or missing metrics token."}), 401
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # Sum the per-process files of all workers, not just this one's values
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
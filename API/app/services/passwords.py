@@ -0,0 +1,186 @@
+# app/services/passwords.py
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from werkzeug.security import generate_password_hash, check_password_hash
+
+logger = logging.getLogger(__name__)
+
+# Password hashing and verification off the request threads.
+# pbkdf2 is deliberately slow and holds the GIL, so a burst of logins (every student at exam
+# start) or hashing hundreds of imported passwords in the request thread would stall the
+# worker for every other endpoint. Hashing and checking run in a process pool created on
+# first use and sized by PASSWORD_HASH_WORKERS (default: one per CPU). Its processes come from a
+# forkserver rather than a fork of this process, whose other threads (log listener, draft
+# flusher, ...) may hold locks at that moment that a forked child could never release. Login/registration
+# work is bounded: past PASSWORD_HASH_MAX_PENDING operations waiting or running,
+# PasswordPoolBusy is raised and the route answers 503 instead of queueing without limit.
+# Bulk hashing (user import) waits instead: at most PASSWORD_HASH_MAX_BATCH_PENDING of its
+# hashes (default: one per worker) are queued or running at a time, across all imports, so
+# logins arriving during an import queue behind a few hashes rather than the whole file.
+# New hashes use PASSWORD_HASH_METHOD; a login whose stored hash uses other parameters is
+# rehashed with the current ones (needs_rehash).
+
+DEFAULT_HASH_METHOD = 'pbkdf2:sha256:600000' # Werkzeug's pbkdf2 default, written out in full
+
+_method = DEFAULT_HASH_METHOD
+_method_prefix = None # Method part of hashes made with _method, with werkzeug's defaults filled in
+_workers = None
+_max_pending = None
+_timeout = 30
+_in_pool = True
+_executor = None
+_executor_lock = threading.Lock()
+_pending = 0 # Pooled login/registration operations submitted and not finished (even if no longer awaited)
+_pending_lock = threading.Lock()
+_batch_slots = threading.BoundedSemaphore(os.cpu_count() or 1) # Bulk hashes queued or running
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when too many password operations are already waiting for the pool."""
+
+
+def init_app(app):
+    """Reads the hash method and pool settings from the PASSWORD_HASH_* config."""
+    global _method, _method_prefix, _workers, _max_pending, _batch_slots, _timeout, _in_pool
+    _method = app.config.get('PASSWORD_HASH_METHOD') or DEFAULT_HASH_METHOD
+    _method_prefix = _hash_prefix(_method) # Also rejects an invalid method at startup
+    _workers = app.config.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 1
+    _max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING') or _workers * 16
+    _batch_slots = threading.BoundedSemaphore(app.config.get('PASSWORD_HASH_MAX_BATCH_PENDING') or _workers)
+    _timeout = app.config.get('PASSWORD_HASH_TIMEOUT_SECONDS', 30)
+    _in_pool = app.config.get('PASSWORD_HASH_IN_POOL', True)
+
+
+def current_method():
+    """The method (with parameters) new password hashes are made with."""
+    return _method
+
+
+def hash_password(password, method=None):
+    """Hashes one password (current method unless given). Top-level so worker processes can run it."""
+    return generate_password_hash(password, method=method or _method)
+
+
+def _check_password(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+@lru_cache(maxsize=8)
+def _hash_prefix(method):
+    """The method part ("pbkdf2:sha256:600000") of hashes made with `method`, e.g. "pbkdf2" or "scrypt"."""
+    return generate_password_hash('x', method=method).split('$', 1)[0]
+
+
+def needs_rehash(password_hash):
+    """True if the stored hash was made with a method or parameters other than the current ones."""
+    prefix = _method_prefix or _hash_prefix(_method)
+    return not password_hash or password_hash.split('$', 1)[0] != prefix
+
+
+def pool_size():
+    """Number of worker processes in the password pool."""
+    return _workers or os.cpu_count() or 1
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=pool_size(), mp_context=multiprocessing.get_context('forkserver'))
+            logger.info('Password hashing pool started with %s workers', pool_size())
+        return _executor
+
+
+def _run_bounded(fn, *args):
+    """Runs fn(*args) in the pool and waits for it; raises PasswordPoolBusy when the queue is full."""
+    global _pending
+    if not _in_pool:
+        return fn(*args)
+    with _pending_lock:
+        if _pending >= (_max_pending or pool_size() * 16):
+            raise PasswordPoolBusy()
+        _pending += 1
+    try:
+        future = _get_executor().submit(fn, *args)
+    except BaseException:
+        _release_pending()
+        raise
+    # The slot is held until the work is done, not until we stop waiting for it
+    future.add_done_callback(_release_pending)
+    try:
+        return future.result(timeout=_timeout)
+    except TimeoutError:
+        raise PasswordPoolBusy() # The pool is saturated (e.g. by a bulk import); the work finishes unobserved
+
+
+def _release_pending(future=None):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+def verify_password(password_hash, password):
+    """Checks a password against its stored hash in the pool. Raises PasswordPoolBusy on overload."""
+    if not password_hash:
+        return False
+    return _run_bounded(_check_password, password_hash, password)
+
+
+def hash_password_pooled(password):
+    """Hashes one password with the current method in the pool. Raises PasswordPoolBusy on overload."""
+    return _run_bounded(hash_password, password, _method)
+
+
+def hash_passwords(passwords):
+    """
+    Returns the hashes of `passwords` in order, computed in the process pool.
+    Waits for a free slot (PASSWORD_HASH_MAX_BATCH_PENDING) before submitting each password.
+    """
+    passwords = list(passwords)
+    if len(passwords) <= 1 or not _in_pool:
+        return [hash_password(password) for password in passwords]
+    executor = _get_executor()
+    slots = _batch_slots
+    futures = []
+    for password in passwords:
+        slots.acquire()
+        try:
+            future = executor.submit(hash_password, password, _method)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        futures.append(future)
+    return [future.result() for future in futures]
+
+
+def run_login_benchmark(logins):
+    """
+    Times `logins` password checks with the current method: in this process one after another,
+    then through the pool (all submitted at once, as in a login burst).
+    Returns {"serial": stats, "pool": stats}, where stats has seconds, per_second and per_core.
+    """
+    password = 'benchmark-password'
+    password_hash = hash_password(password)
+
+    started = time.perf_counter()
+    for _ in range(logins):
+        _check_password(password_hash, password)
+    serial_seconds = time.perf_counter() - started
+
+    executor = _get_executor()
+    list(executor.map(_check_password, [password_hash] * pool_size(), [password] * pool_size())) # Warm up the workers
+    started = time.perf_counter()
+    list(executor.map(_check_password, [password_hash] * logins, [password] * logins))
+    pool_seconds = time.perf_counter() - started
+
+    return {
+        "serial": {"seconds": serial_seconds, "per_second": logins / serial_seconds, "per_core": logins / serial_seconds},
+        "pool": {"seconds": pool_seconds, "per_second": logins / pool_seconds, "per_core": logins / pool_seconds / pool_size()}
+    }
@@ -0,0 +1,138 @@
+# app/services/query_plans.py
+
+from datetime import datetime
+from sqlalchemy import select, func, tuple_, and_, or_
+from sqlalchemy.sql.expression import Executable, ClauseElement
+from sqlalchemy.ext.compiler import compiles
+from app.extensions import db
+from app.models import User, UserRole, Exam, Question, StudentResponse, Evaluation, ExamScore
+
+# EXPLAIN-based check that the hot endpoint queries are served by indexes.
+# Each entry mirrors the shape of a query in the route modules and lists the tables that
+# must not be read with a full table scan. Asserted by tests/test_query_plans.py (pytest, on a
+# database built by the migrations); "flask check-query-plans" runs the same check against a
+# deployed database and exits non-zero on a regression.
+
+
+class _Explain(Executable, ClauseElement):
+    """Wraps a statement so it is executed as EXPLAIN (with normal parameter binding)."""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain)
+def _compile_explain(element, compiler, **kw):
+    prefix = "EXPLAIN QUERY PLAN " if compiler.dialect.name == 'sqlite' else "EXPLAIN "
+    return prefix + compiler.process(element.statement, **kw)
+
+
+def _hot_queries():
+    """Returns (name, statement, tables that must use an index) for the key endpoint queries."""
+    now = datetime.utcnow()
+    return [
+        ("student dashboard: completed exams",
+         select(StudentResponse.exam_id).where(StudentResponse.student_id == 1).distinct(),
+         ['student_responses']),
+        ("student submit: existing submission check",
+         select(StudentResponse.id).where(StudentResponse.student_id == 1, StudentResponse.exam_id == 1).limit(1),
+         ['student_responses']),
+        ("student dashboard: upcoming exams",
+         select(Exam).where(Exam.scheduled_time > now).order_by(Exam.scheduled_time.asc()).limit(5),
+         ['exams']),
+        ("teacher: exam listing",
+         select(Exam).where(Exam.created_by == 1).order_by(Exam.scheduled_time.desc()),
+         ['exams']),
+        ("exam questions",
+         select(Question).where(Question.exam_id == 1).order_by(Question.id),
+         ['questions']),
+        ("teacher results: summary",
+         select(ExamScore, User.name).join(User, ExamScore.student_id == User.id)
+         .where(ExamScore.exam_id == 1).order_by(ExamScore.student_id, ExamScore.id).limit(51),
+         ['exam_scores', 'users']),
+        ("teacher results: summary, next page",
+         select(ExamScore, User.name).join(User, ExamScore.student_id == User.id)
+         .where(ExamScore.exam_id == 1, tuple_(ExamScore.student_id, ExamScore.id) > (10, 1))
+         .order_by(ExamScore.student_id, ExamScore.id).limit(51),
+         ['exam_scores', 'users']),
+        ("teacher results: details",
+         select(StudentResponse.id, Question.marks, Evaluation.marks_awarded)
+         .join(Question, StudentResponse.question_id == Question.id)
+         .outerjoin(Evaluation, Evaluation.response_id == StudentResponse.id)
+         .where(StudentResponse.exam_id == 1)
+         .order_by(StudentResponse.student_id, StudentResponse.question_id),
+         ['student_responses', 'questions', 'evaluations']),
+        ("admin: response listing",
+         select(StudentResponse.id).order_by(StudentResponse.submitted_at.desc(), StudentResponse.id.desc()).limit(20),
+         ['student_responses']),
+        ("admin: response listing, next page",
+         select(StudentResponse.id).where(tuple_(StudentResponse.submitted_at, StudentResponse.id) < (now, 1))
+         .order_by(StudentResponse.submitted_at.desc(), StudentResponse.id.desc()).limit(20),
+         ['student_responses']),
+        ("admin: response listing filtered by exam",
+         select(StudentResponse.id).where(StudentResponse.exam_id == 1)
+         .order_by(StudentResponse.submitted_at.desc(), StudentResponse.id.desc()).limit(20),
+         ['student_responses']),
+        ("admin: results listing",
+         select(Evaluation.id).order_by(Evaluation.evaluated_at.desc(), Evaluation.id.desc()).limit(20),
+         ['evaluations']),
+        ("admin: student directory by name",
+         select(User.id).where(User.role == UserRole.STUDENT, User.is_deleted == False)
+         .order_by(func.lower(User.name), User.id).limit(20),
+         ['users']),
+        ("admin: student directory, next page",
+         select(User.id).where(User.role == UserRole.STUDENT, tuple_(func.lower(User.name), User.id) > ('m', 1))
+         .order_by(func.lower(User.name), User.id).limit(20),
+         ['users']),
+        ("admin: student directory prefix search",
+         select(User.id).where(
+             User.role == UserRole.STUDENT,
+             or_(
+                 and_(func.lower(User.name) >= 'ali', func.lower(User.name) < 'alj'),
+                 and_(func.lower(User.email) >= 'ali', func.lower(User.email) < 'alj')
+             )
+         ).order_by(func.lower(User.name), User.id).limit(20),
+         ['users']),
+        ("admin dashboard: verified user counts",
+         select(func.count(User.id)).where(User.role == UserRole.STUDENT, User.is_verified == True),
+         ['users']),
+    ]
+
+
+def hot_query_names():
+    """Names of the checked queries, in order."""
+    return [name for name, _, _ in _hot_queries()]
+
+
+def check_query_plans():
+    """
+    Runs EXPLAIN for every hot query.
+    Returns a list of (name, plan_lines, full_scan_tables); full_scan_tables is empty when the query passes.
+    """
+    dialect = db.engine.dialect.name
+    if dialect not in ('sqlite', 'postgresql'):
+        raise NotImplementedError(f"Query plan checks are not implemented for '{dialect}'.")
+
+    results = []
+    for name, statement, tables in _hot_queries():
+        if dialect == 'postgresql':
+            # Tiny development tables are always cheaper to scan; ask whether an index plan exists
+            db.session.execute(db.text("SET LOCAL enable_seqscan = off"))
+        plan_lines = [_plan_line(dialect, row) for row in db.session.execute(_Explain(statement))]
+        full_scans = [table for table in tables if any(_is_full_scan(dialect, line, table) for line in plan_lines)]
+        results.append((name, plan_lines, full_scans))
+    db.session.rollback()
+    return results
+
+
+def _plan_line(dialect, row):
+    # SQLite: (id, parent, notused, detail); PostgreSQL: (QUERY PLAN,)
+    return row[3] if dialect == 'sqlite' else row[0]
+
+
+def _is_full_scan(dialect, line, table):
+    if dialect == 'sqlite':
+        # "SCAN exams" is a table scan; "SCAN exams USING INDEX ..." / "SEARCH ..." use an index
+        return line.startswith(f"SCAN {table}") and "INDEX" not in line and "PRIMARY KEY" not in line
+    return f"Seq Scan on {table}" in line
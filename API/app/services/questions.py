@@ -0,0 +1,174 @@
+# app/services/questions.py
+
+import csv
+import json
+from datetime import datetime
+from sqlalchemy import func, insert, select, literal
+from app.extensions import db
+from app.models import Exam, Question, QuestionType
+from app.services import stats
+from app.services.exam_totals import adjust_exam_totals
+
+# Question validation shared by the single and bulk "add question" endpoints, bulk insertion,
+# and server-side exam cloning.
+# A bulk batch is validated as a whole first; if any question is invalid nothing is written,
+# otherwise all rows go in with one executemany and one exam totals update.
+
+MAX_QUESTION_BATCH = 500
+CSV_COLUMNS = ('question_text', 'question_type', 'marks', 'options', 'correct_answer', 'word_limit')
+
+
+def validate_question(data):
+    """
+    Validates one question payload (same rules as POST /teacher/exams/<id>/questions).
+    Returns a dict of Question column values; raises ValueError with a client-facing message.
+    """
+    q_text = data.get('question_text')
+    q_type_str = data.get('question_type') # e.g., "MCQ", "Short Answer"
+    marks = data.get('marks')
+    options = data.get('options') # Expected for MCQ: {"key1": "text1", "key2": "text2"}
+    correct_answer = data.get('correct_answer') # Expected for MCQ: "key1"
+    word_limit = data.get('word_limit') # Expected for Short/Long
+
+    if not q_text or not q_type_str or marks is None:
+        raise ValueError("Missing required fields: question_text, question_type, marks")
+    if not isinstance(q_text, str):
+        raise ValueError("question_text must be a string.")
+
+    try:
+        q_type_enum = QuestionType(q_type_str)
+    except ValueError:
+        valid_types = [qt.value for qt in QuestionType]
+        raise ValueError(f"Invalid question type '{q_type_str}'. Must be one of: {', '.join(valid_types)}")
+
+    try:
+        marks_int = int(marks)
+        if marks_int <= 0: raise ValueError("Marks must be positive")
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid marks value: '{marks}'. Must be a positive integer.")
+
+    validated_options = None
+    validated_correct_answer = None
+    validated_word_limit = None
+
+    if q_type_enum == QuestionType.MCQ:
+        if not options or not isinstance(options, dict):
+            raise ValueError("MCQ requires a non-empty 'options' dictionary (key-value pairs).")
+        if not correct_answer or not isinstance(correct_answer, str):
+            raise ValueError("MCQ requires a 'correct_answer' string (the key of the correct option).")
+        if correct_answer not in options:
+            raise ValueError(f"MCQ 'correct_answer' ('{correct_answer}') must be one of the keys provided in 'options'.")
+        validated_options = options
+        validated_correct_answer = correct_answer
+    elif word_limit is not None:
+        try:
+            word_limit_val = int(word_limit)
+            if word_limit_val <= 0:
+                raise ValueError("Word limit must be positive if provided.")
+            validated_word_limit = word_limit_val
+        except (ValueError, TypeError):
+            raise ValueError("Invalid word_limit. Must be a positive integer or null/absent.")
+
+    return {
+        "question_text": q_text,
+        "question_type": q_type_enum,
+        "marks": marks_int,
+        "options": validated_options,
+        "correct_answer": validated_correct_answer,
+        "word_limit": validated_word_limit
+    }
+
+
+def parse_questions_csv(text_stream):
+    """
+    Reads questions from CSV with a header row (question_text, question_type, marks and optionally
+    options, correct_answer, word_limit). MCQ options are a JSON object or "a=Paris|b=London".
+    Returns [(line, payload dict)]; raises ValueError for a missing header column or bad options.
+    """
+    reader = csv.DictReader(text_stream)
+    header = [(column or '').strip().lower() for column in (reader.fieldnames or [])]
+    missing = [column for column in CSV_COLUMNS[:3] if column not in header]
+    if missing:
+        raise ValueError(f"CSV header is missing required columns: {', '.join(missing)}")
+    reader.fieldnames = header
+
+    entries = []
+    for row in reader:
+        payload = {column: (row.get(column) or '').strip() or None for column in CSV_COLUMNS}
+        if payload['options']:
+            payload['options'] = _parse_options(payload['options'], reader.line_num)
+        entries.append((reader.line_num, payload))
+        if len(entries) > MAX_QUESTION_BATCH:
+            raise ValueError(f"At most {MAX_QUESTION_BATCH} questions can be added per request.")
+    return entries
+
+
+def _parse_options(value, line):
+    if value.startswith('{'):
+        try:
+            return json.loads(value)
+        except ValueError:
+            raise ValueError(f"Line {line}: options is not a valid JSON object.")
+    options = {}
+    for pair in value.split('|'):
+        key, separator, text = pair.partition('=')
+        if not separator or not key.strip():
+            raise ValueError(f"Line {line}: options must look like 'a=Paris|b=London' or be a JSON object.")
+        options[key.strip()] = text.strip()
+    return options
+
+
+def validate_question_batch(entries):
+    """
+    Validates [(ref, payload)] entries. Returns (rows, errors); errors is a list of
+    {"ref", "msg"} dicts, and when it is non-empty rows must not be written.
+    """
+    rows, errors = [], []
+    for ref, payload in entries:
+        if not isinstance(payload, dict):
+            errors.append({"ref": ref, "msg": "Each question must be an object."})
+            continue
+        try:
+            rows.append(validate_question(payload))
+        except ValueError as e:
+            errors.append({"ref": ref, "msg": str(e)})
+    return rows, errors
+
+
+def insert_questions(exam_id, rows):
+    """Inserts validated question rows with one executemany and updates the exam totals. Caller commits."""
+    db.session.execute(insert(Question), [dict(row, exam_id=exam_id) for row in rows])
+    adjust_exam_totals(exam_id, len(rows), sum(row["marks"] for row in rows))
+
+
+def clone_exam(source, teacher_id, title, scheduled_time, duration, description):
+    """
+    Creates a copy of `source` owned by `teacher_id` and copies its questions with a single
+    INSERT ... SELECT (in their original order). Caller commits. Returns the new Exam.
+    """
+    question_count, total_marks = db.session.query(
+        func.count(Question.id), func.coalesce(func.sum(Question.marks), 0)
+    ).filter(Question.exam_id == source.id).one()
+
+    new_exam = Exam(
+        title=title,
+        description=description,
+        scheduled_time=scheduled_time,
+        duration=duration,
+        created_by=teacher_id,
+        created_at=datetime.utcnow(),
+        question_count=question_count,
+        total_marks=total_marks
+    )
+    db.session.add(new_exam)
+    db.session.flush() # Assigns new_exam.id for the copy
+
+    copied_columns = ['question_text', 'question_type', 'options', 'correct_answer', 'marks', 'word_limit']
+    db.session.execute(insert(Question).from_select(
+        ['exam_id'] + copied_columns,
+        select(literal(new_exam.id), *[getattr(Question, column) for column in copied_columns])
+        .where(Question.exam_id == source.id)
+        .order_by(Question.id)
+    ))
+    stats.bump(exams=1)
+    return new_exam
@@ -0,0 +1,268 @@
+# app/services/rankings.py
+
+import logging
+import atexit
+import threading
+from datetime import datetime
+import numpy as np
+from sqlalchemy import event, update, bindparam, select, or_
+from app.extensions import db
+from app.models import Exam, ExamScore, ExamStats, User
+from app.services.scores import score_versions, CHANGED_EXAMS_KEY
+
+logger = logging.getLogger(__name__)
+
+# Cohort ranks, percentiles and score distributions per exam.
+# Students' result pages read them from exam_scores.rank/percentile and exam_stats instead of
+# ranking the whole cohort with window functions on every request. They are recomputed in
+# batch: scores.py records every exam whose exam_scores rows a transaction changes, the exam is
+# queued once that transaction commits, and a background thread recomputes the queued exams after
+# RANKINGS_REFRESH_DELAY_SECONDS, so a burst of submissions or evaluations costs one pass.
+# Each pass loads the exam's marks once, ranks them with sorted NumPy arrays and writes all
+# rows back with one executemany. Only final scores are ranked: students whose answers are all
+# evaluated and whose account is not deleted. Everyone else has a null rank and percentile,
+# and the distribution in exam_stats covers the ranked students only. "flask refresh-rankings" catches up on anything missed
+# (e.g. a process that exited before its refresh ran), using the stored scores_version.
+
+HISTOGRAM_BUCKETS = 10 # 10% bands of the exam's total marks
+TREND_THRESHOLD = 1.0 # Percentage points per exam below which a student's trend counts as steady
+
+_lock = threading.Lock()
+_pending = set() # Exam IDs waiting for a refresh in this process
+_wakeup = threading.Event()
+_stopped = threading.Event()
+_worker = None
+_app = None
+
+
+def init_app(app):
+    """Binds the refresher to the application; its thread starts when the first exam is queued."""
+    global _app
+    _app = app
+    atexit.register(shutdown)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _queue_after_commit(session):
+    # scores.py records the exams each transaction changed; rank them once it is durable
+    exam_ids = session.info.pop(CHANGED_EXAMS_KEY, None)
+    if exam_ids:
+        queue_refresh(exam_ids)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop(CHANGED_EXAMS_KEY, None)
+
+
+def queue_refresh(exam_ids):
+    """Queues exams for a refresh by the background thread (no-op when background refresh is off)."""
+    if _app is None or not _app.config.get('RANKINGS_REFRESH_IN_BACKGROUND', True):
+        return
+    with _lock:
+        _pending.update(exam_ids)
+    _ensure_worker()
+    _wakeup.set()
+
+
+def mark_cohort_changed(exam_ids):
+    """
+    Flags exams whose cohort changed without a score change (a student's account was deleted),
+    so their ranks are recomputed after the commit. Caller commits.
+    """
+    exam_ids = set(exam_ids)
+    if not exam_ids:
+        return
+    # A version no score set has: refresh_stale_rankings treats the stats as stale
+    db.session.execute(update(ExamStats).where(ExamStats.exam_id.in_(exam_ids)).values(scores_version=''))
+    db.session.info.setdefault(CHANGED_EXAMS_KEY, set()).update(exam_ids)
+
+
+def _unrankable_scores():
+    """Condition on exam_scores rows that get no rank: answers still pending, or the student's account is deleted."""
+    score_table = ExamScore.__table__
+    return or_(
+        score_table.c.pending_count > 0,
+        score_table.c.student_id.in_(select(User.id).where(User.is_deleted == True))
+    )
+
+
+def refresh_exam_rankings(exam_id):
+    """
+    Recomputes ranks and percentiles of the fully evaluated, live students of one exam and its
+    ExamStats row; the exam's other score rows get a null rank. Caller commits.
+    Returns the number of ranked students.
+    """
+    version = score_versions([exam_id]).get(exam_id)
+    total_marks = db.session.query(Exam.total_marks).filter(Exam.id == exam_id).scalar()
+    rows = db.session.query(
+        ExamScore.id, ExamScore.marks_awarded, ExamScore.marks_possible, ExamScore.pending_count
+    ).join(
+        User, User.id == ExamScore.student_id
+    ).filter(ExamScore.exam_id == exam_id, User.is_deleted == False).all()
+
+    score_table = ExamScore.__table__ # Core UPDATEs: updated_at left alone
+    db.session.execute(
+        update(score_table).where(
+            score_table.c.exam_id == exam_id, score_table.c.rank.isnot(None), _unrankable_scores()
+        ).values(rank=None, percentile=None)
+    )
+
+    stats_row = db.session.query(ExamStats).filter(ExamStats.exam_id == exam_id).first()
+    if not rows or total_marks is None:
+        if stats_row is not None:
+            db.session.delete(stats_row)
+        return 0
+
+    if stats_row is None:
+        stats_row = ExamStats(exam_id=exam_id)
+        db.session.add(stats_row)
+    stats_row.students = len(rows)
+    stats_row.scores_version = version
+    stats_row.computed_at = datetime.utcnow()
+
+    final = [row for row in rows if row.pending_count == 0]
+    stats_row.fully_evaluated = len(final)
+    if not final:
+        stats_row.mean_marks = stats_row.median_marks = stats_row.std_dev = None
+        stats_row.highest_marks = stats_row.lowest_marks = None
+        stats_row.histogram = [0] * HISTOGRAM_BUCKETS
+        return 0
+
+    score_ids = np.array([row.id for row in final], dtype=np.int64)
+    marks = np.array([row.marks_awarded for row in final], dtype=float)
+    n = len(marks)
+
+    # Ranks and percentile ranks from one sort: for each score, how many are lower and how many equal
+    ordered = np.sort(marks)
+    lower = np.searchsorted(ordered, marks, side='left')
+    lower_or_equal = np.searchsorted(ordered, marks, side='right')
+    ranks = n - lower_or_equal + 1 # Competition ranking: 1 + number of higher scores
+    percentiles = np.round((lower + 0.5 * (lower_or_equal - lower)) / n * 100, 2)
+
+    db.session.execute( # One executemany
+        update(score_table).where(score_table.c.id == bindparam('score_id')).values(
+            rank=bindparam('new_rank'), percentile=bindparam('new_percentile')
+        ),
+        [{"score_id": int(score_id), "new_rank": int(rank), "new_percentile": float(percentile)}
+         for score_id, rank, percentile in zip(score_ids, ranks, percentiles)]
+    )
+
+    # Distribution over the exam's total marks (answered questions only if the exam total is unknown)
+    scale = total_marks or max(row.marks_possible for row in final) or ordered[-1] or 1
+    bands = np.clip((marks / scale * HISTOGRAM_BUCKETS).astype(np.int64), 0, HISTOGRAM_BUCKETS - 1)
+    histogram = np.bincount(bands, minlength=HISTOGRAM_BUCKETS)
+
+    stats_row.mean_marks = round(float(marks.mean()), 2)
+    stats_row.median_marks = round(float(np.median(ordered)), 2)
+    stats_row.std_dev = round(float(marks.std(ddof=1)), 2) if n >= 2 else None
+    stats_row.highest_marks = float(ordered[-1])
+    stats_row.lowest_marks = float(ordered[0])
+    stats_row.histogram = [int(count) for count in histogram]
+    return n
+
+
+def refresh_stale_rankings(exam_ids=None, force=False):
+    """
+    Refreshes exams whose scores changed since their stats were computed, or that have unranked
+    final score rows (all exams if exam_ids is None; every one of them with force), committing
+    after each exam. Returns the number of exams refreshed.
+    """
+    current = score_versions(exam_ids)
+    stats_query = db.session.query(ExamStats.exam_id, ExamStats.scores_version)
+    unranked_query = db.session.query(ExamScore.exam_id).join(
+        User, User.id == ExamScore.student_id
+    ).filter(
+        ExamScore.rank.is_(None), ExamScore.pending_count == 0, User.is_deleted == False
+    ).distinct()
+    if exam_ids is not None:
+        stats_query = stats_query.filter(ExamStats.exam_id.in_(list(exam_ids)))
+        unranked_query = unranked_query.filter(ExamScore.exam_id.in_(list(exam_ids)))
+    stored = dict(stats_query)
+    unranked = {exam_id for (exam_id,) in unranked_query}
+
+    # Exams with changed or re-created score rows, plus exams whose score rows are all gone (stats to drop)
+    stale = {
+        exam_id for exam_id, version in current.items()
+        if force or exam_id in unranked or stored.get(exam_id) != version
+    }
+    stale.update(exam_id for exam_id in stored if exam_id not in current)
+    for exam_id in sorted(stale):
+        try:
+            refresh_exam_rankings(exam_id)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.exception('Rankings: refresh of exam %s failed: %s', exam_id, e)
+    return len(stale)
+
+
+def trend_summary(percentages, percentiles):
+    """
+    Summarizes a student's results in exam order: averages, and the least-squares slope of the
+    percentage per exam, labelled improving/declining once it exceeds TREND_THRESHOLD points.
+    """
+    points = np.array([value for value in percentages if value is not None], dtype=float)
+    ranked = np.array([value for value in percentiles if value is not None], dtype=float)
+    slope = None
+    if len(points) >= 2:
+        slope = float(np.polyfit(np.arange(len(points)), points, 1)[0])
+    if slope is None:
+        direction = None
+    elif slope > TREND_THRESHOLD:
+        direction = "improving"
+    elif slope < -TREND_THRESHOLD:
+        direction = "declining"
+    else:
+        direction = "steady"
+    return {
+        "exams_counted": len(points),
+        "average_percentage": round(float(points.mean()), 2) if len(points) else None,
+        "average_percentile": round(float(ranked.mean()), 2) if len(ranked) else None,
+        "best_percentage": round(float(points.max()), 2) if len(points) else None,
+        "percentage_change_per_exam": round(slope, 2) if slope is not None else None,
+        "trend": direction
+    }
+
+
+def shutdown():
+    """Stops the refresher thread; exams still queued are caught up by "flask refresh-rankings"."""
+    _stopped.set()
+    _wakeup.set()
+    if _worker and _worker.is_alive():
+        _worker.join(timeout=5)
+
+
+def _ensure_worker():
+    """Starts the refresher lazily so each (forked) worker process gets its own."""
+    global _worker
+    with _lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _worker = threading.Thread(target=_run_worker, name='rankings-refresher', daemon=True)
+        _worker.start()
+
+
+def _run_worker():
+    delay = _app.config.get('RANKINGS_REFRESH_DELAY_SECONDS', 5)
+    while not _stopped.is_set():
+        _wakeup.wait()
+        _wakeup.clear()
+        if _stopped.wait(delay): # Let the burst settle so each exam is ranked once for it
+            break
+        with _lock:
+            exam_ids = set(_pending)
+            _pending.clear()
+        if not exam_ids:
+            continue
+        with _app.app_context():
+            try:
+                refreshed = refresh_stale_rankings(exam_ids)
+                logger.info('Rankings: refreshed %s of %s queued exams', refreshed, len(exam_ids))
+            except Exception as e:
+                logger.exception('Rankings: refresh failed, will retry: %s', e)
+                with _lock:
+                    _pending.update(exam_ids)
+                _wakeup.set()
+            finally:
+                db.session.remove()
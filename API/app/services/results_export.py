@@ -0,0 +1,113 @@
+# app/services/results_export.py
+
+import csv
+import io
+import os
+import tempfile
+from openpyxl import Workbook
+from app.extensions import db
+from app.models import User, Question, StudentResponse, Evaluation, ExamScore
+from app.utils.helpers import format_datetime
+
+# Spreadsheet export of an exam's results: one row per student with their marks per question
+# pivoted into columns, then total and percentage.
+# Response rows are read in (student, question) order with yield_per, so only one fetch batch
+# and the current student's row are ever in memory. CSV is produced line by line as the rows
+# arrive; XLSX (a zip archive, which cannot be written incrementally to the client) goes
+# through openpyxl's write-only mode into a temporary file that is then sent in chunks.
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+EXPORT_BATCH_SIZE = 1000 # Rows fetched per round trip
+FILE_CHUNK_SIZE = 64 * 1024
+FORMULA_PREFIXES = ('=', '+', '-', '@') # Spreadsheet apps would evaluate such cells
+
+
+def export_rows(exam):
+    """
+    Yields the header row, then one row per student who submitted:
+    ID, name, email, submitted at, marks per question (empty if unanswered or not yet
+    evaluated), total, maximum, percentage and evaluation status.
+    """
+    questions = db.session.query(Question.id, Question.marks).filter(
+        Question.exam_id == exam.id
+    ).order_by(Question.id).all()
+    column_of = {question_id: index for index, (question_id, _) in enumerate(questions)}
+    total_possible = exam.total_marks
+
+    yield (
+        ["Student ID", "Student Name", "Student Email", "Submitted At (UTC)"]
+        + [f"Q{index + 1} ({marks})" for index, (_, marks) in enumerate(questions)]
+        + ["Total", "Max Marks", "Percentage", "Status"]
+    )
+
+    rows = db.session.query(
+        StudentResponse.student_id, StudentResponse.question_id, Evaluation.marks_awarded,
+        User.name, User.email, ExamScore.marks_awarded.label("total"),
+        ExamScore.pending_count, ExamScore.submitted_at
+    ).join(
+        ExamScore, (ExamScore.exam_id == StudentResponse.exam_id) & (ExamScore.student_id == StudentResponse.student_id)
+    ).join(
+        User, StudentResponse.student_id == User.id
+    ).outerjoin(
+        Evaluation, Evaluation.response_id == StudentResponse.id
+    ).filter(
+        StudentResponse.exam_id == exam.id
+    ).order_by(
+        StudentResponse.student_id, StudentResponse.question_id # Served by ix_student_responses_exam_id_student_id_question_id
+    ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    student_id, head, marks, tail = None, None, None, None
+    for row in rows:
+        if row.student_id != student_id:
+            if student_id is not None:
+                yield head + marks + tail
+            student_id = row.student_id
+            head = [row.student_id, _safe_text(row.name), _safe_text(row.email), format_datetime(row.submitted_at)]
+            marks = [None] * len(questions)
+            percentage = round(row.total / total_possible * 100, 2) if total_possible else None
+            status = "Fully Evaluated" if row.pending_count == 0 else f"Pending Evaluation ({row.pending_count})"
+            tail = [row.total, total_possible, percentage, status]
+        column = column_of.get(row.question_id)
+        if column is not None:
+            marks[column] = row.marks_awarded
+    if student_id is not None:
+        yield head + marks + tail
+
+
+def _safe_text(value):
+    """Neutralizes user-entered text that a spreadsheet would otherwise run as a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(rows):
+    """Encodes rows as CSV, yielding each line as soon as its row is available."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    yield '\ufeff' # BOM so Excel opens the UTF-8 file with the right encoding
+    for row in rows:
+        writer.writerow(['' if value is None else value for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def xlsx_chunks(rows, sheet_title="Results"):
+    """Writes rows to a write-only workbook in a temporary file, then yields the file in chunks."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title)
+    for row in rows:
+        sheet.append(row)
+    handle, path = tempfile.mkstemp(suffix='.xlsx')
+    try:
+        with os.fdopen(handle, 'wb') as temp_file:
+            workbook.save(temp_file)
+        with open(path, 'rb') as temp_file:
+            while True:
+                chunk = temp_file.read(FILE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
@@ -0,0 +1,149 @@
+# app/services/scores.py
+
+from datetime import datetime
+from sqlalchemy import func, select, insert, update, delete
+from app.extensions import db
+from app.models import ExamScore, StudentResponse, Question, Evaluation
+from app.services import stats
+
+# Maintenance of the materialized exam_scores table (one row per student per submitted exam).
+# Every write that changes a student's exam totals calls into this module inside its own
+# transaction, so the table never drifts from the underlying responses/evaluations:
+#   - a submission lands         -> record_submission_score
+#   - an evaluation is saved     -> record_evaluation / apply_score_deltas
+#   - question marks change or questions are deleted -> refresh_exam_scores
+# Updates are applied as "column = column + delta" so concurrent writers do not lose updates.
+# Each change also records the exam in the session (CHANGED_EXAMS_KEY); rankings.py re-ranks
+# those exams after the transaction commits.
+
+CHANGED_EXAMS_KEY = 'exam_scores_changed'
+
+
+def _note_changed(exam_ids):
+    db.session.info.setdefault(CHANGED_EXAMS_KEY, set()).update(exam_ids)
+
+
+def get_question_marks(exam_id):
+    """Returns {question_id: marks} for an exam."""
+    return dict(db.session.query(Question.id, Question.marks).filter(Question.exam_id == exam_id))
+
+
+def record_submission_score(student_id, exam_id, question_ids, submitted_at, question_marks=None):
+    """
+    Creates the score row for a new submission (nothing evaluated yet). Caller commits.
+    Args:
+        question_ids (list): IDs of the questions the student answered.
+        question_marks (dict): Optional {question_id: marks} for the exam, to save a query when
+            recording many submissions of the same exam.
+    """
+    if question_marks is None:
+        question_marks = get_question_marks(exam_id)
+    db.session.add(ExamScore(
+        student_id=student_id,
+        exam_id=exam_id,
+        marks_awarded=0.0,
+        marks_possible=sum(question_marks.get(q_id) or 0 for q_id in question_ids),
+        evaluated_count=0,
+        pending_count=len(question_ids),
+        submitted_at=submitted_at,
+        updated_at=datetime.utcnow()
+    ))
+    _note_changed([exam_id])
+
+
+def record_evaluation(response, marks_awarded, previous_marks=None):
+    """
+    Applies one saved evaluation of `response` to the student's exam score. Caller commits.
+    Args:
+        previous_marks (float): Marks of the evaluation being replaced, or None for a new evaluation.
+    """
+    newly_evaluated = previous_marks is None
+    delta = float(marks_awarded) - (float(previous_marks) if previous_marks is not None else 0.0)
+    apply_score_deltas({(response.student_id, response.exam_id): (delta, 1 if newly_evaluated else 0)})
+
+
+def apply_score_deltas(deltas):
+    """
+    Applies aggregated evaluation changes to exam_scores. Caller commits.
+    Args:
+        deltas (dict): (student_id, exam_id) -> (marks_delta, newly_evaluated_count).
+    """
+    now = datetime.utcnow()
+    # Every new evaluation passes through here, so the dashboard's evaluation counter is kept here too
+    stats.bump(evaluations=sum(newly_evaluated for _, newly_evaluated in deltas.values()))
+    _note_changed(exam_id for _, exam_id in deltas)
+    for (student_id, exam_id), (marks_delta, newly_evaluated) in deltas.items():
+        db.session.execute(
+            update(ExamScore)
+            .where(ExamScore.student_id == student_id, ExamScore.exam_id == exam_id)
+            .values(
+                marks_awarded=ExamScore.marks_awarded + marks_delta,
+                evaluated_count=ExamScore.evaluated_count + newly_evaluated,
+                pending_count=ExamScore.pending_count - newly_evaluated,
+                updated_at=now
+            )
+        )
+
+
+def refresh_exam_scores(exam_id):
+    """
+    Recomputes the score rows of one exam from its responses (e.g. after question marks
+    change or questions are deleted). Pending changes are flushed first. Caller commits.
+    """
+    db.session.flush()
+    db.session.execute(delete(ExamScore).where(ExamScore.exam_id == exam_id))
+    db.session.execute(_insert_scores_from_responses(exam_id))
+    _note_changed([exam_id])
+
+
+def rebuild_all_scores():
+    """Recomputes the whole exam_scores table with a single GROUP BY. Caller commits. Returns the row count."""
+    db.session.execute(delete(ExamScore))
+    db.session.execute(_insert_scores_from_responses())
+    return db.session.query(func.count(ExamScore.id)).scalar()
+
+
+def score_versions(exam_ids=None):
+    """
+    Returns {exam_id: version} for exams with score rows (all exams if exam_ids is None).
+    The version changes whenever a score row of the exam is added, removed or updated, so
+    results derived from exam_scores can be cached and checked for staleness with one query.
+    """
+    query = db.session.query(
+        ExamScore.exam_id, func.count(ExamScore.id), func.max(ExamScore.updated_at),
+        func.sum(ExamScore.evaluated_count), func.sum(ExamScore.marks_awarded)
+    ).group_by(ExamScore.exam_id)
+    if exam_ids is not None:
+        query = query.filter(ExamScore.exam_id.in_(list(exam_ids)))
+    return {
+        exam_id: f"{count}:{updated_at.isoformat() if updated_at else ''}:{evaluated}:{round(marks or 0.0, 4)}"
+        for exam_id, count, updated_at, evaluated, marks in query
+    }
+
+
+def _insert_scores_from_responses(exam_id=None):
+    """INSERT ... SELECT that aggregates responses (joined to questions and evaluations) per student and exam."""
+    aggregate = select(
+        StudentResponse.student_id,
+        StudentResponse.exam_id,
+        func.coalesce(func.sum(Evaluation.marks_awarded), 0.0),
+        func.coalesce(func.sum(Question.marks), 0),
+        func.count(Evaluation.id),
+        func.count(StudentResponse.id) - func.count(Evaluation.id),
+        func.min(StudentResponse.submitted_at),
+        func.max(func.coalesce(Evaluation.evaluated_at, StudentResponse.submitted_at))
+    ).join(
+        Question, StudentResponse.question_id == Question.id
+    ).outerjoin(
+        Evaluation, Evaluation.response_id == StudentResponse.id
+    ).group_by(
+        StudentResponse.student_id, StudentResponse.exam_id
+    )
+    if exam_id is not None:
+        aggregate = aggregate.where(StudentResponse.exam_id == exam_id)
+
+    return insert(ExamScore).from_select(
+        ['student_id', 'exam_id', 'marks_awarded', 'marks_possible',
+         'evaluated_count', 'pending_count', 'submitted_at', 'updated_at'],
+        aggregate
+    )
@@ -0,0 +1,251 @@
+# app/services/search.py
+
+import re
+from collections import namedtuple
+from sqlalchemy import text
+from app.extensions import db
+from app.models import User, Exam, Question, StudentResponse, Evaluation
+
+# Full-text search over student answers, question texts and evaluation feedback.
+# Routes talk to a SearchBackend chosen by database dialect, so another engine can be added
+# without touching them. The SQLite backend keeps one FTS5 table, search_index, in sync with
+# the source tables through triggers (created by a migration, or by "flask rebuild-search-index"),
+# so every write path - including bulk inserts and the deletion jobs - is covered.
+# A document's rowid encodes its source: rowid = source id * 4 + kind.
+
+RESPONSE = 'response'
+QUESTION = 'question'
+FEEDBACK = 'feedback'
+
+KIND_CODES = {RESPONSE: 1, QUESTION: 2, FEEDBACK: 3}
+KINDS_BY_CODE = {code: kind for kind, code in KIND_CODES.items()}
+
+HIGHLIGHT_START = '[['
+HIGHLIGHT_END = ']]'
+SNIPPET_TOKENS = 16
+
+SearchHit = namedtuple('SearchHit', ['kind', 'ref_id', 'exam_id', 'snippet', 'score'])
+
+
+def build_match_query(query_text):
+    """
+    Turns user input into a safe FTS5 query: "quoted phrases" stay phrases, other words must all
+    match, and the last word also matches as a prefix (search-as-you-type). Returns None if empty.
+    """
+    parts = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query_text or ''):
+        tokens = re.findall(r'\w+', phrase or word)
+        if tokens:
+            parts.append((' '.join(tokens), bool(phrase)))
+    if not parts:
+        return None
+    terms = [f'"{tokens}"' for tokens, _ in parts]
+    if not parts[-1][1]:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class SearchBackend:
+    """Interface of a full-text search engine over responses, questions and feedback."""
+    name = None
+
+    def install(self):
+        """Creates the index structures if they are missing."""
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Re-indexes every document from the source tables. Returns {kind: document count}."""
+        raise NotImplementedError
+
+    def search(self, match_query, kind=None, exam_id=None, owner_id=None, limit=20, offset=0):
+        """
+        Returns one page of SearchHit, best match first.
+        kind limits the source, exam_id one exam, owner_id the exams created by that teacher.
+        Exams scheduled for deletion are never returned.
+        """
+        raise NotImplementedError
+
+
+# (kind, table, text column, exam id expression for a NEW/OLD row)
+_FTS_SOURCES = (
+    (RESPONSE, 'student_responses', 'response_text', '{row}.exam_id'),
+    (QUESTION, 'questions', 'question_text', '{row}.exam_id'),
+    (FEEDBACK, 'evaluations', 'feedback', '(SELECT exam_id FROM student_responses WHERE id = {row}.response_id)'),
+)
+
+
+class Fts5SearchBackend(SearchBackend):
+    """SQLite FTS5 with bm25 ranking and trigger-maintained documents."""
+    name = 'sqlite-fts5'
+
+    def install(self):
+        for statement in fts5_ddl():
+            db.session.execute(text(statement))
+
+    def rebuild(self):
+        db.session.execute(text("DELETE FROM search_index"))
+        counts = {}
+        for kind, table, column, exam_expression in _FTS_SOURCES:
+            counts[kind] = db.session.execute(text(
+                f"INSERT INTO search_index(rowid, body, exam_id) "
+                f"SELECT id * 4 + {KIND_CODES[kind]}, {column}, {exam_expression.format(row=table)} "
+                f"FROM {table} WHERE {column} IS NOT NULL AND {column} != ''"
+            )).rowcount
+        db.session.execute(text("INSERT INTO search_index(search_index) VALUES ('optimize')"))
+        return counts
+
+    def search(self, match_query, kind=None, exam_id=None, owner_id=None, limit=20, offset=0):
+        conditions = [
+            "search_index MATCH :match",
+            "exam_id NOT IN (SELECT id FROM exams WHERE is_deleted)"
+        ]
+        params = {
+            "match": match_query, "start": HIGHLIGHT_START, "end": HIGHLIGHT_END,
+            "tokens": SNIPPET_TOKENS, "limit": limit, "offset": offset
+        }
+        if kind:
+            conditions.append("rowid % 4 = :kind_code")
+            params["kind_code"] = KIND_CODES[kind]
+        if exam_id:
+            conditions.append("exam_id = :exam_id")
+            params["exam_id"] = exam_id
+        if owner_id:
+            conditions.append("exam_id IN (SELECT id FROM exams WHERE created_by = :owner_id)")
+            params["owner_id"] = owner_id
+        rows = db.session.execute(text(
+            "SELECT rowid, exam_id, snippet(search_index, 0, :start, :end, '...', :tokens) AS snippet, "
+            "bm25(search_index) AS score FROM search_index "
+            f"WHERE {' AND '.join(conditions)} ORDER BY rank LIMIT :limit OFFSET :offset"
+        ), params)
+        return [
+            # bm25 is "lower is better"; flip it so clients see higher = more relevant
+            SearchHit(KINDS_BY_CODE[row.rowid % 4], row.rowid // 4, row.exam_id, row.snippet, round(-row.score, 4))
+            for row in rows
+        ]
+
+
+def fts5_ddl():
+    """CREATE statements for the FTS5 table and the triggers that keep it in sync (idempotent)."""
+    statements = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index "
+        "USING fts5(body, exam_id UNINDEXED, tokenize = 'porter unicode61')"
+    ]
+    for kind, table, column, exam_expression in _FTS_SOURCES:
+        code = KIND_CODES[kind]
+        new_document = (
+            f"INSERT INTO search_index(rowid, body, exam_id) "
+            f"SELECT new.id * 4 + {code}, new.{column}, {exam_expression.format(row='new')} "
+            f"WHERE new.{column} IS NOT NULL AND new.{column} != '';"
+        )
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS search_index_{table}_insert AFTER INSERT ON {table} "
+            f"BEGIN {new_document} END",
+            f"CREATE TRIGGER IF NOT EXISTS search_index_{table}_update AFTER UPDATE OF {column} ON {table} "
+            f"BEGIN DELETE FROM search_index WHERE rowid = old.id * 4 + {code}; {new_document} END",
+            f"CREATE TRIGGER IF NOT EXISTS search_index_{table}_delete AFTER DELETE ON {table} "
+            f"BEGIN DELETE FROM search_index WHERE rowid = old.id * 4 + {code}; END",
+        ]
+    return statements
+
+
+def get_backend():
+    """The search backend for the configured database; raises NotImplementedError if there is none."""
+    dialect_name = db.engine.dialect.name
+    if dialect_name == 'sqlite':
+        return Fts5SearchBackend()
+    raise NotImplementedError(f"Full-text search is not implemented for the '{dialect_name}' dialect.")
+
+
+def describe_hits(hits):
+    """
+    Resolves hits into response dicts with their context (exam, question, student), using one
+    query per source kind. Hits whose source row vanished meanwhile are dropped.
+    """
+    ids_by_kind = {}
+    for hit in hits:
+        ids_by_kind.setdefault(hit.kind, []).append(hit.ref_id)
+
+    details = {}
+    if ids_by_kind.get(RESPONSE):
+        for row in db.session.query(
+            StudentResponse.id, StudentResponse.question_id, StudentResponse.student_id,
+            User.name.label("student_name"), Exam.title.label("exam_title")
+        ).join(User, StudentResponse.student_id == User.id).join(
+            Exam, StudentResponse.exam_id == Exam.id
+        ).filter(StudentResponse.id.in_(ids_by_kind[RESPONSE])):
+            details[(RESPONSE, row.id)] = {
+                "response_id": row.id, "question_id": row.question_id,
+                "student_id": row.student_id, "student_name": row.student_name, "exam_title": row.exam_title
+            }
+    if ids_by_kind.get(QUESTION):
+        for row in db.session.query(
+            Question.id, Question.question_type, Question.marks, Exam.title.label("exam_title")
+        ).join(Exam, Question.exam_id == Exam.id).filter(Question.id.in_(ids_by_kind[QUESTION])):
+            details[(QUESTION, row.id)] = {
+                "question_id": row.id, "question_type": row.question_type.value,
+                "marks": row.marks, "exam_title": row.exam_title
+            }
+    if ids_by_kind.get(FEEDBACK):
+        for row in db.session.query(
+            Evaluation.id, Evaluation.response_id, Evaluation.marks_awarded, Evaluation.evaluated_by,
+            StudentResponse.question_id, User.name.label("student_name"), Exam.title.label("exam_title")
+        ).join(StudentResponse, Evaluation.response_id == StudentResponse.id).join(
+            User, StudentResponse.student_id == User.id
+        ).join(Exam, StudentResponse.exam_id == Exam.id).filter(Evaluation.id.in_(ids_by_kind[FEEDBACK])):
+            details[(FEEDBACK, row.id)] = {
+                "evaluation_id": row.id, "response_id": row.response_id, "question_id": row.question_id,
+                "marks_awarded": row.marks_awarded, "evaluated_by": row.evaluated_by,
+                "student_name": row.student_name, "exam_title": row.exam_title
+            }
+
+    results = []
+    for hit in hits:
+        context = details.get((hit.kind, hit.ref_id))
+        if context is None:
+            continue
+        results.append({"type": hit.kind, "exam_id": hit.exam_id, "snippet": hit.snippet, "score": hit.score, **context})
+    return results
+
+
+MAX_SEARCH_PER_PAGE = 50
+MAX_SEARCH_RESULTS = 1000 # Deepest result reachable by paging; refine the query instead
+
+
+def parse_search_args(args):
+    """
+    Reads q, type, exam_id, page and per_page from request args.
+    Returns a dict; raises ValueError with a client-facing message on invalid input.
+    """
+    match_query = build_match_query(args.get('q'))
+    if match_query is None:
+        raise ValueError("Missing search text (q).")
+    kind = args.get('type') or None
+    if kind and kind not in KIND_CODES:
+        raise ValueError(f"type must be one of: {', '.join(KIND_CODES)}.")
+    page = args.get('page', 1, type=int)
+    per_page = args.get('per_page', 20, type=int)
+    if page < 1 or per_page < 1:
+        raise ValueError("page and per_page must be positive integers.")
+    per_page = min(per_page, MAX_SEARCH_PER_PAGE)
+    if page * per_page > MAX_SEARCH_RESULTS:
+        raise ValueError(f"Only the first {MAX_SEARCH_RESULTS} results can be paged through; refine the search.")
+    return {
+        "q": args.get('q'), "match": match_query, "type": kind,
+        "exam_id": args.get('exam_id', type=int), "page": page, "per_page": per_page
+    }
+
+
+def search_page(params, owner_id=None):
+    """Runs a search parsed by parse_search_args and returns the response payload for one page."""
+    hits = get_backend().search(
+        params["match"], kind=params["type"], exam_id=params["exam_id"], owner_id=owner_id,
+        limit=params["per_page"] + 1, offset=(params["page"] - 1) * params["per_page"]
+    )
+    has_more = len(hits) > params["per_page"]
+    return {
+        "query": params["q"],
+        "results": describe_hits(hits[:params["per_page"]]),
+        "page": params["page"],
+        "per_page": params["per_page"],
+        "has_more": has_more
+    }
@@ -0,0 +1,128 @@
+# app/services/stats.py
+
+import threading
+from cachetools import TTLCache
+from sqlalchemy import func, update
+from app.extensions import db
+from app.models import StatCounter, User, UserRole, Exam, StudentResponse, Evaluation
+
+# Incremental counters behind the admin dashboard (stat_counters table).
+# Writes that create, verify or delete users, exams, responses or evaluations call bump()
+# inside their own transaction, so a counter commits or rolls back together with the rows
+# it counts. The dashboard reads the counters through a short-lived in-process cache
+# instead of running COUNT(*) over ever-growing tables.
+
+VERIFIED_TEACHERS = 'verified_teachers'
+VERIFIED_STUDENTS = 'verified_students'
+PENDING_USERS = 'pending_users' # Non-admin users awaiting verification
+EXAMS = 'exams'
+RESPONSES = 'responses'
+EVALUATIONS = 'evaluations'
+
+COUNTER_NAMES = (VERIFIED_TEACHERS, VERIFIED_STUDENTS, PENDING_USERS, EXAMS, RESPONSES, EVALUATIONS)
+
+_cache = TTLCache(maxsize=1, ttl=10)
+_cache_lock = threading.Lock()
+
+
+def init_app(app):
+    """Sizes the counter cache from ADMIN_STATS_CACHE_SECONDS."""
+    global _cache
+    _cache = TTLCache(maxsize=1, ttl=app.config['ADMIN_STATS_CACHE_SECONDS'])
+
+
+def bump(**deltas):
+    """
+    Adds deltas to counters, e.g. bump(responses=3, evaluations=-1). Caller commits.
+    Counters are updated with "value = value + delta" so concurrent writers do not lose updates.
+    """
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        result = db.session.execute(
+            update(StatCounter).where(StatCounter.name == name).values(value=StatCounter.value + delta)
+        )
+        if result.rowcount == 0:
+            # Counter row not created yet (fresh database): it starts from this change
+            db.session.add(StatCounter(name=name, value=delta))
+
+
+def bump_user(role, is_verified, delta):
+    """Counts a user entering (+1) or leaving (-1) the counter matching its role and verification."""
+    name = user_counter_name(role, is_verified)
+    if name:
+        bump(**{name: delta})
+
+
+def bump_removed_responses(*criteria):
+    """
+    Uncounts the responses matching `criteria` (and their evaluations) before they are deleted,
+    e.g. bump_removed_responses(StudentResponse.exam_id == exam_id). Caller commits.
+    """
+    response_count = db.session.query(func.count(StudentResponse.id)).filter(*criteria).scalar()
+    evaluation_count = db.session.query(func.count(Evaluation.id)).join(
+        StudentResponse, Evaluation.response_id == StudentResponse.id
+    ).filter(*criteria).scalar()
+    bump(**{RESPONSES: -response_count, EVALUATIONS: -evaluation_count})
+
+
+def user_counter_name(role, is_verified):
+    """The counter a user is counted in, or None (admins are not counted)."""
+    if role == UserRole.ADMIN:
+        return None
+    if not is_verified:
+        return PENDING_USERS
+    return VERIFIED_TEACHERS if role == UserRole.TEACHER else VERIFIED_STUDENTS
+
+
+def get_counters():
+    """Returns {counter name: value}, served from the in-process cache when fresh."""
+    with _cache_lock:
+        counters = _cache.get('counters')
+    if counters is None:
+        counters = dict.fromkeys(COUNTER_NAMES, 0)
+        counters.update(db.session.query(StatCounter.name, StatCounter.value).all())
+        with _cache_lock:
+            _cache['counters'] = counters
+    return counters
+
+
+def compute_counters():
+    """Recomputes every counter from the underlying tables with COUNT queries."""
+    verified_by_role = dict(
+        db.session.query(User.role, func.count(User.id))
+        .filter(User.is_verified == True, User.is_deleted == False)
+        .group_by(User.role)
+    )
+    return {
+        VERIFIED_TEACHERS: verified_by_role.get(UserRole.TEACHER, 0),
+        VERIFIED_STUDENTS: verified_by_role.get(UserRole.STUDENT, 0),
+        PENDING_USERS: User.query.filter(
+            User.is_verified == False, User.role != UserRole.ADMIN, User.is_deleted == False
+        ).count(),
+        # Users and exams stop counting when they are scheduled for deletion; responses and
+        # evaluations when the deletion job actually removes them
+        EXAMS: db.session.query(func.count(Exam.id)).filter(Exam.is_deleted == False).scalar(),
+        RESPONSES: db.session.query(func.count(StudentResponse.id)).scalar(),
+        EVALUATIONS: db.session.query(func.count(Evaluation.id)).scalar()
+    }
+
+
+def reconcile_counters():
+    """
+    Overwrites the stored counters with freshly computed values. Caller commits.
+    Returns a list of (name, stored value or None, actual value) for counters that were off.
+    """
+    stored = dict(db.session.query(StatCounter.name, StatCounter.value).all())
+    drift = []
+    for name, actual in compute_counters().items():
+        if name not in stored:
+            db.session.add(StatCounter(name=name, value=actual))
+        elif stored[name] != actual:
+            db.session.execute(update(StatCounter).where(StatCounter.name == name).values(value=actual))
+        else:
+            continue
+        drift.append((name, stored.get(name), actual))
+    with _cache_lock:
+        _cache.clear()
+    return drift
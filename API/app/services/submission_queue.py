@@ -0,0 +1,380 @@
+# app/services/submission_queue.py
+
+import logging
+import json
+import os
+import threading
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.extensions import db
+from app.models import StudentResponse
+from app.services.submissions import record_submission
+from app.services.scores import get_question_marks
+
+logger = logging.getLogger(__name__)
+
+# Optional write-behind queue for exam submissions (SUBMISSION_QUEUE_ENABLED).
+#
+# At the end of an exam every student submits within the same minute. On SQLite each direct
+# submit takes the database write lock, so concurrent writers fail with "database is locked".
+# In queue mode a validated submission is appended to a local log file and fsync'd before the
+# student gets an acknowledgement; a single drainer thread then moves log entries into
+# student_responses in large transactions.
+#
+# Files in SUBMISSION_QUEUE_DIR (default: <instance>/submission_queue):
+#   submissions.log    - append-only JSON lines, one per submission
+#   submissions.offset - byte offset in the log up to which entries are committed to the DB
+#   drain.lock         - flock held by the one process (across gunicorn workers) that drains
+#   pending/<student_id>-<exam_id> - marker of a queued submission, created (exclusively)
+#                        with the log entry, so a second submit is refused by every worker;
+#                        markers are removed when the log is emptied
+#   dead_letter.log    - entries that could not be written (e.g. the exam was removed), with the error
+#
+# Crash recovery: entries past the stored offset are replayed when a drainer starts.
+# Replays are idempotent because a submission is skipped if the student already has
+# responses for that exam (the same "first submission wins" rule as the endpoint).
+# Each entry is applied in its own SAVEPOINT; one that fails for a reason other than the
+# database being unavailable is moved to the dead-letter file, so it cannot hold up the log.
+# Failed entries (and unreadable lines) are written to the dead-letter file only after their
+# batch commits, so a batch that is rolled back and retried does not dead-letter them twice.
+#
+# Under gunicorn, every worker starts a drainer from the post_worker_init hook (gunicorn.conf.py)
+# and they compete for drain.lock. CLI commands such as "flask db upgrade" never start one; with
+# the development server the drainer starts on the first request.
+
+LOG_FILENAME = 'submissions.log'
+OFFSET_FILENAME = 'submissions.offset'
+LOCK_FILENAME = 'drain.lock'
+PENDING_DIRNAME = 'pending'
+DEAD_LETTER_FILENAME = 'dead_letter.log'
+
+_app = None
+_queue_dir = None
+_append_lock = threading.Lock()
+_state_lock = threading.Lock()
+_wakeup = threading.Event()
+_stopped = threading.Event()
+_drainer = None
+
+
+def init_app(app):
+    """Prepares the queue directory when queue mode is enabled. The drainer is started by start_drainer."""
+    global _app, _queue_dir
+    if not app.config.get('SUBMISSION_QUEUE_ENABLED'):
+        return
+    try:
+        import fcntl # noqa: F401 - POSIX file locking is required for the shared log
+    except ImportError:
+        raise RuntimeError("SUBMISSION_QUEUE_ENABLED requires a POSIX platform (fcntl is unavailable).")
+
+    _app = app
+    _queue_dir = app.config.get('SUBMISSION_QUEUE_DIR') or os.path.join(app.instance_path, 'submission_queue')
+    os.makedirs(os.path.join(_queue_dir, PENDING_DIRNAME), exist_ok=True)
+
+    # Fallback for servers without the gunicorn hook (e.g. "flask run"); a no-op once the drainer runs
+    app.before_request(start_drainer)
+
+
+def is_enabled():
+    return _app is not None
+
+
+def enqueue(student_id, exam_id, answers, submitted_at):
+    """
+    Durably appends a validated submission to the log. Returns True once the entry is fsync'd,
+    or False if a submission of the student for the exam is already queued (by any worker).
+    Args:
+        answers (list): (question_id, response_text) pairs, already validated for the exam.
+    """
+    import fcntl
+    entry = json.dumps({
+        "student_id": student_id,
+        "exam_id": exam_id,
+        "submitted_at": submitted_at.isoformat(),
+        "answers": [[question_id, response_text] for question_id, response_text in answers]
+    }) + "\n"
+
+    with _append_lock:
+        fd = os.open(_path(LOG_FILENAME), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        try:
+            # Exclusive lock: serializes appends across worker processes and with log truncation
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            marker = _pending_marker(student_id, exam_id)
+            try:
+                os.close(os.open(marker, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o640))
+            except FileExistsError:
+                return False
+            try:
+                os.write(fd, entry.encode('utf-8'))
+                os.fsync(fd)
+            except Exception:
+                os.remove(marker)
+                raise
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    _wakeup.set()
+    return True
+
+
+def is_pending(student_id, exam_id):
+    """True if a submission of the student for the exam is queued and the log has not been emptied since."""
+    if _queue_dir is None:
+        return False
+    return os.path.exists(_pending_marker(student_id, exam_id))
+
+
+def drain():
+    """
+    Moves all complete log entries past the stored offset into student_responses.
+    Must run inside an application context by the process holding the drain lock
+    (the drainer thread or the drain-submissions CLI command). Returns the number of submissions applied.
+    """
+    batch_size = _app.config['SUBMISSION_QUEUE_BATCH_SIZE']
+    offset = _read_offset()
+    applied = 0
+
+    log_path = _path(LOG_FILENAME)
+    if not os.path.exists(log_path):
+        return 0
+
+    with open(log_path, 'rb') as log_file:
+        log_file.seek(offset)
+        batch = []
+        unreadable = [] # (line, error), dead-lettered with the batch they were read in
+        position = offset
+        for line in log_file:
+            if not line.endswith(b"\n"):
+                break # Partially written tail entry; it will be complete on the next pass
+            position += len(line)
+            try:
+                batch.append(json.loads(line))
+            except ValueError as e:
+                logger.error('Submission queue: unreadable log entry at offset %s moved to the dead-letter file: %s', position - len(line), e)
+                unreadable.append((line.decode('utf-8', errors='replace').rstrip("\n"), e))
+            if len(batch) >= batch_size:
+                applied += _apply_batch(batch, unreadable)
+                _write_offset(position)
+                batch, unreadable = [], []
+        if batch or unreadable:
+            applied += _apply_batch(batch, unreadable)
+        if position != offset:
+            _write_offset(position)
+
+    _truncate_if_drained()
+    return applied
+
+
+def drain_with_lock():
+    """
+    Drains the log from outside the web workers (drain-submissions CLI command).
+    Returns the number of submissions applied, or None if a running worker holds the drain lock.
+    """
+    import fcntl
+    with open(_path(LOCK_FILENAME), 'a+') as lock_file:
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+        try:
+            return drain()
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def start_drainer():
+    """
+    Starts this process's drainer thread, unless queue mode is disabled or it is already running.
+    Called from gunicorn's post_worker_init hook and, as a fallback, before each request.
+    """
+    global _drainer
+    if _app is None or (_drainer is not None and _drainer.is_alive()):
+        return
+    with _state_lock:
+        if _drainer is not None and _drainer.is_alive():
+            return
+        _drainer = threading.Thread(target=_run_drainer, name='submission-drainer', daemon=True)
+        _drainer.start()
+
+
+def shutdown():
+    _stopped.set()
+    _wakeup.set()
+
+
+def _apply_batch(entries, unreadable=()):
+    """
+    Writes a batch of log entries in one transaction, skipping students who already submitted.
+    Entries that fail, and the batch's `unreadable` (line, error) pairs, are moved to the
+    dead-letter file once the transaction commits; errors of the database itself
+    (locked, unavailable) roll the batch back and are raised, so it is retried.
+    """
+    parsed = []
+    malformed = list(unreadable) # (entry or line, error) without a pending marker to remove
+    for entry in entries:
+        try:
+            parsed.append((entry, _parse_entry(entry)))
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error('Submission queue: malformed entry moved to the dead-letter file: %s', e)
+            malformed.append((entry, e))
+    pairs = {(student_id, exam_id) for _, (student_id, exam_id, _, _) in parsed}
+    existing = set(
+        db.session.query(StudentResponse.student_id, StudentResponse.exam_id).filter(
+            StudentResponse.exam_id.in_({exam_id for _, exam_id in pairs}),
+            StudentResponse.student_id.in_({student_id for student_id, _ in pairs})
+        ).distinct()
+    ) if pairs else set()
+
+    applied = 0
+    failed = [] # (entry, error), dead-lettered once the batch is committed
+    question_marks_by_exam = {} # A batch is mostly one exam's deadline rush; look its marks up once
+    try:
+        _begin_batch_transaction()
+        for entry, (student_id, exam_id, answers, submitted_at) in parsed:
+            key = (student_id, exam_id)
+            if key in existing:
+                continue # Already in the DB (replay after a crash, or a duplicate submit)
+            try:
+                with db.session.begin_nested():
+                    if exam_id not in question_marks_by_exam:
+                        question_marks_by_exam[exam_id] = get_question_marks(exam_id)
+                    record_submission(
+                        student_id=student_id,
+                        exam_id=exam_id,
+                        answers=answers,
+                        submitted_at=submitted_at,
+                        question_marks=question_marks_by_exam[exam_id]
+                    )
+            except OperationalError:
+                raise # The database is locked or unreachable: retry the whole batch later
+            except Exception as e:
+                logger.error('Submission queue: submission of student %s for exam %s moved to the dead-letter file: %s', student_id, exam_id, e)
+                failed.append((entry, e))
+                continue
+            existing.add(key)
+            applied += 1
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for entry, error in malformed:
+        _dead_letter(entry, error)
+    for entry, error in failed:
+        _dead_letter(entry, error)
+        _remove_pending_marker(entry['student_id'], entry['exam_id']) # The student may submit again
+    return applied
+
+
+def _parse_entry(entry):
+    """(student_id, exam_id, answers, submitted_at) of a log entry; raises KeyError/TypeError/ValueError if malformed."""
+    student_id, exam_id = entry['student_id'], entry['exam_id']
+    if not isinstance(student_id, int) or not isinstance(exam_id, int):
+        raise ValueError("student_id and exam_id must be integers")
+    answers = [(question_id, response_text) for question_id, response_text in entry['answers']]
+    return student_id, exam_id, answers, datetime.fromisoformat(entry['submitted_at'])
+
+
+def _begin_batch_transaction():
+    """
+    Opens the batch transaction on the connection before the first SAVEPOINT. pysqlite only
+    begins one before a DML statement, and releasing a SAVEPOINT opened outside a transaction
+    would commit that entry on its own.
+    """
+    if db.session.get_bind().dialect.name == 'sqlite':
+        connection = db.session.connection()
+        if not connection.connection.dbapi_connection.in_transaction:
+            db.session.execute(text("BEGIN IMMEDIATE")) # Take the write lock for the whole batch up front
+
+
+def _dead_letter(entry, error):
+    """Appends a failed entry (or unreadable line) and its error to the dead-letter file."""
+    record = json.dumps({"failed_at": datetime.utcnow().isoformat(), "error": str(error), "entry": entry}, default=str) + "\n"
+    with open(_path(DEAD_LETTER_FILENAME), 'a') as f:
+        f.write(record)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _pending_marker(student_id, exam_id):
+    return os.path.join(_queue_dir, PENDING_DIRNAME, f"{student_id}-{exam_id}")
+
+
+def _remove_pending_marker(student_id, exam_id):
+    try:
+        os.remove(_pending_marker(student_id, exam_id))
+    except FileNotFoundError:
+        pass
+
+
+def _truncate_if_drained():
+    """Empties the log once every entry is committed, so it does not grow without bound."""
+    import fcntl
+    log_path = _path(LOG_FILENAME)
+    with open(log_path, 'ab') as log_file:
+        fcntl.flock(log_file.fileno(), fcntl.LOCK_EX)
+        try:
+            if os.path.getsize(log_path) == _read_offset():
+                log_file.truncate(0)
+                os.fsync(log_file.fileno())
+                _write_offset(0)
+                # Every queued submission is now in the DB (or dead-lettered), and no enqueue can
+                # be creating a marker while the log lock is held
+                pending_dir = os.path.join(_queue_dir, PENDING_DIRNAME)
+                for filename in os.listdir(pending_dir):
+                    os.remove(os.path.join(pending_dir, filename))
+        finally:
+            fcntl.flock(log_file.fileno(), fcntl.LOCK_UN)
+
+
+def _read_offset():
+    try:
+        with open(_path(OFFSET_FILENAME), 'r') as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _write_offset(offset):
+    """Atomically replaces the offset file (write temp file, fsync, rename)."""
+    tmp_path = _path(OFFSET_FILENAME + '.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(str(offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, _path(OFFSET_FILENAME))
+
+
+def _path(filename):
+    return os.path.join(_queue_dir, filename)
+
+
+def _run_drainer():
+    """Competes for the drain lock; the winner replays any backlog and then drains on an interval."""
+    import fcntl
+    interval = _app.config['SUBMISSION_QUEUE_DRAIN_INTERVAL_SECONDS']
+    lock_file = open(_path(LOCK_FILENAME), 'a+')
+    holding_lock = False
+    while not _stopped.is_set():
+        if not holding_lock:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                holding_lock = True
+                logger.info('Submission queue: process %s is now the drainer', os.getpid())
+            except BlockingIOError:
+                # Another worker drains; retry later in case that process exits
+                _stopped.wait(interval * 5)
+                continue
+
+        with _app.app_context():
+            try:
+                applied = drain()
+                if applied:
+                    logger.info('Submission queue: %s submissions written to the database', applied)
+            except Exception as e:
+                logger.exception('Submission queue: drain failed, will retry: %s', e)
+        _wakeup.wait(interval)
+        _wakeup.clear()
+    lock_file.close()
@@ -0,0 +1,40 @@
+# app/services/submissions.py
+
+from app.extensions import db
+from app.models import StudentResponse, ExamDraft
+from app.services.scores import record_submission_score
+from app.services import stats
+
+# Single place where a student's exam submission is written to the database.
+# Used both by the submit endpoint (direct mode) and by the submission queue drainer,
+# so everything that must happen when a submission lands happens in both paths.
+
+
+def record_submission(student_id, exam_id, answers, submitted_at, question_marks=None):
+    """
+    Adds the responses of one submission to the current session, creates the student's
+    exam_scores row, counts the responses and drops the student's draft. The caller owns the transaction (commit/rollback).
+    Args:
+        answers (list): (question_id, response_text) pairs, already validated for the exam.
+        submitted_at (datetime): Naive UTC submission time.
+        question_marks (dict): Optional {question_id: marks} for the exam (see record_submission_score).
+    Returns:
+        list: The new StudentResponse objects.
+    """
+    responses = [
+        StudentResponse(
+            student_id=student_id,
+            exam_id=exam_id,
+            question_id=question_id,
+            response_text=response_text,
+            submitted_at=submitted_at
+        )
+        for question_id, response_text in answers
+    ]
+    db.session.add_all(responses)
+    record_submission_score(
+        student_id, exam_id, [question_id for question_id, _ in answers], submitted_at, question_marks
+    )
+    ExamDraft.query.filter_by(student_id=student_id, exam_id=exam_id).delete(synchronize_session=False)
+    stats.bump(responses=len(responses))
+    return responses
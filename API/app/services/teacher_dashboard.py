@@ -0,0 +1,156 @@
+# app/services/teacher_dashboard.py
+
+import threading
+from datetime import datetime, timedelta
+from cachetools import TTLCache
+from sqlalchemy import event, func, case
+from sqlalchemy.orm import object_session
+from app.extensions import db
+from app.models import Exam, ExamScore
+from app.services.scores import CHANGED_EXAMS_KEY
+from app.utils.helpers import format_datetime
+
+# Teacher dashboard: per-exam submission/evaluation figures for all of a teacher's exams, read
+# with one query grouped by exam over exams LEFT JOIN exam_scores, and cached per teacher.
+# A teacher's entry is dropped as soon as a transaction commits that changes one of their exams
+# (create/update/delete via the mapper events below, question writes via note_exams_changed)
+# or its scores (submissions and evaluations, via the exams scores.py records in the session).
+# Other worker processes pick the change up when their entry expires
+# (TEACHER_DASHBOARD_CACHE_SECONDS). Exam statuses are derived
+# from the cached schedule on every read, so they never lag behind the clock.
+
+SUBMISSIONS_WINDOW = timedelta(hours=24)
+STALE_TEACHERS_KEY = 'teacher_dashboard_stale_teachers'
+STALE_EXAMS_KEY = 'teacher_dashboard_stale_exams'
+
+_cache = TTLCache(maxsize=1024, ttl=30)
+_cache_lock = threading.Lock()
+
+
+def init_app(app):
+    """Sets the per-teacher cache lifetime from TEACHER_DASHBOARD_CACHE_SECONDS."""
+    global _cache
+    _cache = TTLCache(maxsize=1024, ttl=app.config['TEACHER_DASHBOARD_CACHE_SECONDS'])
+
+
+@event.listens_for(Exam, 'after_insert')
+@event.listens_for(Exam, 'after_update')
+def _note_exam_written(mapper, connection, exam):
+    session = object_session(exam)
+    if session is not None:
+        session.info.setdefault(STALE_TEACHERS_KEY, set()).add(exam.created_by)
+
+
+def note_exams_changed(exam_ids):
+    """Marks exams whose dashboard figures the current transaction changes."""
+    db.session.info.setdefault(STALE_EXAMS_KEY, set()).update(exam_ids)
+
+
+@event.listens_for(db.session, 'before_commit')
+def _note_scores_changed(session):
+    # rankings.py pops CHANGED_EXAMS_KEY after the commit; keep our own copy
+    exam_ids = session.info.get(CHANGED_EXAMS_KEY)
+    if exam_ids:
+        session.info.setdefault(STALE_EXAMS_KEY, set()).update(exam_ids)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(session):
+    teacher_ids = session.info.pop(STALE_TEACHERS_KEY, None)
+    exam_ids = session.info.pop(STALE_EXAMS_KEY, None)
+    if teacher_ids or exam_ids:
+        invalidate(teacher_ids or (), exam_ids or ())
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop(STALE_TEACHERS_KEY, None)
+    session.info.pop(STALE_EXAMS_KEY, None)
+
+
+def invalidate(teacher_ids=(), exam_ids=()):
+    """Drops the cached dashboards of the given teachers and of the owners of the given exams."""
+    exam_ids = set(exam_ids)
+    with _cache_lock:
+        for teacher_id, (teacher_exam_ids, _) in list(_cache.items()):
+            if teacher_id in teacher_ids or not teacher_exam_ids.isdisjoint(exam_ids):
+                _cache.pop(teacher_id, None)
+
+
+def get_dashboard(teacher_id):
+    """Returns the dashboard dict for a teacher, from the cache when fresh."""
+    with _cache_lock:
+        cached = _cache.get(teacher_id)
+    if cached is None:
+        exams, generated_at = _load_exams(teacher_id), datetime.utcnow()
+        cached = (frozenset(exam["id"] for exam in exams), (exams, generated_at))
+        with _cache_lock:
+            _cache[teacher_id] = cached
+        from_cache = False
+    else:
+        from_cache = True
+    exams, generated_at = cached[1]
+
+    now = datetime.utcnow()
+    status_counts = {"upcoming": 0, "active": 0, "finished": 0}
+    exam_data = []
+    for exam in exams:
+        status = _exam_status(exam["scheduled_time"], exam["duration_minutes"], now)
+        status_counts[status] += 1
+        exam_data.append(dict(
+            {key: value for key, value in exam.items() if key != "scheduled_time"},
+            scheduled_time_utc=format_datetime(exam["scheduled_time"]),
+            status=status.capitalize()
+        ))
+    return {
+        "message": "Teacher Dashboard",
+        "my_exams_count": len(exams),
+        "exam_status_counts": status_counts,
+        "submissions_last_24h": sum(exam["submissions_last_24h"] for exam in exams),
+        "pending_evaluations": sum(exam["pending_evaluations"] for exam in exams),
+        "exams": exam_data,
+        "generated_at_utc": format_datetime(generated_at),
+        "cached": from_cache
+    }
+
+
+def _exam_status(scheduled_time, duration_minutes, now):
+    if now < scheduled_time:
+        return "upcoming"
+    if now < scheduled_time + timedelta(minutes=duration_minutes):
+        return "active"
+    return "finished"
+
+
+def _load_exams(teacher_id):
+    """One grouped query: every live exam of the teacher with its exam_scores aggregates."""
+    since = datetime.utcnow() - SUBMISSIONS_WINDOW
+    fully_evaluated = ExamScore.pending_count == 0
+    rows = db.session.query(
+        Exam.id, Exam.title, Exam.scheduled_time, Exam.duration, Exam.question_count, Exam.total_marks,
+        func.count(ExamScore.id).label("submissions"),
+        func.coalesce(func.sum(case((ExamScore.submitted_at >= since, 1), else_=0)), 0).label("recent"),
+        func.coalesce(func.sum(ExamScore.pending_count), 0).label("pending"),
+        func.coalesce(func.sum(case((fully_evaluated, 1), else_=0)), 0).label("evaluated"),
+        func.avg(case((fully_evaluated, ExamScore.marks_awarded))).label("average")
+    ).outerjoin(
+        ExamScore, ExamScore.exam_id == Exam.id
+    ).filter(
+        Exam.created_by == teacher_id, Exam.is_deleted == False # Served by ix_exams_created_by_scheduled_time
+    ).group_by(Exam.id).order_by(Exam.scheduled_time.desc(), Exam.id.desc()).all()
+
+    return [{
+        "id": row.id,
+        "title": row.title,
+        "scheduled_time": row.scheduled_time,
+        "duration_minutes": row.duration,
+        "question_count": row.question_count,
+        "total_marks": row.total_marks,
+        "submissions": row.submissions,
+        "submissions_last_24h": int(row.recent),
+        "pending_evaluations": int(row.pending), # Answers still awaiting evaluation
+        "fully_evaluated": int(row.evaluated),
+        # Over fully evaluated submissions only
+        "average_marks": round(row.average, 2) if row.average is not None else None,
+        "average_percentage": round(row.average / row.total_marks * 100, 2) if row.average is not None and row.total_marks else None
+    } for row in rows]
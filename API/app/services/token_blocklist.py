@@ -0,0 +1,144 @@
+# app/services/token_blocklist.py
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from flask_jwt_extended import decode_token
+from app.extensions import db
+from app.models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Revoked JWTs, checked on every authenticated request without a database query.
+# Revocations are rows in revoked_tokens; each process keeps them in memory (revoked JTIs and
+# per-user "revoked before" cut-offs) and loads only rows with a higher id than it has seen,
+# at most every REVOKED_TOKENS_SYNC_SECONDS. A revocation made in this process applies at once;
+# other processes apply it on their next sync. Entries are dropped from memory, and rows can be
+# purged ("flask purge-revoked-tokens"), once the tokens they revoke have expired anyway.
+
+ALL_TOKENS = 'all'
+SYNC_OVERLAP_ROWS = 100 # Re-read this many already seen ids, for rows committed out of id order
+
+_revoked = {} # jti -> expiry (datetime) of the revoked token
+_user_cutoffs = {} # user_id -> (cut-off, expiry): tokens issued up to the cut-off (naive UTC) are revoked
+_last_id = 0
+_last_sync = None # time.monotonic() of the last sync, None before the first
+_sync_seconds = 5
+_longest_lifetime = timedelta(days=30) # Longest access/refresh token lifetime
+_lock = threading.Lock()
+
+
+def init_app(app, jwt):
+    """Registers the blocklist check with Flask-JWT-Extended and reads the sync interval."""
+    global _sync_seconds, _longest_lifetime
+    _sync_seconds = app.config['REVOKED_TOKENS_SYNC_SECONDS']
+    _longest_lifetime = max(app.config['JWT_ACCESS_TOKEN_EXPIRES'], app.config['JWT_REFRESH_TOKEN_EXPIRES'])
+
+    @jwt.token_in_blocklist_loader
+    def _check_if_token_revoked(jwt_header, jwt_payload):
+        return is_revoked(jwt_payload)
+
+
+def is_revoked(jwt_payload):
+    """True if the token was revoked (by jti, or by a cut-off for its user)."""
+    _sync_if_due()
+    if jwt_payload.get('jti') in _revoked:
+        return True
+    cutoff = _user_cutoffs.get(_user_id(jwt_payload))
+    issued_at = jwt_payload.get('iat')
+    return cutoff is not None and issued_at is not None and datetime.utcfromtimestamp(issued_at) <= cutoff[0]
+
+
+def revoke_token(jwt_payload):
+    """Revokes one decoded token (e.g. at logout or refresh token rotation). Caller commits."""
+    expires_at = datetime.utcfromtimestamp(jwt_payload['exp']) if jwt_payload.get('exp') else datetime.utcnow() + timedelta(days=365)
+    db.session.add(RevokedToken(
+        jti=jwt_payload['jti'],
+        token_type=jwt_payload.get('type', 'access'),
+        user_id=_user_id(jwt_payload),
+        expires_at=expires_at
+    ))
+    with _lock:
+        _revoked[jwt_payload['jti']] = expires_at # Kept even if the caller rolls back: fails safe
+
+
+def revoke_encoded_token(encoded_token, user_id=None):
+    """
+    Revokes a token given as a string (e.g. the refresh token sent at logout). Caller commits.
+    Returns False if it is invalid or, with user_id, belongs to another user.
+    """
+    try:
+        payload = decode_token(encoded_token, allow_expired=True)
+    except Exception:
+        return False
+    if user_id is not None and _user_id(payload) != user_id:
+        return False
+    if payload.get('jti') in _revoked:
+        return True
+    revoke_token(payload)
+    return True
+
+
+def revoke_all_for_user(user_id):
+    """Revokes every token issued to a user until now. Caller commits."""
+    now = datetime.utcnow().replace(microsecond=0) # iat has second resolution
+    db.session.add(RevokedToken(
+        jti=None, token_type=ALL_TOKENS, user_id=user_id, revoked_at=now, expires_at=now + _longest_lifetime
+    ))
+    with _lock:
+        _add_cutoff(user_id, now, now + _longest_lifetime)
+
+
+def _add_cutoff(user_id, cutoff, expires_at):
+    current = _user_cutoffs.get(user_id)
+    if current is None or cutoff > current[0]:
+        _user_cutoffs[user_id] = (cutoff, max(expires_at, current[1]) if current else expires_at)
+
+
+def purge_expired():
+    """Deletes revocation rows whose tokens have expired. Caller commits. Returns the number deleted."""
+    return RevokedToken.query.filter(RevokedToken.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+
+
+def _user_id(jwt_payload):
+    user_info = jwt_payload.get('user_info') or {}
+    try:
+        return int(user_info.get('id', jwt_payload.get('sub')))
+    except (TypeError, ValueError):
+        return None
+
+
+def _sync_if_due():
+    global _last_id, _last_sync
+    now = time.monotonic()
+    if _last_sync is not None and now - _last_sync < _sync_seconds:
+        return
+    with _lock:
+        if _last_sync is not None and now - _last_sync < _sync_seconds:
+            return # Another thread synced meanwhile
+        _last_sync = now
+        last_id = _last_id
+    try:
+        rows = db.session.query(
+            RevokedToken.id, RevokedToken.jti, RevokedToken.user_id, RevokedToken.revoked_at, RevokedToken.expires_at
+        ).filter(RevokedToken.id > last_id - SYNC_OVERLAP_ROWS).order_by(RevokedToken.id).all()
+    except Exception as e:
+        logger.exception('Token blocklist sync failed, keeping the previous state: %s', e)
+        return
+    utc_now = datetime.utcnow()
+    with _lock:
+        for row_id, jti, user_id, revoked_at, expires_at in rows:
+            if expires_at < utc_now:
+                continue
+            if jti:
+                _revoked[jti] = expires_at
+            elif user_id is not None:
+                _add_cutoff(user_id, revoked_at, expires_at)
+        if rows:
+            _last_id = max(_last_id, rows[-1][0])
+        # Forget revocations of tokens that have expired anyway
+        for jti in [jti for jti, expires_at in _revoked.items() if expires_at < utc_now]:
+            del _revoked[jti]
+        for user_id in [user_id for user_id, (_, expires_at) in _user_cutoffs.items() if expires_at < utc_now]:
+            del _user_cutoffs[user_id]
@@ -0,0 +1,87 @@
+# app/services/user_cache.py
+
+import threading
+from collections import namedtuple
+from cachetools import TTLCache
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from app.extensions import db
+from app.models import User
+
+# Short-lived in-process cache of what the auth decorators need to know about a user:
+# id -> (role, is_verified), for live (not deleted) accounts only.
+# The decorators resolve the current user once per request (flask.g) and, with a warm cache,
+# without touching the users table. An entry is dropped as soon as a transaction that changes
+# the user commits in this process (ORM writes via the mapper events below, bulk Core updates
+# via note_users_changed); other processes see the change once their entry expires
+# (USER_CACHE_SECONDS, 0 disables the cache). Deleting a user also revokes their tokens
+# (token_blocklist), so other processes reject them within REVOKED_TOKENS_SYNC_SECONDS, before
+# their cached entry is ever consulted. Verification needs no such step: it only widens access.
+
+AuthUser = namedtuple('AuthUser', ['id', 'role', 'is_verified'])
+
+STALE_USERS_KEY = 'user_cache_stale_users'
+
+_cache = None # TTLCache, or None when disabled
+_cache_lock = threading.Lock()
+
+
+def init_app(app):
+    """Sizes the cache from USER_CACHE_SECONDS / USER_CACHE_SIZE (disabled when the lifetime is 0)."""
+    global _cache
+    ttl = app.config['USER_CACHE_SECONDS']
+    _cache = TTLCache(maxsize=app.config['USER_CACHE_SIZE'], ttl=ttl) if ttl > 0 else None
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _note_user_written(mapper, connection, user):
+    session = object_session(user)
+    if session is not None:
+        session.info.setdefault(STALE_USERS_KEY, set()).add(user.id)
+
+
+def note_users_changed(user_ids):
+    """Marks users changed by a bulk (Core) statement in the current transaction."""
+    db.session.info.setdefault(STALE_USERS_KEY, set()).update(user_ids)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(session):
+    user_ids = session.info.pop(STALE_USERS_KEY, None)
+    if user_ids:
+        invalidate(user_ids)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop(STALE_USERS_KEY, None)
+
+
+def invalidate(user_ids):
+    """Drops cached entries of the given users."""
+    if _cache is None:
+        return
+    with _cache_lock:
+        for user_id in user_ids:
+            _cache.pop(user_id, None)
+
+
+def get_auth_user(user_id):
+    """Returns the AuthUser for a live account, from the cache when fresh; None if not found or deleted."""
+    if _cache is not None:
+        with _cache_lock:
+            cached = _cache.get(user_id)
+        if cached is not None:
+            return cached
+
+    row = db.session.query(User.id, User.role, User.is_verified).filter(
+        User.id == user_id, User.is_deleted == False # Accounts scheduled for deletion are treated as gone
+    ).first()
+    if row is None:
+        return None # Not cached, so a user created later is found right away
+    auth_user = AuthUser(row.id, row.role, row.is_verified)
+    if _cache is not None:
+        with _cache_lock:
+            _cache[user_id] = auth_user
+    return auth_user
@@ -0,0 +1,128 @@
+# app/services/user_import.py
+
+import logging
+import csv
+from sqlalchemy import insert
+from app.extensions import db
+from app.models import User, UserRole
+from app.services import stats
+from app.services.passwords import hash_passwords
+
+logger = logging.getLogger(__name__)
+
+# CSV import of users (a new intake of students, typically), used by "flask import-users" and
+# POST /admin/users/import. The file is read row by row; valid rows are collected into chunks,
+# hashed in the password process pool and inserted with one executemany per chunk. Each chunk
+# is committed on its own, so a large file never sits in one transaction and a failing chunk
+# only loses its own rows. Invalid rows are skipped and reported with their line number.
+
+REQUIRED_COLUMNS = ('name', 'email', 'password')
+IMPORTABLE_ROLES = (UserRole.STUDENT, UserRole.TEACHER) # Admins are only created with "flask create-admin"
+MAX_REPORTED_ERRORS = 1000 # Beyond this only error_count keeps growing
+
+
+def parse_role(value, default=UserRole.STUDENT):
+    """Maps 'student'/'Teacher'/... to an importable UserRole; empty means default. Raises ValueError."""
+    if not value or not value.strip():
+        return default
+    try:
+        role = UserRole[value.strip().upper()]
+    except KeyError:
+        role = None
+    if role not in IMPORTABLE_ROLES:
+        raise ValueError(f"Invalid role '{value.strip()}'. Choose from: {', '.join(r.value for r in IMPORTABLE_ROLES)}")
+    return role
+
+
+def import_users(text_stream, default_role=UserRole.STUDENT, verified=False, chunk_size=500):
+    """
+    Imports users from a CSV text stream with a header row containing name, email, password
+    and optionally role (defaults to `default_role`). Commits after every chunk.
+    Raises ValueError if the header is missing required columns.
+    Returns a report dict: rows, created, error_count and errors ([{"line", "email", "msg"}]).
+    """
+    reader = csv.DictReader(text_stream)
+    header = [(column or '').strip().lower() for column in (reader.fieldnames or [])]
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"CSV header is missing required columns: {', '.join(missing)}")
+    reader.fieldnames = header
+
+    report = {"rows": 0, "created": 0, "error_count": 0, "errors": []}
+    seen_emails = set()
+    chunk = [] # (line, name, email, password, role)
+    for row in reader:
+        report["rows"] += 1
+        line = reader.line_num
+        name = (row.get('name') or '').strip()
+        email = (row.get('email') or '').strip()
+        password = row.get('password') or ''
+
+        if not name or not email or not password:
+            _add_error(report, line, email, "Missing required fields: name, email, or password")
+            continue
+        if '@' not in email or '.' not in email.split('@')[-1]:
+            _add_error(report, line, email, "Invalid email format")
+            continue
+        if email in seen_emails:
+            _add_error(report, line, email, "Duplicate email in this file")
+            continue
+        try:
+            role = parse_role(row.get('role'), default_role)
+        except ValueError as e:
+            _add_error(report, line, email, str(e))
+            continue
+
+        seen_emails.add(email)
+        chunk.append((line, name, email, password, role))
+        if len(chunk) >= chunk_size:
+            _insert_chunk(chunk, verified, report)
+            chunk = []
+
+    if chunk:
+        _insert_chunk(chunk, verified, report)
+    report["errors"].sort(key=lambda error: error["line"])
+    return report
+
+
+def _add_error(report, line, email, msg):
+    report["error_count"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"line": line, "email": email or None, "msg": msg})
+
+
+def _insert_chunk(chunk, verified, report):
+    """Inserts one chunk of validated rows (skipping already registered emails) and commits it."""
+    existing = {
+        email for (email,) in db.session.query(User.email).filter(User.email.in_([entry[2] for entry in chunk]))
+    }
+    new_users = []
+    for line, name, email, password, role in chunk:
+        if email in existing:
+            _add_error(report, line, email, "Email address already registered")
+        else:
+            new_users.append((line, name, email, password, role))
+    if not new_users:
+        return
+
+    hashes = hash_passwords([entry[3] for entry in new_users])
+    rows = [{
+        "name": name,
+        "email": email,
+        "password_hash": password_hash,
+        "role": role,
+        "is_verified": verified
+    } for (_, name, email, _, role), password_hash in zip(new_users, hashes)]
+
+    try:
+        db.session.execute(insert(User), rows)
+        for role in IMPORTABLE_ROLES:
+            stats.bump_user(role, verified, sum(1 for entry in new_users if entry[4] == role))
+        db.session.commit()
+        report["created"] += len(rows)
+    except Exception as e:
+        # E.g. an email registered concurrently since the existence check: the whole chunk is rejected
+        db.session.rollback()
+        logger.exception('Error inserting import chunk (lines %s-%s): %s', new_users[0][0], new_users[-1][0], e)
+        for line, _, email, _, _ in new_users:
+            _add_error(report, line, email, "Could not be inserted (database error); retry the import for this row")
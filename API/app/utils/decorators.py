@@ -1,41 +1,55 @@
 # app/utils/decorators.py
 
+import logging
 from functools import wraps
-from flask_jwt_extended import verify_jwt_in_request # Verifies JWT presence and validity
-from flask import jsonify
-from app.models import User, UserRole # Import User model for DB lookups
+from flask_jwt_extended import verify_jwt_in_request, get_jwt # Verifies JWT presence and validity
+from flask import jsonify, g
+from app.models import UserRole
+from app.services import user_cache # Cached (role, is_verified) per user id
 # Import helper functions to get user details from verified JWT claims
 from app.utils.helpers import get_current_user_id, get_current_user_role
+from app.utils.logging_setup import SAMPLED # Marks high-volume debug records for sampling
 
-# Helper function (internal to this module or could be moved to helpers if used elsewhere)
-# to fetch the User object based on the ID found in the JWT claims.
+logger = logging.getLogger(__name__)
+
+def _verify_jwt_once():
+    """
+    Runs verify_jwt_in_request() unless the JWT of this request was already verified
+    (by @jwt_required() or another decorator). Raises like verify_jwt_in_request().
+    """
+    try:
+        get_jwt() # Raises RuntimeError until the request's JWT has been verified
+    except RuntimeError:
+        verify_jwt_in_request()
+
+# Resolves the user of the verified JWT claims once per request (stored on flask.g) through the
+# process-level user cache, so stacked decorators and warm caches cost no extra DB lookups.
 def _get_user_from_verified_claims():
     """
-    Retrieves the User object from DB based on the ID in verified JWT claims.
+    Retrieves the AuthUser (id, role, is_verified) for the ID in verified JWT claims.
     Should only be called *after* verify_jwt_in_request().
-    Returns User object or None.
+    Returns AuthUser or None.
     """
+    if 'current_user' in g:
+        return g.current_user # Already resolved for this request
     user_id = get_current_user_id() # Get ID from claims
+    user = None
     if user_id is not None:
          try:
-             # Attempt to query the database for the user
-             # Ensure user_id type matches User.id type (e.g., handle int conversion if needed)
-             user = User.query.get(int(user_id))
+             user = user_cache.get_auth_user(int(user_id))
              if user:
-                 print(f"--- Decorator helper: Found user {user.id} from claims ---")
-                 return user
+                 logger.debug('Decorator helper: Found user %s from claims', user.id, extra=SAMPLED)
              else:
-                 print(f"!!! Decorator helper: User with ID {user_id} from claims NOT found in DB.")
-                 return None
+                 logger.warning('Decorator helper: User with ID %s from claims NOT found in DB.', user_id)
          except ValueError:
-             print(f"!!! Decorator helper: Could not convert user ID '{user_id}' from claims to integer.")
-             return None
+             logger.error("Decorator helper: Could not convert user ID '%s' from claims to integer.", user_id)
          except Exception as e:
-             print(f"!!! Decorator helper: DB Error fetching user {user_id}: {e}")
-             return None # Treat DB errors as failure to find user
+             logger.exception('Decorator helper: DB Error fetching user %s: %s', user_id, e)
+             return None # Treat DB errors as failure to find user (not remembered, may be transient)
     else:
-         print(f"!!! Decorator helper: Failed to get user ID from claims.")
-         return None
+         logger.warning('Decorator helper: Failed to get user ID from claims.')
+    g.current_user = user
+    return user
 
 # --- Role Required Decorator ---
 def role_required(required_role_enum):
@@ -48,32 +62,32 @@ def role_required(required_role_enum):
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            print(f"\n>>> Entering role_required decorator for: {required_role_enum.name}")
+            logger.debug('Entering role_required decorator for: %s', required_role_enum.name, extra=SAMPLED)
             # 1. Verify JWT is present and valid (signature, expiry)
             try:
-                verify_jwt_in_request()
+                _verify_jwt_once()
             except Exception as e:
                  # Handles errors like missing token, expired token, invalid signature etc.
-                 print(f"!!! JWT verification failed in role_required: {e}")
+                 logger.info('JWT verification failed in role_required: %s', e)
                  # Customize message based on exception type if needed
                  return jsonify({"msg": "Authorization Error: Invalid or missing token."}), 401
 
             # 2. Get user's role from the verified JWT's claims
             user_role_str = get_current_user_role()
-            print(f"--- Role from claims: {user_role_str} ---")
+            logger.debug('Role from claims: %s', user_role_str, extra=SAMPLED)
 
             if not user_role_str:
-                 print(f"!!! Role missing in JWT claims.")
+                 logger.warning('Role missing in JWT claims.')
                  # This shouldn't happen if token creation includes the role claim
                  return jsonify({"msg": "Unauthorized: Role information missing."}), 401
 
             # 3. Check if the role matches the required role
             if user_role_str != required_role_enum.name:
-                print(f"!!! Role mismatch. Required: {required_role_enum.name}, Found: {user_role_str}")
+                logger.info('Role mismatch. Required: %s, Found: %s', required_role_enum.name, user_role_str)
                 return jsonify({"msg": f"Forbidden: Access restricted to {required_role_enum.value}."}), 403
 
             # 4. Role matches, proceed to the wrapped function
-            print(f"<<< Role check PASSED ({required_role_enum.name}). Proceeding to: {fn.__name__}")
+            logger.debug('Role check PASSED (%s). Proceeding to: %s', required_role_enum.name, fn.__name__, extra=SAMPLED)
             return fn(*args, **kwargs)
         return wrapper
     return decorator
@@ -91,12 +105,12 @@ def verified_required(fn):
     """
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        print(f"\n>>> Entering verified_required decorator")
+        logger.debug('Entering verified_required decorator', extra=SAMPLED)
         # 1. Verify JWT is present and valid
         try:
-            verify_jwt_in_request()
+            _verify_jwt_once()
         except Exception as e:
-             print(f"!!! JWT verification failed in verified_required: {e}")
+             logger.info('JWT verification failed in verified_required: %s', e)
              return jsonify({"msg": "Authorization Error: Invalid or missing token."}), 401
 
         # 2. Get the user object from DB based on verified JWT claims
@@ -107,19 +121,52 @@ def verified_required(fn):
             # - User ID missing/invalid in claims
             # - User ID in claims but user deleted from DB since token issuance
             # - DB error during lookup
-            print(f"!!! User object could not be retrieved from DB in verified_required.")
+            logger.warning('User object could not be retrieved from DB in verified_required.')
             # Return 401 as the token might be valid but doesn't map to a current user
             return jsonify({"msg": "Unauthorized: User associated with token not found or invalid."}), 401
 
         # 3. Check the user's verification status
         if not user.is_verified:
-            print(f"!!! User {user.email} (ID: {user.id}) is not verified.")
+            logger.info('User %s is not verified.', user.id)
             return jsonify({"msg": "Forbidden: Your account requires verification by an administrator."}), 403
 
         # 4. User is verified, proceed to the wrapped function
-        print(f"<<< Verification check PASSED for user {user.id}. Proceeding to: {fn.__name__}")
+        logger.debug('Verification check PASSED for user %s. Proceeding to: %s', user.id, fn.__name__, extra=SAMPLED)
         return fn(*args, **kwargs)
     return wrapper
 
-# No changes were required here as decorators operate on JWT claims and DB lookups,
-# independent of the internal datetime storage format.
\ No newline at end of file
+# --- Combined Role + Verified Account Decorator ---
+def verified_role_required(required_role_enum):
+    """
+    Decorator factory equivalent to stacking role_required(required_role_enum) and
+    verified_required, with a single JWT verification and user lookup. The role is checked
+    against the user's stored role rather than the token claim.
+    Args:
+        required_role_enum (UserRole): The enum member (e.g., UserRole.STUDENT).
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                _verify_jwt_once()
+            except Exception as e:
+                 logger.info('JWT verification failed in verified_role_required: %s', e)
+                 return jsonify({"msg": "Authorization Error: Invalid or missing token."}), 401
+
+            user = _get_user_from_verified_claims()
+            if not user:
+                logger.warning('User could not be resolved in verified_role_required.')
+                return jsonify({"msg": "Unauthorized: User associated with token not found or invalid."}), 401
+            if user.role != required_role_enum:
+                logger.info('Role mismatch. Required: %s, Found: %s', required_role_enum.name, user.role.name)
+                return jsonify({"msg": f"Forbidden: Access restricted to {required_role_enum.value}."}), 403
+            if not user.is_verified:
+                logger.info('User %s is not verified.', user.id)
+                return jsonify({"msg": "Forbidden: Your account requires verification by an administrator."}), 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+verified_admin_required = verified_role_required(UserRole.ADMIN)
+verified_teacher_required = verified_role_required(UserRole.TEACHER)
+verified_student_required = verified_role_required(UserRole.STUDENT)
@@ -1,9 +1,18 @@
 # app/utils/helpers.py
 
+import logging
+import base64
+import binascii
+import json
 from flask_jwt_extended import get_jwt
+from sqlalchemy import tuple_
+from cachetools import TTLCache
+from app.extensions import db
 # Standard datetime library (might be needed for parsing elsewhere, but format_datetime uses the object directly)
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 # Removed pendulum and timezone imports
 
 def format_datetime(dt):
@@ -12,13 +21,113 @@ def format_datetime(dt):
         return None
     if not isinstance(dt, datetime):
         # Add a check in case something else is passed
-        print(f"!!! WARNING: format_datetime received non-datetime object: {type(dt)}. Returning None.")
+        logger.warning('format_datetime received non-datetime object: %s. Returning None.', type(dt))
         return None
     # isoformat() on a naive datetime produces a string without timezone info,
     # which is standard for representing naive UTC.
     # Example: 2023-10-27T10:30:00
     return dt.isoformat()
 
+def upsert_statement(model, index_elements, update_columns, newer_column=None):
+    """
+    Builds an INSERT ... ON CONFLICT DO UPDATE statement for the model's table.
+    Execute it with a list of row dicts to upsert many rows in one executemany.
+    With newer_column, an existing row is only updated if the new row's value in that column is greater.
+    Supports the SQLite and PostgreSQL dialects.
+    """
+    dialect_name = db.engine.dialect.name
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upsert is not supported for the '{dialect_name}' dialect.")
+
+    stmt = insert(model.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: stmt.excluded[column] for column in update_columns},
+        where=(model.__table__.c[newer_column] < stmt.excluded[newer_column]) if newer_column else None
+    )
+
+def encode_cursor(sort_value, row_id):
+    """
+    Encodes the (sort value, id) key of the last row on a page as an opaque cursor string.
+    The sort value is a timestamp, a string (e.g. a lower-cased name) or an integer ID.
+    """
+    if isinstance(sort_value, datetime):
+        key = [sort_value.isoformat(), row_id]
+    elif isinstance(sort_value, int):
+        key = [sort_value, row_id, 'i']
+    else:
+        key = [sort_value, row_id, 's'] # Tagged so decode_cursor keeps it as a string
+    payload = json.dumps(key, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor made by encode_cursor. Returns (naive datetime, string or integer, id);
+    raises ValueError if malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if len(key) == 3 and key[2] == 's' and isinstance(key[0], str):
+            return key[0], int(key[1])
+        if len(key) == 3 and key[2] == 'i':
+            return int(key[0]), int(key[1])
+        timestamp, row_id = key
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (TypeError, ValueError, UnicodeError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+# --- Keyset pagination (admin listings, teacher results summary) ---
+
+# Approximate totals per listing and filter set, so paging through a listing does not recount it
+_listing_total_cache = TTLCache(maxsize=256, ttl=60)
+
+def fetch_keyset_page(query, sort_column, id_column, args, descending=True):
+    """
+    Orders `query` by (sort column, id), newest first unless descending=False, and fetches one page
+    after the cursor. Returns (rows, next_cursor); rows must expose the two sort columns as
+    `sort_value` and `sort_id`. The sort column is a timestamp, a string (the user directories)
+    or an integer ID (the teacher results summary).
+    """
+    per_page = args["per_page"]
+    sort_key = tuple_(sort_column, id_column)
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    if args["cursor"]:
+        query = query.filter(sort_key < args["cursor"] if descending else sort_key > args["cursor"])
+    elif args["page"] and args["page"] > 1:
+        query = query.offset((args["page"] - 1) * per_page) # Legacy page-number access
+
+    rows = query.limit(per_page + 1).all() # One extra row tells us whether another page exists
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    return rows, encode_cursor(rows[-1].sort_value, rows[-1].sort_id)
+
+def approximate_total(cache_key, count_query):
+    """Returns the cached row count for a listing, running `count_query` when it has expired."""
+    total = _listing_total_cache.get(cache_key)
+    if total is None:
+        total = count_query.scalar() or 0
+        _listing_total_cache[cache_key] = total
+    return total
+
+def pagination_payload(args, next_cursor, total=None):
+    """Pagination fields of a listing response (legacy page fields only when `page` was used)."""
+    payload = {"next_cursor": next_cursor, "has_more": next_cursor is not None, "per_page": args["per_page"]}
+    if total is not None:
+        payload["approximate_total"] = total
+    if args["page"] and not args["cursor"]:
+        payload["current_page"] = args["page"]
+        payload["total_pages"] = -(-total // args["per_page"]) if total is not None else None
+    return payload
+
 # --- JWT Helper Functions (No changes needed) ---
 
 def get_current_user_id():
@@ -32,11 +141,11 @@ def get_current_user_id():
              # return int(user_id)
              return user_id # Assuming ID is stored/used as comes from token (usually int or string)
         else:
-            print("!!! WARNING: User ID not found in JWT 'user_info' claim.")
+            logger.warning("User ID not found in JWT 'user_info' claim.")
             return None
     except Exception as e:
         # Catch potential errors during JWT processing, although flask_jwt_extended usually handles basic validation
-        print(f"!!! ERROR: Exception while getting user ID from JWT: {e}")
+        logger.error('Exception while getting user ID from JWT: %s', e)
         return None
 
 def get_current_user_role():
@@ -48,10 +157,10 @@ def get_current_user_role():
         if role:
             return role # Returns the role string (e.g., 'Admin', 'Teacher')
         else:
-            print("!!! WARNING: User role not found in JWT 'user_info' claim.")
+            logger.warning("User role not found in JWT 'user_info' claim.")
             return None
     except Exception as e:
-        print(f"!!! ERROR: Exception while getting user role from JWT: {e}")
+        logger.error('Exception while getting user role from JWT: %s', e)
         return None
 
 def get_current_user_claims():
@@ -60,5 +169,5 @@ def get_current_user_claims():
         jwt_data = get_jwt()
         return jwt_data.get('user_info', {})
     except Exception as e:
-        print(f"!!! ERROR: Exception while getting user claims from JWT: {e}")
+        logger.error('Exception while getting user claims from JWT: %s', e)
         return {} # Return empty dict on error
\ No newline at end of file
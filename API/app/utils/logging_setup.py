@@ -0,0 +1,145 @@
+# app/utils/logging_setup.py
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Logging for the application's own loggers: "app" and one child per module
+# (logging.getLogger(__name__)). Request threads only put records on a bounded in-memory queue;
+# a listener thread formats them (JSON lines by default) and writes them to stdout. When the
+# queue is full, records are dropped and counted rather than waited for; the count is logged as
+# a warning once the queue has room again, and when the listener stops.
+# High-volume per-request messages (auth decorators, endpoint entry) are logged at DEBUG with
+# extra=SAMPLED and only a LOG_SAMPLE_RATE share of them is kept. The default level is
+# WARNING, or DEBUG when the app runs in debug mode; LOG_LEVEL overrides it.
+
+SAMPLED = {"sampled": True} # Pass as extra= to subject a record to sampling
+
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'sampled'}
+_listener = None
+_queue_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, thread, exc (if any) and any extra= fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps every record except those logged with extra=SAMPLED, which are kept with probability `rate`."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if not getattr(record, 'sampled', False) or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: records arriving while the queue is full are counted in `dropped`."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0 # Total since start
+        self.unreported = 0 # Dropped since the last "records dropped" warning
+
+    def prepare(self, record):
+        # Render message arguments and traceback now (they may not survive until the listener
+        # runs), leaving the layout to the listener's formatter
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        # Called under the handler lock, so the counters need no lock of their own
+        try:
+            if self.unreported:
+                self.queue.put_nowait(self.dropped_record())
+                self.unreported = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self.unreported += 1
+
+    def dropped_record(self):
+        """Warning record stating how many records were dropped since the last one."""
+        return logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            f"{self.unreported} log records dropped because the log queue was full ({self.dropped} in total)",
+            None, None
+        )
+
+
+def configure_logging(app):
+    """Sets up the "app" logger from LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATE and LOG_QUEUE_SIZE."""
+    global _listener, _queue_handler
+    _stop_listener() # Reconfigured (e.g. a second app in the same process)
+
+    level = app.config.get('LOG_LEVEL') or ('DEBUG' if app.debug else 'WARNING')
+    logger = logging.getLogger('app')
+    logger.setLevel(level.upper())
+    logger.propagate = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    output = logging.StreamHandler(sys.stdout)
+    if app.config.get('LOG_FORMAT', 'json') == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s'))
+
+    queue_size = app.config.get('LOG_QUEUE_SIZE', 10000)
+    if queue_size > 0:
+        handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        _listener = QueueListener(handler.queue, output)
+        _listener.start()
+        _queue_handler = handler
+    else:
+        handler = output # Synchronous, e.g. for debugging the logging itself
+    handler.addFilter(SamplingFilter(app.config.get('LOG_SAMPLE_RATE', 1.0)))
+    logger.addHandler(handler)
+
+
+def _stop_listener():
+    """Stops the listener thread after it has written out what is still queued, then reports drops not yet logged."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        if _queue_handler.unreported:
+            record = _queue_handler.dropped_record()
+            for output in _listener.handlers:
+                output.handle(record)
+        _listener = None
+        _queue_handler = None
+
+
+atexit.register(_stop_listener)
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,4 +10,55 @@ class Config:
         'sqlite:///app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'fallback-jwt-secret-key'
-    GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
\ No newline at end of file
+    # Short-lived access tokens, renewed with rotating refresh tokens via POST /auth/refresh
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=float(os.environ.get('JWT_ACCESS_TOKEN_MINUTES', 15)))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(hours=float(os.environ.get('JWT_REFRESH_TOKEN_HOURS', 168)))
+    # Each process reloads new token revocations (revoked_tokens table) at most this often
+    REVOKED_TOKENS_SYNC_SECONDS = float(os.environ.get('REVOKED_TOKENS_SYNC_SECONDS', 5))
+    GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+    # Answer autosave: buffered drafts are flushed to the DB in batches on this interval
+    DRAFT_FLUSH_INTERVAL_SECONDS = float(os.environ.get('DRAFT_FLUSH_INTERVAL_SECONDS', 2))
+    DRAFT_FLUSH_BATCH_SIZE = int(os.environ.get('DRAFT_FLUSH_BATCH_SIZE', 500))
+    DRAFT_SPOOL_DIR = os.environ.get('DRAFT_SPOOL_DIR') # Unflushed autosaves readable by every worker; defaults to <instance>/draft_spool
+    # Write-behind submission queue (see app/services/submission_queue.py); off by default
+    SUBMISSION_QUEUE_ENABLED = os.environ.get('SUBMISSION_QUEUE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    SUBMISSION_QUEUE_DIR = os.environ.get('SUBMISSION_QUEUE_DIR') # Defaults to <instance>/submission_queue
+    SUBMISSION_QUEUE_DRAIN_INTERVAL_SECONDS = float(os.environ.get('SUBMISSION_QUEUE_DRAIN_INTERVAL_SECONDS', 1))
+    SUBMISSION_QUEUE_BATCH_SIZE = int(os.environ.get('SUBMISSION_QUEUE_BATCH_SIZE', 1000))
+    # Admin dashboard counters are cached in-process for this many seconds
+    ADMIN_STATS_CACHE_SECONDS = float(os.environ.get('ADMIN_STATS_CACHE_SECONDS', 10))
+    # Bulk user import: rows inserted per chunk, and processes used to hash passwords (default: CPU count)
+    USER_IMPORT_CHUNK_SIZE = int(os.environ.get('USER_IMPORT_CHUNK_SIZE', 500))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None
+    # Password hashing: method with parameters for new hashes (older hashes are upgraded on login), and the
+    # bound on login/registration hash operations queued for the pool before requests get 503
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 0)) or None # Default: 16 per worker
+    # Bulk (import) hashes queued or running at a time; further ones wait, so logins are not stuck behind an import
+    PASSWORD_HASH_MAX_BATCH_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_BATCH_PENDING', 0)) or None # Default: 1 per worker
+    PASSWORD_HASH_TIMEOUT_SECONDS = float(os.environ.get('PASSWORD_HASH_TIMEOUT_SECONDS', 30))
+    PASSWORD_HASH_IN_POOL = os.environ.get('PASSWORD_HASH_IN_POOL', 'true').lower() in ('1', 'true', 'yes') # Else hash in the request thread
+    # Exam/user deletions run as background jobs: rows removed per transaction and pause between chunks
+    DELETION_CHUNK_SIZE = int(os.environ.get('DELETION_CHUNK_SIZE', 1000))
+    DELETION_CHUNK_PAUSE_SECONDS = float(os.environ.get('DELETION_CHUNK_PAUSE_SECONDS', 0.05))
+    DELETION_JOBS_IN_BACKGROUND = os.environ.get('DELETION_JOBS_IN_BACKGROUND', 'true').lower() in ('1', 'true', 'yes') # Else only "flask run-deletion-jobs"
+    DELETION_JOB_POLL_SECONDS = float(os.environ.get('DELETION_JOB_POLL_SECONDS', 30)) # Worker re-checks for jobs queued by other processes
+    DELETION_JOB_STALE_SECONDS = float(os.environ.get('DELETION_JOB_STALE_SECONDS', 300)) # A running job without progress for this long is requeued
+    # Item analysis results kept in memory (one per exam; recomputed whenever the exam's scores change)
+    ITEM_ANALYSIS_CACHE_SIZE = int(os.environ.get('ITEM_ANALYSIS_CACHE_SIZE', 64))
+    # Teacher dashboards are cached per teacher for this many seconds (dropped earlier when the teacher's exams or scores change)
+    TEACHER_DASHBOARD_CACHE_SECONDS = float(os.environ.get('TEACHER_DASHBOARD_CACHE_SECONDS', 30))
+    # Auth decorators cache each user's role/verification in-process for this many seconds (0 disables)
+    USER_CACHE_SECONDS = float(os.environ.get('USER_CACHE_SECONDS', 10))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+    # Ranks/percentiles are recomputed in the background this many seconds after an exam's scores change
+    RANKINGS_REFRESH_DELAY_SECONDS = float(os.environ.get('RANKINGS_REFRESH_DELAY_SECONDS', 5))
+    RANKINGS_REFRESH_IN_BACKGROUND = os.environ.get('RANKINGS_REFRESH_IN_BACKGROUND', 'true').lower() in ('1', 'true', 'yes') # Else only "flask refresh-rankings"
+    # Application log level (DEBUG/INFO/WARNING/ERROR); unset means DEBUG in debug mode, WARNING otherwise
+    LOG_LEVEL = os.environ.get('LOG_LEVEL')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json') # 'json' (one object per line) or 'text'
+    LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 0.01)) # Share of high-volume debug messages kept
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000)) # Records buffered for the writer thread (0 writes synchronously)
+    # Request/DB/Gemini metrics on GET /metrics (Prometheus text format)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') # Required: scrapers send "Authorization: Bearer <token>"; without it /metrics is off
@@ -0,0 +1,36 @@
+# gunicorn.conf.py
+# Read by gunicorn when it is started from this directory (command-line options still apply).
+
+import glob
+import os
+
+# Each worker keeps its metrics in files here and GET /metrics sums them (prometheus_client
+# multiprocess mode). Set before the workers import the app.
+os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'prometheus_metrics')
+)
+
+# Imported after the variable is set (prometheus_client reads it on import), and here rather than
+# in child_exit: that runs in a signal handler, where a first import can fail during shutdown.
+from prometheus_client import multiprocess # noqa: E402
+
+
+def on_starting(server):
+    """Starts with empty metric files, so counters of a previous run are not summed in."""
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(path, exist_ok=True)
+    for filename in glob.glob(os.path.join(path, '*.db')):
+        os.remove(filename)
+
+
+def child_exit(server, worker):
+    """Drops the in-flight gauge of a worker that exited; its counters stay in the totals."""
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    """Starts the worker's background threads once it has loaded the app (never in CLI commands)."""
+    from app.services import submission_queue, deletion_jobs
+    submission_queue.start_drainer()
+    deletion_jobs.start_worker()
@@ -0,0 +1,69 @@
+"""full text search index
+
+Revision ID: 8ef39de9f53c
+Revises: 5eda35de23cd
+Create Date: 2026-10-19 08:29:46.024933
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8ef39de9f53c'
+down_revision = '5eda35de23cd'
+branch_labels = None
+depends_on = None
+
+
+# Documents: (kind code, table, text column, exam id of a row). rowid = source id * 4 + kind code.
+# Mirrors app/services/search.py as of this revision.
+SOURCES = (
+    (1, 'student_responses', 'response_text', '{row}.exam_id'),
+    (2, 'questions', 'question_text', '{row}.exam_id'),
+    (3, 'evaluations', 'feedback', '(SELECT exam_id FROM student_responses WHERE id = {row}.response_id)'),
+)
+
+
+def upgrade():
+    # FTS5 is SQLite-only; other databases get no index (search reports it as unavailable)
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute(
+        "CREATE VIRTUAL TABLE search_index "
+        "USING fts5(body, exam_id UNINDEXED, tokenize = 'porter unicode61')"
+    )
+    for code, table, column, exam_expression in SOURCES:
+        new_document = (
+            f"INSERT INTO search_index(rowid, body, exam_id) "
+            f"SELECT new.id * 4 + {code}, new.{column}, {exam_expression.format(row='new')} "
+            f"WHERE new.{column} IS NOT NULL AND new.{column} != '';"
+        )
+        op.execute(
+            f"CREATE TRIGGER search_index_{table}_insert AFTER INSERT ON {table} "
+            f"BEGIN {new_document} END"
+        )
+        op.execute(
+            f"CREATE TRIGGER search_index_{table}_update AFTER UPDATE OF {column} ON {table} "
+            f"BEGIN DELETE FROM search_index WHERE rowid = old.id * 4 + {code}; {new_document} END"
+        )
+        op.execute(
+            f"CREATE TRIGGER search_index_{table}_delete AFTER DELETE ON {table} "
+            f"BEGIN DELETE FROM search_index WHERE rowid = old.id * 4 + {code}; END"
+        )
+        # Index the existing rows
+        op.execute(
+            f"INSERT INTO search_index(rowid, body, exam_id) "
+            f"SELECT id * 4 + {code}, {column}, {exam_expression.format(row=table)} "
+            f"FROM {table} WHERE {column} IS NOT NULL AND {column} != ''"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for _, table, _, _ in SOURCES:
+        for event in ('insert', 'update', 'delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS search_index_{table}_{event}")
+    op.execute("DROP TABLE IF EXISTS search_index")
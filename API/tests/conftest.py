@@ -0,0 +1,130 @@
+# tests/conftest.py
+
+import itertools
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from flask_migrate import upgrade
+from app import create_app
+from app.extensions import db
+from app.models import User, UserRole, StudentResponse
+from app.services import stats
+from config import Config
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+PASSWORD = 'secret-password'
+
+_user_numbers = itertools.count(1)
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """Application on a temporary SQLite database with the schema built by the migrations."""
+    data_dir = tmp_path_factory.mktemp('data')
+
+    class TestConfig(Config):
+        TESTING = True
+        JWT_SECRET_KEY = 'test-jwt-secret-key-of-32-bytes!' # Long enough for HS256 without warnings
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{data_dir / 'test.db'}"
+        DRAFT_SPOOL_DIR = str(data_dir / 'draft_spool')
+        DRAFT_FLUSH_INTERVAL_SECONDS = 3600 # Tests flush explicitly
+        DELETION_JOBS_IN_BACKGROUND = False
+        RANKINGS_REFRESH_IN_BACKGROUND = False
+        METRICS_ENABLED = False
+        PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+        PASSWORD_HASH_IN_POOL = False
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        upgrade(directory=MIGRATIONS_DIR) # Indexes as deployed, not just those declared on the models
+    yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app, client):
+    """
+    Creates a verified account and logs it in through the API. Returns a namespace with
+    id, email, tokens (the login response) and headers (Authorization with the access token).
+    """
+    def make_user(role=UserRole.STUDENT):
+        number = next(_user_numbers)
+        email = f"{role.name.lower()}{number}@example.com"
+        with app.app_context():
+            user = User(name=f"{role.value} {number}", email=email, role=role, is_verified=True)
+            user.set_password(PASSWORD)
+            db.session.add(user)
+            stats.bump_user(role, True, 1)
+            db.session.commit()
+            user_id = user.id
+        tokens = login(client, email)
+        return SimpleNamespace(id=user_id, email=email, tokens=tokens, headers=bearer(tokens['access_token']))
+    return make_user
+
+
+@pytest.fixture
+def make_exam(client):
+    """
+    Creates an exam with questions through the teacher API. Returns a namespace with
+    id, question_ids and question_marks (in question order).
+    Args (of the returned function):
+        marks (list): Marks of each question; the first is an MCQ, the rest short answers.
+        starts_in (timedelta): Offset of the scheduled time from now (negative: already running).
+    """
+    def make_exam(teacher, marks=(2, 5, 5), starts_in=timedelta(minutes=-5), duration_minutes=60):
+        response = client.post('/teacher/exams', headers=teacher.headers, json={
+            "title": f"Exam {next(_user_numbers)}",
+            "scheduled_time_utc": (datetime.utcnow() + starts_in).isoformat(timespec='seconds'),
+            "duration_minutes": duration_minutes
+        })
+        assert response.status_code == 201, response.get_json()
+        exam_id = response.get_json()["exam"]["id"]
+        questions = [
+            {"question_text": "Pick one", "question_type": "MCQ", "marks": mark,
+             "options": {"a": "A", "b": "B"}, "correct_answer": "a"} if index == 0 else
+            {"question_text": f"Explain {index}", "question_type": "Short Answer", "marks": mark}
+            for index, mark in enumerate(marks)
+        ]
+        response = client.post(f'/teacher/exams/{exam_id}/questions/bulk', headers=teacher.headers, json=questions)
+        assert response.status_code == 201, response.get_json()
+        listed = client.get(f'/teacher/exams/{exam_id}/questions', headers=teacher.headers).get_json()
+        return SimpleNamespace(
+            id=exam_id,
+            question_ids=[question["id"] for question in listed],
+            question_marks=[question["marks"] for question in listed]
+        )
+    return make_exam
+
+
+def login(client, email, password=PASSWORD):
+    """Logs in through the API and returns the token payload."""
+    response = client.post('/auth/login', json={"email": email, "password": password})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def submit(client, student, exam, answers):
+    """Submits {question_id: response_text} for the student; returns the response."""
+    return client.post(f'/student/exams/{exam.id}/submit', headers=student.headers, json={
+        "answers": [{"question_id": question_id, "response_text": text} for question_id, text in answers.items()]
+    })
+
+
+def response_ids(app, exam, question_id=None):
+    """{(student_id, question_id): response id} of an exam's stored responses."""
+    with app.app_context():
+        query = db.session.query(StudentResponse.student_id, StudentResponse.question_id, StudentResponse.id).filter(
+            StudentResponse.exam_id == exam.id
+        )
+        if question_id is not None:
+            query = query.filter(StudentResponse.question_id == question_id)
+        return {(student_id, q_id): response_id for student_id, q_id, response_id in query}
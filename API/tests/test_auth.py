@@ -0,0 +1,31 @@
+# tests/test_auth.py
+
+from app.models import UserRole
+from conftest import bearer
+
+
+def test_refresh_rotates_and_rejects_the_old_token(client, make_user):
+    student = make_user()
+    old_refresh = student.tokens["refresh_token"]
+
+    response = client.post('/auth/refresh', headers=bearer(old_refresh))
+    assert response.status_code == 200
+    tokens = response.get_json()
+    assert tokens["refresh_token"] != old_refresh
+    assert client.get('/auth/me', headers=bearer(tokens["access_token"])).status_code == 200
+
+    reused = client.post('/auth/refresh', headers=bearer(old_refresh))
+    assert reused.status_code == 401
+    assert reused.get_json()["msg"] == "Token has been revoked"
+
+    # The rotated token works once, like the first
+    assert client.post('/auth/refresh', headers=bearer(tokens["refresh_token"])).status_code == 200
+
+
+def test_tokens_of_a_deleted_user_are_revoked(client, make_user):
+    admin, student = make_user(UserRole.ADMIN), make_user()
+    assert client.get('/student/dashboard', headers=student.headers).status_code == 200
+
+    assert client.delete(f'/admin/users/{student.id}', headers=admin.headers).status_code == 202
+    assert client.get('/student/dashboard', headers=student.headers).status_code == 401
+    assert client.post('/auth/refresh', headers=bearer(student.tokens["refresh_token"])).status_code == 401
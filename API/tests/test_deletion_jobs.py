@@ -0,0 +1,84 @@
+# tests/test_deletion_jobs.py
+
+from datetime import datetime, timedelta
+import pytest
+from app.extensions import db
+from app.models import UserRole, DeletionJob, StatCounter, StudentResponse
+from app.services import deletion_jobs, stats
+from conftest import submit, response_ids
+
+
+@pytest.fixture
+def small_chunks(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'DELETION_CHUNK_SIZE', 1)
+    monkeypatch.setitem(app.config, 'DELETION_CHUNK_PAUSE_SECONDS', 0)
+
+
+def _counters(app):
+    with app.app_context():
+        return dict(db.session.query(StatCounter.name, StatCounter.value))
+
+
+def _run_jobs(app):
+    with app.app_context():
+        return deletion_jobs.run_pending_jobs()
+
+
+def _exam_with_submissions(client, app, make_user, make_exam):
+    """An exam with three responses of two students, one of them graded. Returns (teacher, exam)."""
+    admin, teacher = make_user(UserRole.ADMIN), make_user(UserRole.TEACHER)
+    exam = make_exam(teacher)
+    first, second = make_user(), make_user()
+    submit(client, first, exam, {exam.question_ids[0]: "a", exam.question_ids[1]: "x"})
+    submit(client, second, exam, {exam.question_ids[1]: "y"})
+    graded = response_ids(app, exam)[(first.id, exam.question_ids[1])]
+    response = client.post('/admin/evaluate/bulk', headers=admin.headers, json={"evaluations": [{"response_id": graded, "marks": 3}]})
+    assert response.status_code == 200
+    return teacher, exam
+
+
+def test_chunked_exam_deletion_updates_counters(app, client, small_chunks, make_user, make_exam):
+    teacher, exam = _exam_with_submissions(client, app, make_user, make_exam)
+    before = _counters(app)
+
+    response = client.delete(f'/teacher/exams/{exam.id}', headers=teacher.headers)
+    assert response.status_code == 202
+    job_id = response.get_json()["deletion_job"]["job_id"]
+    assert _counters(app)[stats.EXAMS] == before[stats.EXAMS] - 1 # Hidden right away
+
+    assert _run_jobs(app) >= 1
+    after = _counters(app)
+    assert after[stats.RESPONSES] == before[stats.RESPONSES] - 3
+    assert after[stats.EVALUATIONS] == before[stats.EVALUATIONS] - 1
+    with app.app_context():
+        assert StudentResponse.query.filter_by(exam_id=exam.id).count() == 0
+
+    job = client.get(f'/teacher/deletion-jobs/{job_id}', headers=teacher.headers).get_json()
+    assert job["status"] == deletion_jobs.COMPLETED
+    assert job["rows_deleted"] == job["rows_total"] > 3 # One chunk per row, questions and exam included
+    assert job["percent_complete"] == 100.0
+
+
+def test_job_of_a_dead_worker_is_requeued(app, client, make_user, make_exam):
+    teacher = make_user(UserRole.TEACHER)
+    stale_exam, live_exam = make_exam(teacher), make_exam(teacher)
+    stale_job = client.delete(f'/teacher/exams/{stale_exam.id}', headers=teacher.headers).get_json()["deletion_job"]["job_id"]
+    live_job = client.delete(f'/teacher/exams/{live_exam.id}', headers=teacher.headers).get_json()["deletion_job"]["job_id"]
+
+    # Both were claimed; only the first one's runner stopped sending heartbeats
+    now = datetime.utcnow()
+    stale_seconds = app.config['DELETION_JOB_STALE_SECONDS']
+    with app.app_context():
+        for job_id, heartbeat_at in ((stale_job, now - timedelta(seconds=stale_seconds + 60)), (live_job, now)):
+            job = db.session.get(DeletionJob, job_id)
+            job.status, job.started_at, job.heartbeat_at = deletion_jobs.RUNNING, heartbeat_at, heartbeat_at
+        db.session.commit()
+
+    _run_jobs(app)
+    with app.app_context():
+        assert db.session.get(DeletionJob, stale_job).status == deletion_jobs.COMPLETED
+        assert db.session.get(DeletionJob, live_job).status == deletion_jobs.RUNNING # Still owned by its worker
+
+        db.session.get(DeletionJob, live_job).status = deletion_jobs.PENDING
+        db.session.commit()
+    _run_jobs(app) # Leave no job behind for other tests
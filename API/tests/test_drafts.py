@@ -0,0 +1,85 @@
+# tests/test_drafts.py
+
+import json
+import os
+from datetime import timedelta
+from app.extensions import db
+from app.models import UserRole, ExamDraft
+from app.services import draft_buffer
+from conftest import submit
+
+
+def _stored_drafts(app, student, exam):
+    with app.app_context():
+        return dict(db.session.query(ExamDraft.question_id, ExamDraft.response_text).filter_by(
+            student_id=student.id, exam_id=exam.id
+        ))
+
+
+def _save_draft(client, student, exam, answers):
+    return client.put(f'/student/exams/{exam.id}/draft', headers=student.headers, json={
+        "answers": [{"question_id": question_id, "response_text": text} for question_id, text in answers.items()]
+    })
+
+
+def test_autosave_is_spooled_then_flushed(app, client, make_user, make_exam):
+    student, exam = make_user(), make_exam(make_user(UserRole.TEACHER))
+    q1, q2 = exam.question_ids[1:]
+
+    response = _save_draft(client, student, exam, {q1: "first", q2: "draft"})
+    assert response.status_code == 202
+    _save_draft(client, student, exam, {q1: "second"})
+
+    # Unflushed saves are in this process's spool and already served by GET draft
+    spool_path = os.path.join(draft_buffer._spool_dir, f"{os.getpid()}{draft_buffer.SPOOL_SUFFIX}")
+    assert os.path.getsize(spool_path) > 0
+    answers = client.get(f'/student/exams/{exam.id}/draft', headers=student.headers).get_json()["answers"]
+    assert {a["question_id"]: a["response_text"] for a in answers} == {q1: "second", q2: "draft"}
+
+    with app.app_context():
+        assert draft_buffer.flush() >= 2
+    assert _stored_drafts(app, student, exam) == {q1: "second", q2: "draft"}
+    assert os.path.getsize(spool_path) == 0 # Flushed lines leave the spool
+
+
+def test_spool_of_exited_worker_is_adopted(app, make_user, make_exam):
+    student, exam = make_user(), make_exam(make_user(UserRole.TEACHER))
+    q1 = exam.question_ids[1]
+    saved_at = "2030-01-01T00:00:00"
+    orphan = os.path.join(draft_buffer._spool_dir, f"999999999{draft_buffer.SPOOL_SUFFIX}") # No process holds its lock
+    with open(orphan, 'w') as f:
+        f.write(json.dumps([student.id, exam.id, q1, "left behind", saved_at]) + "\n")
+        f.write('[1,2,3,"partial line') # Written by a worker that died mid-save; ignored
+
+    with app.app_context():
+        draft_buffer._adopt_orphaned_spools()
+
+    assert _stored_drafts(app, student, exam) == {q1: "left behind"}
+    assert not os.path.exists(orphan)
+
+
+def test_drafts_of_submitted_exams_are_pruned(app, client, make_user, make_exam):
+    student, exam = make_user(), make_exam(make_user(UserRole.TEACHER))
+    q0, q1 = exam.question_ids[:2]
+    _save_draft(client, student, exam, {q1: "draft"})
+
+    assert submit(client, student, exam, {q0: "a", q1: "final"}).status_code == 200
+    assert _stored_drafts(app, student, exam) == {}
+
+    # Saves another worker still buffers for the exam are dropped when they are flushed
+    draft_buffer.buffer_answers(student.id, exam.id, {q1: "late autosave"})
+    with app.app_context():
+        draft_buffer.flush()
+    assert _stored_drafts(app, student, exam) == {}
+
+
+def test_draft_rejected_after_submit_and_before_start(client, make_user, make_exam):
+    student, teacher = make_user(), make_user(UserRole.TEACHER)
+    upcoming = make_exam(teacher, starts_in=timedelta(hours=1))
+    response = _save_draft(client, student, upcoming, {upcoming.question_ids[1]: "early"})
+    assert response.status_code == 403
+
+    exam = make_exam(teacher)
+    assert submit(client, student, exam, {exam.question_ids[0]: "a"}).status_code == 200
+    response = _save_draft(client, student, exam, {exam.question_ids[1]: "after submit"})
+    assert response.status_code == 403
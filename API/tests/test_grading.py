@@ -0,0 +1,90 @@
+# tests/test_grading.py
+
+from app.extensions import db
+from app.models import UserRole, Evaluation, ExamScore
+from app.services.scores import rebuild_all_scores
+from conftest import submit, response_ids
+
+
+def _grade(client, admin, evaluations, question_id=None):
+    payload = {"evaluations": [{"response_id": response_id, "marks": marks} for response_id, marks in evaluations]}
+    if question_id is not None:
+        payload["question_id"] = question_id
+    return client.post('/admin/evaluate/bulk', headers=admin.headers, json=payload)
+
+
+def _scores(app, exam):
+    """{student_id: (marks_awarded, marks_possible, evaluated_count, pending_count)} of an exam."""
+    with app.app_context():
+        return {
+            row.student_id: (row.marks_awarded, row.marks_possible, row.evaluated_count, row.pending_count)
+            for row in ExamScore.query.filter_by(exam_id=exam.id)
+        }
+
+
+def test_bulk_grading_rejects_marks_above_question_maximum(app, client, make_user, make_exam):
+    admin, exam = make_user(UserRole.ADMIN), make_exam(make_user(UserRole.TEACHER))
+    question_id = exam.question_ids[1] # Worth 5 marks
+    students = [make_user(), make_user()]
+    for student in students:
+        submit(client, student, exam, {question_id: "answer"})
+    responses = response_ids(app, exam, question_id)
+    before = _scores(app, exam)
+
+    response = _grade(client, admin, [
+        (responses[(students[0].id, question_id)], 4),
+        (responses[(students[1].id, question_id)], 6)
+    ], question_id=question_id)
+
+    assert response.status_code == 400
+    assert [(error["index"], error["msg"]) for error in response.get_json()["errors"]] == [(1, "marks must be between 0 and 5.")]
+    with app.app_context(): # The valid entry was not saved either
+        assert Evaluation.query.filter(Evaluation.response_id.in_(responses.values())).count() == 0
+    assert _scores(app, exam) == before
+
+
+def test_bulk_grading_reports_created_and_updated(app, client, make_user, make_exam):
+    admin, exam = make_user(UserRole.ADMIN), make_exam(make_user(UserRole.TEACHER))
+    question_id = exam.question_ids[2]
+    students = [make_user(), make_user()]
+    for student in students:
+        submit(client, student, exam, {question_id: "answer"})
+    first, second = (response_ids(app, exam)[(student.id, question_id)] for student in students)
+
+    response = _grade(client, admin, [(first, 3)])
+    assert response.status_code == 200
+    assert (response.get_json()["created"], response.get_json()["updated"]) == (1, 0)
+
+    response = _grade(client, admin, [(first, 5), (second, 2.5)], question_id=question_id)
+    assert response.status_code == 200
+    assert (response.get_json()["created"], response.get_json()["updated"]) == (1, 1)
+    with app.app_context():
+        assert dict(db.session.query(Evaluation.response_id, Evaluation.marks_awarded).filter(
+            Evaluation.response_id.in_([first, second])
+        )) == {first: 5.0, second: 2.5}
+
+
+def test_incremental_scores_match_a_rebuild(app, client, make_user, make_exam):
+    admin, exam = make_user(UserRole.ADMIN), make_exam(make_user(UserRole.TEACHER))
+    q0, q1, q2 = exam.question_ids
+    full, partial, ungraded = make_user(), make_user(), make_user()
+    submit(client, full, exam, {q0: "a", q1: "x", q2: "y"})
+    submit(client, partial, exam, {q1: "x", q2: "y"})
+    submit(client, ungraded, exam, {q2: "y"})
+    responses = response_ids(app, exam)
+
+    # New evaluations, a regrade, and two responses of one student in one batch
+    _grade(client, admin, [(responses[(full.id, q0)], 2), (responses[(full.id, q1)], 4)])
+    _grade(client, admin, [(responses[(full.id, q1)], 1.5), (responses[(full.id, q2)], 5)])
+    _grade(client, admin, [(responses[(partial.id, q1)], 3)])
+
+    incremental = _scores(app, exam)
+    assert incremental == {
+        full.id: (8.5, 12, 3, 0),
+        partial.id: (3.0, 10, 1, 1),
+        ungraded.id: (0.0, 5, 0, 1)
+    }
+    with app.app_context():
+        rebuild_all_scores()
+        db.session.commit()
+    assert _scores(app, exam) == incremental
@@ -0,0 +1,17 @@
+# tests/test_query_plans.py
+
+import pytest
+from app.services.query_plans import check_query_plans, hot_query_names
+
+
+@pytest.fixture(scope='module')
+def plans(app):
+    """EXPLAIN result of every hot query, by name: (plan lines, tables read with a full scan)."""
+    with app.app_context():
+        return {name: (plan_lines, full_scans) for name, plan_lines, full_scans in check_query_plans()}
+
+
+@pytest.mark.parametrize('name', hot_query_names())
+def test_hot_query_uses_indexes(plans, name):
+    plan_lines, full_scans = plans[name]
+    assert not full_scans, f"{name}: full scan of {', '.join(full_scans)}\n" + "\n".join(plan_lines)
@@ -0,0 +1,105 @@
+# tests/test_submission_queue.py
+
+import json
+import os
+from datetime import datetime
+from unittest import mock
+import pytest
+from sqlalchemy.exc import OperationalError
+from app.extensions import db
+from app.models import UserRole, StudentResponse
+from app.services import submission_queue
+from conftest import submit
+
+
+@pytest.fixture
+def queue_dir(app, tmp_path, monkeypatch):
+    """Queue mode on the shared app (what init_app sets up), with no drainer thread: tests drain explicitly."""
+    os.makedirs(tmp_path / submission_queue.PENDING_DIRNAME)
+    monkeypatch.setattr(submission_queue, '_app', app)
+    monkeypatch.setattr(submission_queue, '_queue_dir', str(tmp_path))
+    return tmp_path
+
+
+def _drain(app):
+    with app.app_context():
+        return submission_queue.drain()
+
+
+def _stored_answers(app, exam):
+    with app.app_context():
+        return sorted(db.session.query(StudentResponse.student_id, StudentResponse.response_text).filter_by(exam_id=exam.id))
+
+
+def _dead_letters(queue_dir):
+    path = queue_dir / submission_queue.DEAD_LETTER_FILENAME
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_queued_submissions_are_replayed_once(app, client, queue_dir, make_user, make_exam):
+    exam = make_exam(make_user(UserRole.TEACHER))
+    students = [make_user(), make_user()]
+    for student in students:
+        assert submit(client, student, exam, {exam.question_ids[0]: f"from {student.id}"}).status_code == 202
+    assert _stored_answers(app, exam) == [] # Acknowledged, not yet written
+
+    log_path = queue_dir / submission_queue.LOG_FILENAME
+    log = log_path.read_bytes()
+    assert _drain(app) == 2
+    expected = [(student.id, f"from {student.id}") for student in students]
+    assert _stored_answers(app, exam) == expected
+    assert log_path.read_bytes() == b"" and os.listdir(queue_dir / submission_queue.PENDING_DIRNAME) == []
+
+    # Crash after the commit but before the offset was saved: the entries are replayed, without duplicates
+    log_path.write_bytes(log)
+    (queue_dir / submission_queue.OFFSET_FILENAME).write_text("0")
+    assert _drain(app) == 0
+    assert _stored_answers(app, exam) == expected
+
+
+def test_failed_entries_are_dead_lettered_after_commit(app, client, queue_dir, make_user, make_exam):
+    exam = make_exam(make_user(UserRole.TEACHER))
+    good, bad = make_user(), make_user()
+    assert submit(client, good, exam, {exam.question_ids[0]: "ok"}).status_code == 202
+    with open(queue_dir / submission_queue.LOG_FILENAME, 'a') as log:
+        log.write("not json\n")
+    # Passed the endpoint's checks, but cannot be stored (response_text must be a string)
+    submission_queue.enqueue(bad.id, exam.id, [(exam.question_ids[0], {"not": "text"})], datetime.utcnow())
+
+    # A batch rolled back by the database is retried without dead-lettering anything twice
+    with app.app_context():
+        with mock.patch.object(db.session, 'commit', side_effect=OperationalError('COMMIT', {}, Exception('database is locked'))):
+            with pytest.raises(OperationalError):
+                submission_queue.drain()
+    assert _dead_letters(queue_dir) == []
+
+    assert _drain(app) == 1
+    assert _stored_answers(app, exam) == [(good.id, "ok")]
+    dead = _dead_letters(queue_dir)
+    assert len(dead) == 2
+    assert dead[0]["entry"] == "not json"
+    assert dead[1]["entry"]["student_id"] == bad.id
+
+    # The student whose submission failed may submit again
+    assert submit(client, bad, exam, {exam.question_ids[0]: "retry"}).status_code == 202
+
+
+def test_queued_submission_blocks_resubmit_and_drafts(app, client, queue_dir, make_user, make_exam):
+    exam = make_exam(make_user(UserRole.TEACHER))
+    student = make_user()
+    answer = {exam.question_ids[1]: "queued"}
+    assert submit(client, student, exam, answer).status_code == 202
+    assert submission_queue.is_pending(student.id, exam.id)
+
+    assert submit(client, student, exam, {exam.question_ids[1]: "again"}).status_code == 403
+    draft = client.put(f'/student/exams/{exam.id}/draft', headers=student.headers, json={
+        "answers": [{"question_id": exam.question_ids[1], "response_text": "autosave"}]
+    })
+    assert draft.status_code == 403
+
+    _drain(app)
+    assert not submission_queue.is_pending(student.id, exam.id)
+    assert submit(client, student, exam, {exam.question_ids[1]: "again"}).status_code == 403
+    assert _stored_answers(app, exam) == [(student.id, "queued")]
@@ -0,0 +1,65 @@
+# tests/test_teacher_results.py
+
+import csv
+import io
+from app.models import UserRole
+from conftest import submit, response_ids
+
+
+def _grade(client, admin, app, exam, marks):
+    """Saves marks given as {(student_id, question_id): marks}."""
+    responses = response_ids(app, exam)
+    response = client.post('/admin/evaluate/bulk', headers=admin.headers, json={
+        "evaluations": [{"response_id": responses[key], "marks": value} for key, value in marks.items()]
+    })
+    assert response.status_code == 200, response.get_json()
+
+
+def test_results_summary_pages_through_every_student(client, make_user, make_exam):
+    teacher = make_user(UserRole.TEACHER)
+    exam = make_exam(teacher)
+    students = [make_user() for _ in range(5)]
+    for student in students:
+        submit(client, student, exam, {exam.question_ids[1]: "answer"})
+
+    url = f'/teacher/exams/results/{exam.id}?mode=summary&per_page=2'
+    seen, pages, cursor = [], 0, None
+    while True:
+        page = client.get(url + (f'&cursor={cursor}' if cursor else ''), headers=teacher.headers).get_json()
+        assert page["summary"]["students"] == 5 and page["approximate_total"] == 5
+        seen += [result["student_id"] for result in page["results"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        assert page["has_more"] == (cursor is not None)
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert seen == sorted(student.id for student in students)
+    assert client.get(url + '&cursor=not-a-cursor', headers=teacher.headers).status_code == 400
+
+
+def test_csv_export_pivots_marks_per_question(app, client, make_user, make_exam):
+    admin, teacher = make_user(UserRole.ADMIN), make_user(UserRole.TEACHER)
+    exam = make_exam(teacher, marks=(2, 5, 5))
+    q0, q1, q2 = exam.question_ids
+    graded, partly_graded = make_user(), make_user()
+    submit(client, graded, exam, {q0: "a", q2: "text"}) # Skips q1
+    submit(client, partly_graded, exam, {q0: "b", q1: "text", q2: "text"})
+    _grade(client, admin, app, exam, {(graded.id, q0): 2, (graded.id, q2): 4, (partly_graded.id, q1): 1.5})
+
+    response = client.get(f'/teacher/exams/{exam.id}/results/export?format=csv', headers=teacher.headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True).lstrip('\ufeff'))))
+
+    assert rows[0] == [
+        "Student ID", "Student Name", "Student Email", "Submitted At (UTC)",
+        "Q1 (2)", "Q2 (5)", "Q3 (5)", "Total", "Max Marks", "Percentage", "Status"
+    ]
+    by_student = {int(row[0]): row for row in rows[1:]}
+    assert sorted(by_student) == sorted([graded.id, partly_graded.id])
+    # Per-question marks land in their question's column; unanswered and ungraded cells are empty
+    assert by_student[graded.id][2] == graded.email
+    assert by_student[graded.id][4:] == ["2.0", "", "4.0", "6.0", "12", "50.0", "Fully Evaluated"]
+    assert by_student[partly_graded.id][4:] == ["", "1.5", "", "1.5", "12", "12.5", "Pending Evaluation (2)"]
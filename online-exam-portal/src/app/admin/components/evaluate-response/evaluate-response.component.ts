@@ -28,11 +28,11 @@ interface Response {
 }
 
 interface ResponseData {
-  current_page: number;
   per_page: number;
   responses: Response[];
-  total_pages: number;
-  total_responses: number;
+  next_cursor: string | null;
+  has_more: boolean;
+  approximate_total?: number;
 }
 
 @Component({
@@ -49,6 +49,9 @@ export class EvaluateResponseComponent implements OnInit {
   totalPages = 1;
   totalResponses = 0;
   itemsPerPage = 20;
+  // Cursor of every page visited so far (index 0 = first page); the API pages by cursor, not by number
+  private pageCursors: (string | null)[] = [null];
+  private nextCursor: string | null = null;
   
   // For individual response evaluation
   selectedResponse: any = null;
@@ -71,13 +74,14 @@ export class EvaluateResponseComponent implements OnInit {
   loadResponses() {
     this.loading = true;
     this.error = null;
-    this.apiService.getAllResponses().subscribe({
+    this.apiService.getAllResponses(this.pageCursors[this.currentPage - 1], this.itemsPerPage).subscribe({
       next: (data: ResponseData) => {
         this.responses = data.responses;
-        this.currentPage = data.current_page;
-        this.totalPages = data.total_pages;
-        this.totalResponses = data.total_responses;
+        this.nextCursor = data.next_cursor;
+        this.totalResponses = data.approximate_total ?? this.totalResponses;
         this.itemsPerPage = data.per_page;
+        // Pages beyond the next one are unknown until reached; the total is approximate
+        this.totalPages = data.has_more ? this.currentPage + 1 : this.currentPage;
         this.loading = false;
       },
       error: (err) => {
@@ -155,9 +159,13 @@ export class EvaluateResponseComponent implements OnInit {
   }
 
   changePage(page: number) {
-    if (page >= 1 && page <= this.totalPages) {
-      this.loadResponses();
+    if (page === this.currentPage + 1 && this.nextCursor) {
+      this.pageCursors[page - 1] = this.nextCursor;
+    } else if (page < 1 || page > this.currentPage) {
+      return;
     }
+    this.currentPage = page;
+    this.loadResponses();
   }
 
   closeEvaluation() {
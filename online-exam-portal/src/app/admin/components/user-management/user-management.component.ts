@@ -6,6 +6,8 @@ import { ErrorAlertComponent } from '../../../shared/components/error-alert/erro
 import { CommonModule } from '@angular/common';
 import { User } from '../../../core/models/user';
 import { RouterLink } from '@angular/router';
+import { Observable } from 'rxjs';
+import { map } from 'rxjs/operators';
 
 @Component({
   selector: 'app-user-management',
@@ -19,6 +21,13 @@ export class UserManagementComponent implements OnInit {
   error: string | null = null;
   activeTab: 'pending' | 'teachers' | 'students' = 'pending';
 
+  // Teacher/student directories are paged by cursor and searched by name/email prefix
+  search = '';
+  currentPage = 1;
+  private pageCursors: (string | null)[] = [null];
+  nextCursor: string | null = null;
+  private searchTimer: any = null;
+
   constructor(
     private apiService: ApiService,
     private errorHandler: ErrorHandlerService
@@ -30,23 +39,55 @@ export class UserManagementComponent implements OnInit {
 
   setActiveTab(tab: 'pending' | 'teachers' | 'students') {
     this.activeTab = tab;
+    this.search = '';
+    this.resetPaging();
     this.loadUsers();
   }
 
+  onSearch(value: string) {
+    clearTimeout(this.searchTimer);
+    this.searchTimer = setTimeout(() => {
+      this.search = value.trim();
+      this.resetPaging();
+      this.loadUsers();
+    }, 300);
+  }
+
+  changePage(page: number) {
+    if (page === this.currentPage + 1 && this.nextCursor) {
+      this.pageCursors[page - 1] = this.nextCursor;
+    } else if (page < 1 || page > this.currentPage) {
+      return;
+    }
+    this.currentPage = page;
+    this.loadUsers();
+  }
+
+  private resetPaging() {
+    this.currentPage = 1;
+    this.pageCursors = [null];
+    this.nextCursor = null;
+  }
+
   loadUsers() {
     this.loading = true;
     this.error = null;
     
-    let apiCall;
+    const cursor = this.pageCursors[this.currentPage - 1];
+    let apiCall: Observable<User[]>;
     switch (this.activeTab) {
       case 'pending':
         apiCall = this.apiService.getPendingUsers();
         break;
       case 'teachers':
-        apiCall = this.apiService.getAllTeachers();
+        apiCall = this.apiService.getAllTeachers(cursor, this.search).pipe(
+          map((data) => this.directoryPage(data, data.teachers))
+        );
         break;
       case 'students':
-        apiCall = this.apiService.getAllStudents();
+        apiCall = this.apiService.getAllStudents(cursor, this.search).pipe(
+          map((data) => this.directoryPage(data, data.students))
+        );
         break;
     }
     
@@ -65,6 +106,11 @@ export class UserManagementComponent implements OnInit {
     });
   }
 
+  private directoryPage(data: any, users: User[]): User[] {
+    this.nextCursor = data.next_cursor;
+    return users;
+  }
+
   verifyUser(userId: number) {
     if (confirm('Are you sure you want to verify this user?')) {
       this.loading = true;
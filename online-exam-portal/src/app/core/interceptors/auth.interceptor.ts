@@ -1,7 +1,7 @@
-import { HttpInterceptorFn } from '@angular/common/http';
+import { HttpErrorResponse, HttpInterceptorFn } from '@angular/common/http';
 import { inject } from '@angular/core';
 import { AuthService } from '../services/auth.service';
-import { catchError, throwError } from 'rxjs';
+import { catchError, switchMap, throwError } from 'rxjs';
 import { Router } from '@angular/router';
 
 export const authInterceptor: HttpInterceptorFn = (req, next) => {
@@ -23,13 +23,17 @@ export const authInterceptor: HttpInterceptorFn = (req, next) => {
     });
     return next(cloned).pipe(
       catchError(err => {
-        if (err.status === 401) {
-          // Only logout if it's not a token refresh attempt
-          if (!req.url.includes('/auth/refresh')) {
-            authService.logout().subscribe(() => {
-              router.navigate(['/auth/login']);
-            });
-          }
+        if (err instanceof HttpErrorResponse && err.status === 401 && !req.url.includes('/auth/logout')) {
+          // Access token expired or revoked: try once with a refreshed token, else log out
+          return authService.refreshToken().pipe(
+            switchMap(newToken => next(req.clone({ setHeaders: { Authorization: `Bearer ${newToken}` } }))),
+            catchError(refreshErr => {
+              authService.logout().subscribe(() => {
+                router.navigate(['/auth/login']);
+              });
+              return throwError(() => err);
+            })
+          );
         }
         return throwError(() => err);
       })
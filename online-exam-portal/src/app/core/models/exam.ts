@@ -6,5 +6,7 @@ export interface Exam {
   duration_minutes?: number;
   created_by?: number;
   created_at_utc?: string;
+  question_count?: number;
+  total_marks?: number;
   status?: 'Upcoming' | 'Active';
 }
\ No newline at end of file
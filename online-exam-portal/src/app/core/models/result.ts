@@ -1,21 +1,38 @@
+export interface ResultQuestion {
+    question_id: number;
+    question_text: string;
+    question_type: string;
+    your_response: string;
+    submitted_at_utc: string;
+    marks_awarded: number | null;
+    marks_possible: number;
+    feedback: string;
+    evaluated_at_utc: string | null;
+    evaluated_by: string | null;
+    status: 'Evaluated' | 'Pending Evaluation';
+  }
+
 export interface Result {
     exam_id: number;
     exam_title: string;
     exam_scheduled_time_utc: string;
     total_marks_awarded: number;
     total_marks_possible: number;
+    evaluated_count: number;
+    pending_count: number;
     overall_status: 'Results Declared' | 'Pending Evaluation';
-    questions: {
-      question_id: number;
-      question_text: string;
-      question_type: string;
-      your_response: string;
-      submitted_at_utc: string;
-      marks_awarded: number | null;
-      marks_possible: number;
-      feedback: string;
-      evaluated_at_utc: string | null;
-      evaluated_by: string | null;
-      status: 'Evaluated' | 'Pending Evaluation';
-    }[];
-  }
\ No newline at end of file
+    rank: number | null;
+    percentile: number | null;
+    cohort: {
+      students: number;
+      ranked_students: number;
+      average_marks: number | null;
+      median_marks: number | null;
+      highest_marks: number | null;
+      histogram: number[];
+      band_percent: number;
+      provisional: boolean;
+      computed_at_utc: string;
+    } | null;
+    questions?: ResultQuestion[];
+  }
@@ -1,9 +1,9 @@
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
+import { HttpClient, HttpParams } from '@angular/common/http';
 import { Observable } from 'rxjs';
 import { environment } from '../../../environments/environment';
 import { Exam } from '../models/exam';
-import { Result } from '../models/result';
+import { Result, ResultQuestion } from '../models/result';
 import { Question } from '../models/question';
 import { User } from '../models/user';
 
@@ -32,12 +32,23 @@ export class ApiService {
     return this.http.get<User[]>(`${this.baseUrl}/admin/users/pending`);
   }
 
-  getAllTeachers(): Observable<User[]> {
-    return this.http.get<User[]>(`${this.baseUrl}/admin/teachers`);
+  getAllTeachers(cursor: string | null = null, search: string = '', perPage: number = 50): Observable<any> {
+    return this.http.get(`${this.baseUrl}/admin/teachers`, { params: this.directoryParams(cursor, search, perPage) });
   }
 
-  getAllStudents(): Observable<User[]> {
-    return this.http.get<User[]>(`${this.baseUrl}/admin/students`);
+  getAllStudents(cursor: string | null = null, search: string = '', perPage: number = 50): Observable<any> {
+    return this.http.get(`${this.baseUrl}/admin/students`, { params: this.directoryParams(cursor, search, perPage) });
+  }
+
+  private directoryParams(cursor: string | null, search: string, perPage: number): HttpParams {
+    let params = new HttpParams().set('per_page', perPage);
+    if (cursor) {
+      params = params.set('cursor', cursor);
+    }
+    if (search) {
+      params = params.set('q', search);
+    }
+    return params;
   }
 
   verifyUser(userId: number): Observable<any> {
@@ -67,6 +78,8 @@ export class ApiService {
     total_pages: number;
     current_page: number;
     per_page: number;
+    next_cursor: string | null;
+    has_more: boolean;
   }> {
     return this.http.get<any>(`${this.baseUrl}/admin/results/all?page=${page}&per_page=${perPage}`);
   }
@@ -105,8 +118,27 @@ export class ApiService {
     return this.http.post(`${this.baseUrl}/admin/evaluate/submit`, data);
   }
 
-  getAllResponses(): Observable<any> {
-    return this.http.get(`${this.baseUrl}/admin/response/all`);
+  getQuestionResponses(questionId: number, cursor: string | null = null, status: 'pending' | 'evaluated' | null = null, perPage: number = 50): Observable<any> {
+    let params = new HttpParams().set('per_page', perPage);
+    if (cursor) {
+      params = params.set('cursor', cursor);
+    }
+    if (status) {
+      params = params.set('status', status);
+    }
+    return this.http.get(`${this.baseUrl}/admin/questions/${questionId}/responses`, { params });
+  }
+
+  submitBulkEvaluations(evaluations: Array<{ response_id: number; marks: number; feedback?: string }>, questionId?: number): Observable<any> {
+    return this.http.post(`${this.baseUrl}/admin/evaluate/bulk`, { question_id: questionId, evaluations });
+  }
+
+  getAllResponses(cursor: string | null = null, perPage: number = 20): Observable<any> {
+    let params = new HttpParams().set('per_page', perPage).set('with_total', 'true');
+    if (cursor) {
+      params = params.set('cursor', cursor);
+    }
+    return this.http.get(`${this.baseUrl}/admin/response/all`, { params });
   }
 
   triggerAIEvaluation(responseId: number): Observable<any> {
@@ -142,9 +174,21 @@ export class ApiService {
     return this.http.delete(`${this.baseUrl}/teacher/exams/${examId}/questions/${questionId}`);
   }
   getExamResults(examId: number): Observable<any> {
+    // Summary only; per-response details are loaded per student with getExamResultDetails
     return this.http.get(`${this.baseUrl}/teacher/exams/results/${examId}`);
   }
 
+  getExamResultDetails(examId: number, studentId: number): Observable<{ exam_id: number; student_id: number; details: any[] }> {
+    return this.http.get<{ exam_id: number; student_id: number; details: any[] }>(`${this.baseUrl}/teacher/exams/results/${examId}/students/${studentId}`);
+  }
+
+  exportExamResults(examId: number, format: 'csv' | 'xlsx'): Observable<Blob> {
+    return this.http.get(`${this.baseUrl}/teacher/exams/${examId}/results/export`, {
+      params: new HttpParams().set('format', format),
+      responseType: 'blob'
+    });
+  }
+
   // Student APIs
   getStudentDashboard(): Observable<{ message: string; completed_exams_count: number; upcoming_exams: Exam[] }> {
     return this.http.get<{ message: string; completed_exams_count: number; upcoming_exams: Exam[] }>(`${this.baseUrl}/student/dashboard`);
@@ -172,11 +216,27 @@ export class ApiService {
     }>(`${this.baseUrl}/student/exams/${examId}/take`);
   }
 
-  submitExam(examId: number, answers: { question_id: number; response_text: string }[]): Observable<{ msg: string }> {
-    return this.http.post<{ msg: string }>(`${this.baseUrl}/student/exams/${examId}/submit`, { answers });
+  submitExam(examId: number, answers: { question_id: number; response_text: string }[], useDraft: boolean = false): Observable<{ msg: string }> {
+    return this.http.post<{ msg: string }>(`${this.baseUrl}/student/exams/${examId}/submit`, { answers, use_draft: useDraft });
+  }
+
+  saveExamDraft(examId: number, answers: { question_id: number; response_text: string }[]): Observable<{ msg: string; saved_answers: number }> {
+    return this.http.put<{ msg: string; saved_answers: number }>(`${this.baseUrl}/student/exams/${examId}/draft`, { answers });
+  }
+
+  getExamDraft(examId: number): Observable<{
+    exam_id: number;
+    answers: { question_id: number; response_text: string; saved_at_utc: string }[];
+  }> {
+    return this.http.get<any>(`${this.baseUrl}/student/exams/${examId}/draft`);
   }
 
   getStudentResults(): Observable<Result[]> {
+    // Summary only; per-question details are loaded per exam with getStudentResultQuestions
     return this.http.get<Result[]>(`${this.baseUrl}/student/results/my`);
   }
+
+  getStudentResultQuestions(examId: number): Observable<{ exam_id: number; questions: ResultQuestion[] }> {
+    return this.http.get<{ exam_id: number; questions: ResultQuestion[] }>(`${this.baseUrl}/student/results/my/${examId}/questions`);
+  }
 }
\ No newline at end of file
@@ -1,7 +1,7 @@
 import { Injectable } from '@angular/core';
 import { HttpClient } from '@angular/common/http';
-import { BehaviorSubject, Observable, of } from 'rxjs';
-import { catchError, map, tap } from 'rxjs/operators';
+import { BehaviorSubject, Observable, of, throwError } from 'rxjs';
+import { catchError, finalize, map, shareReplay, tap } from 'rxjs/operators';
 import { environment } from '../../../environments/environment';
 import { User } from '../models/user';
 import { Router } from '@angular/router';
@@ -14,6 +14,8 @@ export class AuthService {
   private currentUserSubject = new BehaviorSubject<User | null>(null);
   public currentUser = this.currentUserSubject.asObservable();
   private TOKEN_KEY = 'auth_token';
+  private REFRESH_TOKEN_KEY = 'refresh_token';
+  private refreshInFlight: Observable<string> | null = null;
 
   constructor(
     private http: HttpClient,
@@ -41,11 +43,11 @@ export class AuthService {
     }
   }
 
-  login(credentials: { email: string; password: string }): Observable<{ access_token: string }> {
-    return this.http.post<{ access_token: string }>(`${this.apiUrl}/auth/login`, credentials).pipe(
+  login(credentials: { email: string; password: string }): Observable<{ access_token: string; refresh_token: string }> {
+    return this.http.post<{ access_token: string; refresh_token: string }>(`${this.apiUrl}/auth/login`, credentials).pipe(
       tap(response => {
         if (response.access_token) {
-          localStorage.setItem(this.TOKEN_KEY, response.access_token);
+          this.storeTokens(response);
           this.fetchUser().subscribe({
             next: (user) => {
               if (user) {
@@ -69,8 +71,31 @@ export class AuthService {
     return this.http.post(`${this.apiUrl}/auth/register`, user);
   }
 
+  /**
+   * Exchanges the stored refresh token for a new token pair (the old refresh token stops working).
+   * Concurrent callers share one request. Emits the new access token.
+   */
+  refreshToken(): Observable<string> {
+    const refreshToken = localStorage.getItem(this.REFRESH_TOKEN_KEY);
+    if (!refreshToken) {
+      return throwError(() => new Error('No refresh token'));
+    }
+    if (!this.refreshInFlight) {
+      this.refreshInFlight = this.http.post<{ access_token: string; refresh_token: string }>(
+        `${this.apiUrl}/auth/refresh`, {}, { headers: { Authorization: `Bearer ${refreshToken}` } }
+      ).pipe(
+        tap(response => this.storeTokens(response)),
+        map(response => response.access_token),
+        finalize(() => this.refreshInFlight = null),
+        shareReplay(1)
+      );
+    }
+    return this.refreshInFlight;
+  }
+
   logout(): Observable<void> {
-    return this.http.post<{ msg: string }>(`${this.apiUrl}/auth/logout`, {}).pipe(
+    const refreshToken = localStorage.getItem(this.REFRESH_TOKEN_KEY);
+    return this.http.post<{ msg: string }>(`${this.apiUrl}/auth/logout`, refreshToken ? { refresh_token: refreshToken } : {}).pipe(
       tap(() => this.clearAuth()),
       map(() => void 0),
       catchError(() => {
@@ -103,8 +128,14 @@ export class AuthService {
     return localStorage.getItem(this.TOKEN_KEY);
   }
   
+  private storeTokens(tokens: { access_token: string; refresh_token: string }) {
+    localStorage.setItem(this.TOKEN_KEY, tokens.access_token);
+    localStorage.setItem(this.REFRESH_TOKEN_KEY, tokens.refresh_token);
+  }
+
   private clearAuth() {
     localStorage.removeItem(this.TOKEN_KEY);
+    localStorage.removeItem(this.REFRESH_TOKEN_KEY);
     this.currentUserSubject.next(null);
   }
 
@@ -21,6 +21,10 @@ export class ExamTakeComponent implements OnInit, OnDestroy {
   submitting: boolean = false;
   timeLeft: number = 0;
   private timerInterval: any;
+  private autosaveInterval: any;
+  // Question IDs edited since the last autosave; only these are sent as deltas
+  private dirtyQuestionIds = new Set<number>();
+  private readonly autosaveIntervalMs = 10000;
 
   constructor(
     private route: ActivatedRoute,
@@ -39,6 +43,9 @@ export class ExamTakeComponent implements OnInit, OnDestroy {
     if (this.timerInterval) {
       clearInterval(this.timerInterval);
     }
+    if (this.autosaveInterval) {
+      clearInterval(this.autosaveInterval);
+    }
   }
 
   loadExam(examId: number) {
@@ -53,7 +60,9 @@ export class ExamTakeComponent implements OnInit, OnDestroy {
         }
         this.exam = response;
         this.timeLeft = response.time_remaining_seconds || response.duration_minutes * 60;
+        this.restoreDraft(examId);
         this.startTimer();
+        this.startAutosave();
         this.loading = false;
       },
       error: (err) => {
@@ -73,6 +82,26 @@ export class ExamTakeComponent implements OnInit, OnDestroy {
     }, 1000);
   }
 
+  startAutosave() {
+    this.autosaveInterval = setInterval(() => this.saveProgress(), this.autosaveIntervalMs);
+  }
+
+  restoreDraft(examId: number) {
+    this.apiService.getExamDraft(examId).subscribe({
+      next: (draft) => {
+        for (const answer of draft.answers) {
+          // Answers typed since the page loaded take precedence over the stored draft
+          if (this.answers[answer.question_id] === undefined) {
+            this.answers[answer.question_id] = answer.response_text;
+          }
+        }
+      },
+      error: () => {
+        // No draft available; start with empty answers
+      }
+    });
+  }
+
   get currentQuestion(): Question | null {
     return this.exam?.questions[this.currentQuestionIndex] || null;
   }
@@ -81,6 +110,7 @@ export class ExamTakeComponent implements OnInit, OnDestroy {
     if (this.currentQuestion) {
       const value = event.target ? event.target.value : event;
       this.answers[this.currentQuestion.id] = value;
+      this.dirtyQuestionIds.add(this.currentQuestion.id);
     }
   }
 
@@ -102,20 +132,23 @@ export class ExamTakeComponent implements OnInit, OnDestroy {
   }
 
   saveProgress() {
-    if (!this.exam) return;
-    
-    // Convert answers to the format expected by the API
-    const formattedAnswers = Object.entries(this.answers).map(([id, text]) => ({
-      question_id: parseInt(id),
-      response_text: text
+    if (!this.exam || this.submitting || this.dirtyQuestionIds.size === 0) return;
+
+    // Autosave only the answers changed since the last save
+    const changedIds = Array.from(this.dirtyQuestionIds);
+    this.dirtyQuestionIds.clear();
+    const formattedAnswers = changedIds.map(id => ({
+      question_id: id,
+      response_text: this.answers[id]
     }));
-    
-    this.apiService.submitExam(this.exam.exam_id, formattedAnswers).subscribe({
+
+    this.apiService.saveExamDraft(this.exam.exam_id, formattedAnswers).subscribe({
       next: () => {
-        // Show success message or handle as needed
+        // Draft saved; nothing to show
       },
-      error: (err) => {
-        this.error = err.error?.msg || 'Failed to save progress.';
+      error: () => {
+        // Retry these answers on the next autosave
+        changedIds.forEach(id => this.dirtyQuestionIds.add(id));
       }
     });
   }
@@ -130,6 +163,9 @@ export class ExamTakeComponent implements OnInit, OnDestroy {
     if (!this.exam) return;
     
     this.submitting = true;
+    if (this.autosaveInterval) {
+      clearInterval(this.autosaveInterval);
+    }
     
     // Convert answers to the format expected by the API
     const formattedAnswers = Object.entries(this.answers).map(([id, text]) => ({
@@ -137,7 +173,8 @@ export class ExamTakeComponent implements OnInit, OnDestroy {
       response_text: text
     }));
     
-    this.apiService.submitExam(this.exam.exam_id, formattedAnswers).subscribe({
+    // use_draft lets the server fill in answers autosaved from another tab or before a crash
+    this.apiService.submitExam(this.exam.exam_id, formattedAnswers, true).subscribe({
       next: (response) => {
         this.submitting = false;
         this.router.navigate(['/student/results'], { 
@@ -2,7 +2,7 @@ import { Component, OnInit } from '@angular/core';
 import { CommonModule } from '@angular/common';
 import { RouterModule } from '@angular/router';
 import { ApiService } from '../../../core/services/api.service';
-import { Result } from '../../../core/models/result';
+import { Result, ResultQuestion } from '../../../core/models/result';
 
 @Component({
   selector: 'app-results',
@@ -13,6 +13,10 @@ import { Result } from '../../../core/models/result';
 export class ResultsComponent implements OnInit {
   results: Result[] = [];
   error: string | null = null;
+  // Question details per exam ID, fetched the first time an exam is expanded
+  questions: { [examId: number]: ResultQuestion[] } = {};
+  expanded = new Set<number>();
+  loadingQuestions = new Set<number>();
 
   constructor(private apiService: ApiService) {}
 
@@ -32,4 +36,28 @@ export class ResultsComponent implements OnInit {
       }
     });
   }
+
+  toggleQuestions(examId: number) {
+    if (this.expanded.has(examId)) {
+      this.expanded.delete(examId);
+      return;
+    }
+    this.expanded.add(examId);
+    if (this.questions[examId] || this.loadingQuestions.has(examId)) {
+      return;
+    }
+    this.loadingQuestions.add(examId);
+    this.apiService.getStudentResultQuestions(examId).subscribe({
+      next: (response) => {
+        this.questions[examId] = response.questions;
+        this.loadingQuestions.delete(examId);
+      },
+      error: (err) => {
+        this.loadingQuestions.delete(examId);
+        this.expanded.delete(examId);
+        this.error = err.error?.msg || 'Failed to load question details.';
+        console.error('Error loading question details:', err);
+      }
+    });
+  }
 }
\ No newline at end of file
@@ -4,8 +4,28 @@ import { RouterModule } from '@angular/router';
 import { HttpClient } from '@angular/common/http';
 import { environment } from '../../../../environments/environment';
 
+interface TeacherExamSummary {
+  id: number;
+  title: string;
+  scheduled_time_utc: string;
+  duration_minutes: number;
+  status: 'Upcoming' | 'Active' | 'Finished';
+  question_count: number;
+  total_marks: number;
+  submissions: number;
+  submissions_last_24h: number;
+  pending_evaluations: number;
+  fully_evaluated: number;
+  average_marks: number | null;
+  average_percentage: number | null;
+}
+
 interface TeacherStats {
   my_exams_count: number;
+  exam_status_counts: { upcoming: number; active: number; finished: number };
+  submissions_last_24h: number;
+  pending_evaluations: number;
+  exams: TeacherExamSummary[];
 }
 
 @Component({
@@ -16,7 +16,12 @@ export class ExamResultsComponent implements OnInit {
   examId: number;
   results: any[] = [];
   loading = false;
+  exporting = false;
   error: string | null = null;
+  // Per-response details per student ID, fetched the first time a student is expanded
+  details: { [studentId: number]: any[] } = {};
+  expanded = new Set<number>();
+  loadingDetails = new Set<number>();
 
   constructor(
     private apiService: ApiService,
@@ -45,4 +50,46 @@ export class ExamResultsComponent implements OnInit {
       }
     });
   }
+
+  toggleDetails(studentId: number) {
+    if (this.expanded.has(studentId)) {
+      this.expanded.delete(studentId);
+      return;
+    }
+    this.expanded.add(studentId);
+    if (this.details[studentId] || this.loadingDetails.has(studentId)) {
+      return;
+    }
+    this.loadingDetails.add(studentId);
+    this.apiService.getExamResultDetails(this.examId, studentId).subscribe({
+      next: (response) => {
+        this.details[studentId] = response.details;
+        this.loadingDetails.delete(studentId);
+      },
+      error: (err) => {
+        this.loadingDetails.delete(studentId);
+        this.expanded.delete(studentId);
+        this.errorHandler.handleError(err.error?.msg || 'Failed to load result details');
+      }
+    });
+  }
+
+  exportResults(format: 'csv' | 'xlsx') {
+    this.exporting = true;
+    this.apiService.exportExamResults(this.examId, format).subscribe({
+      next: (file) => {
+        const url = URL.createObjectURL(file);
+        const link = document.createElement('a');
+        link.href = url;
+        link.download = `exam_${this.examId}_results.${format}`;
+        link.click();
+        URL.revokeObjectURL(url);
+        this.exporting = false;
+      },
+      error: () => {
+        this.exporting = false;
+        this.errorHandler.handleError('Failed to export results');
+      }
+    });
+  }
 }
\ No newline at end of file